@@ -8,14 +8,18 @@ import sys
 from .base_events import *
 from .coroutines import *
 from .events import *
+from .files import *
 from .futures import *
 from .locks import *
+from .loopstats import *
+from .pools import *
 from .protocols import *
 from .runners import *
 from .queues import *
 from .streams import *
 from .subprocess import *
 from .tasks import *
+from .timerwheel import *
 from .transports import *
 
 # Exposed for _asynciomodule.c to implement now deprecated
@@ -25,14 +29,18 @@ from .tasks import _all_tasks_compat  # NoQA
 __all__ = (base_events.__all__ +
            coroutines.__all__ +
            events.__all__ +
+           files.__all__ +
            futures.__all__ +
            locks.__all__ +
+           loopstats.__all__ +
+           pools.__all__ +
            protocols.__all__ +
            runners.__all__ +
            queues.__all__ +
            streams.__all__ +
            subprocess.__all__ +
            tasks.__all__ +
+           timerwheel.__all__ +
            transports.__all__)
 
 if sys.platform == 'win32':  # pragma: no cover
@@ -16,6 +16,7 @@ to modify the meaning of the API call itself.
 import collections
 import collections.abc
 import concurrent.futures
+import functools
 import heapq
 import itertools
 import logging
@@ -37,10 +38,14 @@ except ImportError:  # pragma: no cover
 from . import constants
 from . import coroutines
 from . import events
+from . import files
 from . import futures
+from . import loopstats
 from . import protocols
 from . import sslproto
+from . import staggered
 from . import tasks
+from . import timerwheel
 from . import transports
 from .log import logger
 
@@ -85,6 +90,91 @@ def _format_pipe(fd):
         return repr(fd)
 
 
+def _interleave_addrinfos(addrinfos, first_address_family_count=1):
+    """Interleave list of addrinfo tuples by family."""
+    # Group addresses by family
+    addrinfos_by_family = collections.OrderedDict()
+    for addr in addrinfos:
+        family = addr[0]
+        if family not in addrinfos_by_family:
+            addrinfos_by_family[family] = []
+        addrinfos_by_family[family].append(addr)
+    addrinfos_lists = list(addrinfos_by_family.values())
+
+    reordered = []
+    if first_address_family_count > 1:
+        reordered.extend(addrinfos_lists[0][:first_address_family_count - 1])
+        del addrinfos_lists[0][:first_address_family_count - 1]
+    reordered.extend(
+        a for a in itertools.chain.from_iterable(
+            itertools.zip_longest(*addrinfos_lists)
+        ) if a is not None)
+    return reordered
+
+
+class _GetaddrinfoCache:
+    """Cache of getaddrinfo() results, used by BaseEventLoop.getaddrinfo().
+
+    Successful results are kept for ttl seconds and resolution failures
+    (socket.gaierror) for negative_ttl seconds. Concurrent lookups of the
+    same address share a single call to getaddrinfo().
+    """
+
+    def __init__(self, loop, ttl, negative_ttl, maxsize):
+        self._loop = loop
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._maxsize = maxsize
+        # key -> [expiry time, result list or gaierror args, pending future]
+        self._entries = collections.OrderedDict()
+
+    def clear(self):
+        self._entries.clear()
+
+    async def getaddrinfo(self, key, resolve):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value, fut = entry
+            if fut is not None:
+                value = await tasks.shield(fut, loop=self._loop)
+                return list(value)
+            if self._loop.time() < expires:
+                self._entries.move_to_end(key)
+                if isinstance(value, list):
+                    return list(value)
+                raise socket.gaierror(*value)
+            del self._entries[key]
+
+        fut = tasks.ensure_future(resolve(), loop=self._loop)
+        entry = [None, None, fut]
+        self._entries[key] = entry
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+        fut.add_done_callback(functools.partial(self._resolved, key, entry))
+        return list(await tasks.shield(fut, loop=self._loop))
+
+    def _resolved(self, key, entry, fut):
+        if self._entries.get(key) is not entry:
+            return
+        entry[2] = None
+        if fut.cancelled():
+            ttl = 0
+        else:
+            exc = fut.exception()
+            if exc is None:
+                ttl = self._ttl
+                entry[1] = list(fut.result())
+            elif isinstance(exc, socket.gaierror):
+                ttl = self._negative_ttl
+                entry[1] = exc.args
+            else:
+                ttl = 0
+        if ttl > 0:
+            entry[0] = self._loop.time() + ttl
+        else:
+            del self._entries[key]
+
+
 def _set_reuseport(sock):
     if not hasattr(socket, 'SO_REUSEPORT'):
         raise ValueError('reuse_port not supported by socket module')
@@ -352,7 +442,10 @@ class BaseEventLoop(events.AbstractEventLoop):
         self._stopping = False
         self._ready = collections.deque()
         self._scheduled = []
+        self._timer_wheel = None
         self._default_executor = None
+        self._file_io_pool = None
+        self._getaddrinfo_cache = None
         self._internal_fds = 0
         # Identifier of the thread running the event loop, or None if the
         # event loop is not running
@@ -363,6 +456,7 @@ class BaseEventLoop(events.AbstractEventLoop):
         # In debug mode, if the execution of a callback or a step of a task
         # exceed this duration in seconds, the slow callback/task is logged.
         self.slow_callback_duration = 0.1
+        self._stats = None
         self._current_handle = None
         self._task_factory = None
         self._coroutine_origin_tracking_enabled = False
@@ -416,6 +510,56 @@ class BaseEventLoop(events.AbstractEventLoop):
         """Return a task factory, or None if the default one is in use."""
         return self._task_factory
 
+    def set_timer_wheel(self, wheel):
+        """Schedule the timers with a TimerWheel instead of a heap.
+
+        wheel must be a TimerWheel instance, or None to go back to the
+        heap.  The timers already scheduled are moved over.
+        """
+        if wheel is not None and not isinstance(wheel, timerwheel.TimerWheel):
+            raise TypeError('wheel must be a TimerWheel instance or None')
+        if wheel is self._timer_wheel:
+            return
+        if wheel is not None:
+            wheel._start(self.time())
+
+        if self._timer_wheel is not None:
+            timers = self._timer_wheel.clear()
+        else:
+            timers = [timer for timer in self._scheduled
+                      if not timer._cancelled]
+            for timer in self._scheduled:
+                timer._scheduled = False
+            self._scheduled = []
+            self._timer_cancelled_count = 0
+
+        self._timer_wheel = wheel
+        if wheel is not None:
+            for timer in timers:
+                wheel.push(timer)
+        else:
+            for timer in timers:
+                timer._scheduled = True
+            heapq.heapify(timers)
+            self._scheduled = timers
+
+    def get_timer_wheel(self):
+        """Return the TimerWheel in use, or None if timers use a heap."""
+        return self._timer_wheel
+
+    def set_stats(self, stats):
+        """Start recording statistics of the event loop into stats.
+
+        stats must be a LoopStats instance, or None to stop recording.
+        """
+        if stats is not None and not isinstance(stats, loopstats.LoopStats):
+            raise TypeError('stats must be a LoopStats instance or None')
+        self._stats = stats
+
+    def get_stats(self):
+        """Return the LoopStats instance in use, or None."""
+        return self._stats
+
     def _make_socket_transport(self, sock, protocol, waiter=None, *,
                                extra=None, server=None):
         """Create socket transport."""
@@ -597,10 +741,16 @@ class BaseEventLoop(events.AbstractEventLoop):
         self._closed = True
         self._ready.clear()
         self._scheduled.clear()
+        if self._timer_wheel is not None:
+            self._timer_wheel.clear()
         executor = self._default_executor
         if executor is not None:
             self._default_executor = None
             executor.shutdown(wait=False)
+        pool = self._file_io_pool
+        if pool is not None:
+            self._file_io_pool = None
+            pool.shutdown(wait=False)
 
     def is_closed(self):
         """Returns True if the event loop was closed."""
@@ -660,8 +810,11 @@ class BaseEventLoop(events.AbstractEventLoop):
         timer = events.TimerHandle(when, callback, args, self, context)
         if timer._source_traceback:
             del timer._source_traceback[-1]
-        heapq.heappush(self._scheduled, timer)
-        timer._scheduled = True
+        if self._timer_wheel is not None:
+            self._timer_wheel.push(timer)
+        else:
+            heapq.heappush(self._scheduled, timer)
+            timer._scheduled = True
         return timer
 
     def call_soon(self, callback, *args, context=None):
@@ -743,6 +896,26 @@ class BaseEventLoop(events.AbstractEventLoop):
     def set_default_executor(self, executor):
         self._default_executor = executor
 
+    def set_file_io_pool(self, pool):
+        """Run the file operations of the loop in pool.
+
+        pool must be a FileIOPool created for this loop, or None to use a
+        pool with the default size, created when first needed.
+        """
+        if pool is not None:
+            if not isinstance(pool, files.FileIOPool):
+                raise TypeError('pool must be a FileIOPool instance or None')
+            if pool._loop is not self:
+                raise ValueError('pool was created for another event loop')
+        self._file_io_pool = pool
+
+    def get_file_io_pool(self):
+        """Return the FileIOPool running the file operations of the loop."""
+        self._check_closed()
+        if self._file_io_pool is None:
+            self._file_io_pool = files.FileIOPool(loop=self)
+        return self._file_io_pool
+
     def _getaddrinfo_debug(self, host, port, family, type, proto, flags):
         msg = [f"{host}:{port!r}"]
         if family:
@@ -774,9 +947,38 @@ class BaseEventLoop(events.AbstractEventLoop):
         else:
             getaddr_func = socket.getaddrinfo
 
+        if self._getaddrinfo_cache is not None:
+            return await self._getaddrinfo_cache.getaddrinfo(
+                (host, port, family, type, proto, flags),
+                functools.partial(
+                    self.run_in_executor, None, getaddr_func,
+                    host, port, family, type, proto, flags))
+
         return await self.run_in_executor(
             None, getaddr_func, host, port, family, type, proto, flags)
 
+    def set_getaddrinfo_cache(self, ttl, *, negative_ttl=0, maxsize=1024):
+        """Cache the results of getaddrinfo() in the event loop.
+
+        Successful results are reused for ttl seconds, and failures to
+        resolve a name for negative_ttl seconds.  At most maxsize results
+        are kept, the least recently used being discarded first.
+
+        If ttl is None, the cache is disabled and emptied.
+        """
+        if ttl is None:
+            self._getaddrinfo_cache = None
+            return
+        if ttl <= 0:
+            raise ValueError(f'ttl must be a positive number, got {ttl!r}')
+        if negative_ttl < 0:
+            raise ValueError(
+                f'negative_ttl must not be negative, got {negative_ttl!r}')
+        if maxsize < 1:
+            raise ValueError(f'maxsize must be at least 1, got {maxsize!r}')
+        self._getaddrinfo_cache = _GetaddrinfoCache(
+            self, ttl, negative_ttl, maxsize)
+
     async def getnameinfo(self, sockaddr, flags=0):
         return await self.run_in_executor(
             None, socket.getnameinfo, sockaddr, flags)
@@ -803,30 +1005,10 @@ class BaseEventLoop(events.AbstractEventLoop):
             "and file {file!r} combination")
 
     async def _sock_sendfile_fallback(self, sock, file, offset, count):
-        if offset:
-            file.seek(offset)
-        blocksize = (
-            min(count, constants.SENDFILE_FALLBACK_READBUFFER_SIZE)
-            if count else constants.SENDFILE_FALLBACK_READBUFFER_SIZE
-        )
-        buf = bytearray(blocksize)
-        total_sent = 0
-        try:
-            while True:
-                if count:
-                    blocksize = min(count - total_sent, blocksize)
-                    if blocksize <= 0:
-                        break
-                view = memoryview(buf)[:blocksize]
-                read = await self.run_in_executor(None, file.readinto, view)
-                if not read:
-                    break  # EOF
-                await self.sock_sendall(sock, view)
-                total_sent += read
-            return total_sent
-        finally:
-            if total_sent > 0 and hasattr(file, 'seek'):
-                file.seek(offset + total_sent)
+        return await files._sendfile_fallback(
+            self, file, offset, count,
+            constants.SENDFILE_FALLBACK_READBUFFER_SIZE,
+            functools.partial(self.sock_sendall, sock))
 
     def _check_sendfile_params(self, sock, file, offset, count):
         if 'b' not in getattr(file, 'mode', 'b'):
@@ -849,12 +1031,51 @@ class BaseEventLoop(events.AbstractEventLoop):
                 "offset must be a non-negative integer (got {!r})".format(
                     offset))
 
+    async def _connect_sock(self, exceptions, addr_info, local_addr_infos=None):
+        """Create, bind and connect one socket."""
+        my_exceptions = []
+        exceptions.append(my_exceptions)
+        family, type_, proto, _, address = addr_info
+        sock = None
+        try:
+            sock = socket.socket(family=family, type=type_, proto=proto)
+            sock.setblocking(False)
+            if local_addr_infos is not None:
+                for _, _, _, _, laddr in local_addr_infos:
+                    try:
+                        sock.bind(laddr)
+                        break
+                    except OSError as exc:
+                        msg = (
+                            f'error while attempting to bind on '
+                            f'address {laddr!r}: '
+                            f'{exc.strerror.lower()}'
+                        )
+                        exc = OSError(exc.errno, msg)
+                        my_exceptions.append(exc)
+                else:  # all bind attempts failed
+                    raise my_exceptions.pop()
+            if self._debug:
+                logger.debug("connect %r to %r", sock, address)
+            await self.sock_connect(sock, address)
+            return sock
+        except OSError as exc:
+            my_exceptions.append(exc)
+            if sock is not None:
+                sock.close()
+            raise
+        except:
+            if sock is not None:
+                sock.close()
+            raise
+
     async def create_connection(
             self, protocol_factory, host=None, port=None,
             *, ssl=None, family=0,
             proto=0, flags=0, sock=None,
             local_addr=None, server_hostname=None,
-            ssl_handshake_timeout=None):
+            ssl_handshake_timeout=None,
+            happy_eyeballs_delay=None, interleave=None):
         """Connect to a TCP server.
 
         Create a streaming transport connection to a given Internet host and
@@ -865,6 +1086,14 @@ class BaseEventLoop(events.AbstractEventLoop):
         This method is a coroutine which will try to establish the connection
         in the background.  When successful, the coroutine returns a
         (transport, protocol) pair.
+
+        If happy_eyeballs_delay is not None, the resolved addresses are tried
+        as in RFC 8305 ("Happy Eyeballs"): a new connection attempt is
+        started every happy_eyeballs_delay seconds (or as soon as the
+        previous one fails) without waiting for the previous attempts, and
+        the first to succeed is used.  interleave controls the reordering
+        of the addresses by family; it defaults to 1 when happy eyeballs is
+        enabled.
         """
         if server_hostname is not None and not ssl:
             raise ValueError('server_hostname is only meaningful with ssl')
@@ -889,6 +1118,10 @@ class BaseEventLoop(events.AbstractEventLoop):
             raise ValueError(
                 'ssl_handshake_timeout is only meaningful with ssl')
 
+        if happy_eyeballs_delay is not None and interleave is None:
+            # If using happy eyeballs, default to interleave addresses by family
+            interleave = 1
+
         if host is not None or port is not None:
             if sock is not None:
                 raise ValueError(
@@ -907,43 +1140,31 @@ class BaseEventLoop(events.AbstractEventLoop):
                     flags=flags, loop=self)
                 if not laddr_infos:
                     raise OSError('getaddrinfo() returned empty list')
+            else:
+                laddr_infos = None
+
+            if interleave:
+                infos = _interleave_addrinfos(infos, interleave)
 
             exceptions = []
-            for family, type, proto, cname, address in infos:
-                try:
-                    sock = socket.socket(family=family, type=type, proto=proto)
-                    sock.setblocking(False)
-                    if local_addr is not None:
-                        for _, _, _, _, laddr in laddr_infos:
-                            try:
-                                sock.bind(laddr)
-                                break
-                            except OSError as exc:
-                                msg = (
-                                    f'error while attempting to bind on '
-                                    f'address {laddr!r}: '
-                                    f'{exc.strerror.lower()}'
-                                )
-                                exc = OSError(exc.errno, msg)
-                                exceptions.append(exc)
-                        else:
-                            sock.close()
-                            sock = None
-                            continue
-                    if self._debug:
-                        logger.debug("connect %r to %r", sock, address)
-                    await self.sock_connect(sock, address)
-                except OSError as exc:
-                    if sock is not None:
-                        sock.close()
-                    exceptions.append(exc)
-                except:
-                    if sock is not None:
-                        sock.close()
-                    raise
-                else:
-                    break
-            else:
+            if happy_eyeballs_delay is None:
+                # not using happy eyeballs
+                for addrinfo in infos:
+                    try:
+                        sock = await self._connect_sock(
+                            exceptions, addrinfo, laddr_infos)
+                        break
+                    except OSError:
+                        continue
+            else:  # using happy eyeballs
+                sock, _, _ = await staggered.staggered_race(
+                    (functools.partial(self._connect_sock,
+                                       exceptions, addrinfo, laddr_infos)
+                     for addrinfo in infos),
+                    happy_eyeballs_delay, loop=self)
+
+            if sock is None:
+                exceptions = [exc for sub in exceptions for exc in sub]
                 if len(exceptions) == 1:
                     raise exceptions[0]
                 else:
@@ -1059,28 +1280,17 @@ class BaseEventLoop(events.AbstractEventLoop):
             "sendfile syscall is not supported")
 
     async def _sendfile_fallback(self, transp, file, offset, count):
-        if offset:
-            file.seek(offset)
-        blocksize = min(count, 16384) if count else 16384
-        buf = bytearray(blocksize)
-        total_sent = 0
         proto = _SendfileFallbackProtocol(transp)
+
+        async def send(data):
+            await proto.drain()
+            transp.write(data)
+
         try:
-            while True:
-                if count:
-                    blocksize = min(count - total_sent, blocksize)
-                    if blocksize <= 0:
-                        return total_sent
-                view = memoryview(buf)[:blocksize]
-                read = file.readinto(view)
-                if not read:
-                    return total_sent  # EOF
-                await proto.drain()
-                transp.write(view)
-                total_sent += read
+            return await files._sendfile_fallback(
+                self, file, offset, count,
+                constants.SENDFILE_FALLBACK_READBUFFER_SIZE, send)
         finally:
-            if total_sent > 0 and hasattr(file, 'seek'):
-                file.seek(offset + total_sent)
             await proto.restore()
 
     async def start_tls(self, transport, protocol, sslcontext, *,
@@ -1663,7 +1873,10 @@ class BaseEventLoop(events.AbstractEventLoop):
     def _timer_handle_cancelled(self, handle):
         """Notification that a TimerHandle has been cancelled."""
         if handle._scheduled:
-            self._timer_cancelled_count += 1
+            if self._timer_wheel is not None:
+                self._timer_wheel.remove(handle)
+            else:
+                self._timer_cancelled_count += 1
 
     def _run_once(self):
         """Run one full iteration of the event loop.
@@ -1673,6 +1886,10 @@ class BaseEventLoop(events.AbstractEventLoop):
         'call_later' callbacks.
         """
 
+        stats = self._stats
+        if stats is not None:
+            iteration_start = time.perf_counter()
+
         sched_count = len(self._scheduled)
         if (sched_count > _MIN_SCHEDULED_TIMER_HANDLES and
             self._timer_cancelled_count / sched_count >
@@ -1696,14 +1913,23 @@ class BaseEventLoop(events.AbstractEventLoop):
                 handle = heapq.heappop(self._scheduled)
                 handle._scheduled = False
 
+        # With a TimerWheel, _scheduled is empty.
+        wheel = self._timer_wheel
         timeout = None
         if self._ready or self._stopping:
             timeout = 0
+        elif wheel is not None:
+            when = wheel.next_deadline()
+            if when is not None:
+                timeout = min(max(0, when - self.time()),
+                              MAXIMUM_SELECT_TIMEOUT)
         elif self._scheduled:
             # Compute the desired timeout.
             when = self._scheduled[0]._when
             timeout = min(max(0, when - self.time()), MAXIMUM_SELECT_TIMEOUT)
 
+        if stats is not None:
+            select_start = time.perf_counter()
         if self._debug and timeout != 0:
             t0 = self.time()
             event_list = self._selector.select(timeout)
@@ -1726,10 +1952,14 @@ class BaseEventLoop(events.AbstractEventLoop):
                            timeout * 1e3, dt * 1e3)
         else:
             event_list = self._selector.select(timeout)
+        if stats is not None:
+            select_end = time.perf_counter()
         self._process_events(event_list)
 
         # Handle 'later' callbacks that are ready.
         end_time = self.time() + self._clock_resolution
+        if wheel is not None:
+            self._ready.extend(wheel.expire(end_time))
         while self._scheduled:
             handle = self._scheduled[0]
             if handle._when >= end_time:
@@ -1753,17 +1983,27 @@ class BaseEventLoop(events.AbstractEventLoop):
                 try:
                     self._current_handle = handle
                     t0 = self.time()
-                    handle._run()
+                    if stats is not None:
+                        stats._run_handle(handle)
+                    else:
+                        handle._run()
                     dt = self.time() - t0
                     if dt >= self.slow_callback_duration:
                         logger.warning('Executing %s took %.3f seconds',
                                        _format_handle(handle), dt)
                 finally:
                     self._current_handle = None
+            elif stats is not None:
+                stats._run_handle(handle)
             else:
                 handle._run()
         handle = None  # Needed to break cycles when an exception occurs.
 
+        if stats is not None:
+            latency = (time.perf_counter() - select_end +
+                       select_start - iteration_start)
+            stats._add_iteration(select_end - select_start, latency, ntodo)
+
     def _set_coroutine_origin_tracking(self, enabled):
         if bool(enabled) == bool(self._coroutine_origin_tracking_enabled):
             return
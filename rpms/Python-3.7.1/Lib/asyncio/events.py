@@ -104,7 +104,7 @@ class Handle:
 class TimerHandle(Handle):
     """Object returned by timed callback registration methods."""
 
-    __slots__ = ['_scheduled', '_when']
+    __slots__ = ['_scheduled', '_when', '_wheel_slot']
 
     def __init__(self, when, callback, args, loop, context=None):
         assert when is not None
@@ -113,6 +113,8 @@ class TimerHandle(Handle):
             del self._source_traceback[-1]
         self._when = when
         self._scheduled = False
+        # Slot of the TimerWheel holding the handle, if the loop uses one
+        self._wheel_slot = None
 
     def _repr_info(self):
         info = super()._repr_info()
@@ -300,12 +302,16 @@ class AbstractEventLoop:
     async def getnameinfo(self, sockaddr, flags=0):
         raise NotImplementedError
 
+    def set_getaddrinfo_cache(self, ttl, *, negative_ttl=0, maxsize=1024):
+        raise NotImplementedError
+
     async def create_connection(
             self, protocol_factory, host=None, port=None,
             *, ssl=None, family=0, proto=0,
             flags=0, sock=None, local_addr=None,
             server_hostname=None,
-            ssl_handshake_timeout=None):
+            ssl_handshake_timeout=None,
+            happy_eyeballs_delay=None, interleave=None):
         raise NotImplementedError
 
     async def create_server(
@@ -572,6 +578,30 @@ class AbstractEventLoop:
     def set_debug(self, enabled):
         raise NotImplementedError
 
+    # File I/O.
+
+    def set_file_io_pool(self, pool):
+        raise NotImplementedError
+
+    def get_file_io_pool(self):
+        raise NotImplementedError
+
+    # Timer scheduling.
+
+    def set_timer_wheel(self, wheel):
+        raise NotImplementedError
+
+    def get_timer_wheel(self):
+        raise NotImplementedError
+
+    # Instrumentation.
+
+    def set_stats(self, stats):
+        raise NotImplementedError
+
+    def get_stats(self):
+        raise NotImplementedError
+
 
 class AbstractEventLoopPolicy:
     """Abstract policy for accessing the event loop."""
@@ -0,0 +1,452 @@
+"""Asynchronous file I/O.
+
+Operating systems offer no portable way to read regular files without
+blocking, so file operations are run in worker threads.  Rather than the
+default executor of the event loop, which name resolution and
+run_in_executor() calls share, they use a FileIOPool: a separately sized
+pool whose completions are handed over to the event loop in batches,
+without going through concurrent.futures.
+"""
+
+__all__ = ('FileIOPool', 'AsyncFile', 'open_file')
+
+import io
+import queue
+import threading
+
+from . import events
+from . import futures
+from . import tasks
+
+
+_DEFAULT_MAX_WORKERS = 4
+
+# Small reads from files opened in binary mode are served from a buffer
+# filled this many bytes at a time.
+_READAHEAD_SIZE = 64 * 1024
+
+
+class FileIOPool:
+    """Pool of threads running the blocking file operations of a loop.
+
+    Worker threads are started on demand, up to max_workers.  The results
+    of the operations are set on asyncio futures directly, and the results
+    of operations completing close together are delivered with a single
+    wakeup of the event loop.
+    """
+
+    def __init__(self, max_workers=None, *, loop=None):
+        if max_workers is None:
+            max_workers = _DEFAULT_MAX_WORKERS
+        elif max_workers < 1:
+            raise ValueError('max_workers must be >= 1')
+        self._max_workers = max_workers
+        if loop is not None:
+            self._loop = loop
+        else:
+            self._loop = events.get_event_loop()
+        self._queue = queue.SimpleQueue()
+        self._threads = []
+        self._lock = threading.Lock()
+        # Number of workers waiting for an operation minus the number of
+        # operations queued, protected by _lock: run() reserves an idle
+        # worker for each operation it queues.
+        self._idle = 0
+        # Completed operations not delivered yet, protected by _lock.
+        self._completed = []
+        self._shutdown = False
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} '
+                f'max_workers={self._max_workers} '
+                f'threads={len(self._threads)}>')
+
+    @property
+    def max_workers(self):
+        """Maximum number of worker threads of the pool."""
+        return self._max_workers
+
+    def run(self, func, *args):
+        """Arrange for func(*args) to be called in a worker thread.
+
+        Return a Future for the result.  Cancelling the future prevents
+        the call if it has not started yet.
+        """
+        if self._shutdown:
+            raise RuntimeError('cannot run new operations after shutdown')
+        fut = self._loop.create_future()
+        self._queue.put((fut, func, args))
+        with self._lock:
+            self._idle -= 1
+            start = self._idle < 0
+        if start and len(self._threads) < self._max_workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f'asyncio-file-io_{len(self._threads)}',
+                daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return fut
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads once the pending operations are done.
+
+        If wait is true, block until they are stopped.
+        """
+        if self._shutdown:
+            return
+        self._shutdown = True
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self):
+        get = self._queue.get
+        lock = self._lock
+        while True:
+            with lock:
+                self._idle += 1
+            # The operation was accounted for by run()
+            item = get()
+            if item is None:
+                return
+            fut, func, args = item
+            del item
+            if fut.cancelled():
+                continue
+            try:
+                result = (func(*args), None)
+            except BaseException as exc:
+                result = (None, exc)
+            del func, args
+            with lock:
+                self._completed.append((fut, result))
+                # If other operations completed since the last delivery,
+                # _deliver() is already scheduled.
+                wakeup = len(self._completed) == 1
+            del fut, result
+            if wakeup:
+                try:
+                    self._loop.call_soon_threadsafe(self._deliver)
+                except RuntimeError:
+                    # The event loop is closed
+                    pass
+
+    def _deliver(self):
+        with self._lock:
+            completed = self._completed
+            self._completed = []
+        for fut, (result, exc) in completed:
+            if fut.cancelled():
+                continue
+            if exc is None:
+                fut.set_result(result)
+            else:
+                fut.set_exception(exc)
+
+
+class _FileReader:
+    # Read a file block by block in a FileIOPool, reading the next block
+    # ahead while the current one is used.  count is the maximum number
+    # of bytes to read, or None to read up to the end of the file.
+
+    def __init__(self, pool, file, count, blocksize):
+        self._pool = pool
+        self._file = file
+        self._remaining = count
+        self._buffers = [bytearray(blocksize), bytearray(blocksize)]
+        self._index = 0
+        self._pending = None
+        # Number of bytes read from the file
+        self.nread = 0
+        self._start()
+
+    def _start(self):
+        buf = self._buffers[self._index]
+        size = len(buf)
+        if self._remaining is not None:
+            size = min(size, self._remaining)
+        if size <= 0:
+            return
+        view = memoryview(buf)[:size]
+        self._pending = (self._pool.run(self._file.readinto, view), view)
+
+    async def read(self):
+        """Return the next block, or an empty block at the end.
+
+        A block is only valid until the next call.
+        """
+        if self._pending is None:
+            return b''
+        fut, view = self._pending
+        # If the task is cancelled, the read has to complete anyway
+        # before the file position can be restored: see close().
+        n = await tasks.shield(fut)
+        self._pending = None
+        if not n:
+            return b''
+        self.nread += n
+        if self._remaining is not None:
+            self._remaining -= n
+        self._index ^= 1
+        self._start()
+        return view[:n]
+
+    async def close(self):
+        """Wait for the read in progress, if any."""
+        if self._pending is None:
+            return
+        fut = self._pending[0]
+        self._pending = None
+        try:
+            n = await fut
+        except futures.CancelledError:
+            raise
+        except Exception:
+            return
+        if n:
+            self.nread += n
+
+
+async def _sendfile_fallback(loop, file, offset, count, blocksize, send):
+    """Send a file by reading it in the file I/O pool of loop.
+
+    send is a coroutine function called with each block.
+    """
+    if offset:
+        file.seek(offset)
+    if count:
+        blocksize = min(count, blocksize)
+    reader = _FileReader(loop.get_file_io_pool(), file, count or None,
+                         blocksize)
+    total_sent = 0
+    try:
+        while True:
+            block = await reader.read()
+            if not block:
+                return total_sent  # EOF
+            await send(block)
+            total_sent += len(block)
+    finally:
+        await reader.close()
+        if reader.nread > 0 and hasattr(file, 'seek'):
+            file.seek(offset + total_sent)
+
+
+class AsyncFile:
+    """File object whose blocking methods are coroutines.
+
+    The operations are run in the FileIOPool of the event loop.  Small
+    reads from a file opened in binary read-only mode are served from a
+    read-ahead buffer, so that most of them do not leave the event loop.
+
+    Operations on an AsyncFile should not be run concurrently: the order
+    in which they are run would be undefined.  An operation which is
+    cancelled still completes in its worker thread.
+    """
+
+    def __init__(self, file, *, loop=None):
+        if loop is None:
+            loop = events.get_event_loop()
+        self._file = file
+        self._loop = loop
+        self._pool = loop.get_file_io_pool()
+        self._readahead = (isinstance(file, io.BufferedIOBase) and
+                           file.readable() and not file.writable())
+        # Data read ahead from the file, from offset _pos
+        self._buffer = b''
+        self._pos = 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self._file!r}>'
+
+    @property
+    def file(self):
+        """The underlying file object."""
+        return self._file
+
+    @property
+    def name(self):
+        return self._file.name
+
+    @property
+    def mode(self):
+        return self._file.mode
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def fileno(self):
+        return self._file.fileno()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        line = await self.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line
+
+    def _take(self, size):
+        # Return up to size bytes of the read-ahead buffer.
+        pos = self._pos
+        data = self._buffer[pos:pos + size]
+        self._pos = pos + len(data)
+        if self._pos == len(self._buffer):
+            self._buffer = b''
+            self._pos = 0
+        return data
+
+    def _take_all(self):
+        data = self._buffer[self._pos:]
+        self._buffer = b''
+        self._pos = 0
+        return data
+
+    async def _fill(self):
+        # Read more data ahead.  Return False at the end of the file.
+        data = await self._pool.run(self._file.read1, _READAHEAD_SIZE)
+        if not data:
+            return False
+        if self._pos < len(self._buffer):
+            self._buffer = self._buffer[self._pos:] + data
+        else:
+            self._buffer = data
+        self._pos = 0
+        return True
+
+    async def read(self, size=-1):
+        """Read and return up to size bytes, or until EOF if size is -1."""
+        if not self._readahead:
+            return await self._pool.run(self._file.read, size)
+        if size is None or size < 0:
+            data = self._take_all()
+            return data + await self._pool.run(self._file.read)
+        if size >= _READAHEAD_SIZE:
+            data = self._take(size)
+            if len(data) < size:
+                data += await self._pool.run(self._file.read,
+                                             size - len(data))
+            return data
+        while len(self._buffer) - self._pos < size:
+            if not await self._fill():
+                break
+        return self._take(size)
+
+    async def readinto(self, b):
+        """Read bytes into b and return the number of bytes read."""
+        if not self._readahead:
+            return await self._pool.run(self._file.readinto, b)
+        view = memoryview(b).cast('B')
+        size = len(view)
+        if size >= _READAHEAD_SIZE:
+            data = self._take(size)
+            n = len(data)
+            view[:n] = data
+            if n < size:
+                n += await self._pool.run(self._file.readinto, view[n:])
+            return n
+        data = await self.read(size)
+        view[:len(data)] = data
+        return len(data)
+
+    async def readline(self, size=-1):
+        """Read and return one line, or up to size bytes."""
+        if not self._readahead:
+            return await self._pool.run(self._file.readline, size)
+        if size is None:
+            size = -1
+        start = self._pos
+        while True:
+            end = self._buffer.find(b'\n', start) + 1
+            if end:
+                if size < 0 or end - self._pos <= size:
+                    return self._take(end - self._pos)
+                break
+            if 0 <= size <= len(self._buffer) - self._pos:
+                break
+            start = len(self._buffer) - self._pos
+            if not await self._fill():
+                break
+        return self._take(len(self._buffer) if size < 0 else size)
+
+    async def readlines(self, hint=-1):
+        """Read and return a list of lines."""
+        if not self._readahead:
+            return await self._pool.run(self._file.readlines, hint)
+        lines = []
+        total = 0
+        async for line in self:
+            lines.append(line)
+            total += len(line)
+            if 0 < hint <= total:
+                break
+        return lines
+
+    async def write(self, data):
+        """Write data and return the number of bytes or characters written."""
+        return await self._pool.run(self._file.write, data)
+
+    async def writelines(self, lines):
+        await self._pool.run(self._file.writelines, lines)
+
+    async def seek(self, offset, whence=io.SEEK_SET):
+        """Change the file position and return the new one."""
+        if whence == io.SEEK_CUR:
+            offset -= len(self._buffer) - self._pos
+        self._buffer = b''
+        self._pos = 0
+        return await self._pool.run(self._file.seek, offset, whence)
+
+    async def tell(self):
+        """Return the file position."""
+        pos = await self._pool.run(self._file.tell)
+        return pos - (len(self._buffer) - self._pos)
+
+    async def truncate(self, size=None):
+        return await self._pool.run(self._file.truncate, size)
+
+    async def flush(self):
+        await self._pool.run(self._file.flush)
+
+    async def close(self):
+        """Close the file."""
+        self._buffer = b''
+        self._pos = 0
+        await self._pool.run(self._file.close)
+
+    async def sendfile(self, transport, count=None):
+        """Send the file to transport, from the current file position.
+
+        Send count bytes, or up to the end of the file if count is None.
+        Use loop.sendfile(), so the sendfile syscall is used if possible.
+        Return the total number of bytes sent.
+        """
+        offset = await self.seek(0, io.SEEK_CUR)
+        return await self._loop.sendfile(transport, self._file,
+                                         offset, count)
+
+
+async def open_file(file, mode='r', buffering=-1, encoding=None,
+                    errors=None, newline=None, closefd=True, opener=None,
+                    *, loop=None):
+    """Open file and return an AsyncFile.
+
+    The arguments have the same meaning as for the built-in open().
+    """
+    if loop is None:
+        loop = events.get_event_loop()
+    f = await loop.get_file_io_pool().run(
+        open, file, mode, buffering, encoding, errors, newline, closefd,
+        opener)
+    return AsyncFile(f, loop=loop)
@@ -0,0 +1,924 @@
+"""HTTP/1.1 server and client.
+
+The server and the client are built on asyncio streams; the headers are
+parsed with http.client.parse_headers(), like http.server and
+http.client do.  Both support persistent connections and the chunked
+transfer encoding; the server answers pipelined requests in order.
+
+Unlike the other asyncio modules, this one is not imported by
+"import asyncio": use "import asyncio.http".
+"""
+
+__all__ = (
+    'Request', 'Response', 'start_server',
+    'ConnectionPool', 'ClientResponse',
+)
+
+import collections
+import email.utils
+import http.client
+import io
+import re
+import time
+import urllib.parse
+from http import HTTPStatus
+
+from . import events
+from . import futures
+from . import streams
+
+
+# Size of the pieces of a body read by iterating over it.
+_CHUNK_SIZE = 64 * 1024
+
+# Maximum number of bytes of a request body that the handler did not read
+# which are skipped to keep the connection open.
+_MAX_DISCARD = 64 * 1024
+
+# Responses to pipelined requests are held back in the transport until
+# this many bytes are pending, or the next iteration of the event loop.
+_CORK_LIMIT = 64 * 1024
+
+# Requests which are sent again when a reused connection turns out to be
+# closed: the server may have processed the request before closing it.
+_IDEMPOTENT_METHODS = frozenset(
+    {'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'})
+
+# Header field names: tokens of RFC 7230.
+_token_match = re.compile(rb"[!#$%&'*+\-.^_`|~0-9A-Za-z]+").fullmatch
+
+_last_date = (None, None)
+
+
+def _date_header():
+    # Formatting the date is costly: do it at most once a second.
+    global _last_date
+    now = int(time.time())
+    if _last_date[0] != now:
+        _last_date = (now, email.utils.formatdate(now, usegmt=True))
+    return _last_date[1]
+
+
+def _parse_version(version):
+    # Parse 'HTTP/x.y' the way http.server does.
+    if not version.startswith('HTTP/'):
+        raise ValueError(version)
+    number = version[5:].split('.')
+    if len(number) != 2:
+        raise ValueError(version)
+    return int(number[0]), int(number[1])
+
+
+def _tokens(headers, name):
+    # Return the lowercase tokens of the comma-separated header name.
+    tokens = set()
+    for value in headers.get_all(name, ()):
+        tokens.update(token.strip().lower() for token in value.split(','))
+    return tokens
+
+
+def _content_length(headers):
+    # Return the Content-Length of headers, None if it has none, or raise
+    # ValueError if it is invalid.
+    values = headers.get_all('Content-Length')
+    if not values:
+        return None
+    if len(set(values)) != 1 or not values[0].strip().isdigit():
+        raise ValueError(f'invalid Content-Length: {values!r}')
+    return int(values[0])
+
+
+def _is_chunked(headers):
+    # Return True if chunked is the last transfer coding of headers, raise
+    # ValueError for another transfer coding.
+    values = headers.get_all('Transfer-Encoding')
+    if not values:
+        return False
+    if values[-1].rsplit(',', 1)[-1].strip().lower() != 'chunked':
+        raise ValueError(f'unsupported Transfer-Encoding: {values!r}')
+    return True
+
+
+def _format_headers(lines, headers):
+    # Append the header lines of headers, a mapping or an iterable of
+    # (name, value) pairs, to lines.  Return the set of the lowercase
+    # names.
+    if hasattr(headers, 'items'):
+        headers = headers.items()
+    names = set()
+    for name, value in headers:
+        name = str(name)
+        value = str(value)
+        if '\r' in value or '\n' in value or ':' in name or '\n' in name:
+            raise ValueError(f'invalid header: {name!r}: {value!r}')
+        lines.append(f'{name}: {value}\r\n')
+        names.add(name.lower())
+    return names
+
+
+def _parse_head(head):
+    # Split a message head, ending with an empty line, into its first line
+    # and its headers.
+    lines = head.split(b'\r\n')
+    fields = lines[1:-2]
+    headers = http.client.HTTPMessage()
+    if len(fields) < http.client._MAXHEADERS:
+        # Fast path for the usual one header per line: store the fields
+        # the way the email parser would, without running it.
+        for field in fields:
+            name, sep, value = field.partition(b':')
+            if (not sep or not _token_match(name) or
+                    b'\n' in value or b'\r' in value or
+                    len(field) > http.client._MAXLINE):
+                break
+            headers.set_raw(str(name, 'iso-8859-1'),
+                            str(value.lstrip(b' \t'), 'iso-8859-1'))
+        else:
+            return str(lines[0], 'iso-8859-1'), headers
+    end = head.index(b'\r\n')
+    headers = http.client.parse_headers(io.BytesIO(head[end + 2:]))
+    return str(head[:end], 'iso-8859-1'), headers
+
+
+class _Body:
+    # Reader of a message body: length bytes, chunks if length is None and
+    # chunked is true, or everything up to the end of the stream.
+    # on_eof is called once the body is read entirely.
+
+    def __init__(self, reader, length=None, chunked=False, on_eof=None):
+        self._reader = reader
+        self._chunked = chunked
+        # Bytes left in the body, or in the current chunk
+        self._remaining = 0 if chunked else length
+        self._eof = False
+        self._on_eof = on_eof
+        # Interim response to send before reading the body
+        self._continue = None
+        if length == 0 and not chunked:
+            self._set_eof()
+
+    def at_eof(self):
+        return self._eof
+
+    def _set_eof(self):
+        self._eof = True
+        if self._on_eof is not None:
+            on_eof = self._on_eof
+            self._on_eof = None
+            on_eof()
+
+    async def _readline(self):
+        try:
+            return await self._reader.readuntil(b'\r\n')
+        except streams.IncompleteReadError as exc:
+            raise http.client.IncompleteRead(exc.partial) from None
+        except streams.LimitOverrunError:
+            raise http.client.LineTooLong('chunk size') from None
+
+    async def _readexactly(self, n):
+        try:
+            return await self._reader.readexactly(n)
+        except streams.IncompleteReadError as exc:
+            raise http.client.IncompleteRead(exc.partial, n) from None
+
+    async def _next_chunk(self):
+        line = await self._readline()
+        try:
+            size = int(line.split(b';', 1)[0], 16)
+        except ValueError:
+            raise http.client.HTTPException(
+                f'invalid chunk size: {line!r}') from None
+        if size < 0:
+            raise http.client.HTTPException(f'invalid chunk size: {line!r}')
+        if size:
+            self._remaining = size
+            return
+        # Skip the trailer
+        while await self._readline() != b'\r\n':
+            pass
+        self._remaining = None
+        self._set_eof()
+
+    async def _end_chunk(self):
+        if await self._readexactly(2) != b'\r\n':
+            raise http.client.HTTPException('missing CRLF after chunk')
+
+    def _send_continue(self):
+        writer = self._continue
+        self._continue = None
+        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+    async def read(self, n=-1):
+        """Read up to n bytes, or up to the end of the body if n is -1."""
+        if self._eof or not n:
+            return b''
+        if self._continue is not None:
+            self._send_continue()
+        if n > 0:
+            return await self._read_some(n)
+        if self._remaining is None:
+            # Up to the end of the stream
+            data = await self._reader.read()
+            self._set_eof()
+            return data
+        if not self._chunked:
+            data = await self._readexactly(self._remaining)
+            self._remaining = 0
+            self._set_eof()
+            return data
+        chunks = []
+        while True:
+            if not self._remaining:
+                await self._next_chunk()
+                if self._eof:
+                    return b''.join(chunks)
+            chunks.append(await self._readexactly(self._remaining))
+            self._remaining = 0
+            await self._end_chunk()
+
+    async def _read_some(self, n):
+        if self._chunked and not self._remaining:
+            await self._next_chunk()
+            if self._eof:
+                return b''
+        if self._remaining is None:
+            data = await self._reader.read(n)
+            if not data:
+                self._set_eof()
+            return data
+        data = await self._reader.read(min(n, self._remaining))
+        if not data:
+            raise http.client.IncompleteRead(b'', self._remaining)
+        self._remaining -= len(data)
+        if not self._remaining:
+            if self._chunked:
+                await self._end_chunk()
+            else:
+                self._set_eof()
+        return data
+
+    async def _discard(self, limit):
+        # Skip the rest of the body if it is at most limit bytes long.
+        # Return True if the end of the body was reached.
+        if self._continue is not None:
+            # The client has not sent the body
+            return False
+        while not self._eof:
+            if self._remaining is None or limit <= 0:
+                return False
+            limit -= len(await self._read_some(limit))
+        return True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self.read(_CHUNK_SIZE)
+        if not data:
+            raise StopAsyncIteration
+        return data
+
+
+# Server
+
+
+class Request:
+    """HTTP request received by a server.
+
+    The body is read with read(), or by iterating over the request, which
+    yields pieces of it.
+    """
+
+    def __init__(self, method, path, version, headers, body, writer):
+        self.method = method
+        # Request target, as sent by the client
+        self.path = path
+        self.version = version
+        # http.client.HTTPMessage instance
+        self.headers = headers
+        self._body = body
+        self._writer = writer
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.method} {self.path}>'
+
+    def get_extra_info(self, name, default=None):
+        """Return information about the connection of the request."""
+        return self._writer.get_extra_info(name, default)
+
+    async def read(self, n=-1):
+        """Read up to n bytes of the body, or all of it if n is -1."""
+        return await self._body.read(n)
+
+    def __aiter__(self):
+        return self._body.__aiter__()
+
+
+class Response:
+    """HTTP response, returned by the request handler of a server.
+
+    body is a bytes-like object, or an asynchronous iterable of bytes-like
+    objects sent with the chunked transfer encoding unless headers has a
+    Content-Length.  headers is a mapping or an iterable of (name, value)
+    pairs; the Content-Length, Date and Connection headers are added.
+    """
+
+    def __init__(self, status=HTTPStatus.OK, headers=(), body=b'', *,
+                 reason=None):
+        self.status = int(status)
+        if reason is None:
+            try:
+                reason = HTTPStatus(self.status).phrase
+            except ValueError:
+                reason = ''
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.status} {self.reason}>'
+
+
+def _error_response(status, message=None):
+    status = HTTPStatus(status)
+    body = f'{status.value} {message or status.phrase}\n'.encode('latin-1')
+    return Response(status, {'Content-Type': 'text/plain'}, body)
+
+
+class _BadRequest(Exception):
+    # Raised to answer an invalid request with an error response.
+
+    def __init__(self, status, message=None):
+        self.response = _error_response(status, message)
+
+
+class _ServerConnection:
+    # Serve the requests received on a connection, one after another.
+
+    def __init__(self, handler, reader, writer, keepalive_timeout, loop):
+        self._handler = handler
+        self._reader = reader
+        self._writer = writer
+        self._transport = writer.transport
+        self._keepalive_timeout = keepalive_timeout
+        self._loop = loop
+        self._corked = False
+
+    async def serve(self):
+        try:
+            while await self._serve_request():
+                pass
+        except (ConnectionError, http.client.HTTPException):
+            pass
+        finally:
+            self._transport.close()
+
+    async def _read_head(self):
+        timer = None
+        if self._keepalive_timeout is not None:
+            timer = self._loop.call_later(self._keepalive_timeout,
+                                          self._transport.close)
+        try:
+            while True:
+                head = await self._reader.readuntil(b'\r\n\r\n')
+                # Ignore empty lines before the request line.
+                head = head.lstrip(b'\r\n')
+                if head:
+                    return head
+        except streams.IncompleteReadError:
+            return None
+        except streams.LimitOverrunError:
+            raise _BadRequest(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def _parse_request(self, head):
+        try:
+            line, headers = _parse_head(head)
+        except http.client.HTTPException:
+            raise _BadRequest(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        words = line.split()
+        if len(words) != 3:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST,
+                              f'Bad request syntax ({line!r})')
+        method, path, version = words
+        try:
+            version_number = _parse_version(version)
+        except ValueError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST,
+                              f'Bad request version ({version!r})')
+        if version_number >= (2, 0):
+            raise _BadRequest(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED)
+
+        try:
+            chunked = _is_chunked(headers)
+            length = _content_length(headers)
+        except ValueError as exc:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, str(exc))
+        if chunked and length is not None:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST,
+                              'Content-Length with Transfer-Encoding')
+        body = _Body(self._reader, 0 if length is None else length, chunked)
+
+        connection = _tokens(headers, 'Connection')
+        if version_number >= (1, 1):
+            keep_alive = 'close' not in connection
+            if (not body.at_eof() and
+                    headers.get('Expect', '').lower() == '100-continue'):
+                body._continue = self._writer
+        else:
+            keep_alive = 'keep-alive' in connection
+        request = Request(method, path, version, headers, body, self._writer)
+        return request, keep_alive
+
+    async def _serve_request(self):
+        # Serve one request.  Return True if the connection is kept open.
+        request = None
+        try:
+            head = await self._read_head()
+            if head is None:
+                return False
+            request, keep_alive = self._parse_request(head)
+        except _BadRequest as exc:
+            await self._send_response(request, exc.response, False)
+            return False
+
+        if request._body._continue is not None:
+            # The interim response must not be held back.
+            self._uncork()
+        try:
+            response = await self._handler(request)
+            if not isinstance(response, Response):
+                raise TypeError(f'the request handler returned {response!r} '
+                                f'instead of a Response')
+        except futures.CancelledError:
+            raise
+        except Exception as exc:
+            self._loop.call_exception_handler({
+                'message': 'Unhandled exception in HTTP request handler',
+                'exception': exc,
+                'transport': self._transport,
+            })
+            response = _error_response(HTTPStatus.INTERNAL_SERVER_ERROR)
+            keep_alive = False
+
+        keep_alive = await self._send_response(request, response, keep_alive)
+        if keep_alive and not request._body.at_eof():
+            keep_alive = await request._body._discard(_MAX_DISCARD)
+        return keep_alive
+
+    async def _send_response(self, request, response, keep_alive):
+        # Return True if the connection can be kept open.
+        status = response.status
+        body = response.body
+        lines = [f'HTTP/1.1 {status} {response.reason}\r\n']
+        names = _format_headers(lines, response.headers)
+        if 'date' not in names:
+            lines.append(f'Date: {_date_header()}\r\n')
+
+        has_body = not (100 <= status < 200 or status in (204, 304))
+        send_body = has_body and (request is None or
+                                  request.method != 'HEAD')
+        streamed = not isinstance(body, (bytes, bytearray, memoryview))
+        chunked = False
+        if not streamed:
+            if 'content-length' not in names and has_body:
+                lines.append(f'Content-Length: {len(body)}\r\n')
+        elif 'content-length' not in names and send_body:
+            if request is not None and request.version != 'HTTP/1.0':
+                chunked = True
+                lines.append('Transfer-Encoding: chunked\r\n')
+            else:
+                # The end of the body is marked by closing the connection.
+                keep_alive = False
+        if 'connection' not in names:
+            if not keep_alive:
+                lines.append('Connection: close\r\n')
+            elif request.version == 'HTTP/1.0':
+                lines.append('Connection: keep-alive\r\n')
+        lines.append('\r\n')
+        head = ''.join(lines).encode('latin-1')
+
+        writer = self._writer
+        if streamed:
+            self._uncork()
+            writer.write(head)
+            if send_body:
+                await self._send_stream(body, chunked)
+            elif hasattr(body, 'aclose'):
+                await body.aclose()
+        else:
+            if keep_alive and self._reader._buffer and not self._corked:
+                # More pipelined requests are waiting: send the responses
+                # together.
+                self._transport.cork()
+                self._corked = True
+                self._loop.call_soon(self._uncork)
+            if send_body and body:
+                writer.writelines([head, body])
+            else:
+                writer.write(head)
+            if self._corked and (
+                    not keep_alive or
+                    self._transport.get_write_buffer_size() >= _CORK_LIMIT):
+                self._uncork()
+        if not self._corked:
+            await writer.drain()
+        return keep_alive
+
+    async def _send_stream(self, body, chunked):
+        writer = self._writer
+        async for data in body:
+            if not data:
+                continue
+            if chunked:
+                writer.writelines([b'%x\r\n' % len(data), data, b'\r\n'])
+            else:
+                writer.write(data)
+            await writer.drain()
+        if chunked:
+            writer.write(b'0\r\n\r\n')
+
+    def _uncork(self):
+        if self._corked:
+            self._corked = False
+            self._transport.uncork()
+
+
+async def start_server(handler, host=None, port=None, *, loop=None,
+                       limit=streams._DEFAULT_LIMIT, keepalive_timeout=75.0,
+                       **kwds):
+    """Start an HTTP/1.1 server.
+
+    handler is a coroutine function called with a Request for each
+    request received, which returns a Response.  The requests of a
+    connection are handled one after another.
+
+    limit is the maximum size of the head of a request, and idle
+    connections are closed after keepalive_timeout seconds, unless it is
+    None.  The other arguments are passed to loop.create_server(), whose
+    Server object is returned.
+    """
+    if loop is None:
+        loop = events.get_event_loop()
+
+    def client_connected(reader, writer):
+        connection = _ServerConnection(handler, reader, writer,
+                                       keepalive_timeout, loop)
+        return connection.serve()
+
+    return await streams.start_server(client_connected, host, port,
+                                      loop=loop, limit=limit, **kwds)
+
+
+# Client
+
+
+class ClientResponse:
+    """HTTP response received by a ConnectionPool.
+
+    The body is read with read(), or by iterating over the response, which
+    yields pieces of it.  The connection goes back to the pool once the
+    body is read entirely; close() closes it before.  Responses are
+    asynchronous context managers, which close them on exit.
+    """
+
+    def __init__(self, status, reason, version, headers, body, connection):
+        self.status = status
+        self.reason = reason
+        self.version = version
+        # http.client.HTTPMessage instance
+        self.headers = headers
+        self._body = body
+        self._connection = connection
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.status} {self.reason}>'
+
+    async def read(self, n=-1):
+        """Read up to n bytes of the body, or all of it if n is -1."""
+        try:
+            return await self._body.read(n)
+        except BaseException:
+            self.close()
+            raise
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self.read(_CHUNK_SIZE)
+        if not data:
+            raise StopAsyncIteration
+        return data
+
+    def _release(self):
+        # Called once the body has been read entirely.
+        connection = self._connection
+        if connection is not None:
+            self._connection = None
+            connection.release()
+
+    def close(self):
+        """Close the connection unless the body was read entirely."""
+        connection = self._connection
+        if connection is not None:
+            self._connection = None
+            self._body._on_eof = None
+            connection.release(False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _ClientConnection:
+
+    def __init__(self, pool, key, reader, writer):
+        self._pool = pool
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        # Number of requests sent
+        self.requests = 0
+        # Set by the response once the body has been read: whether the
+        # connection can be reused.
+        self.keep_alive = False
+
+    def is_usable(self):
+        return not (self.writer.transport.is_closing() or
+                    self.reader.at_eof() or self.reader._buffer)
+
+    def close(self):
+        self.writer.transport.close()
+
+    def release(self, reuse=None):
+        if reuse is None:
+            reuse = self.keep_alive
+        self._pool._release(self, reuse)
+
+
+class ConnectionPool:
+    """Pool of HTTP/1.1 client connections, reused between requests.
+
+    At most limit_per_host connections are open to a given host and port
+    at a time: further requests wait for one of them.  ssl is the
+    SSLContext used for https URLs, the default one if it is None.
+    """
+
+    def __init__(self, *, limit_per_host=10, ssl=None, loop=None):
+        if limit_per_host < 1:
+            raise ValueError('limit_per_host must be >= 1')
+        self._limit = limit_per_host
+        self._ssl = ssl
+        if loop is not None:
+            self._loop = loop
+        else:
+            self._loop = events.get_event_loop()
+        # (scheme, host, port) -> idle connections
+        self._idle = collections.defaultdict(list)
+        # (scheme, host, port) -> number of open or opening connections
+        self._open = collections.Counter()
+        # (scheme, host, port) -> futures waiting for a connection
+        self._waiters = collections.defaultdict(collections.deque)
+        self._closed = False
+
+    def __repr__(self):
+        extra = f'limit_per_host={self._limit}'
+        if self._closed:
+            extra = f'{extra}, closed'
+        return f'<{self.__class__.__name__} {extra}>'
+
+    @property
+    def limit_per_host(self):
+        """Maximum number of connections to a host and port."""
+        return self._limit
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the idle connections, and the others once released."""
+        self._closed = True
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
+        for waiters in self._waiters.values():
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(
+                        RuntimeError('ConnectionPool is closed'))
+
+    def _hand_over(self, key, connection):
+        # Give connection, or its slot if it is None, to the first
+        # waiter.  Return False if nobody is waiting.
+        waiters = self._waiters.get(key)
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(connection)
+                return True
+        return False
+
+    def _release(self, connection, reuse):
+        key = connection.key
+        if reuse and not self._closed and connection.is_usable():
+            if not self._hand_over(key, connection):
+                self._idle[key].append(connection)
+            return
+        connection.close()
+        if not self._hand_over(key, None):
+            self._open[key] -= 1
+            if not self._open[key]:
+                del self._open[key]
+
+    async def _acquire(self, key):
+        if self._closed:
+            raise RuntimeError('ConnectionPool is closed')
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            if connection.is_usable():
+                return connection
+            connection.close()
+            self._open[key] -= 1
+        if self._open[key] < self._limit and not self._waiters.get(key):
+            self._open[key] += 1
+        else:
+            waiter = self._loop.create_future()
+            self._waiters[key].append(waiter)
+            try:
+                connection = await waiter
+            except BaseException:
+                # A connection or a slot may have been handed over just
+                # before the cancellation: pass it on.
+                if waiter.done() and not waiter.cancelled() and (
+                        waiter.exception() is None):
+                    connection = waiter.result()
+                    if connection is not None:
+                        self._release(connection, True)
+                    elif not self._hand_over(key, None):
+                        self._open[key] -= 1
+                raise
+            if connection is not None:
+                if connection.is_usable():
+                    return connection
+                # Open a new connection in its slot
+                connection.close()
+
+        scheme, host, port = key
+        try:
+            if scheme == 'https':
+                ssl = self._ssl if self._ssl is not None else True
+                reader, writer = await streams.open_connection(
+                    host, port, ssl=ssl, loop=self._loop)
+            else:
+                reader, writer = await streams.open_connection(
+                    host, port, loop=self._loop)
+        except BaseException:
+            if not self._hand_over(key, None):
+                self._open[key] -= 1
+            raise
+        return _ClientConnection(self, key, reader, writer)
+
+    async def request(self, method, url, *, headers=(), body=b''):
+        """Send a request and return a ClientResponse once its head is
+        received.
+
+        headers is a mapping or an iterable of (name, value) pairs; Host,
+        Content-Length or Transfer-Encoding are added.  body is a
+        bytes-like object, or an asynchronous iterable of bytes-like
+        objects sent with the chunked transfer encoding unless headers has
+        a Content-Length.
+        """
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme == 'http':
+            port = parts.port or 80
+        elif scheme == 'https':
+            port = parts.port or 443
+        else:
+            raise ValueError(f'unsupported URL scheme: {url!r}')
+        if not parts.hostname:
+            raise ValueError(f'no host in URL: {url!r}')
+        key = (scheme, parts.hostname, port)
+
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+        lines = [f'{method} {path} HTTP/1.1\r\n']
+        names = _format_headers(lines, headers)
+        if 'host' not in names:
+            lines.append(f'Host: {parts.netloc.rpartition("@")[2]}\r\n')
+        streamed = not isinstance(body, (bytes, bytearray, memoryview))
+        if 'content-length' not in names:
+            if streamed:
+                lines.append('Transfer-Encoding: chunked\r\n')
+            elif body or method not in ('GET', 'HEAD'):
+                lines.append(f'Content-Length: {len(body)}\r\n')
+        chunked = streamed and 'content-length' not in names
+        lines.append('\r\n')
+        head = ''.join(lines).encode('latin-1')
+
+        while True:
+            connection = await self._acquire(key)
+            reused = connection.requests > 0
+            connection.requests += 1
+            try:
+                await self._send(connection, head, body, streamed, chunked)
+                return await self._read_response(connection, method)
+            except (ConnectionError, http.client.RemoteDisconnected):
+                connection.release(False)
+                # The server may have closed an idle connection while the
+                # request was sent: retry on a new connection.
+                if (not reused or streamed
+                        or method not in _IDEMPOTENT_METHODS):
+                    raise
+            except BaseException:
+                connection.release(False)
+                raise
+
+    async def _send(self, connection, head, body, streamed, chunked):
+        writer = connection.writer
+        if not streamed:
+            if body:
+                writer.writelines([head, body])
+            else:
+                writer.write(head)
+            await writer.drain()
+            return
+        writer.write(head)
+        async for data in body:
+            if not data:
+                continue
+            if chunked:
+                writer.writelines([b'%x\r\n' % len(data), data, b'\r\n'])
+            else:
+                writer.write(data)
+            await writer.drain()
+        if chunked:
+            writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def _read_response(self, connection, method):
+        reader = connection.reader
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except streams.IncompleteReadError as exc:
+                if exc.partial:
+                    raise http.client.BadStatusLine(
+                        str(exc.partial, 'iso-8859-1')) from None
+                raise http.client.RemoteDisconnected(
+                    'Remote end closed connection without response') from None
+            except streams.LimitOverrunError:
+                raise http.client.LineTooLong('response head') from None
+            line, headers = _parse_head(head)
+            words = line.split(None, 2)
+            try:
+                version, status = words[:2]
+                version_number = _parse_version(version)
+                status = int(status)
+                if not 100 <= status <= 999:
+                    raise ValueError(status)
+            except ValueError:
+                raise http.client.BadStatusLine(line) from None
+            # Skip the interim responses
+            if not 100 <= status < 200 or status == 101:
+                break
+        reason = words[2].strip() if len(words) > 2 else ''
+
+        connection_tokens = _tokens(headers, 'Connection')
+        if version_number >= (1, 1):
+            keep_alive = 'close' not in connection_tokens
+        else:
+            keep_alive = 'keep-alive' in connection_tokens
+        connection.keep_alive = keep_alive
+
+        if (method == 'HEAD' or 100 <= status < 200 or
+                status in (204, 304)):
+            body = _Body(reader, 0)
+        else:
+            try:
+                chunked = _is_chunked(headers)
+                length = None if chunked else _content_length(headers)
+            except ValueError as exc:
+                raise http.client.HTTPException(str(exc)) from None
+            if not chunked and length is None:
+                # The body ends when the connection is closed.
+                connection.keep_alive = False
+            body = _Body(reader, length, chunked)
+        response = ClientResponse(status, reason, version, headers, body,
+                                  connection)
+        if body.at_eof():
+            response._release()
+        else:
+            body._on_eof = response._release
+        return response
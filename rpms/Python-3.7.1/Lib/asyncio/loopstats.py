@@ -0,0 +1,232 @@
+"""Instrumentation of the event loop.
+
+A LoopStats instance installed with loop.set_stats() records how the event
+loop spends its time: the duration of the I/O polls, of the iterations and
+of each callback, the depth of the ready queue, and the time spent running
+the steps of each task.
+"""
+
+__all__ = ('LoopStats',)
+
+import bisect
+import json
+import time
+import weakref
+
+from . import tasks
+
+
+# Upper bounds of the buckets of the duration histograms, in seconds.
+_TIME_BOUNDS = (
+    1e-5, 2e-5, 5e-5,
+    1e-4, 2e-4, 5e-4,
+    1e-3, 2e-3, 5e-3,
+    1e-2, 2e-2, 5e-2,
+    0.1, 0.2, 0.5,
+    1.0, 2.0, 5.0,
+    10.0,
+)
+
+# Upper bounds of the buckets of the ready queue depth histogram.
+_DEPTH_BOUNDS = (0,) + tuple(2 ** i for i in range(17))
+
+_task_types = (tasks._PyTask, tasks.Task)
+
+_perf_counter = time.perf_counter
+_bisect_left = bisect.bisect_left
+
+try:
+    _cpu_clock = time.thread_time
+except AttributeError:  # pragma: no cover
+    _cpu_clock = time.process_time
+
+
+class _Histogram:
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._total = 0
+        self._max = 0
+
+    def add(self, value):
+        self._counts[_bisect_left(self._bounds, value)] += 1
+        self._total += value
+        if value > self._max:
+            self._max = value
+
+    def as_dict(self):
+        # The last bucket counts the values above the highest bound.
+        bounds = self._bounds + (None,)
+        return {
+            'count': sum(self._counts),
+            'total': self._total,
+            'max': self._max,
+            'buckets': [{'le': le, 'count': count}
+                        for le, count in zip(bounds, self._counts)],
+        }
+
+
+def _coro_name(task):
+    coro = task._coro
+    try:
+        return coro.__qualname__
+    except AttributeError:
+        return type(coro).__qualname__
+
+
+class LoopStats:
+    """Statistics of an event loop.
+
+    Install an instance with loop.set_stats() to start recording:
+
+    - the time spent in each poll for I/O events;
+    - the latency of each iteration, i.e. the time it spent outside of
+      the poll, during which I/O events are not processed;
+    - the duration of each callback;
+    - the number of callbacks ready at each iteration;
+    - for each task, the number of steps, and their cumulative duration
+      and CPU time.  The CPU time is only measured if *cpu_time* is true,
+      which makes calling a callback slower.
+
+    Tasks are tracked until they are destroyed; their statistics are also
+    summed for each coroutine function, which outlives them.
+    """
+
+    def __init__(self, *, cpu_time=True):
+        self._cpu_time = cpu_time
+        self.reset()
+
+    def reset(self):
+        """Discard all the statistics recorded so far."""
+        self._start_time = time.time()
+        self._iterations = 0
+        self._select = _Histogram(_TIME_BOUNDS)
+        self._latency = _Histogram(_TIME_BOUNDS)
+        self._callbacks = _Histogram(_TIME_BOUNDS)
+        self._ready = _Histogram(_DEPTH_BOUNDS)
+        # id(task) -> [steps, run time, CPU time, coroutine name, weakref]
+        # The entry is moved into _coros when the task is destroyed.  A
+        # plain dict is much faster than a WeakKeyDictionary here.
+        self._tasks = {}
+        # Coroutine name -> [steps, run time, CPU time] of dead tasks
+        self._coros = {}
+
+    def _add_iteration(self, select_time, latency, ntodo):
+        self._iterations += 1
+        self._select.add(select_time)
+        self._latency.add(latency)
+        self._ready.add(ntodo)
+
+    def _run_handle(self, handle):
+        # The steps and wakeups of a task are methods bound to it.
+        task = getattr(handle._callback, '__self__', None)
+        if self._cpu_time:
+            c0 = _cpu_clock()
+            t0 = _perf_counter()
+            handle._run()
+            dt = _perf_counter() - t0
+            cpu = _cpu_clock() - c0
+        else:
+            t0 = _perf_counter()
+            handle._run()
+            dt = _perf_counter() - t0
+            cpu = 0.0
+        # Inlined _Histogram.add(): this runs for every callback, and most
+        # of them fall in the first bucket.
+        hist = self._callbacks
+        if dt <= _TIME_BOUNDS[0]:
+            hist._counts[0] += 1
+        else:
+            hist._counts[_bisect_left(_TIME_BOUNDS, dt)] += 1
+        hist._total += dt
+        if dt > hist._max:
+            hist._max = dt
+
+        entry = self._tasks.get(id(task))
+        if entry is None:
+            if not isinstance(task, _task_types):
+                return
+            entry = self._track_task(task)
+        entry[0] += 1
+        entry[1] += dt
+        entry[2] += cpu
+
+    def _track_task(self, task):
+        key = id(task)
+        tasks = self._tasks
+        coros = self._coros
+
+        def forget(ref):
+            steps, run_time, cpu_time, name, ref = tasks.pop(key)
+            coro = coros.setdefault(name, [0, 0.0, 0.0])
+            coro[0] += steps
+            coro[1] += run_time
+            coro[2] += cpu_time
+
+        entry = [0, 0.0, 0.0, _coro_name(task), weakref.ref(task, forget)]
+        tasks[key] = entry
+        return entry
+
+    def get_task_stats(self, task):
+        """Return the statistics of a task as a dict.
+
+        The 'steps' key is the number of times the task ran, 'run_time'
+        their cumulative duration and 'cpu_time' the CPU time they used,
+        in seconds.  Return None if the task did not run since the
+        statistics were reset.
+        """
+        entry = self._tasks.get(id(task))
+        if entry is None or entry[4]() is not task:
+            return None
+        steps, run_time, cpu_time, name, ref = entry
+        return {'steps': steps, 'run_time': run_time, 'cpu_time': cpu_time}
+
+    def as_dict(self, max_tasks=20):
+        """Return the statistics as a dict of JSON serializable values.
+
+        Only the *max_tasks* live tasks which ran the longest are listed;
+        None lists all of them.  Durations are in seconds.
+        """
+        entries = list(self._tasks.values())
+        coros = {name: list(coro) for name, coro in self._coros.items()}
+        for steps, run_time, cpu_time, name, ref in entries:
+            coro = coros.setdefault(name, [0, 0.0, 0.0])
+            coro[0] += steps
+            coro[1] += run_time
+            coro[2] += cpu_time
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+        if max_tasks is not None:
+            entries = entries[:max_tasks]
+        tasks = []
+        for steps, run_time, cpu_time, name, ref in entries:
+            task = ref()
+            if task is not None:
+                tasks.append({'id': id(task), 'coro': name,
+                              'done': task.done(), 'steps': steps,
+                              'run_time': run_time, 'cpu_time': cpu_time})
+        return {
+            'start_time': self._start_time,
+            'iterations': self._iterations,
+            'select_time': self._select.as_dict(),
+            'iteration_latency': self._latency.as_dict(),
+            'callback_time': self._callbacks.as_dict(),
+            'ready_queue': self._ready.as_dict(),
+            'tasks': tasks,
+            'coros': {
+                name: {'steps': steps, 'run_time': run_time,
+                       'cpu_time': cpu_time}
+                for name, (steps, run_time, cpu_time) in coros.items()
+            },
+        }
+
+    def to_json(self, max_tasks=20, **kwargs):
+        """Return the statistics as a JSON document.
+
+        Keyword arguments are passed to json.dumps().
+        """
+        return json.dumps(self.as_dict(max_tasks), **kwargs)
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} iterations={self._iterations} '
+                f'tasks={len(self._tasks)}>')
@@ -0,0 +1,250 @@
+"""Bounded concurrency."""
+
+__all__ = ('TaskPool',)
+
+import collections
+
+from . import coroutines
+from . import events
+from . import tasks
+
+
+class TaskPool:
+    """Run coroutines as tasks, with at most *limit* of them at a time.
+
+    spawn() waits for a free slot before starting a task, which applies
+    backpressure to the producer of the coroutines.  map() and
+    map_unordered() run a coroutine function over an iterable, consuming
+    it lazily: a task holds its slot until its result is retrieved, so
+    they use O(limit) memory whatever the size of the iterable.
+
+    The pool is also an asynchronous context manager, whose exit waits
+    for the spawned tasks, or cancels them if the block raised.
+    """
+
+    def __init__(self, limit, *, loop=None):
+        if limit < 1:
+            raise ValueError('limit must be >= 1')
+        self._limit = limit
+        # Number of free slots
+        self._free = limit
+        self._waiters = collections.deque()
+        self._tasks = set()
+        if loop is not None:
+            self._loop = loop
+        else:
+            self._loop = events.get_event_loop()
+
+    def __repr__(self):
+        extra = f'limit={self._limit}, tasks={len(self._tasks)}'
+        if self._waiters:
+            extra = f'{extra}, waiters={len(self._waiters)}'
+        return f'<{self.__class__.__name__} {extra}>'
+
+    @property
+    def limit(self):
+        """Maximum number of tasks of the pool."""
+        return self._limit
+
+    def __len__(self):
+        """Return the number of tasks holding a slot."""
+        return self._limit - self._free
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.cancel()
+        await self.join()
+
+    def _try_acquire(self):
+        # Waiting coroutines take precedence.
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return True
+        return False
+
+    async def _acquire(self):
+        if self._try_acquire():
+            return
+        waiter = self._loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except:
+            # The slot may have been handed over just before the
+            # cancellation: give it to the next waiter.
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+            raise
+
+    def _release(self, task=None):
+        # Hand the slot over to the first waiter, if any: it does not
+        # have to compete for it once woken up.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+    def _start(self, coro):
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _abandon(self, task):
+        # Done callback of a task whose result nobody will retrieve.
+        self._release()
+        if not task.cancelled():
+            task.exception()
+
+    async def spawn(self, coro):
+        """Start a task running coro, once a slot is free.
+
+        Return the Task.  Its slot is freed when it is done.
+        """
+        if not coroutines.iscoroutine(coro):
+            raise TypeError(f'a coroutine was expected, got {coro!r}')
+        try:
+            await self._acquire()
+        except:
+            coro.close()
+            raise
+        task = self._start(coro)
+        task.add_done_callback(self._release)
+        return task
+
+    async def join(self):
+        """Wait until all the tasks of the pool are done."""
+        while self._tasks:
+            await tasks.wait(list(self._tasks), loop=self._loop)
+
+    def cancel(self):
+        """Cancel all the tasks of the pool."""
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def _start_next(self, func, it, is_async):
+        # Start a task running func() for the next item of it, in the slot
+        # taken by the caller.  The slot is released if that fails, or at
+        # the end of it, where None is returned.
+        try:
+            if is_async:
+                item = await it.__anext__()
+            else:
+                item = next(it)
+        except (StopIteration, StopAsyncIteration):
+            self._release()
+            return None
+        except:
+            self._release()
+            raise
+        try:
+            return self._start(func(item))
+        except:
+            self._release()
+            raise
+
+    async def map(self, func, iterable):
+        """Asynchronous iterator over the results of func(item).
+
+        func is a coroutine function called for each item of iterable,
+        which can be an iterable or an asynchronous iterable, and the
+        results are yielded in the order of the items.  If a call raises
+        an exception, or if the iteration stops early, the other tasks
+        are cancelled.
+        """
+        is_async = hasattr(type(iterable), '__aiter__')
+        if is_async:
+            it = iterable.__aiter__()
+        else:
+            it = iter(iterable)
+        pending = collections.deque()
+        exhausted = False
+        try:
+            while True:
+                # Start as many tasks as possible, without waiting for
+                # a slot as long as a result is pending.
+                while not exhausted:
+                    if pending:
+                        if not self._try_acquire():
+                            break
+                    else:
+                        await self._acquire()
+                    task = await self._start_next(func, it, is_async)
+                    if task is None:
+                        exhausted = True
+                        break
+                    pending.append(task)
+                if not pending:
+                    return
+                task = pending[0]
+                try:
+                    result = await task
+                finally:
+                    pending.popleft()
+                    self._release()
+                yield result
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(self._abandon)
+
+    async def map_unordered(self, func, iterable):
+        """Like map(), but yield the results as the tasks complete."""
+        is_async = hasattr(type(iterable), '__aiter__')
+        if is_async:
+            it = iterable.__aiter__()
+        else:
+            it = iter(iterable)
+        pending = set()
+        finished = collections.deque()
+        waiter = None
+        exhausted = False
+
+        # A single waiter is woken up by the done callback of any task:
+        # unlike tasks.wait(), nothing is registered on each wait.
+        def on_done(task):
+            pending.discard(task)
+            finished.append(task)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
+
+        try:
+            while True:
+                while not exhausted:
+                    if pending or finished:
+                        if not self._try_acquire():
+                            break
+                    else:
+                        await self._acquire()
+                    task = await self._start_next(func, it, is_async)
+                    if task is None:
+                        exhausted = True
+                        break
+                    pending.add(task)
+                    task.add_done_callback(on_done)
+                if not finished:
+                    if not pending:
+                        return
+                    waiter = self._loop.create_future()
+                    try:
+                        await waiter
+                    finally:
+                        waiter = None
+                    continue
+                task = finished.popleft()
+                self._release()
+                yield task.result()
+        finally:
+            for task in pending:
+                task.remove_done_callback(on_done)
+                task.cancel()
+                task.add_done_callback(self._abandon)
+            for task in finished:
+                self._abandon(task)
@@ -9,6 +9,8 @@ __all__ = 'BaseSelectorEventLoop',
 import collections
 import errno
 import functools
+import itertools
+import os
 import selectors
 import socket
 import warnings
@@ -28,6 +30,14 @@ from . import transports
 from .log import logger
 
 
+_HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+if _HAS_SENDMSG:
+    try:
+        _SC_IOV_MAX = os.sysconf('SC_IOV_MAX')
+    except (AttributeError, ValueError, OSError):
+        _SC_IOV_MAX = 16  # The minimum required by POSIX
+
+
 def _test_selector_event(selector, fd, event):
     # Test if the selector is monitoring 'event' events
     # for the file descriptor 'fd'.
@@ -721,6 +731,14 @@ class _SelectorSocketTransport(_SelectorTransport):
     _start_tls_compatible = True
     _sendfile_compatible = constants._SendfileMode.TRY_NATIVE
 
+    # The write buffer is a deque of bytes-like objects, sent with a
+    # single sendmsg() call when it holds more than one.
+    _buffer_factory = collections.deque
+
+    # Writes smaller than this are copied into a bytearray at the end of
+    # the write buffer instead of being queued separately.
+    _coalesce_size = 4096
+
     def __init__(self, loop, sock, protocol, waiter=None,
                  extra=None, server=None):
 
@@ -729,6 +747,8 @@ class _SelectorSocketTransport(_SelectorTransport):
         self._eof = False
         self._paused = False
         self._empty_waiter = None
+        self._buffer_size = 0
+        self._corked = 0
 
         # Disable the Nagle algorithm -- small writes will be
         # sent without waiting for the TCP ACK.  This generally
@@ -862,7 +882,7 @@ class _SelectorSocketTransport(_SelectorTransport):
             self._conn_lost += 1
             return
 
-        if not self._buffer:
+        if not self._buffer and not self._corked:
             # Optimization: try to send now.
             try:
                 n = self._sock.send(data)
@@ -872,34 +892,139 @@ class _SelectorSocketTransport(_SelectorTransport):
                 self._fatal_error(exc, 'Fatal write error on socket transport')
                 return
             else:
-                data = data[n:]
-                if not data:
+                if n == len(data):
                     return
+                if n:
+                    data = memoryview(data)[n:]
             # Not all was written; register write handler.
             self._loop._add_writer(self._sock_fd, self._write_ready)
+            self._append_to_buffer(data)
+        else:
+            # Add it to the buffer.
+            buffer = self._buffer
+            if (buffer and len(data) < self._coalesce_size and
+                    type(buffer[-1]) is bytearray):
+                # Fast path of _append_to_buffer() for small writes
+                buffer[-1] += data
+                self._buffer_size += len(data)
+            else:
+                self._append_to_buffer(data)
+        if self._buffer_size > self._high_water:
+            self._maybe_pause_protocol()
+
+    def _append_to_buffer(self, data):
+        buffer = self._buffer
+        size = len(data)
+        if size < self._coalesce_size or not (
+                isinstance(data, bytes) or
+                (isinstance(data, memoryview) and
+                 isinstance(data.obj, bytes))):
+            # Small writes are copied together, which is cheaper than
+            # queueing them one by one.  Mutable data is always copied,
+            # since the caller may modify it once write() returns.
+            if buffer and type(buffer[-1]) is bytearray:
+                buffer[-1] += data
+            else:
+                buffer.append(bytearray(data))
+        else:
+            # Large immutable data is sent without being copied.
+            buffer.append(data)
+        self._buffer_size += size
+
+    def writelines(self, list_of_data):
+        list_of_data = list(list_of_data)
+        if max(map(len, list_of_data), default=0) < self._coalesce_size:
+            # Joining small buffers is much faster than queueing them
+            self.write(b''.join(list_of_data))
+            return
+
+        for data in list_of_data:
+            if not isinstance(data, (bytes, bytearray, memoryview)):
+                raise TypeError(f'data argument must be a bytes-like object, '
+                                f'not {type(data).__name__!r}')
+        if self._eof:
+            raise RuntimeError('Cannot call writelines() after write_eof()')
+        if self._empty_waiter is not None:
+            raise RuntimeError('unable to writelines; sendfile is in progress')
 
-        # Add it to the buffer.
-        self._buffer.extend(data)
+        if self._conn_lost:
+            if self._conn_lost >= constants.LOG_THRESHOLD_FOR_CONNLOST_WRITES:
+                logger.warning('socket.send() raised exception.')
+            self._conn_lost += 1
+            return
+
+        was_empty = not self._buffer
+        for data in list_of_data:
+            if data:
+                self._append_to_buffer(data)
+        if not self._buffer:
+            return
+        if was_empty and not self._corked:
+            self._write_now()
         self._maybe_pause_protocol()
 
+    def cork(self):
+        self._corked += 1
+
+    def uncork(self):
+        if not self._corked:
+            return
+        self._corked -= 1
+        if self._corked or not self._buffer or self._conn_lost:
+            return
+        self._write_now()
+
+    def _write_now(self):
+        # Try to send the whole buffer right away; the write handler sends
+        # what is left.
+        self._write_ready()
+        if self._buffer and not self._conn_lost:
+            self._loop._add_writer(self._sock_fd, self._write_ready)
+
+    def _uncork_all(self):
+        if self._corked:
+            self._corked = 1
+            self.uncork()
+
+    def close(self):
+        self._uncork_all()
+        super().close()
+
+    def get_write_buffer_size(self):
+        return self._buffer_size
+
+    def _force_close(self, exc):
+        super()._force_close(exc)
+        self._buffer_size = 0
+
     def _write_ready(self):
         assert self._buffer, 'Data should not be empty'
 
         if self._conn_lost:
             return
         try:
-            n = self._sock.send(self._buffer)
+            if len(self._buffer) == 1:
+                n = self._sock.send(self._buffer[0])
+            elif _HAS_SENDMSG:
+                n = self._sock.sendmsg(
+                    itertools.islice(self._buffer, _SC_IOV_MAX))
+            else:
+                data = b''.join(self._buffer)
+                self._buffer.clear()
+                self._buffer.append(data)
+                n = self._sock.send(data)
         except (BlockingIOError, InterruptedError):
             pass
         except Exception as exc:
             self._loop._remove_writer(self._sock_fd)
             self._buffer.clear()
+            self._buffer_size = 0
             self._fatal_error(exc, 'Fatal write error on socket transport')
             if self._empty_waiter is not None:
                 self._empty_waiter.set_exception(exc)
         else:
             if n:
-                del self._buffer[:n]
+                self._consume_buffer(n)
             self._maybe_resume_protocol()  # May append to buffer.
             if not self._buffer:
                 self._loop._remove_writer(self._sock_fd)
@@ -910,9 +1035,22 @@ class _SelectorSocketTransport(_SelectorTransport):
                 elif self._eof:
                     self._sock.shutdown(socket.SHUT_WR)
 
+    def _consume_buffer(self, n):
+        """Remove the first n bytes sent from the write buffer."""
+        self._buffer_size -= n
+        buffer = self._buffer
+        while n:
+            data = buffer.popleft()
+            size = len(data)
+            if size > n:
+                buffer.appendleft(memoryview(data)[n:])
+                break
+            n -= size
+
     def write_eof(self):
         if self._closing or self._eof:
             return
+        self._uncork_all()
         self._eof = True
         if not self._buffer:
             self._sock.shutdown(socket.SHUT_WR)
@@ -929,6 +1067,7 @@ class _SelectorSocketTransport(_SelectorTransport):
     def _make_empty_waiter(self):
         if self._empty_waiter is not None:
             raise RuntimeError("Empty waiter is already set")
+        self._uncork_all()
         self._empty_waiter = self._loop.create_future()
         if not self._buffer:
             self._empty_waiter.set_result(None)
@@ -1,5 +1,6 @@
 import collections
 import warnings
+import weakref
 try:
     import ssl
 except ImportError:  # pragma: no cover
@@ -26,6 +27,13 @@ def _create_transport_context(server_side, server_hostname):
     return sslcontext
 
 
+# Receive buffers for the record level data, shared by all the SSLProtocol
+# instances of an event loop.  The data is copied into the incoming BIO as
+# soon as it is received, so the buffer is free again when buffer_updated()
+# returns.
+_recv_buffers = weakref.WeakKeyDictionary()
+
+
 # States of an _SSLPipe.
 _UNWRAPPED = "UNWRAPPED"
 _DO_HANDSHAKE = "DO_HANDSHAKE"
@@ -154,10 +162,10 @@ class _SSLPipe(object):
         ssldata, appdata = self.feed_ssldata(b'')
         assert appdata == [] or appdata == [b'']
 
-    def feed_ssldata(self, data, only_handshake=False):
+    def feed_ssldata(self, data, only_handshake=False, read_appdata=True):
         """Feed SSL record level data into the pipe.
 
-        The data must be a bytes instance. It is OK to send an empty bytes
+        The data must be a bytes-like object. It is OK to send an empty bytes
         instance. This can be used to get ssldata for a handshake initiated by
         this endpoint.
 
@@ -168,11 +176,14 @@ class _SSLPipe(object):
         needs to be forwarded to the application. The appdata list may contain
         an empty buffer indicating an SSL "close_notify" alert. This alert must
         be acknowledged by calling shutdown().
+
+        If *read_appdata* is false, the plaintext of a wrapped pipe is left
+        in the pipe, to be retrieved with read_appdata().
         """
         if self._state == _UNWRAPPED:
             # If unwrapped, pass plaintext data straight through.
             if data:
-                appdata = [data]
+                appdata = [bytes(data)]
             else:
                 appdata = []
             return ([], appdata)
@@ -196,7 +207,7 @@ class _SSLPipe(object):
 
             if self._state == _WRAPPED:
                 # Main state: read data from SSL until close_notify
-                while True:
+                while read_appdata:
                     chunk = self._sslobj.read(self.max_size)
                     appdata.append(chunk)
                     if not chunk:  # close_notify
@@ -229,6 +240,49 @@ class _SSLPipe(object):
             ssldata.append(self._outgoing.read())
         return (ssldata, appdata)
 
+    def read_appdata(self, buffer=None):
+        """Read plaintext data from a wrapped pipe.
+
+        Return an (ssldata, result) tuple. The ssldata element is a list of
+        buffers containing SSL data that needs to be sent to the remote SSL.
+
+        If *buffer* is None, result is a bytes object with the plaintext of
+        the next SSL record. Otherwise the plaintext of as many SSL records
+        as have been received is decrypted straight into *buffer*, and
+        result is the number of bytes written to it. An empty result (b''
+        or 0) indicates an SSL "close_notify" alert, which must be
+        acknowledged by calling shutdown(). The result is None if no
+        complete record has been received yet.
+        """
+        if self._state != _WRAPPED:
+            raise RuntimeError('no security layer present')
+
+        ssldata = []
+        result = None
+        try:
+            if buffer is None:
+                result = self._sslobj.read(self.max_size)
+            else:
+                view = memoryview(buffer)
+                size = len(view)
+                result = self._sslobj.read(size, view)
+                while result and result < size:
+                    n = self._sslobj.read(size - result, view[result:])
+                    if not n:  # close_notify, returned by the next call
+                        break
+                    result += n
+        except (ssl.SSLError, ssl.CertificateError) as exc:
+            exc_errno = getattr(exc, 'errno', None)
+            if exc_errno not in (
+                    ssl.SSL_ERROR_WANT_READ, ssl.SSL_ERROR_WANT_WRITE,
+                    ssl.SSL_ERROR_SYSCALL):
+                raise
+            self._need_ssldata = (exc_errno == ssl.SSL_ERROR_WANT_READ)
+
+        if self._outgoing.pending:
+            ssldata.append(self._outgoing.read())
+        return (ssldata, result)
+
     def feed_appdata(self, data, offset=0):
         """Feed plaintext data into the pipe.
 
@@ -326,7 +380,7 @@ class _SSLProtocolTransport(transports._FlowControlMixin,
         tr = self._ssl_protocol._transport
         if tr is None:
             raise RuntimeError('SSL transport has not been initialized yet')
-        return tr.is_reading()
+        return not self._ssl_protocol._app_reading_paused and tr.is_reading()
 
     def pause_reading(self):
         """Pause the receiving end.
@@ -334,6 +388,7 @@ class _SSLProtocolTransport(transports._FlowControlMixin,
         No data will be passed to the protocol's data_received()
         method until resume_reading() is called.
         """
+        self._ssl_protocol._app_reading_paused = True
         self._ssl_protocol._transport.pause_reading()
 
     def resume_reading(self):
@@ -342,7 +397,7 @@ class _SSLProtocolTransport(transports._FlowControlMixin,
         Data received will once again be passed to the protocol's
         data_received() method.
         """
-        self._ssl_protocol._transport.resume_reading()
+        self._ssl_protocol._resume_reading()
 
     def set_write_buffer_limits(self, high=None, low=None):
         """Set the high- and low-water limits for write flow control.
@@ -366,8 +421,12 @@ class _SSLProtocolTransport(transports._FlowControlMixin,
         self._ssl_protocol._transport.set_write_buffer_limits(high, low)
 
     def get_write_buffer_size(self):
-        """Return the current size of the write buffer."""
-        return self._ssl_protocol._transport.get_write_buffer_size()
+        """Return the current size of the write buffer.
+
+        This includes the plaintext data which has not been encrypted yet.
+        """
+        return (self._ssl_protocol._transport.get_write_buffer_size() +
+                self._ssl_protocol._write_buffer_size)
 
     @property
     def _protocol_paused(self):
@@ -387,6 +446,20 @@ class _SSLProtocolTransport(transports._FlowControlMixin,
             return
         self._ssl_protocol._write_appdata(data)
 
+    def cork(self):
+        """Hold back the data written until uncork() is called."""
+        tr = self._ssl_protocol._transport
+        if tr is not None:
+            tr.cork()
+
+    def uncork(self):
+        """Undo one cork() call, sending the buffered data if it was the
+        last one.
+        """
+        tr = self._ssl_protocol._transport
+        if tr is not None:
+            tr.uncork()
+
     def can_write_eof(self):
         """Return True if this transport supports write_eof(), False if not."""
         return False
@@ -402,11 +475,16 @@ class _SSLProtocolTransport(transports._FlowControlMixin,
         self._closed = True
 
 
-class SSLProtocol(protocols.Protocol):
+class SSLProtocol(protocols.BufferedProtocol, protocols.Protocol):
     """SSL protocol.
 
     Implementation of SSL on top of a socket using incoming and outgoing
     buffers which are ssl.MemoryBIO objects.
+
+    Record level data is received into a buffer shared by the event loop.
+    The plaintext is decrypted straight into the buffer of an application
+    protocol which supports BufferedProtocol, and is only decrypted while
+    the application is reading.
     """
 
     def __init__(self, loop, app_protocol, sslcontext, waiter,
@@ -450,6 +528,9 @@ class SSLProtocol(protocols.Protocol):
         self._session_established = False
         self._in_handshake = False
         self._in_shutdown = False
+        # Set by the app transport's pause_reading(): the received data is
+        # kept in the incoming BIO until resume_reading() is called.
+        self._app_reading_paused = False
         # transport, ex: SelectorSocketTransport
         self._transport = None
         self._call_connection_made = call_connection_made
@@ -513,17 +594,33 @@ class SSLProtocol(protocols.Protocol):
         """
         self._app_protocol.resume_writing()
 
+    def get_buffer(self, n):
+        """Return the buffer to receive SSL data into."""
+        view = _recv_buffers.get(self._loop)
+        if view is None:
+            view = memoryview(bytearray(_SSLPipe.max_size))
+            _recv_buffers[self._loop] = view
+        return view
+
+    def buffer_updated(self, nbytes):
+        """Called when SSL data was written into the buffer."""
+        self._feed_ssldata(_recv_buffers[self._loop][:nbytes])
+
     def data_received(self, data):
         """Called when some SSL data is received.
 
         The argument is a bytes object.
         """
+        self._feed_ssldata(data)
+
+    def _feed_ssldata(self, data):
         if self._sslpipe is None:
             # transport closing, sslpipe is destroyed
             return
 
         try:
-            ssldata, appdata = self._sslpipe.feed_ssldata(data)
+            ssldata, appdata = self._sslpipe.feed_ssldata(
+                data, read_appdata=False)
         except Exception as e:
             self._fatal_error(e, 'SSL error in data received')
             return
@@ -531,6 +628,7 @@ class SSLProtocol(protocols.Protocol):
         for chunk in ssldata:
             self._transport.write(chunk)
 
+        # Plaintext passed through after the SSL shutdown
         for chunk in appdata:
             if chunk:
                 try:
@@ -543,10 +641,60 @@ class SSLProtocol(protocols.Protocol):
                     self._fatal_error(
                         ex, 'application protocol failed to receive SSL data')
                     return
-            else:
+
+        self._read_appdata()
+
+    def _read_appdata(self):
+        # Pass the decrypted data to the application protocol until no
+        # complete record is left in the pipe or the application pauses
+        # reading.
+        while (self._sslpipe is not None and self._sslpipe.wrapped and
+               not self._app_reading_paused):
+            buf = None
+            if self._app_protocol_is_buffer:
+                try:
+                    buf = self._app_protocol.get_buffer(-1)
+                    if not len(buf):
+                        raise RuntimeError(
+                            'get_buffer() returned an empty buffer')
+                except Exception as ex:
+                    self._fatal_error(
+                        ex, 'application protocol failed to receive SSL data')
+                    return
+
+            try:
+                ssldata, result = self._sslpipe.read_appdata(buf)
+            except Exception as e:
+                self._fatal_error(e, 'SSL error in data received')
+                return
+
+            for chunk in ssldata:
+                self._transport.write(chunk)
+
+            if result is None:
+                break
+            if not result:  # close_notify
                 self._start_shutdown()
                 break
 
+            try:
+                if buf is not None:
+                    self._app_protocol.buffer_updated(result)
+                else:
+                    self._app_protocol.data_received(result)
+            except Exception as ex:
+                self._fatal_error(
+                    ex, 'application protocol failed to receive SSL data')
+                return
+
+    def _resume_reading(self):
+        self._app_reading_paused = False
+        self._transport.resume_reading()
+        # Records received before pause_reading() took effect are still
+        # waiting in the pipe.  Don't decrypt them here: resume_reading()
+        # may be called from the application's buffer_updated().
+        self._loop.call_soon(self._read_appdata)
+
     def eof_received(self):
         """Called when the other end of the low-level stream
         is half-closed.
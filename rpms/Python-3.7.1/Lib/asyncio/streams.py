@@ -5,6 +5,7 @@ __all__ = (
 )
 
 import socket
+import weakref
 
 if hasattr(socket, 'AF_UNIX'):
     __all__ += ('open_unix_connection', 'start_unix_server')
@@ -17,6 +18,12 @@ from .tasks import sleep
 
 
 _DEFAULT_LIMIT = 2 ** 16  # 64 KiB
+_RECV_BUFFER_SIZE = 2 ** 18  # 256 KiB
+
+# Receive buffer shared by the StreamReaders of each event loop.  Data is
+# copied out of it before buffer_updated() returns, so it never holds data
+# between two callbacks.
+_recv_buffers = weakref.WeakKeyDictionary()
 
 
 class IncompleteReadError(EOFError):
@@ -209,13 +216,17 @@ class FlowControlMixin(protocols.Protocol):
         await waiter
 
 
-class StreamReaderProtocol(FlowControlMixin, protocols.Protocol):
+class StreamReaderProtocol(FlowControlMixin, protocols.BufferedProtocol,
+                           protocols.Protocol):
     """Helper class to adapt between Protocol and StreamReader.
 
     (This is a helper class instead of making StreamReader itself a
     Protocol subclass, because the StreamReader has other potential
     uses, and to prevent the user of the StreamReader to accidentally
     call inappropriate methods of the protocol.)
+
+    Transports supporting BufferedProtocol receive directly into memory
+    provided by the StreamReader; others call data_received().
     """
 
     def __init__(self, stream_reader, client_connected_cb=None, loop=None):
@@ -256,6 +267,12 @@ class StreamReaderProtocol(FlowControlMixin, protocols.Protocol):
     def data_received(self, data):
         self._stream_reader.feed_data(data)
 
+    def get_buffer(self, sizehint):
+        return self._stream_reader._get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        self._stream_reader._buffer_updated(nbytes)
+
     def eof_received(self):
         self._stream_reader.feed_eof()
         if self._over_ssl:
@@ -368,6 +385,12 @@ class StreamReader:
         self._exception = None
         self._transport = None
         self._paused = False
+        # Memory returned by _get_buffer(): either a view of the buffer
+        # passed to a pending readinto() call, or the loop's receive buffer.
+        self._recv_view = None
+        self._readinto_view = None
+        self._readinto_nbytes = 0
+        self._direct = False
 
     def __repr__(self):
         info = ['StreamReader']
@@ -432,7 +455,9 @@ class StreamReader:
 
         self._buffer.extend(data)
         self._wakeup_waiter()
+        self._maybe_pause_transport()
 
+    def _maybe_pause_transport(self):
         if (self._transport is not None and
                 not self._paused and
                 len(self._buffer) > 2 * self._limit):
@@ -446,6 +471,55 @@ class StreamReader:
             else:
                 self._paused = True
 
+    def _get_buffer(self, sizehint):
+        """Return memory for the transport to receive into.
+
+        If a readinto() call is waiting for data, the transport writes
+        straight into the caller's buffer.  Otherwise a receive buffer
+        owned by the stream is reused for every chunk, instead of
+        allocating a bytes object per chunk as data_received() does.
+        """
+        self._direct = (self._readinto_view is not None and
+                        not self._buffer and
+                        type(self).feed_data is StreamReader.feed_data)
+        if self._direct:
+            return self._readinto_view
+        if self._recv_view is None:
+            view = _recv_buffers.get(self._loop)
+            if view is None:
+                view = memoryview(bytearray(_RECV_BUFFER_SIZE))
+                _recv_buffers[self._loop] = view
+            self._recv_view = view
+        return self._recv_view
+
+    def _buffer_updated(self, nbytes):
+        """Called when nbytes were written to the last _get_buffer()."""
+        if self._direct:
+            assert not self._eof, '_buffer_updated after feed_eof'
+            self._direct = False
+            # The view must not be returned again by _get_buffer() before
+            # readinto() resumes.
+            self._readinto_view = None
+            self._readinto_nbytes = nbytes
+            self._wakeup_waiter()
+        elif type(self).feed_data is StreamReader.feed_data:
+            assert not self._eof, '_buffer_updated after feed_eof'
+            self._buffer += self._recv_view[:nbytes]
+            self._wakeup_waiter()
+            self._maybe_pause_transport()
+        else:
+            # Subclasses overriding feed_data() still see every chunk
+            self.feed_data(bytes(self._recv_view[:nbytes]))
+
+    def _consume(self, n):
+        """Remove the first n bytes of the buffer and return them."""
+        # Copy through a memoryview: slicing the bytearray first would
+        # copy the data twice.
+        with memoryview(self._buffer) as view:
+            data = bytes(view[:n])
+        del self._buffer[:n]
+        return data
+
     async def _wait_for_data(self, func_name):
         """Wait until feed_data() or feed_eof() is called.
 
@@ -591,10 +665,9 @@ class StreamReader:
             raise LimitOverrunError(
                 'Separator is found, but chunk is longer than limit', isep)
 
-        chunk = self._buffer[:isep + seplen]
-        del self._buffer[:isep + seplen]
+        chunk = self._consume(isep + seplen)
         self._maybe_resume_transport()
-        return bytes(chunk)
+        return chunk
 
     async def read(self, n=-1):
         """Read up to `n` bytes from the stream.
@@ -640,12 +713,63 @@ class StreamReader:
             await self._wait_for_data('read')
 
         # This will work right even if buffer is less than n bytes
-        data = bytes(self._buffer[:n])
-        del self._buffer[:n]
+        data = self._consume(n)
 
         self._maybe_resume_transport()
         return data
 
+    async def readinto(self, buffer):
+        """Read up to len(buffer) bytes from the stream into buffer.
+
+        Return the number of bytes read, which is at least one unless
+        buffer is empty or the EOF was received and the internal buffer is
+        empty, in which case 0 is returned.
+
+        buffer can be any writable bytes-like object.  When no data is
+        buffered yet, transports supporting BufferedProtocol receive the
+        data directly into it, without any intermediate copy.
+
+        If stream was paused, this function will automatically resume it if
+        needed.
+        """
+        if self._exception is not None:
+            raise self._exception
+
+        with memoryview(buffer) as view, view.cast('B') as view:
+            if view.readonly:
+                raise TypeError('readinto() argument must be a writable '
+                                'bytes-like object')
+            if not view:
+                return 0
+
+            if not self._buffer and not self._eof:
+                self._readinto_view = view
+                self._readinto_nbytes = 0
+                try:
+                    await self._wait_for_data('readinto')
+                except BaseException:
+                    # If the task was cancelled after data was received
+                    # into buffer, the caller will not see it: keep it in
+                    # the stream.
+                    if self._readinto_nbytes:
+                        self._buffer[:0] = view[:self._readinto_nbytes]
+                        self._readinto_nbytes = 0
+                    raise
+                finally:
+                    self._readinto_view = None
+                nbytes = self._readinto_nbytes
+                self._readinto_nbytes = 0
+                if nbytes:
+                    return nbytes
+
+            nbytes = min(len(view), len(self._buffer))
+            with memoryview(self._buffer) as data:
+                view[:nbytes] = data[:nbytes]
+            del self._buffer[:nbytes]
+
+        self._maybe_resume_transport()
+        return nbytes
+
     async def readexactly(self, n):
         """Read exactly `n` bytes.
 
@@ -682,8 +806,7 @@ class StreamReader:
             data = bytes(self._buffer)
             self._buffer.clear()
         else:
-            data = bytes(self._buffer[:n])
-            del self._buffer[:n]
+            data = self._consume(n)
         self._maybe_resume_transport()
         return data
 
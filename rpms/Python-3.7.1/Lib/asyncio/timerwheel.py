@@ -0,0 +1,247 @@
+"""Hierarchical timer wheel.
+
+By default the event loop keeps its timers in a heap, where scheduling a
+timer costs O(log n) and cancelled timers are only dropped lazily.  A
+TimerWheel installed with loop.set_timer_wheel() schedules and cancels
+timers in O(1) instead, which suits servers re-arming a timeout on each
+of many connections.
+
+Time is cut into ticks of *resolution* seconds.  Level 0 of the wheel has
+one slot per tick for the next 64 ticks, level 1 one slot per 64 ticks for
+the next 64 * 64 ticks, and so on.  When level 0 wraps around, the timers
+of the next slot of level 1 are spread over level 0, and similarly for the
+higher levels.  Timers keep their exact deadline: the resolution only
+bounds the number of timers compared when looking for the next deadline.
+"""
+
+__all__ = ('TimerWheel',)
+
+import operator
+
+
+_BITS = 6
+_SIZE = 1 << _BITS
+_MASK = _SIZE - 1
+_FULL = (1 << _SIZE) - 1
+_LEVELS = 6
+# Timers further away are put in the last slot of the highest level, and
+# moved again each time that slot is cascaded.
+_MAX_TICKS = 1 << (_BITS * _LEVELS)
+
+_when_key = operator.attrgetter('_when')
+
+
+def _next_bit(bitmap, start):
+    # Distance from bit start to the next set bit of bitmap, wrapping
+    # around, or -1 if bitmap is empty.
+    if not bitmap:
+        return -1
+    rotated = ((bitmap >> start) | (bitmap << (_SIZE - start))) & _FULL
+    return (rotated & -rotated).bit_length() - 1
+
+
+class TimerWheel:
+    """Scheduler for the timers of an event loop.
+
+    A TimerWheel can only be used by one event loop.
+    """
+
+    def __init__(self, resolution=0.001):
+        if resolution <= 0:
+            raise ValueError(
+                f'resolution should be a positive number, got {resolution}')
+        self._resolution = resolution
+        # Timers are stored in dicts keyed by id(): TimerHandle objects
+        # which compare equal are still distinct timers.
+        self._levels = [[{} for _ in range(_SIZE)] for _ in range(_LEVELS)]
+        # Bit i of _occupied[level] is set if the slot i of the level may
+        # be non-empty.  Bits of emptied slots are cleared lazily.
+        self._occupied = [0] * _LEVELS
+        self._tick = 0
+        self._count = 0
+
+    @property
+    def resolution(self):
+        """Duration of a tick of the wheel, in seconds."""
+        return self._resolution
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} '
+                f'resolution={self._resolution} timers={self._count}>')
+
+    def _start(self, now):
+        """Start counting ticks from the loop time now."""
+        if self._count:
+            raise RuntimeError('TimerWheel is already in use')
+        self._tick = int(now / self._resolution)
+
+    def _insert(self, timer):
+        tick = self._tick
+        expires = timer._when / self._resolution
+        if expires >= tick + _MAX_TICKS:
+            expires = tick + _MAX_TICKS - 1
+        elif expires <= tick:
+            expires = tick
+        else:
+            expires = int(expires)
+        delta = expires - tick
+        if delta < _SIZE:
+            level = 0
+            index = expires & _MASK
+        else:
+            level = (delta.bit_length() - 1) // _BITS
+            index = (expires >> (level * _BITS)) & _MASK
+        slot = self._levels[level][index]
+        slot[id(timer)] = timer
+        self._occupied[level] |= 1 << index
+        timer._wheel_slot = slot
+
+    def push(self, timer):
+        """Schedule a TimerHandle."""
+        self._insert(timer)
+        timer._scheduled = True
+        self._count += 1
+
+    def remove(self, timer):
+        """Unschedule a TimerHandle."""
+        del timer._wheel_slot[id(timer)]
+        timer._wheel_slot = None
+        timer._scheduled = False
+        self._count -= 1
+
+    def _cascade(self, tick):
+        # Called when level 0 wraps around: spread the timers of the next
+        # slot of each level whose lower level wrapped too.
+        self._tick = tick
+        for level in range(1, _LEVELS):
+            index = (tick >> (level * _BITS)) & _MASK
+            slot = self._levels[level][index]
+            if slot:
+                timers = list(slot.values())
+                slot.clear()
+                for timer in timers:
+                    self._insert(timer)
+            self._occupied[level] &= ~(1 << index)
+            if index:
+                break
+
+    def next_deadline(self):
+        """Return the loop time at which expire() should be called next.
+
+        Return None if no timer is scheduled.
+        """
+        if not self._count:
+            return None
+        tick = self._tick
+        slots = self._levels[0]
+        current = tick & _MASK
+        deadline = None
+        while True:
+            distance = _next_bit(self._occupied[0], current)
+            if distance < 0:
+                break
+            index = (current + distance) & _MASK
+            slot = slots[index]
+            if slot:
+                deadline = min(map(_when_key, slot.values()))
+                break
+            self._occupied[0] &= ~(1 << index)
+
+        # Timers of a higher level may be cascaded to level 0 before this
+        # deadline: wake up for the cascade first.
+        cascade = self._next_cascade(tick)
+        if cascade is not None:
+            cascade *= self._resolution
+            if deadline is None or cascade < deadline:
+                deadline = cascade
+        return deadline
+
+    def _next_cascade(self, tick):
+        # Return the first tick after tick at which a non-empty slot of
+        # a level above 0 is cascaded.
+        result = None
+        for level in range(1, _LEVELS):
+            shift = level * _BITS
+            current = ((tick >> shift) + 1) & _MASK
+            distance = _next_bit(self._occupied[level], current)
+            if distance >= 0:
+                start = ((tick >> shift) + 1 + distance) << shift
+                if result is None or start < result:
+                    result = start
+        return result
+
+    def expire(self, end_time):
+        """Unschedule and return the timers due at end_time.
+
+        The timers are sorted by deadline.
+        """
+        target = int(end_time / self._resolution)
+        # Make sure that the tick returned by next_deadline() is reached
+        # despite rounding errors.
+        if (target + 1) * self._resolution <= end_time:
+            target += 1
+        if not self._count:
+            if target > self._tick:
+                self._tick = target
+            return []
+
+        due = []
+        slots = self._levels[0]
+        tick = self._tick
+        while True:
+            index = tick & _MASK
+            slot = slots[index]
+            if slot:
+                if tick < target:
+                    due.extend(slot.values())
+                    slot.clear()
+                else:
+                    for key, timer in list(slot.items()):
+                        if timer._when <= end_time:
+                            due.append(timer)
+                            del slot[key]
+            if not slot:
+                self._occupied[0] &= ~(1 << index)
+            if tick >= target:
+                break
+            # Skip to the next non-empty slot, to the end of the lap, or
+            # if level 0 is empty, to the next cascade.
+            rest = self._occupied[0] >> (index + 1)
+            if rest:
+                tick += (rest & -rest).bit_length()
+            elif self._occupied[0]:
+                tick = (tick | _MASK) + 1
+            else:
+                tick = self._next_cascade(tick)
+                if tick is None:
+                    tick = target
+            if tick > target:
+                tick = target
+            if not tick & _MASK:
+                self._cascade(tick)
+        self._tick = tick
+
+        for timer in due:
+            timer._wheel_slot = None
+            timer._scheduled = False
+        self._count -= len(due)
+        if len(due) > 1:
+            due.sort(key=_when_key)
+        return due
+
+    def clear(self):
+        """Unschedule and return all the timers."""
+        timers = []
+        for slots in self._levels:
+            for slot in slots:
+                timers.extend(slot.values())
+                slot.clear()
+        for timer in timers:
+            timer._wheel_slot = None
+            timer._scheduled = False
+        self._occupied = [0] * _LEVELS
+        self._count = 0
+        return timers
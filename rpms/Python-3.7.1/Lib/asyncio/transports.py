@@ -110,6 +110,25 @@ class WriteTransport(BaseTransport):
         data = b''.join(list_of_data)
         self.write(data)
 
+    def cork(self):
+        """Hold back the data written until uncork() is called.
+
+        While the transport is corked, write() and writelines() only
+        buffer data, so that many small writes can be sent together.
+        Calls can be nested; the data is sent when uncork() has been
+        called as many times as cork().  close() and write_eof() send
+        the buffered data even if the transport is corked.
+
+        The default implementation does nothing.
+        """
+
+    def uncork(self):
+        """Undo one cork() call, sending the buffered data if it was the
+        last one.
+
+        The default implementation does nothing.
+        """
+
     def write_eof(self):
         """Close the write end after flushing buffered data.
 
@@ -2,6 +2,7 @@
 
 import errno
 import io
+import itertools
 import os
 import selectors
 import signal
@@ -11,6 +12,7 @@ import subprocess
 import sys
 import threading
 import warnings
+import weakref
 
 
 from . import base_events
@@ -28,7 +30,7 @@ from .log import logger
 __all__ = (
     'SelectorEventLoop',
     'AbstractChildWatcher', 'SafeChildWatcher',
-    'FastChildWatcher', 'DefaultEventLoopPolicy',
+    'FastChildWatcher', 'ThreadedChildWatcher', 'DefaultEventLoopPolicy',
 )
 
 
@@ -836,6 +838,20 @@ class AbstractChildWatcher:
         raise NotImplementedError()
 
 
+def _compute_returncode(status):
+    if os.WIFSIGNALED(status):
+        # The child process died because of a signal.
+        return -os.WTERMSIG(status)
+    elif os.WIFEXITED(status):
+        # The child process exited (e.g sys.exit()).
+        return os.WEXITSTATUS(status)
+    else:
+        # The child exited, but we don't understand its status.
+        # This shouldn't happen, but if it does, let's just
+        # return that status; perhaps that helps debug it.
+        return status
+
+
 class BaseChildWatcher(AbstractChildWatcher):
 
     def __init__(self):
@@ -851,6 +867,9 @@ class BaseChildWatcher(AbstractChildWatcher):
     def _do_waitpid_all(self):
         raise NotImplementedError()
 
+    def _compute_returncode(self, status):
+        return _compute_returncode(status)
+
     def attach_loop(self, loop):
         assert loop is None or isinstance(loop, events.AbstractEventLoop)
 
@@ -883,19 +902,6 @@ class BaseChildWatcher(AbstractChildWatcher):
                 'exception': exc,
             })
 
-    def _compute_returncode(self, status):
-        if os.WIFSIGNALED(status):
-            # The child process died because of a signal.
-            return -os.WTERMSIG(status)
-        elif os.WIFEXITED(status):
-            # The child process exited (e.g sys.exit()).
-            return os.WEXITSTATUS(status)
-        else:
-            # The child exited, but we don't understand its status.
-            # This shouldn't happen, but if it does, let's just
-            # return that status; perhaps that helps debug it.
-            return status
-
 
 class SafeChildWatcher(BaseChildWatcher):
     """'Safe' child watcher implementation.
@@ -1086,6 +1092,98 @@ class FastChildWatcher(BaseChildWatcher):
                 callback(pid, returncode, *args)
 
 
+class ThreadedChildWatcher(AbstractChildWatcher):
+    """Threaded child watcher implementation.
+
+    This implementation waits for each process in a thread of its own,
+    calling os.waitpid() for that process only.  It does not install a
+    SIGCHLD handler, so it can be used from any thread and event loop,
+    and does not disrupt other code spawning processes.
+
+    The cost of reaping a process does not depend on the number of
+    children (O(1) each time a child terminates), but each child costs a
+    thread while it runs.
+    """
+
+    def __init__(self):
+        self._pid_counter = itertools.count(0)
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._threads = {}
+        # All the threads still alive, including those running a callback
+        # after their process terminated
+        self._all_threads = weakref.WeakSet()
+
+    def close(self):
+        with self._lock:
+            self._callbacks.clear()
+
+    def _join_threads(self):
+        """Internal: wait until the processes being waited for terminate
+        and their threads exit."""
+        with self._lock:
+            threads = list(self._all_threads)
+        for thread in threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, a, b, c):
+        pass
+
+    def attach_loop(self, loop):
+        pass
+
+    def add_child_handler(self, pid, callback, *args):
+        with self._lock:
+            self._callbacks[pid] = (callback, args)
+            if pid in self._threads:
+                # The process is already waited for.
+                return
+            name = f'waitpid-{next(self._pid_counter)}'
+            thread = threading.Thread(target=self._do_waitpid, name=name,
+                                      args=(pid,), daemon=True)
+            self._threads[pid] = thread
+            self._all_threads.add(thread)
+            # Started with the lock held: _join_threads() cannot see a
+            # thread which is not started yet.
+            thread.start()
+
+    def remove_child_handler(self, pid):
+        with self._lock:
+            return self._callbacks.pop(pid, None) is not None
+
+    def _do_waitpid(self, expected_pid):
+        assert expected_pid > 0
+
+        try:
+            pid, status = os.waitpid(expected_pid, 0)
+        except ChildProcessError:
+            # The child process is already reaped
+            # (may happen if waitpid() is called elsewhere).
+            pid = expected_pid
+            returncode = 255
+            logger.warning(
+                "Unknown child process pid %d, will report returncode 255",
+                pid)
+        else:
+            returncode = _compute_returncode(status)
+
+        with self._lock:
+            del self._threads[expected_pid]
+            try:
+                callback, args = self._callbacks.pop(expected_pid)
+            except KeyError:
+                # .remove_child_handler() or .close() was called
+                return
+        try:
+            callback(pid, returncode, *args)
+        except Exception as exc:
+            logger.error('Exception in the callback of child process %d',
+                         pid, exc_info=exc)
+
+
 class _UnixDefaultEventLoopPolicy(events.BaseDefaultEventLoopPolicy):
     """UNIX event loop policy with a watcher for child processes."""
     _loop_factory = _UnixSelectorEventLoop
@@ -29,6 +29,7 @@ __all__ = (
     'as_completed',
     'ProcessPoolExecutor',
     'ThreadPoolExecutor',
+    'WorkStealingThreadPoolExecutor',
 )
 
 
@@ -38,6 +39,7 @@ def __dir__():
 
 def __getattr__(name):
     global ProcessPoolExecutor, ThreadPoolExecutor
+    global WorkStealingThreadPoolExecutor
 
     if name == 'ProcessPoolExecutor':
         from .process import ProcessPoolExecutor as pe
@@ -49,4 +51,9 @@ def __getattr__(name):
         ThreadPoolExecutor = te
         return te
 
+    if name == 'WorkStealingThreadPoolExecutor':
+        from .thread import WorkStealingThreadPoolExecutor as wse
+        WorkStealingThreadPoolExecutor = wse
+        return wse
+
     raise AttributeError(f"module {__name__} has no attribute {name}")
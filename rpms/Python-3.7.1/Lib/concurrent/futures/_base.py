@@ -4,6 +4,7 @@
 __author__ = 'Brian Quinlan (brian@sweetapp.com)'
 
 import collections
+import itertools
 import logging
 import threading
 import time
@@ -547,7 +548,7 @@ class Executor(object):
         """
         raise NotImplementedError()
 
-    def map(self, fn, *iterables, timeout=None, chunksize=1):
+    def map(self, fn, *iterables, timeout=None, chunksize=1, buffersize=None):
         """Returns an iterator equivalent to map(fn, iter).
 
         Args:
@@ -559,6 +560,12 @@ class Executor(object):
                 before being passed to a child process. This argument is only
                 used by ProcessPoolExecutor; it is ignored by
                 ThreadPoolExecutor.
+            buffersize: The maximum number of submitted calls (or chunks with
+                ProcessPoolExecutor) whose result has not been retrieved yet.
+                If None, all the calls are submitted immediately and the
+                iterables are consumed before returning. Otherwise the
+                iterables are consumed lazily: a new call is submitted each
+                time a result is retrieved.
 
         Returns:
             An iterator equivalent to: map(func, *iterables) but the calls may
@@ -569,28 +576,127 @@ class Executor(object):
                 before the given timeout.
             Exception: If fn(*args) raises for any values.
         """
+        if buffersize is not None and buffersize < 1:
+            raise ValueError("buffersize must be None or >= 1.")
+
         if timeout is not None:
             end_time = timeout + time.monotonic()
 
-        fs = [self.submit(fn, *args) for args in zip(*iterables)]
+        args_iter = zip(*iterables)
+        if buffersize is not None:
+            args_iter = iter(args_iter)
+            fs = collections.deque(
+                self.submit(fn, *args)
+                for args in itertools.islice(args_iter, buffersize))
+        else:
+            fs = collections.deque(self.submit(fn, *args)
+                                   for args in args_iter)
 
         # Yield must be hidden in closure so that the futures are submitted
         # before the first iterator value is required.
         def result_iterator():
             try:
-                # reverse to keep finishing order
-                fs.reverse()
                 while fs:
+                    if buffersize is not None:
+                        # Keep the window full while waiting for the result
+                        for args in itertools.islice(args_iter, 1):
+                            fs.append(self.submit(fn, *args))
                     # Careful not to keep a reference to the popped future
                     if timeout is None:
-                        yield fs.pop().result()
+                        yield fs.popleft().result()
                     else:
-                        yield fs.pop().result(end_time - time.monotonic())
+                        yield fs.popleft().result(end_time - time.monotonic())
             finally:
                 for future in fs:
                     future.cancel()
         return result_iterator()
 
+    def map_unordered(self, fn, *iterables, timeout=None, chunksize=1,
+                      buffersize=None):
+        """Returns an iterator over the results of fn(*args) as they complete.
+
+        Like map(), but the results are yielded as soon as they are
+        available instead of in the order of the iterables, like
+        as_completed() does for futures.
+
+        Args:
+            fn: A callable that will take as many arguments as there are
+                passed iterables.
+            timeout: The maximum number of seconds to wait. If None, then there
+                is no limit on the wait time.
+            chunksize: The size of the chunks the iterable will be broken into
+                before being passed to a child process. This argument is only
+                used by ProcessPoolExecutor; it is ignored by
+                ThreadPoolExecutor.
+            buffersize: The maximum number of submitted calls (or chunks with
+                ProcessPoolExecutor) whose result has not been retrieved yet.
+                If None, all the calls are submitted immediately.
+
+        Returns:
+            An iterator over the results of fn(*args) for all the args of
+            zip(*iterables), in completion order.
+
+        Raises:
+            TimeoutError: If the entire result iterator could not be generated
+                before the given timeout.
+            Exception: If fn(*args) raises for any values.
+        """
+        if buffersize is not None and buffersize < 1:
+            raise ValueError("buffersize must be None or >= 1.")
+
+        if timeout is not None:
+            end_time = timeout + time.monotonic()
+
+        args_iter = iter(zip(*iterables))
+        waiter = _AsCompletedWaiter()
+        pending = set()
+
+        def submit(n):
+            for args in itertools.islice(args_iter, n):
+                f = self.submit(fn, *args)
+                with f._condition:
+                    if f._state in [CANCELLED_AND_NOTIFIED, FINISHED]:
+                        waiter.add_result(f)
+                    else:
+                        f._waiters.append(waiter)
+                pending.add(f)
+
+        submit(buffersize)
+
+        def result_iterator():
+            try:
+                while pending:
+                    with waiter.lock:
+                        finished = waiter.finished_futures
+                        waiter.finished_futures = []
+                        waiter.event.clear()
+                    if not finished:
+                        if timeout is None:
+                            wait_timeout = None
+                        else:
+                            wait_timeout = end_time - time.monotonic()
+                            if wait_timeout < 0:
+                                raise TimeoutError(
+                                    '%d futures unfinished' % len(pending))
+                        waiter.event.wait(wait_timeout)
+                        continue
+
+                    # reverse to keep finishing order
+                    finished.reverse()
+                    while finished:
+                        pending.remove(finished[-1])
+                        if buffersize is not None:
+                            submit(1)
+                        # Careful not to keep a reference to the popped future
+                        yield finished.pop().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+                    with future._condition:
+                        if waiter in future._waiters:
+                            future._waiters.remove(waiter)
+        return result_iterator()
+
     def shutdown(self, wait=True):
         """Clean-up the resources associated with the Executor.
 
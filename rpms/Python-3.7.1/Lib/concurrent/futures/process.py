@@ -41,18 +41,40 @@ Local worker thread:
 Process #1..n:
 - reads _CallItems from "Call Q", executes the calls, and puts the resulting
   _ResultItems in "Result Q"
+
+When a shared_memory_threshold is given, results whose pickle is at least
+that large are written by the worker in a file and only a _SharedResult
+handle goes through "Result Q".  The local worker thread maps the file,
+unpickles the result and hands the file back to the worker for reuse.  All
+the files live in a directory private to the executor which is removed at
+shutdown, so that the results of crashed workers are not leaked.  The files
+of a worker are also removed when it is replaced.  Smaller results go
+through "Result Q" as a _PickledResult, wrapping the pickle made to measure
+their size so that they are not pickled twice.
+
+When restart_workers is true, each worker puts a _CallStarted in "Result Q"
+before running a call, so that the local worker thread knows which call a
+worker was running when it terminated abruptly: only the future of that call
+fails and a new worker is started.  When max_worker_rss is given, a worker
+whose resident set size exceeds it after a call exits cleanly, like at
+shutdown, and is replaced.
 """
 
 __author__ = 'Brian Quinlan (brian@sweetapp.com)'
 
 import atexit
+import mmap
 import os
+import shutil
+import sys
+import tempfile
 from concurrent.futures import _base
 import queue
 from queue import Full
 import multiprocessing as mp
 from multiprocessing.connection import wait
 from multiprocessing.queues import Queue
+from multiprocessing.reduction import ForkingPickler
 import threading
 import weakref
 from functools import partial
@@ -102,6 +124,8 @@ def _python_exit():
     for t, _ in items:
         t.join()
 
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+
 # Controls how many more calls than processes will be queued in the call queue.
 # A smaller number will mean that processes spend more time idle waiting for
 # work while a larger number will make Future.cancel() succeed less frequently
@@ -143,6 +167,20 @@ class _ResultItem(object):
         self.exception = exception
         self.result = result
 
+class _SharedResult(object):
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+
+class _PickledResult(object):
+    def __init__(self, data):
+        self.data = data
+
+class _CallStarted(object):
+    def __init__(self, pid, work_id):
+        self.pid = pid
+        self.work_id = work_id
+
 class _CallItem(object):
     def __init__(self, work_id, fn, args, kwargs):
         self.work_id = work_id
@@ -191,6 +229,127 @@ def _process_chunk(fn, chunk):
     return [fn(*args) for args in chunk]
 
 
+def _shared_memory_root():
+    """Return the directory where the shared results are stored.
+
+    Like multiprocessing.heap, prefer a file system backed by memory.
+    """
+    if sys.platform == 'linux' and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+class _SharedResultWriter(object):
+    """Store the large results of a worker in memory-mapped files.
+
+    The files are recycled: once the result has been loaded, the executor
+    renames its file to free-<pid>-<n> and the worker which created it
+    renames it back to result-<pid>-<n> to store another result.  This
+    avoids the cost of allocating fresh pages for every result.
+    """
+
+    def __init__(self, directory, threshold):
+        self.directory = directory
+        self.threshold = threshold
+        self.pid = os.getpid()
+        self.files = []
+
+    def _claim_file(self):
+        for n in self.files:
+            path = os.path.join(self.directory,
+                                'result-%d-%d' % (self.pid, n))
+            free_path = os.path.join(self.directory,
+                                     'free-%d-%d' % (self.pid, n))
+            try:
+                os.rename(free_path, path)
+            except FileNotFoundError:
+                # Still used by a result not yet received
+                continue
+            return path, os.open(path, os.O_WRONLY | _O_BINARY)
+        n = len(self.files)
+        path = os.path.join(self.directory, 'result-%d-%d' % (self.pid, n))
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | _O_BINARY,
+                     0o600)
+        self.files.append(n)
+        return path, fd
+
+    def store(self, result):
+        """Return a _SharedResult for result, or a _PickledResult if it is
+        small."""
+        data = ForkingPickler.dumps(result)
+        size = len(data)
+        if size < self.threshold:
+            # Send the pickle already made rather than pickling result
+            # again.  dumps() returns a memoryview, which cannot be pickled.
+            return _PickledResult(bytes(data))
+        path, fd = self._claim_file()
+        try:
+            # Writing to the file is cheaper than mapping it: it avoids a
+            # page fault per page.
+            data = memoryview(data)
+            while data:
+                n = os.write(fd, data)
+                data = data[n:]
+        finally:
+            os.close(fd)
+        return _SharedResult(path, size)
+
+
+def _load_shared_result(shared):
+    """Load a result stored by _SharedResultWriter and free its file."""
+    try:
+        fd = os.open(shared.path, os.O_RDONLY | _O_BINARY)
+        try:
+            with mmap.mmap(fd, shared.size, access=mmap.ACCESS_READ) as buf:
+                return ForkingPickler.loads(buf)
+        finally:
+            os.close(fd)
+    finally:
+        head, tail = os.path.split(shared.path)
+        os.rename(shared.path,
+                  os.path.join(head, tail.replace('result-', 'free-', 1)))
+
+
+def _remove_worker_files(directory, pid):
+    """Remove the files of a worker which terminated.
+
+    The results stored in them have been received or will never be: a new
+    worker reusing the pid would fail to create its files otherwise.
+    """
+    prefixes = ('result-%d-' % pid, 'free-%d-' % pid)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefixes):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def _get_rss():
+    """Return the resident set size of the current process in bytes.
+
+    Return None if it cannot be determined.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * mmap.PAGESIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Fall back to the peak RSS: in kilobytes, except on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss
+    return rss * 1024
+
+
 def _sendback_result(result_queue, work_id, result=None, exception=None):
     """Safely send back the given result or exception"""
     try:
@@ -201,7 +360,8 @@ def _sendback_result(result_queue, work_id, result=None, exception=None):
         result_queue.put(_ResultItem(work_id, exception=exc))
 
 
-def _process_worker(call_queue, result_queue, initializer, initargs):
+def _process_worker(call_queue, result_queue, initializer, initargs,
+                    shared_memory=None, report_calls=False, max_rss=None):
     """Evaluates calls from call_queue and places the results in result_queue.
 
     This worker is run in a separate process.
@@ -213,6 +373,12 @@ def _process_worker(call_queue, result_queue, initializer, initargs):
             to by the worker.
         initializer: A callable initializer, or None
         initargs: A tuple of args for the initializer
+        shared_memory: A (directory, threshold) tuple if large results
+            are sent through memory-mapped files, or None
+        report_calls: If true, put a _CallStarted in result_queue before
+            running each call
+        max_rss: The resident set size in bytes above which the worker
+            exits after a call, or None
     """
     if initializer is not None:
         try:
@@ -222,14 +388,23 @@ def _process_worker(call_queue, result_queue, initializer, initargs):
             # The parent will notice that the process stopped and
             # mark the pool broken
             return
+    if shared_memory is not None:
+        shared_writer = _SharedResultWriter(*shared_memory)
+    else:
+        shared_writer = None
+    pid = os.getpid()
     while True:
         call_item = call_queue.get(block=True)
         if call_item is None:
             # Wake up queue management thread
-            result_queue.put(os.getpid())
+            result_queue.put(pid)
             return
+        if report_calls:
+            result_queue.put(_CallStarted(pid, call_item.work_id))
         try:
             r = call_item.fn(*call_item.args, **call_item.kwargs)
+            if shared_writer is not None:
+                r = shared_writer.store(r)
         except BaseException as e:
             exc = _ExceptionWithTraceback(e, e.__traceback__)
             _sendback_result(result_queue, call_item.work_id, exception=exc)
@@ -240,6 +415,14 @@ def _process_worker(call_queue, result_queue, initializer, initargs):
         # open files or shared memory that is not needed anymore
         del call_item
 
+        if max_rss is not None:
+            rss = _get_rss()
+            if rss is not None and rss > max_rss:
+                # Exit to release the memory, the executor starts a new
+                # worker to replace this one
+                result_queue.put(pid)
+                return
+
 
 def _add_call_item_to_queue(pending_work_items,
                             work_ids,
@@ -285,7 +468,9 @@ def _queue_management_worker(executor_reference,
                              work_ids_queue,
                              call_queue,
                              result_queue,
-                             thread_wakeup):
+                             thread_wakeup,
+                             shared_memory_dir=None,
+                             restart_workers=False):
     """Manages the communication between this process and the worker processes.
 
     This function is run in a local thread.
@@ -306,13 +491,51 @@ def _queue_management_worker(executor_reference,
         thread_wakeup: A _ThreadWakeup to allow waking up the
             queue_manager_thread from the main Thread and avoid deadlocks
             caused by permanently locked queues.
+        shared_memory_dir: The directory of the results sent through
+            memory-mapped files, removed when the workers are stopped, or
+            None.
+        restart_workers: If true, a worker terminating abruptly while
+            running a call only fails the future of that call and is
+            replaced, instead of breaking the executor.
     """
     executor = None
+    # Map of pids to the work id of the call they are running, only
+    # maintained when restart_workers is true
+    running_calls = {}
 
     def shutting_down():
         return (_global_shutdown or executor is None
                 or executor._shutdown_thread)
 
+    def restart_crashed_workers(ready):
+        # Only restart the workers which were running a call: a worker which
+        # terminated while waiting for a call may hold the lock of the call
+        # queue, and the executor must be marked broken.
+        dead = [p for p in processes.values() if p.sentinel in ready]
+        if not dead or any(p.pid not in running_calls for p in dead):
+            return False
+        for p in dead:
+            del processes[p.pid]
+            # The sentinel may be ready before the exit code is available
+            p.join()
+            if shared_memory_dir is not None:
+                _remove_worker_files(shared_memory_dir, p.pid)
+            work_item = pending_work_items.pop(running_calls.pop(p.pid), None)
+            if work_item is not None:
+                work_item.future.set_exception(BrokenProcessPool(
+                    "A process in the process pool was terminated abruptly "
+                    "(exit code %s) while the future was running; the "
+                    "process was replaced." % p.exitcode))
+                # Delete references to object. See issue16284
+                del work_item
+        start_workers()
+        return True
+
+    def start_workers():
+        executor = executor_reference()
+        if executor is not None and not _global_shutdown:
+            executor._adjust_process_count()
+
     def shutdown_worker():
         # This is an upper bound on the number of children alive.
         n_children_alive = sum(p.is_alive() for p in processes.values())
@@ -336,6 +559,10 @@ def _queue_management_worker(executor_reference,
         for p in processes.values():
             p.join()
 
+        # Release the results which were never received.
+        if shared_memory_dir is not None:
+            shutil.rmtree(shared_memory_dir, ignore_errors=True)
+
     result_reader = result_queue._reader
     wakeup_reader = thread_wakeup._reader
     readers = [result_reader, wakeup_reader]
@@ -366,6 +593,10 @@ def _queue_management_worker(executor_reference,
             is_broken = False
             result_item = None
         thread_wakeup.clear()
+        if is_broken and cause is None and restart_workers:
+            if restart_crashed_workers(ready):
+                is_broken = False
+                result_item = None
         if is_broken:
             # Mark the process pool broken so that submits fail right now.
             executor = executor_reference()
@@ -396,14 +627,42 @@ def _queue_management_worker(executor_reference,
         if isinstance(result_item, int):
             # Clean shutdown of a worker using its PID
             # (avoids marking the executor broken)
-            assert shutting_down()
             p = processes.pop(result_item)
             p.join()
-            if not processes:
+            running_calls.pop(result_item, None)
+            if shared_memory_dir is not None:
+                _remove_worker_files(shared_memory_dir, result_item)
+            executor = executor_reference()
+            if not shutting_down():
+                # The worker exceeded max_worker_rss: replace it
+                executor._adjust_process_count()
+            elif not processes:
                 shutdown_worker()
                 return
+            executor = None
+        elif isinstance(result_item, _CallStarted):
+            running_calls[result_item.pid] = result_item.work_id
         elif result_item is not None:
+            if running_calls:
+                for pid, work_id in running_calls.items():
+                    if work_id == result_item.work_id:
+                        del running_calls[pid]
+                        break
             work_item = pending_work_items.pop(result_item.work_id, None)
+            if isinstance(result_item.result, _PickledResult):
+                try:
+                    result_item.result = ForkingPickler.loads(
+                        result_item.result.data)
+                except BaseException as e:
+                    result_item.result = None
+                    result_item.exception = e
+            elif isinstance(result_item.result, _SharedResult):
+                try:
+                    result_item.result = _load_shared_result(
+                        result_item.result)
+                except BaseException as e:
+                    result_item.result = None
+                    result_item.exception = e
             # work_item can be None if another process terminated (see above)
             if work_item is not None:
                 if result_item.exception:
@@ -427,6 +686,11 @@ def _queue_management_worker(executor_reference,
                 # is not gc-ed yet.
                 if executor is not None:
                     executor._shutdown_thread = True
+                # When only cancelled futures remain in pending_work_items,
+                # the next wait() would block forever: drop them now.
+                _add_call_item_to_queue(pending_work_items,
+                                        work_ids_queue,
+                                        call_queue)
                 # Since no new work items can be added, it is safe to shutdown
                 # this thread if there are no pending work items.
                 if not pending_work_items:
@@ -488,7 +752,9 @@ class BrokenProcessPool(_base.BrokenExecutor):
 
 class ProcessPoolExecutor(_base.Executor):
     def __init__(self, max_workers=None, mp_context=None,
-                 initializer=None, initargs=()):
+                 initializer=None, initargs=(), *,
+                 shared_memory_threshold=None, restart_workers=False,
+                 max_worker_rss=None, forkserver_preload=None):
         """Initializes a new ProcessPoolExecutor instance.
 
         Args:
@@ -499,6 +765,19 @@ class ProcessPoolExecutor(_base.Executor):
                 object should provide SimpleQueue, Queue and Process.
             initializer: An callable used to initialize worker processes.
             initargs: A tuple of arguments to pass to the initializer.
+            shared_memory_threshold: If not None, results whose pickled
+                size is at least this number of bytes are sent back through
+                a memory-mapped file instead of the result pipe.
+            restart_workers: If true, a worker process terminating abruptly
+                while running a call is replaced and only the future of that
+                call fails, instead of the whole executor being broken.
+            max_worker_rss: If not None, a worker process whose resident set
+                size exceeds this number of bytes after a call exits and is
+                replaced.
+            forkserver_preload: A list of modules to import in the forkserver
+                process, so that the worker processes forked from it start
+                with these modules already imported. mp_context must use the
+                "forkserver" start method.
         """
         _check_system_limits()
 
@@ -514,11 +793,27 @@ class ProcessPoolExecutor(_base.Executor):
             mp_context = mp.get_context()
         self._mp_context = mp_context
 
+        if forkserver_preload is not None:
+            if mp_context.get_start_method() != 'forkserver':
+                raise ValueError("forkserver_preload requires a forkserver "
+                                 "mp_context")
+            mp_context.set_forkserver_preload(list(forkserver_preload))
+
+        if max_worker_rss is not None and max_worker_rss <= 0:
+            raise ValueError("max_worker_rss must be None or greater than 0")
+        self._restart_workers = restart_workers
+        self._max_worker_rss = max_worker_rss
+
         if initializer is not None and not callable(initializer):
             raise TypeError("initializer must be a callable")
         self._initializer = initializer
         self._initargs = initargs
 
+        if shared_memory_threshold is not None and shared_memory_threshold < 1:
+            raise ValueError("shared_memory_threshold must be None or >= 1")
+        self._shared_memory_threshold = shared_memory_threshold
+        self._shared_memory_dir = None
+
         # Management thread
         self._queue_management_thread = None
 
@@ -565,6 +860,10 @@ class ProcessPoolExecutor(_base.Executor):
                 mp.util.debug('Executor collected: triggering callback for'
                               ' QueueManager wakeup')
                 thread_wakeup.wakeup()
+            if self._shared_memory_threshold is not None:
+                self._shared_memory_dir = tempfile.mkdtemp(
+                    prefix='pyfut-%d-' % os.getpid(),
+                    dir=_shared_memory_root())
             # Start the processes so that their sentinels are known.
             self._adjust_process_count()
             self._queue_management_thread = threading.Thread(
@@ -575,7 +874,9 @@ class ProcessPoolExecutor(_base.Executor):
                       self._work_ids,
                       self._call_queue,
                       self._result_queue,
-                      self._queue_management_thread_wakeup),
+                      self._queue_management_thread_wakeup,
+                      self._shared_memory_dir,
+                      self._restart_workers),
                 name="QueueManagerThread")
             self._queue_management_thread.daemon = True
             self._queue_management_thread.start()
@@ -583,13 +884,21 @@ class ProcessPoolExecutor(_base.Executor):
                 self._queue_management_thread_wakeup
 
     def _adjust_process_count(self):
+        if self._shared_memory_dir is not None:
+            shared_memory = (self._shared_memory_dir,
+                             self._shared_memory_threshold)
+        else:
+            shared_memory = None
         for _ in range(len(self._processes), self._max_workers):
             p = self._mp_context.Process(
                 target=_process_worker,
                 args=(self._call_queue,
                       self._result_queue,
                       self._initializer,
-                      self._initargs))
+                      self._initargs,
+                      shared_memory,
+                      self._restart_workers,
+                      self._max_worker_rss))
             p.start()
             self._processes[p.pid] = p
 
@@ -616,7 +925,7 @@ class ProcessPoolExecutor(_base.Executor):
             return f
     submit.__doc__ = _base.Executor.submit.__doc__
 
-    def map(self, fn, *iterables, timeout=None, chunksize=1):
+    def map(self, fn, *iterables, timeout=None, chunksize=1, buffersize=None):
         """Returns an iterator equivalent to map(fn, iter).
 
         Args:
@@ -627,6 +936,9 @@ class ProcessPoolExecutor(_base.Executor):
             chunksize: If greater than one, the iterables will be chopped into
                 chunks of size chunksize and submitted to the process pool.
                 If set to one, the items in the list will be sent one at a time.
+            buffersize: The maximum number of submitted chunks whose result
+                has not been retrieved yet. If None, the iterables are chopped
+                and submitted immediately. Otherwise they are consumed lazily.
 
         Returns:
             An iterator equivalent to: map(func, *iterables) but the calls may
@@ -642,8 +954,20 @@ class ProcessPoolExecutor(_base.Executor):
 
         results = super().map(partial(_process_chunk, fn),
                               _get_chunks(*iterables, chunksize=chunksize),
-                              timeout=timeout)
+                              timeout=timeout, buffersize=buffersize)
+        return _chain_from_iterable_of_lists(results)
+
+    def map_unordered(self, fn, *iterables, timeout=None, chunksize=1,
+                      buffersize=None):
+        if chunksize < 1:
+            raise ValueError("chunksize must be >= 1.")
+
+        results = super().map_unordered(
+            partial(_process_chunk, fn),
+            _get_chunks(*iterables, chunksize=chunksize),
+            timeout=timeout, buffersize=buffersize)
         return _chain_from_iterable_of_lists(results)
+    map_unordered.__doc__ = _base.Executor.map_unordered.__doc__
 
     def shutdown(self, wait=True):
         with self._shutdown_lock:
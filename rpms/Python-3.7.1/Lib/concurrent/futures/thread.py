@@ -7,9 +7,12 @@ __author__ = 'Brian Quinlan (brian@sweetapp.com)'
 
 import atexit
 from concurrent.futures import _base
+import bisect
+import heapq
 import itertools
 import queue
 import threading
+import time
 import weakref
 import os
 
@@ -41,6 +44,10 @@ def _python_exit():
 
 atexit.register(_python_exit)
 
+# Upper bounds (in seconds) of the buckets of the histogram of the time spent
+# by the work items in the queues of a WorkStealingThreadPoolExecutor.
+LATENCY_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
 
 class _WorkItem(object):
     def __init__(self, future, fn, args, kwargs):
@@ -99,6 +106,215 @@ def _worker(executor_reference, work_queue, initializer, initargs):
         _base.LOGGER.critical('Exception in worker', exc_info=True)
 
 
+class _WorkQueues(object):
+    """Work queues of a WorkStealingThreadPoolExecutor.
+
+    Work items submitted from outside the pool go to a shared priority queue.
+    Work items submitted by a worker go to its own priority queue, from which
+    idle workers steal.  All the queues are heaps ordered by priority, then
+    submission order, and are protected by a single condition which the
+    workers only hold to pick their next item.
+
+    put(None) wakes up a worker, like the None sentinel of the work queue of
+    a ThreadPoolExecutor.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._heap = []
+        # Priority queues of the workers
+        self._locals = []
+        self._local = threading.local()
+        self._counter = itertools.count().__next__
+        self._wakeups = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._stolen = 0
+        self._reaped = 0
+        self._latency = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def _qsize(self):
+        return len(self._heap) + sum(map(len, self._locals))
+
+    def _pop(self, local):
+        # Pick the item with the lowest priority value.  On ties, prefer the
+        # worker's own queue, then the queue of another worker (the end of a
+        # fan-out started by a running item), then the shared queue (a new
+        # submission).
+        best = source = None
+        if local:
+            best = local[0]
+            source = local
+        for q in self._locals:
+            if q and q is not local and (best is None or q[0][0] < best[0]):
+                best = q[0]
+                source = q
+        if self._heap and (best is None or self._heap[0][0] < best[0]):
+            return heapq.heappop(self._heap)
+        if source is None:
+            return None
+        if source is not local:
+            self._stolen += 1
+        return heapq.heappop(source)
+
+    def _remove_worker(self, local):
+        for i, q in enumerate(self._locals):
+            if q is local:
+                del self._locals[i]
+                break
+        else:
+            return
+        # Hand the items left by a dying worker to the others
+        for entry in local:
+            heapq.heappush(self._heap, entry)
+        local.clear()
+
+    def put(self, work_item, priority=0):
+        with self._cond:
+            if work_item is None:
+                self._wakeups += 1
+                self._cond.notify()
+                return
+            entry = (priority, self._counter(), time.monotonic(), work_item)
+            local = getattr(self._local, 'queue', None)
+            if local is not None:
+                heapq.heappush(local, entry)
+            else:
+                heapq.heappush(self._heap, entry)
+            self._submitted += 1
+            self._cond.notify()
+
+    def get(self, local, timeout=None):
+        """Return the next work item, or None when woken up by put(None).
+
+        Raise queue.Empty, and remove the worker, if no work item could be
+        found within timeout seconds.
+        """
+        with self._cond:
+            if timeout is not None:
+                endtime = time.monotonic() + timeout
+            while True:
+                entry = self._pop(local)
+                if entry is not None:
+                    self._running += 1
+                    latency = time.monotonic() - entry[2]
+                    self._latency[bisect.bisect_left(LATENCY_BUCKETS,
+                                                     latency)] += 1
+                    return entry[3]
+                if self._wakeups:
+                    self._wakeups -= 1
+                    return None
+                if timeout is None:
+                    self._cond.wait()
+                else:
+                    remaining = endtime - time.monotonic()
+                    if remaining <= 0:
+                        self._remove_worker(local)
+                        self._reaped += 1
+                        raise queue.Empty
+                    self._cond.wait(remaining)
+
+    def task_done(self):
+        with self._cond:
+            self._running -= 1
+            self._completed += 1
+
+    def add_worker(self):
+        """Return the priority queue of a new worker."""
+        with self._cond:
+            local = []
+            self._locals.append(local)
+            return local
+
+    def bind(self, local):
+        """Send the items submitted by the current thread to local."""
+        self._local.queue = local
+
+    def remove_worker(self, local):
+        with self._cond:
+            self._remove_worker(local)
+
+    def needs_worker(self, max_workers):
+        """Return True if there are more queued items than idle workers."""
+        with self._cond:
+            nthreads = len(self._locals)
+            return (nthreads < max_workers
+                    and nthreads - self._running < self._qsize())
+
+    def drain(self):
+        """Remove and return all the queued work items."""
+        with self._cond:
+            entries = self._heap
+            self._heap = []
+            for q in self._locals:
+                entries.extend(q)
+                q.clear()
+            return [entry[3] for entry in entries]
+
+    def statistics(self):
+        with self._cond:
+            nthreads = len(self._locals)
+            return {
+                'threads': nthreads,
+                'active': self._running,
+                'idle': nthreads - self._running,
+                'queued': self._qsize(),
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'stolen': self._stolen,
+                'reaped': self._reaped,
+                'latency': list(zip(LATENCY_BUCKETS + (float('inf'),),
+                                    self._latency)),
+            }
+
+
+def _stealing_worker(executor_reference, work_queues, local, idle_timeout,
+                     initializer, initargs):
+    work_queues.bind(local)
+    if initializer is not None:
+        try:
+            initializer(*initargs)
+        except BaseException:
+            _base.LOGGER.critical('Exception in initializer:', exc_info=True)
+            work_queues.remove_worker(local)
+            executor = executor_reference()
+            if executor is not None:
+                executor._initializer_failed()
+            return
+    try:
+        while True:
+            try:
+                work_item = work_queues.get(local, idle_timeout)
+            except queue.Empty:
+                # Idle for too long: the worker was removed from the pool
+                return
+            if work_item is not None:
+                work_item.run()
+                work_queues.task_done()
+                # Delete references to object. See issue16284
+                del work_item
+                continue
+            executor = executor_reference()
+            # Exit if:
+            #   - The interpreter is shutting down OR
+            #   - The executor that owns the worker has been collected OR
+            #   - The executor that owns the worker has been shutdown.
+            if _shutdown or executor is None or executor._shutdown:
+                # Flag the executor as shutting down as early as possible if it
+                # is not gc-ed yet.
+                if executor is not None:
+                    executor._shutdown = True
+                work_queues.remove_worker(local)
+                # Notice other workers
+                work_queues.put(None)
+                return
+            del executor
+    except BaseException:
+        work_queues.remove_worker(local)
+        _base.LOGGER.critical('Exception in worker', exc_info=True)
+
+
 class BrokenThreadPool(_base.BrokenExecutor):
     """
     Raised when a worker thread in a ThreadPoolExecutor failed initializing.
@@ -203,3 +419,119 @@ class ThreadPoolExecutor(_base.Executor):
             for t in self._threads:
                 t.join()
     shutdown.__doc__ = _base.Executor.shutdown.__doc__
+
+
+class WorkStealingThreadPoolExecutor(ThreadPoolExecutor):
+    """A ThreadPoolExecutor with per-worker queues and idle thread reaping.
+
+    Calls submitted from a worker thread go to the worker's own queue, from
+    which idle workers steal, so that the calls of a fan-out are run before
+    the calls submitted later from outside the pool.
+    """
+
+    def __init__(self, max_workers=None, thread_name_prefix='',
+                 initializer=None, initargs=(), idle_timeout=None):
+        """Initializes a new WorkStealingThreadPoolExecutor instance.
+
+        Args:
+            max_workers: The maximum number of threads that can be used to
+                execute the given calls.
+            thread_name_prefix: An optional name prefix to give our threads.
+            initializer: An callable used to initialize worker threads.
+            initargs: A tuple of arguments to pass to the initializer.
+            idle_timeout: The number of seconds after which an idle worker
+                thread exits. If None, the threads are never reaped.
+        """
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError("idle_timeout must be None or greater than 0")
+        super().__init__(max_workers, thread_name_prefix,
+                         initializer, initargs)
+        self._idle_timeout = idle_timeout
+        self._work_queue = _WorkQueues()
+        self._thread_counter = itertools.count().__next__
+
+    def submit(self, fn, *args, **kwargs):
+        return self.submit_with_priority(0, fn, *args, **kwargs)
+    submit.__doc__ = _base.Executor.submit.__doc__
+
+    def submit_with_priority(self, priority, fn, *args, **kwargs):
+        """Submits a callable to be executed with the given priority.
+
+        Calls with a lower priority value are started first, including among
+        the calls submitted by a worker thread; calls with the same priority
+        are started in submission order.
+
+        Returns:
+            A Future representing the given call.
+        """
+        with self._shutdown_lock:
+            if self._broken:
+                raise BrokenThreadPool(self._broken)
+
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            if _shutdown:
+                raise RuntimeError('cannot schedule new futures after'
+                                   'interpreter shutdown')
+
+            f = _base.Future()
+            w = _WorkItem(f, fn, args, kwargs)
+
+            self._work_queue.put(w, priority)
+            self._adjust_thread_count()
+            return f
+
+    def _adjust_thread_count(self):
+        # When the executor gets lost, the weakref callback will wake up
+        # the worker threads.
+        def weakref_cb(_, q=self._work_queue):
+            q.put(None)
+        # Only start a thread if the idle ones cannot run the queued calls
+        if not self._work_queue.needs_worker(self._max_workers):
+            return
+        self._threads = {t for t in self._threads if t.is_alive()}
+        thread_name = '%s_%d' % (self._thread_name_prefix or self,
+                                 self._thread_counter())
+        t = threading.Thread(name=thread_name, target=_stealing_worker,
+                             args=(weakref.ref(self, weakref_cb),
+                                   self._work_queue,
+                                   self._work_queue.add_worker(),
+                                   self._idle_timeout,
+                                   self._initializer,
+                                   self._initargs))
+        t.daemon = True
+        t.start()
+        self._threads.add(t)
+        _threads_queues[t] = self._work_queue
+
+    def _initializer_failed(self):
+        with self._shutdown_lock:
+            self._broken = ('A thread initializer failed, the thread pool '
+                            'is not usable anymore')
+            # Drain work queues and mark pending futures failed
+            for work_item in self._work_queue.drain():
+                work_item.future.set_exception(BrokenThreadPool(self._broken))
+
+    def shutdown(self, wait=True):
+        with self._shutdown_lock:
+            self._shutdown = True
+            self._work_queue.put(None)
+        if wait:
+            for t in list(self._threads):
+                t.join()
+    shutdown.__doc__ = _base.Executor.shutdown.__doc__
+
+    def statistics(self):
+        """Returns a dict of counters describing the state of the pool.
+
+        The keys are: 'threads', the number of worker threads; 'active' and
+        'idle', the number of threads running a call or waiting for one;
+        'queued', the number of calls waiting to be started; 'submitted' and
+        'completed', the number of calls submitted and run since the creation
+        of the executor; 'stolen', the number of calls run by another thread
+        than the one which submitted them; 'reaped', the number of threads
+        which exited after idle_timeout; and 'latency', a histogram of the
+        time spent by the calls in the queues, as a list of (upper bound in
+        seconds, count) pairs.
+        """
+        return self._work_queue.statistics()
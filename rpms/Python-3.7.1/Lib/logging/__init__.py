@@ -907,6 +907,34 @@ class Handler(Filterer):
                 self.release()
         return rv
 
+    def emitBatch(self, records):
+        """
+        Emit a sequence of logging records.
+
+        This version just calls emit() for each record. Subclasses which can
+        write several records more efficiently than one at a time (for
+        example, with a single write and flush) may override it.
+        """
+        for record in records:
+            self.emit(record)
+
+    def handleBatch(self, records):
+        """
+        Conditionally emit a sequence of logging records.
+
+        Each record is passed through the handler's filters, and those which
+        pass are emitted together by emitBatch() while holding the I/O thread
+        lock once. Returns the number of records emitted.
+        """
+        records = [record for record in records if self.filter(record)]
+        if records:
+            self.acquire()
+            try:
+                self.emitBatch(records)
+            finally:
+                self.release()
+        return len(records)
+
     def setFormatter(self, fmt):
         """
         Set the formatter for this handler.
@@ -1039,6 +1067,34 @@ class StreamHandler(Handler):
         except Exception:
             self.handleError(record)
 
+    def emitBatch(self, records):
+        """
+        Emit a sequence of records.
+
+        The records are formatted, written to the stream in a single call and
+        the stream is flushed once. A record which cannot be formatted is
+        passed to handleError() and skipped.
+        """
+        # Subclasses which customise emit() (such as the rotating file
+        # handlers) must still see each record through it.
+        if type(self).emit not in (StreamHandler.emit, FileHandler.emit):
+            Handler.emitBatch(self, records)
+            return
+        msgs = []
+        terminator = self.terminator
+        for record in records:
+            try:
+                msgs.append(self.format(record) + terminator)
+            except Exception:
+                self.handleError(record)
+        if not msgs:
+            return
+        try:
+            self.stream.write(''.join(msgs))
+            self.flush()
+        except Exception:
+            self.handleError(records[-1])
+
     def setStream(self, stream):
         """
         Sets the StreamHandler's stream to the specified value,
@@ -1131,6 +1187,17 @@ class FileHandler(StreamHandler):
             self.stream = self._open()
         StreamHandler.emit(self, record)
 
+    def emitBatch(self, records):
+        """
+        Emit a sequence of records.
+
+        If the stream was not opened because 'delay' was specified in the
+        constructor, open it before calling the superclass's emitBatch.
+        """
+        if self.stream is None:
+            self.stream = self._open()
+        StreamHandler.emitBatch(self, records)
+
     def __repr__(self):
         level = getLevelName(self.level)
         return '<%s %s (%s)>' % (self.__class__.__name__, self.baseFilename, level)
@@ -1212,12 +1279,21 @@ class Manager(object):
         Initialize the manager with the root node of the logger hierarchy.
         """
         self.root = rootnode
-        self.disable = 0
+        self._disable = 0
         self.emittedNoHandlerWarning = False
         self.loggerDict = {}
         self.loggerClass = None
         self.logRecordFactory = None
 
+    @property
+    def disable(self):
+        return self._disable
+
+    @disable.setter
+    def disable(self, value):
+        self._disable = value
+        self._clear_cache()
+
     def getLogger(self, name):
         """
         Get a logger with the specified name (channel name), creating it
@@ -1229,9 +1305,13 @@ class Manager(object):
         logger and fix up the parent/child references which pointed to the
         placeholder to now point to the logger.
         """
-        rv = None
         if not isinstance(name, str):
             raise TypeError('A logger name must be a string')
+        # Existing loggers are returned without taking the lock: loggers are
+        # only put in loggerDict once they are fully set up.
+        rv = self.loggerDict.get(name)
+        if rv is not None and not isinstance(rv, PlaceHolder):
+            return rv
         _acquireLock()
         try:
             if name in self.loggerDict:
@@ -1240,14 +1320,19 @@ class Manager(object):
                     ph = rv
                     rv = (self.loggerClass or _loggerClass)(name)
                     rv.manager = self
-                    self.loggerDict[name] = rv
-                    self._fixupChildren(ph, rv)
                     self._fixupParents(rv)
+                    self._set_threshold(rv)
+                    self._fixupChildren(ph, rv)
+                    self.loggerDict[name] = rv
+                    if rv.level:
+                        # The children now inherit the new logger's level
+                        self._clear_cache()
             else:
                 rv = (self.loggerClass or _loggerClass)(name)
                 rv.manager = self
-                self.loggerDict[name] = rv
                 self._fixupParents(rv)
+                self._set_threshold(rv)
+                self.loggerDict[name] = rv
         finally:
             _releaseLock()
         return rv
@@ -1306,23 +1391,32 @@ class Manager(object):
                 alogger.parent = c.parent
                 c.parent = alogger
 
+    def _set_threshold(self, logger):
+        """
+        Compute the lowest level for which the specified logger is enabled.
+        """
+        logger._threshold = max(logger.getEffectiveLevel(), self._disable + 1)
+
     def _clear_cache(self):
         """
-        Clear the cache for all loggers in loggerDict
+        Recompute the threshold of all loggers using this manager
         Called when level changes are made
         """
 
         _acquireLock()
-        for logger in self.loggerDict.values():
-            if isinstance(logger, Logger):
-                logger._cache.clear()
-        self.root._cache.clear()
-        _releaseLock()
+        try:
+            for logger in _loggers:
+                if logger.manager is self:
+                    self._set_threshold(logger)
+        finally:
+            _releaseLock()
 
 #---------------------------------------------------------------------------
 #   Logger classes and functions
 #---------------------------------------------------------------------------
 
+_loggers = weakref.WeakSet()  # all loggers, whose thresholds may need updating
+
 class Logger(Filterer):
     """
     Instances of the Logger class represent a single logging channel. A
@@ -1349,7 +1443,19 @@ class Logger(Filterer):
         self.propagate = True
         self.handlers = []
         self.disabled = False
-        self._cache = {}
+        # The lowest level enabled for this logger, kept up to date by the
+        # manager so that isEnabledFor() is a single comparison.
+        _acquireLock()
+        try:
+            # There is no manager yet when the root logger is created
+            manager = getattr(self, 'manager', None)
+            if manager is None:
+                self._threshold = max(self.level, 1)
+            else:
+                manager._set_threshold(self)
+            _loggers.add(self)
+        finally:
+            _releaseLock()
 
     def setLevel(self, level):
         """
@@ -1620,17 +1726,7 @@ class Logger(Filterer):
         """
         Is this logger enabled for level 'level'?
         """
-        try:
-            return self._cache[level]
-        except KeyError:
-            _acquireLock()
-            if self.manager.disable >= level:
-                is_enabled = self._cache[level] = False
-            else:
-                is_enabled = self._cache[level] = level >= self.getEffectiveLevel()
-            _releaseLock()
-
-            return is_enabled
+        return level >= self._threshold
 
     def getChild(self, suffix):
         """
@@ -2018,7 +2114,6 @@ def disable(level=CRITICAL):
     Disable all logging calls of severity 'level' and below.
     """
     root.manager.disable = level
-    root.manager._clear_cache()
 
 def shutdown(handlerList=_handlerList):
     """
@@ -178,6 +178,7 @@ def _handle_existing_loggers(existing, child_loggers, disable_existing):
             logger.propagate = True
         else:
             logger.disabled = disable_existing
+    root.manager._clear_cache()
 
 def _install_loggers(cp, handlers, disable_existing):
     """Create and install loggers"""
@@ -23,8 +23,9 @@ Copyright (C) 2001-2016 Vinay Sajip. All Rights Reserved.
 To use, simply 'import logging.handlers' and log away!
 """
 
-import logging, socket, os, pickle, struct, time, re
+import logging, socket, os, pickle, shutil, struct, time, re
 from stat import ST_DEV, ST_INO, ST_MTIME
+import collections
 import queue
 import threading
 
@@ -41,21 +42,38 @@ SYSLOG_TCP_PORT             = 514
 
 _MIDNIGHT = 24 * 60 * 60  # number of seconds in a day
 
+# Modules usable to compress rotated log files, and the suffix they add
+_COMPRESSORS = {'gzip': '.gz', 'bz2': '.bz2', 'lzma': '.xz'}
+
+# Whether each newline written to a log file takes an extra byte
+_TRANSLATED_NEWLINES = os.linesep == '\r\n'
+
 class BaseRotatingHandler(logging.FileHandler):
     """
     Base class for handlers that rotate log files at a certain point.
     Not meant to be instantiated directly.  Instead, use RotatingFileHandler
     or TimedRotatingFileHandler.
     """
-    def __init__(self, filename, mode, encoding=None, delay=False):
+    def __init__(self, filename, mode, encoding=None, delay=False, *,
+                 compress=None):
         """
         Use the specified filename for streamed logging
+
+        If compress is 'gzip', 'bz2' or 'lzma', rotated files are compressed
+        with that module on a background thread, and given the matching
+        suffix.
         """
+        if compress is not None:
+            if compress not in _COMPRESSORS:
+                raise ValueError("Invalid compression: %r" % (compress,))
+            self._compressModule = __import__(compress)
         logging.FileHandler.__init__(self, filename, mode, encoding, delay)
         self.mode = mode
         self.encoding = encoding
         self.namer = None
         self.rotator = None
+        self.compress = compress
+        self._compressThread = None
 
     def emit(self, record):
         """
@@ -88,6 +106,8 @@ class BaseRotatingHandler(logging.FileHandler):
             result = default_name
         else:
             result = self.namer(default_name)
+        if self.compress is not None:
+            result += _COMPRESSORS[self.compress]
         return result
 
     def rotate(self, source, dest):
@@ -103,20 +123,66 @@ class BaseRotatingHandler(logging.FileHandler):
                        filename, e.g. 'test.log'
         :param dest:   The destination filename. This is normally
                        what the source is rotated to, e.g. 'test.log.1'.
+
+        If compression was requested, the source is renamed out of the way
+        and compressed to the destination on a background thread instead.
         """
         if not callable(self.rotator):
             # Issue 18940: A file may not have been created if delay is True.
             if os.path.exists(source):
-                os.rename(source, dest)
+                if self.compress is None:
+                    os.rename(source, dest)
+                else:
+                    self.waitForCompression()
+                    temp = dest + '.tmp'
+                    os.rename(source, temp)
+                    t = threading.Thread(target=self._compressFile,
+                                         args=(temp, dest))
+                    self._compressThread = t
+                    t.start()
         else:
             self.rotator(source, dest)
 
+    def _compressFile(self, source, dest):
+        """
+        Compress source to dest, then remove source. This runs on a separate
+        thread, started by rotate().
+        """
+        try:
+            with open(source, 'rb') as src:
+                with self._compressModule.open(dest, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+            os.remove(source)
+        except Exception:
+            if logging.raiseExceptions:
+                raise
+
+    def waitForCompression(self):
+        """
+        Wait until the compression of the last rotated file, if any, is
+        finished.
+        """
+        t = self._compressThread
+        if t is not None:
+            t.join()
+            self._compressThread = None
+
+    def close(self):
+        """
+        Close the stream and wait for any pending compression.
+        """
+        try:
+            logging.FileHandler.close(self)
+        finally:
+            self.waitForCompression()
+
 class RotatingFileHandler(BaseRotatingHandler):
     """
     Handler for logging to a set of files, which switches from one file
     to the next when the current file reaches a certain size.
     """
-    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0, encoding=None, delay=False):
+    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0,
+                 encoding=None, delay=False, *, compress=None):
         """
         Open the specified file and use it as the stream for logging.
 
@@ -136,6 +202,9 @@ class RotatingFileHandler(BaseRotatingHandler):
         respectively.
 
         If maxBytes is zero, rollover never occurs.
+
+        If compress is 'gzip', 'bz2' or 'lzma', the backup files are
+        compressed on a background thread and named "app.log.1.gz" and so on.
         """
         # If rotation/rollover is wanted, it doesn't make sense to use another
         # mode. If for example 'w' were specified, then if there were multiple
@@ -144,9 +213,37 @@ class RotatingFileHandler(BaseRotatingHandler):
         # on each run.
         if maxBytes > 0:
             mode = 'a'
-        BaseRotatingHandler.__init__(self, filename, mode, encoding, delay)
+        BaseRotatingHandler.__init__(self, filename, mode, encoding, delay,
+                                     compress=compress)
         self.maxBytes = maxBytes
         self.backupCount = backupCount
+        # The size of the file, counted as records are written to it, or None
+        # if it must be read from the stream.
+        self._size = None
+        # The message formatted by shouldRollover(), reused by format().
+        self._formatted = None
+
+    def emit(self, record):
+        """
+        Emit a record.
+
+        Output the record to the file, catering for rollover as described
+        in doRollover().
+        """
+        try:
+            BaseRotatingHandler.emit(self, record)
+        finally:
+            self._formatted = None
+
+    def format(self, record):
+        """
+        Format the specified record, reusing the message formatted by
+        shouldRollover() for it if there is one.
+        """
+        formatted = self._formatted
+        if formatted is not None and formatted[0] is record:
+            return formatted[1]
+        return BaseRotatingHandler.format(self, record)
 
     def doRollover(self):
         """
@@ -155,7 +252,10 @@ class RotatingFileHandler(BaseRotatingHandler):
         if self.stream:
             self.stream.close()
             self.stream = None
+        self._size = None
         if self.backupCount > 0:
+            # Backups are renamed below: the previous one must be complete.
+            self.waitForCompression()
             for i in range(self.backupCount - 1, 0, -1):
                 sfn = self.rotation_filename("%s.%d" % (self.baseFilename, i))
                 dfn = self.rotation_filename("%s.%d" % (self.baseFilename,
@@ -177,14 +277,35 @@ class RotatingFileHandler(BaseRotatingHandler):
 
         Basically, see if the supplied record would cause the file to exceed
         the size limit we have.
+
+        The size of the file is only read from the stream after opening it,
+        and when the record seems to reach the limit (in case the file was
+        truncated by someone else); otherwise it is counted as records are
+        written.
         """
         if self.stream is None:                 # delay was set...
             self.stream = self._open()
+            self._size = None
         if self.maxBytes > 0:                   # are we rolling over?
-            msg = "%s\n" % self.format(record)
-            self.stream.seek(0, 2)  #due to non-posix-compliant Windows feature
-            if self.stream.tell() + len(msg) >= self.maxBytes:
-                return 1
+            msg = self.format(record)
+            self._formatted = (record, msg)
+            msg += self.terminator
+            if msg.isascii():
+                length = len(msg)
+            else:
+                length = len(msg.encode(self.stream.encoding or 'utf-8',
+                                        'replace'))
+            if _TRANSLATED_NEWLINES:
+                length += msg.count('\n')
+            size = self._size
+            if size is None or size + length >= self.maxBytes:
+                self.stream.seek(0, 2)  #due to non-posix-compliant Windows feature
+                size = self.stream.tell()
+                if size + length >= self.maxBytes:
+                    self._size = None
+                    return 1
+            # The caller is expected to write the record now.
+            self._size = size + length
         return 0
 
 class TimedRotatingFileHandler(BaseRotatingHandler):
@@ -195,8 +316,10 @@ class TimedRotatingFileHandler(BaseRotatingHandler):
     If backupCount is > 0, when rollover is done, no more than backupCount
     files are kept - the oldest ones are deleted.
     """
-    def __init__(self, filename, when='h', interval=1, backupCount=0, encoding=None, delay=False, utc=False, atTime=None):
-        BaseRotatingHandler.__init__(self, filename, 'a', encoding, delay)
+    def __init__(self, filename, when='h', interval=1, backupCount=0, encoding=None, delay=False, utc=False, atTime=None,
+                 *, compress=None):
+        BaseRotatingHandler.__init__(self, filename, 'a', encoding, delay,
+                                     compress=compress)
         self.when = when.upper()
         self.backupCount = backupCount
         self.utc = utc
@@ -688,6 +811,284 @@ class DatagramHandler(SocketHandler):
             self.createSocket()
         self.sock.sendto(s, self.address)
 
+# The binary record format used by BatchingSocketHandler. A batch is framed
+# as the length of the rest of the frame and the number of records in it,
+# followed by the records. Each record is a fixed header followed by its
+# string fields, each prefixed by its length in UTF-8 (_NO_STRING for None).
+_BATCH_HEADER = struct.Struct('>LL')
+_RECORD_HEADER = struct.Struct('>ddiiqQ')
+_STRING_LENGTH = struct.Struct('>L')
+_NO_STRING = 0xFFFFFFFF
+_RECORD_STRINGS = ('name', 'levelname', 'msg', 'pathname', 'filename',
+                   'module', 'funcName', 'threadName', 'processName',
+                   'exc_text', 'stack_info')
+
+def decodeRecords(data):
+    """
+    Decode the records of a batch sent by a BatchingSocketHandler.
+
+    data is the part of the frame following the batch header; the result is
+    a list of LogRecords.
+    """
+    records = []
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        (created, relativeCreated, levelno, lineno, process,
+         thread) = _RECORD_HEADER.unpack_from(view, offset)
+        offset += _RECORD_HEADER.size
+        d = {
+            'created': created,
+            'msecs': (created - int(created)) * 1000,
+            'relativeCreated': relativeCreated,
+            'levelno': levelno,
+            'lineno': lineno,
+            'process': process if process >= 0 else None,
+            'thread': thread or None,
+            'args': None,
+        }
+        for attr in _RECORD_STRINGS:
+            n, = _STRING_LENGTH.unpack_from(view, offset)
+            offset += _STRING_LENGTH.size
+            if n == _NO_STRING:
+                d[attr] = None
+            else:
+                d[attr] = str(view[offset:offset + n], 'utf-8')
+                offset += n
+        records.append(logging.makeLogRecord(d))
+    return records
+
+def _recvExactly(sock, n):
+    """
+    Read n bytes from sock, or return None if the peer closes the
+    connection first.
+    """
+    buf = bytearray(n)
+    view = memoryview(buf)
+    while view:
+        nbytes = sock.recv_into(view)
+        if not nbytes:
+            return None
+        view = view[nbytes:]
+    return buf
+
+def receiveRecords(sock):
+    """
+    Read the batches sent by a BatchingSocketHandler from the connected
+    socket sock, yielding each batch as a list of LogRecords, until the
+    connection is closed.
+    """
+    while True:
+        header = _recvExactly(sock, _BATCH_HEADER.size)
+        if header is None:
+            return
+        length, count = _BATCH_HEADER.unpack(header)
+        data = _recvExactly(sock, length)
+        if data is None:
+            return
+        yield decodeRecords(data)
+
+class BatchingSocketHandler(SocketHandler):
+    """
+    A handler class which sends logging records to a streaming socket in
+    batches, using a compact binary format rather than pickles.
+
+    Records are encoded when they are emitted and buffered; a separate
+    thread sends the buffered records when capacity of them are waiting,
+    or when the oldest has waited for flushInterval seconds. Connecting,
+    and reconnecting with an exponential backoff when the connection is
+    lost, is also done on that thread, so that emitting a record never
+    blocks on the network. While the peer can't be reached, at most
+    maxBuffered records are kept, the oldest being dropped first.
+
+    Use receiveRecords() or decodeRecords() to decode the records at the
+    receiving end.
+    """
+
+    def __init__(self, host, port, capacity=100, flushInterval=0.1,
+                 maxBuffered=10000):
+        """
+        Initializes the handler with a specific host address and port, and
+        the batching parameters.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        SocketHandler.__init__(self, host, port)
+        self.capacity = capacity
+        self.flushInterval = flushInterval
+        self.maxBuffered = max(maxBuffered, capacity)
+        self.buffer = collections.deque()
+        self.dropped = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._firstTime = None
+        self._flushing = False
+        self._closing = False
+        self._thread = None
+
+    def encodeRecord(self, record):
+        """
+        Encode the record in the binary format used by this handler, and
+        return the resulting bytes.
+        """
+        if record.exc_info and not record.exc_text:
+            # just to get traceback text into record.exc_text ...
+            self.format(record)
+        process = record.process
+        parts = [_RECORD_HEADER.pack(
+            record.created, record.relativeCreated, record.levelno,
+            record.lineno or 0, -1 if process is None else process,
+            record.thread or 0)]
+        d = record.__dict__
+        for attr in _RECORD_STRINGS:
+            if attr == 'msg':
+                value = record.getMessage()
+            else:
+                value = d.get(attr)
+            if value is None:
+                parts.append(_STRING_LENGTH.pack(_NO_STRING))
+            else:
+                value = str(value).encode('utf-8', 'backslashreplace')
+                parts.append(_STRING_LENGTH.pack(len(value)))
+                parts.append(value)
+        return b''.join(parts)
+
+    def handleError(self, record):
+        """
+        Handle an error during logging.
+
+        Errors here come from encoding the record: the connection, which is
+        managed by the sending thread, is left alone.
+        """
+        logging.Handler.handleError(self, record)
+
+    def emit(self, record):
+        """
+        Emit a record.
+
+        Encodes the record and adds it to the buffer, starting the sending
+        thread if needed.
+        """
+        try:
+            data = self.encodeRecord(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._cond:
+            if self._closing:
+                return
+            buffer = self.buffer
+            if not buffer:
+                self._firstTime = time.monotonic()
+            elif len(buffer) >= self.maxBuffered:
+                buffer.popleft()
+                self.dropped += 1
+            buffer.append(data)
+            if len(buffer) >= self.capacity:
+                self._cond.notify()
+            if self._thread is None:
+                self._thread = t = threading.Thread(target=self._sendLoop,
+                                                    daemon=True)
+                t.start()
+
+    def flush(self):
+        """
+        Ask the sending thread to send the buffered records now.
+        """
+        with self._cond:
+            if self.buffer:
+                self._flushing = True
+                self._cond.notify()
+
+    def _nextBatch(self):
+        """
+        Wait until a batch should be sent, and remove it from the buffer.
+        Returns None when the handler is closed and nothing is left to send.
+        """
+        with self._cond:
+            while True:
+                buffer = self.buffer
+                now = time.monotonic()
+                if self._closing:
+                    if not buffer or self.sock is None and self.retryTime:
+                        return None
+                    break
+                if self.retryTime is not None and self.sock is None:
+                    # Not connected: wait until the next attempt is due.
+                    timeout = self.retryTime - time.time()
+                    if timeout > 0:
+                        self._cond.wait(timeout)
+                        continue
+                if len(buffer) >= self.capacity or buffer and self._flushing:
+                    break
+                if buffer:
+                    timeout = self._firstTime + self.flushInterval - now
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                else:
+                    self._cond.wait()
+            n = min(len(buffer), self.capacity)
+            batch = [buffer.popleft() for _ in range(n)]
+            if buffer:
+                self._firstTime = now
+            else:
+                self._flushing = False
+            return batch
+
+    def _requeue(self, batch):
+        """
+        Put back a batch which could not be sent at the front of the buffer.
+        """
+        with self._cond:
+            buffer = self.buffer
+            if not buffer:
+                self._firstTime = time.monotonic()
+            buffer.extendleft(reversed(batch))
+            while len(buffer) > self.maxBuffered:
+                buffer.popleft()
+                self.dropped += 1
+
+    def _sendLoop(self):
+        """
+        Send batches of records, connecting when needed. This runs on a
+        separate thread, started by emit().
+        """
+        while True:
+            batch = self._nextBatch()
+            if batch is None:
+                break
+            if self.sock is None:
+                self.createSocket()
+            sock = self.sock
+            if sock is None:
+                self._requeue(batch)
+                continue
+            data = b''.join(batch)
+            try:
+                sock.sendall(_BATCH_HEADER.pack(len(data), len(batch)) + data)
+            except OSError:
+                # The peer discards the partial frame: send it again once
+                # reconnected.
+                self._requeue(batch)
+                sock.close()
+                self.sock = None
+                if self.retryTime is None:
+                    self.retryPeriod = self.retryStart
+                    self.retryTime = time.time()
+
+    def close(self):
+        """
+        Send the buffered records, if connected, and close the socket.
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            thread.join()
+        SocketHandler.close(self)
+
 class SysLogHandler(logging.Handler):
     """
     A handler class which sends formatted logging records to a syslog
@@ -1338,24 +1739,89 @@ class QueueHandler(logging.Handler):
 
     This code is new in Python 3.2, but this class can be copy pasted into
     user code for use with earlier Python versions.
+
+    The counters ``queued`` and ``dropped`` record how many records were
+    put on the queue and how many were discarded because it was full.
     """
 
-    def __init__(self, queue):
+    def __init__(self, queue, *, policy=None, timeout=None, lazy=False):
         """
         Initialise an instance, using the passed queue.
+
+        If policy is None, a full queue raises queue.Full, which is reported
+        through handleError(). Otherwise it selects what happens when the
+        queue is full: 'block' waits for free space (for at most timeout
+        seconds, if not None, after which the record is dropped),
+        'drop_newest' discards the record being emitted and 'drop_oldest'
+        discards the oldest record on the queue to make room for it.
+
+        If lazy is true, records are enqueued without being formatted first;
+        formatting is left to the handlers attached to the listener. This is
+        only suitable for queues which do not pickle their items.
         """
         logging.Handler.__init__(self)
+        if policy not in (None, 'block', 'drop_newest', 'drop_oldest'):
+            raise ValueError("Invalid queue policy: %r" % (policy,))
         self.queue = queue
+        self.policy = policy
+        self.timeout = timeout
+        self.lazy = lazy
+        self.queued = 0
+        self.dropped = 0
 
     def enqueue(self, record):
         """
         Enqueue a record.
 
-        The base implementation uses put_nowait. You may want to override
-        this method if you want to use blocking, timeouts or custom queue
+        The base implementation uses put_nowait, or the behaviour selected by
+        the policy passed to the constructor when the queue is full. You may
+        want to override this method if you want to use custom queue
         implementations.
         """
-        self.queue.put_nowait(record)
+        policy = self.policy
+        if policy is None:
+            self.queue.put_nowait(record)
+        elif policy == 'block':
+            try:
+                self.queue.put(record, True, self.timeout)
+            except queue.Full:
+                self.dropped += 1
+                return
+        else:
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                if policy == 'drop_newest' or not self._make_room(record):
+                    self.dropped += 1
+                    return
+        self.queued += 1
+
+    def _make_room(self, record, attempts=3):
+        """
+        Discard the oldest records on the queue until the passed record can
+        be put on it. Returns whether this succeeded.
+        """
+        q = self.queue
+        for _ in range(attempts):
+            try:
+                oldest = q.get_nowait()
+            except queue.Empty:
+                pass
+            else:
+                if hasattr(q, 'task_done'):
+                    q.task_done()
+                if oldest is QueueListener._sentinel:
+                    # The listener is stopping: keep its sentinel last and
+                    # drop the new record instead.
+                    q.put_nowait(oldest)
+                    return False
+                self.dropped += 1
+            try:
+                q.put_nowait(record)
+            except queue.Full:
+                continue
+            return True
+        return False
 
     def prepare(self, record):
         """
@@ -1369,7 +1835,13 @@ class QueueHandler(logging.Handler):
         You might want to override this method if you want to convert
         the record to a dict or JSON string, or send a modified copy
         of the record while leaving the original intact.
+
+        If the handler was created with lazy=True, the record is returned
+        unchanged, so that the cost of formatting is paid by the listener
+        thread rather than by the thread which logged the event.
         """
+        if self.lazy:
+            return record
         # The format operation gets traceback text into record.exc_text
         # (if there's exception data), and also returns the formatted
         # message. We can then use this to replace the original
@@ -1404,15 +1876,23 @@ class QueueListener(object):
     """
     _sentinel = None
 
-    def __init__(self, queue, *handlers, respect_handler_level=False):
+    def __init__(self, queue, *handlers, respect_handler_level=False,
+                 batch_size=1):
         """
         Initialise an instance with the specified queue and
         handlers.
+
+        If batch_size is greater than one, the listener removes up to that
+        many records from the queue at a time and passes them to each
+        handler's handleBatch method, if it has one.
         """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
         self.queue = queue
         self.handlers = handlers
         self._thread = None
         self.respect_handler_level = respect_handler_level
+        self.batch_size = batch_size
 
     def dequeue(self, block):
         """
@@ -1460,6 +1940,29 @@ class QueueListener(object):
             if process:
                 handler.handle(record)
 
+    def handle_batch(self, records):
+        """
+        Handle a list of records.
+
+        Each record is prepared, then the whole list is offered to each
+        handler's handleBatch method. Handlers without one are offered the
+        records one at a time.
+        """
+        records = [self.prepare(record) for record in records]
+        for handler in self.handlers:
+            if not self.respect_handler_level:
+                batch = records
+            else:
+                batch = [record for record in records
+                         if record.levelno >= handler.level]
+            handle_batch = getattr(handler, 'handleBatch', None)
+            if handle_batch is not None:
+                if batch:
+                    handle_batch(batch)
+            else:
+                for record in batch:
+                    handler.handle(record)
+
     def _monitor(self):
         """
         Monitor the queue for records, and ask the handler
@@ -1470,6 +1973,9 @@ class QueueListener(object):
         """
         q = self.queue
         has_task_done = hasattr(q, 'task_done')
+        if self.batch_size > 1:
+            self._monitor_batch(q, has_task_done)
+            return
         while True:
             try:
                 record = self.dequeue(True)
@@ -1481,6 +1987,36 @@ class QueueListener(object):
             except queue.Empty:
                 break
 
+    def _monitor_batch(self, q, has_task_done):
+        """
+        Monitor the queue for records, handling all those which are
+        available, up to batch_size at a time, together.
+        """
+        sentinel = self._sentinel
+        batch_size = self.batch_size
+        done = False
+        while not done:
+            try:
+                record = self.dequeue(True)
+            except queue.Empty:
+                break
+            if record is sentinel:
+                break
+            records = [record]
+            while len(records) < batch_size:
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+                if record is sentinel:
+                    done = True
+                    break
+                records.append(record)
+            self.handle_batch(records)
+            if has_task_done:
+                for _ in records:
+                    q.task_done()
+
     def enqueue_sentinel(self):
         """
         This is used to enqueue the sentinel record.
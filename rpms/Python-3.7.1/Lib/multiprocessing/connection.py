@@ -39,6 +39,14 @@ except ImportError:
 #
 
 BUFSIZE = 8192
+# Maximum number of buffers passed to a single os.writev() call
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = -1
+if IOV_MAX <= 0:
+    # The minimum value required by POSIX
+    IOV_MAX = 16
 # A very generous timeout when it comes to local connections...
 CONNECTION_TIMEOUT = 20.
 
@@ -205,6 +213,11 @@ class _ConnectionBase:
         self._check_writable()
         self._send_bytes(_ForkingPickler.dumps(obj))
 
+    def _send_messages(self, bufs):
+        """Send each buffer of a list as a separate message"""
+        for buf in bufs:
+            self._send_bytes(memoryview(buf))
+
     def recv_bytes(self, maxlength=None):
         """
         Receive bytes data as a bytes object.
@@ -356,10 +369,12 @@ class Connection(_ConnectionBase):
             _close(self._handle)
         _write = _multiprocessing.send
         _read = _multiprocessing.recv
+        _writev = None
     else:
         def _close(self, _close=os.close):
             _close(self._handle)
         _write = os.write
+        _writev = getattr(os, 'writev', None)
         _read = os.read
 
     def _send(self, buf, write=_write):
@@ -403,6 +418,29 @@ class Connection(_ConnectionBase):
             # to avoid "broken pipe" errors if the other end closed the pipe.
             self._send(header + buf)
 
+    def _send_messages(self, bufs, writev=_writev):
+        if writev is None:
+            return _ConnectionBase._send_messages(self, bufs)
+        # Write the header and the payload of every message with as few
+        # writev() calls as possible.  Empty payloads are left out: a
+        # writev() of only empty buffers would loop.
+        iov = []
+        for buf in bufs:
+            iov.append(struct.pack("!i", len(buf)))
+            if len(buf):
+                iov.append(buf)
+        i = 0
+        while i < len(iov):
+            n = writev(self._handle, iov[i:i + IOV_MAX])
+            # Skip the buffers which were entirely written
+            while n:
+                size = len(iov[i])
+                if n < size:
+                    iov[i] = memoryview(iov[i])[n:]
+                    break
+                n -= size
+                i += 1
+
     def _recv_bytes(self, maxsize=None):
         buf = self._recv(4)
         size, = struct.unpack("!i", buf.getvalue())
@@ -96,15 +96,15 @@ class BaseContext(object):
         from .synchronize import Barrier
         return Barrier(parties, action, timeout, ctx=self.get_context())
 
-    def Queue(self, maxsize=0):
+    def Queue(self, maxsize=0, *, batch=False):
         '''Returns a queue object'''
         from .queues import Queue
-        return Queue(maxsize, ctx=self.get_context())
+        return Queue(maxsize, ctx=self.get_context(), batch=batch)
 
-    def JoinableQueue(self, maxsize=0):
+    def JoinableQueue(self, maxsize=0, *, batch=False):
         '''Returns a queue object'''
         from .queues import JoinableQueue
-        return JoinableQueue(maxsize, ctx=self.get_context())
+        return JoinableQueue(maxsize, ctx=self.get_context(), batch=batch)
 
     def SimpleQueue(self):
         '''Returns a queue object'''
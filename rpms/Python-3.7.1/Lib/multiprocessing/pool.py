@@ -23,6 +23,7 @@ import traceback
 
 # If threading is available then ThreadPool should be provided.  Therefore
 # we avoid top-level imports which are liable to fail on some systems.
+from . import reduction
 from . import util
 from . import get_context, TimeoutError
 
@@ -46,6 +47,11 @@ def mapstar(args):
 def starmapstar(args):
     return list(itertools.starmap(args[0], args[1]))
 
+def timedmapstar(args):
+    start = time.monotonic()
+    result = list(map(*args))
+    return time.monotonic() - start, result
+
 #
 # Hack to embed stringification of remote traceback in local traceback
 #
@@ -69,6 +75,96 @@ def rebuild_exc(exc, tb):
     exc.__cause__ = RemoteTraceback(tb)
     return exc
 
+#
+# Adaptive chunking of imap() and imap_unordered()
+#
+
+# Time that a worker should spend on a chunk, in seconds
+ADAPTIVE_TARGET = 0.05
+# Upper bound of the pickled size of a chunk, in bytes
+ADAPTIVE_MAX_BYTES = 1 << 20
+# Number of chunks which are sent per worker before waiting for a result
+ADAPTIVE_PIPELINE = 2
+# The pickled size of the items is measured every ADAPTIVE_SAMPLE chunks
+ADAPTIVE_SAMPLE = 16
+
+class AdaptiveChunker(object):
+    '''
+    Split an iterable in chunks whose size follows the time taken by the
+    workers to process the items of the previous chunks, so that each chunk
+    takes about ADAPTIVE_TARGET seconds, and the pickled size of the items.
+
+    The chunks are generated by the task handler thread, which waits when
+    ADAPTIVE_PIPELINE chunks per worker are already being processed, and
+    the result handler thread reports the results through task_done().
+    '''
+    def __init__(self, processes, handler, pickled=True):
+        self._cond = threading.Condition(threading.Lock())
+        self._handler = handler
+        self._pickled = pickled
+        self._max_outstanding = processes * ADAPTIVE_PIPELINE
+        self._outstanding = 0
+        self._size = 1
+        self._item_time = None
+        self._item_bytes = None
+
+    def get_tasks(self, func, it):
+        it = iter(it)
+        for n in itertools.count():
+            with self._cond:
+                while (self._outstanding >= self._max_outstanding
+                       and not self._handler._state):
+                    self._cond.wait(0.1)
+                size = self._size
+            x = tuple(itertools.islice(it, size))
+            if not x:
+                return
+            if self._pickled and n % ADAPTIVE_SAMPLE == 0:
+                self._measure(x)
+            with self._cond:
+                self._outstanding += 1
+            yield (func, x)
+
+    def _measure(self, items):
+        try:
+            size = len(reduction.ForkingPickler.dumps(items))
+        except Exception:
+            # Sending the chunk will fail and report the error
+            return
+        with self._cond:
+            self._item_bytes = max(size // len(items), 1)
+            self._resize(self._size)
+
+    def _resize(self, size):
+        if self._item_bytes is not None:
+            size = min(size, ADAPTIVE_MAX_BYTES // self._item_bytes)
+        self._size = max(size, 1)
+
+    def task_done(self, obj):
+        '''
+        Update the chunk size from the result of a chunk, and return the
+        result without the timing.
+        '''
+        success, value = obj
+        with self._cond:
+            self._outstanding -= 1
+            if success:
+                elapsed, value = value
+                if value:
+                    item_time = elapsed / len(value)
+                    if self._item_time is None:
+                        self._item_time = item_time
+                    else:
+                        self._item_time = (self._item_time + item_time) / 2
+                    # Grow progressively, the first timings are noisy
+                    size = self._size * 2
+                    if self._item_time:
+                        size = min(size,
+                                   int(ADAPTIVE_TARGET / self._item_time))
+                    self._resize(size)
+            self._cond.notify()
+        return success, value
+
 #
 # Code run by worker processes
 #
@@ -316,12 +412,29 @@ class Pool(object):
         except Exception as e:
             yield (result_job, i+1, _helper_reraises_exception, (e,), {})
 
+    def _adaptive_imap(self, func, iterable, iterator_class):
+        '''Helper function to implement imap and imap_unordered with
+        chunks of an adaptive size.'''
+        chunker = AdaptiveChunker(self._processes, self._task_handler,
+                                  hasattr(self._inqueue, '_writer'))
+        result = iterator_class(self._cache, chunker)
+        self._taskqueue.put(
+            (
+                self._guarded_task_generation(
+                    result._job, timedmapstar,
+                    chunker.get_tasks(func, iterable)),
+                result._set_length
+            ))
+        return (item for chunk in result for item in chunk)
+
     def imap(self, func, iterable, chunksize=1):
         '''
         Equivalent of `map()` -- can be MUCH slower than `Pool.map()`.
         '''
         if self._state != RUN:
             raise ValueError("Pool not running")
+        if chunksize is None:
+            return self._adaptive_imap(func, iterable, IMapIterator)
         if chunksize == 1:
             result = IMapIterator(self._cache)
             self._taskqueue.put(
@@ -352,6 +465,9 @@ class Pool(object):
         '''
         if self._state != RUN:
             raise ValueError("Pool not running")
+        if chunksize is None:
+            return self._adaptive_imap(func, iterable,
+                                       IMapUnorderedIterator)
         if chunksize == 1:
             result = IMapUnorderedIterator(self._cache)
             self._taskqueue.put(
@@ -740,10 +856,11 @@ class MapResult(ApplyResult):
 
 class IMapIterator(object):
 
-    def __init__(self, cache):
+    def __init__(self, cache, chunker=None):
         self._cond = threading.Condition(threading.Lock())
         self._job = next(job_counter)
         self._cache = cache
+        self._chunker = chunker
         self._items = collections.deque()
         self._index = 0
         self._length = None
@@ -776,6 +893,8 @@ class IMapIterator(object):
     __next__ = next                    # XXX
 
     def _set(self, i, obj):
+        if self._chunker is not None:
+            obj = self._chunker.task_done(obj)
         with self._cond:
             if self._index == i:
                 self._items.append(obj)
@@ -805,6 +924,8 @@ class IMapIterator(object):
 class IMapUnorderedIterator(IMapIterator):
 
     def _set(self, i, obj):
+        if self._chunker is not None:
+            obj = self._chunker.task_done(obj)
         with self._cond:
             self._items.append(obj)
             self._index += 1
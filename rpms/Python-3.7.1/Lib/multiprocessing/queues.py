@@ -31,9 +31,12 @@ from .util import debug, info, Finalize, register_after_fork, is_exiting
 # Queue type using a pipe, buffer and thread
 #
 
+# Size above which the feeder thread of a batching queue sends a batch
+BATCH_MAX_BYTES = 1 << 16
+
 class Queue(object):
 
-    def __init__(self, maxsize=0, *, ctx):
+    def __init__(self, maxsize=0, *, ctx, batch=False):
         if maxsize <= 0:
             # Can raise ImportError (see issues #3770 and #23400)
             from .synchronize import SEM_VALUE_MAX as maxsize
@@ -48,6 +51,7 @@ class Queue(object):
         self._sem = ctx.BoundedSemaphore(maxsize)
         # For use by concurrent.futures
         self._ignore_epipe = False
+        self._batch = batch
 
         self._after_fork()
 
@@ -57,11 +61,11 @@ class Queue(object):
     def __getstate__(self):
         context.assert_spawning(self)
         return (self._ignore_epipe, self._maxsize, self._reader, self._writer,
-                self._rlock, self._wlock, self._sem, self._opid)
+                self._rlock, self._wlock, self._sem, self._opid, self._batch)
 
     def __setstate__(self, state):
         (self._ignore_epipe, self._maxsize, self._reader, self._writer,
-         self._rlock, self._wlock, self._sem, self._opid) = state
+         self._rlock, self._wlock, self._sem, self._opid, self._batch) = state
         self._after_fork()
 
     def _after_fork(self):
@@ -157,9 +161,15 @@ class Queue(object):
 
         # Start thread which transfers data from buffer to pipe
         self._buffer.clear()
+        if self._batch:
+            target = Queue._feed_batched
+            send_bytes = self._writer._send_messages
+        else:
+            target = Queue._feed
+            send_bytes = self._send_bytes
         self._thread = threading.Thread(
-            target=Queue._feed,
-            args=(self._buffer, self._notempty, self._send_bytes,
+            target=target,
+            args=(self._buffer, self._notempty, send_bytes,
                   self._wlock, self._writer.close, self._ignore_epipe,
                   self._on_queue_feeder_error, self._sem),
             name='QueueFeederThread'
@@ -263,6 +273,78 @@ class Queue(object):
                     queue_sem.release()
                     onerror(e, obj)
 
+    @staticmethod
+    def _feed_batched(buffer, notempty, send_messages, writelock, close,
+                      ignore_epipe, onerror, queue_sem):
+        debug('starting thread to feed batches of data to pipe')
+        sentinel = _sentinel
+        if sys.platform != 'win32':
+            wacquire = writelock.acquire
+            wrelease = writelock.release
+        else:
+            wacquire = None
+
+        def send(bufs, objs):
+            try:
+                if wacquire is None:
+                    send_messages(bufs)
+                else:
+                    wacquire()
+                    try:
+                        send_messages(bufs)
+                    finally:
+                        wrelease()
+            except Exception as e:
+                if ignore_epipe and getattr(e, 'errno', 0) == errno.EPIPE:
+                    return False
+                if is_exiting():
+                    info('error in queue thread: %s', e)
+                    return False
+                # None of the objects of the batch has been sent
+                for obj in objs:
+                    queue_sem.release()
+                    onerror(e, obj)
+            return True
+
+        while 1:
+            # Take all the objects put since the last wakeup
+            with notempty:
+                if not buffer:
+                    notempty.wait()
+                objs = list(buffer)
+                buffer.clear()
+
+            bufs = []
+            batch = []
+            size = 0
+            for obj in objs:
+                if obj is sentinel:
+                    if batch:
+                        send(bufs, batch)
+                    debug('feeder thread got sentinel -- exiting')
+                    close()
+                    return
+                try:
+                    data = _ForkingPickler.dumps(obj)
+                except Exception as e:
+                    if is_exiting():
+                        info('error in queue thread: %s', e)
+                        return
+                    queue_sem.release()
+                    onerror(e, obj)
+                    continue
+                bufs.append(data)
+                batch.append(obj)
+                size += 4 + len(data)
+                if size >= BATCH_MAX_BYTES:
+                    if not send(bufs, batch):
+                        return
+                    bufs = []
+                    batch = []
+                    size = 0
+            if batch and not send(bufs, batch):
+                return
+
     @staticmethod
     def _on_queue_feeder_error(e, obj):
         """
@@ -285,8 +367,8 @@ _sentinel = object()
 
 class JoinableQueue(Queue):
 
-    def __init__(self, maxsize=0, *, ctx):
-        Queue.__init__(self, maxsize, ctx=ctx)
+    def __init__(self, maxsize=0, *, ctx, batch=False):
+        Queue.__init__(self, maxsize, ctx=ctx, batch=batch)
         self._unfinished_tasks = ctx.Semaphore(0)
         self._cond = ctx.Condition()
 
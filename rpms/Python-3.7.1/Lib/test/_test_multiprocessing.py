@@ -20,6 +20,7 @@ import logging
 import struct
 import operator
 import weakref
+import types
 import test.support
 import test.support.script_helper
 from test import support
@@ -1116,6 +1117,111 @@ class _TestQueue(BaseTestCase):
         # Assert that the serialization and the hook have been called correctly
         self.assertTrue(not_serializable_obj.reduce_was_called)
         self.assertTrue(not_serializable_obj.on_queue_feeder_error_was_called)
+
+    @classmethod
+    def _test_batch(cls, queue, n):
+        for i in range(n):
+            queue.put(i)
+        queue.put(b'x' * multiprocessing.queues.BATCH_MAX_BYTES)
+        queue.put(None)
+
+    def test_batch(self):
+        if self.TYPE != 'processes':
+            self.skipTest('test not appropriate for {}'.format(self.TYPE))
+
+        queue = self.Queue(batch=True)
+        n = 20000
+        p = self.Process(target=self._test_batch, args=(queue, n))
+        p.daemon = True
+        p.start()
+        for i in range(n):
+            self.assertEqual(queue.get(), i)
+        self.assertEqual(len(queue.get(timeout=TIMEOUT)),
+                         multiprocessing.queues.BATCH_MAX_BYTES)
+        self.assertIsNone(queue.get(timeout=TIMEOUT))
+        self.assertTrue(queue.empty())
+        self.assertRaises(pyqueue.Empty, queue.get, False)
+        p.join()
+
+        # Items of a batch stay available after the first one is received
+        queue.put(1)
+        queue.put(2)
+        self.assertEqual(queue.get(timeout=TIMEOUT), 1)
+        self.assertFalse(queue.empty())
+        self.assertEqual(queue.get_nowait(), 2)
+        close_queue(queue)
+
+    @classmethod
+    def _test_batch_consumer(cls, queue, results):
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            results.put(item)
+            # Let the other consumers take the next items
+            time.sleep(0.01)
+
+    def test_batch_several_consumers(self):
+        if self.TYPE != 'processes':
+            self.skipTest('test not appropriate for {}'.format(self.TYPE))
+
+        queue = self.Queue(batch=True)
+        results = self.Queue()
+        n = 10
+        consumers = [self.Process(target=self._test_batch_consumer,
+                                  args=(queue, results))
+                     for _ in range(3)]
+        for p in consumers:
+            p.daemon = True
+            p.start()
+        # All the items are sent in a batch: none of them must stay in a
+        # consumer waiting for a lock held by another one.
+        for i in range(n):
+            queue.put(i)
+        for p in consumers:
+            queue.put(None)
+        received = sorted(results.get(timeout=TIMEOUT) for _ in range(n))
+        self.assertEqual(received, list(range(n)))
+        for p in consumers:
+            join_process(p)
+        self.assertTrue(queue.empty())
+        close_queue(queue)
+        close_queue(results)
+
+    def test_batch_feeder_error(self):
+        if self.TYPE != 'processes':
+            self.skipTest('test not appropriate for {}'.format(self.TYPE))
+
+        class NotSerializable(object):
+            def __reduce__(self):
+                raise AttributeError
+        with test.support.captured_stderr():
+            q = self.Queue(maxsize=2, batch=True)
+            q.put(NotSerializable())
+            q.put(True)
+            self.assertTrue(q.get(timeout=1.0))
+            self.assertTrue(q.empty())
+            try:
+                self.assertEqual(q.qsize(), 0)
+            except NotImplementedError:
+                pass
+            close_queue(q)
+
+    def test_batch_joinable(self):
+        if self.TYPE != 'processes':
+            self.skipTest('test not appropriate for {}'.format(self.TYPE))
+
+        queue = self.JoinableQueue(batch=True)
+        worker = self.Process(target=_TestQueue._test_task_done,
+                              args=(queue,))
+        worker.daemon = True
+        worker.start()
+        for i in range(10):
+            queue.put(i)
+        queue.join()
+        queue.put(None)
+        worker.join()
+        close_queue(queue)
 #
 #
 #
@@ -2385,6 +2491,50 @@ class _TestPool(BaseTestCase):
         it = self.pool.imap_unordered(sqr, list(range(1000)), chunksize=100)
         self.assertEqual(sorted(it), list(map(sqr, list(range(1000)))))
 
+    def test_imap_adaptive_chunksize(self):
+        it = self.pool.imap(sqr, iter(range(5000)), chunksize=None)
+        self.assertEqual(list(it), list(map(sqr, range(5000))))
+
+        it = self.pool.imap(sqr, [], chunksize=None)
+        self.assertEqual(list(it), [])
+
+        it = self.pool.imap_unordered(sqr, iter(range(5000)), chunksize=None)
+        self.assertEqual(sorted(it), list(map(sqr, range(5000))))
+
+        if self.TYPE == 'manager':
+            return
+        it = self.pool.imap(sqr, exception_throwing_generator(20, 7),
+                            chunksize=None)
+        for i in range(7):
+            self.assertEqual(next(it), i*i)
+        self.assertRaises(SayWhenError, it.__next__)
+
+        it = self.pool.imap(raise_large_valuerror, [1], chunksize=None)
+        self.assertRaises(ValueError, next, it)
+
+    def test_adaptive_chunker(self):
+        if self.TYPE == 'manager':
+            self.skipTest('test not appropriate for {}'.format(self.TYPE))
+        from multiprocessing.pool import AdaptiveChunker, ADAPTIVE_TARGET
+        # The state of the task handler thread
+        handler = types.SimpleNamespace(_state=0)
+        chunker = AdaptiveChunker(1, handler)
+        tasks = chunker.get_tasks(sqr, range(10**6))
+        sizes = []
+        for i in range(8):
+            func, chunk = next(tasks)
+            sizes.append(len(chunk))
+            # Fast items: the chunks grow
+            chunker.task_done((True, (1e-9, list(chunk))))
+        self.assertEqual(sizes, [1, 2, 4, 8, 16, 32, 64, 128])
+
+        # Slow items: the chunks shrink to the target time
+        for i in range(2):
+            func, chunk = next(tasks)
+            chunker.task_done((True, (ADAPTIVE_TARGET * 10, [0] * 10)))
+        func, chunk = next(tasks)
+        self.assertEqual(len(chunk), 1)
+
     def test_imap_unordered_handle_iterable_exception(self):
         if self.TYPE == 'manager':
             self.skipTest('test not appropriate for {}'.format(self.TYPE))
@@ -3006,6 +3156,29 @@ class _TestConnection(BaseTestCase):
 
         self.assertRaises(ValueError, a.send_bytes, msg, 4, -1)
 
+    def test_send_messages(self):
+        if self.TYPE != 'processes':
+            self.skipTest('test not appropriate for {}'.format(self.TYPE))
+
+        a, b = self.Pipe()
+        # More buffers than IOV_MAX, and more data than the pipe can hold
+        # so that writev() writes them partially
+        bufs = [bytes([i % 256]) * (i % 1000) for i in range(3000)]
+        result = []
+        def receive():
+            for _ in bufs:
+                result.append(b.recv_bytes())
+        reader = threading.Thread(target=receive)
+        reader.start()
+        try:
+            a._send_messages(bufs)
+        finally:
+            reader.join()
+        self.assertEqual(result, bufs)
+
+        a._send_messages([])
+        self.assertFalse(b.poll())
+
     @classmethod
     def _is_fd_assigned(cls, fd):
         try:
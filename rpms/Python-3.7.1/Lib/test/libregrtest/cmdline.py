@@ -118,6 +118,24 @@ To enable all resources except one, use '-uall,-<resource>'.  For
 example, to run all the tests except for the gui tests, give the
 option '-uall,-gui'.
 
+--durations reads the duration of each test from a JSON file written by a
+previous run.  With -j, the slowest tests are then started first (tests
+without a recorded duration are started before all others), so that long
+tests do not end up running alone at the end of the run.  The durations
+of the current run are written back to the file.
+
+--split-package runs each test module of a test package (ex: test_asyncio)
+as a separate test, so that its modules can be spread over -j processes.
+The package's own load_tests() is not used in this case.
+
+--changed and --changed-since only run the selected tests which import,
+directly or indirectly, one of the given modified files.  The import graph
+is computed by scanning the imports of the Python files of the standard
+library and of the tests; it is cached in the file given by --import-cache
+(default: regrtest_imports.json in the temporary directory).  If a modified
+file is not a Python module (ex: a C file), all selected tests are run.
+Documentation files are ignored.
+
 --matchfile filters tests using a text file, one pattern per line.
 Pattern examples:
 
@@ -220,6 +238,22 @@ def _create_parser():
     group.add_argument('-M', '--memlimit', metavar='LIMIT',
                        help='run very large memory-consuming tests.' +
                             more_details)
+    group.add_argument('--split-package', metavar='PACKAGE',
+                       dest='split_packages', action='append',
+                       help='run each test module of the test package '
+                            'PACKAGE as a separate test.' + more_details)
+    group.add_argument('--changed', metavar='FILE',
+                       action='append', type=relative_filename,
+                       help='only run the tests which import the modified '
+                            'file FILE.' + more_details)
+    group.add_argument('--changed-since', metavar='REVISION',
+                       help='only run the tests which import a file '
+                            'modified since the git revision REVISION.' +
+                            more_details)
+    group.add_argument('--import-cache', metavar='FILENAME',
+                       type=relative_filename,
+                       help='file used to cache the import graph of '
+                            '--changed and --changed-since')
     group.add_argument('--testdir', metavar='DIR',
                        type=relative_filename,
                        help='execute test files in the specified directory '
@@ -238,6 +272,11 @@ def _create_parser():
     group.add_argument('-j', '--multiprocess', metavar='PROCESSES',
                        dest='use_mp', type=int,
                        help='run PROCESSES processes at once')
+    group.add_argument('--durations', metavar='FILENAME',
+                       type=relative_filename,
+                       help='schedule the slowest tests first using the '
+                            'test durations stored in FILENAME, and update '
+                            'it.' + more_details)
     group.add_argument('-T', '--coverage', action='store_true',
                        dest='trace',
                        help='turn on code coverage tracing using the trace '
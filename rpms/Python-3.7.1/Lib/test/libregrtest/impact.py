@@ -0,0 +1,244 @@
+"""Select the tests impacted by modified files (--changed, --changed-since).
+
+The import graph of the standard library and of the tests is built from
+an AST scan of the source files.  Imports of all kinds are taken into
+account, including imports inside functions and calls like
+support.import_module('name') with a constant string, so that the
+selection errs on the side of running too many tests.  The imports of
+each file are cached on disk and only rescanned when the file changes.
+"""
+
+import ast
+import json
+import os
+import subprocess
+import sys
+
+
+CACHE_VERSION = 1
+
+# Files which cannot have an impact on the test results
+IGNORED_DIRS = ('Doc', 'Misc')
+IGNORED_EXTS = ('.rst', '.txt', '.md')
+
+# Functions taking a module name as first argument
+IMPORT_FUNCTIONS = {'import_module', 'import_fresh_module', '__import__'}
+
+
+def scan_imports(source, modname, is_package):
+    """Return the set of module names imported by a source file."""
+    tree = ast.parse(source)
+    if is_package:
+        package = modname
+    else:
+        package = modname.rpartition('.')[0]
+    imports = set()
+
+    def add(name):
+        parts = name.split('.')
+        for index in range(1, len(parts) + 1):
+            imports.add('.'.join(parts[:index]))
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                add(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split('.') if package else []
+                if node.level > 1:
+                    parts = parts[:-(node.level - 1)]
+                if node.module:
+                    parts.append(node.module)
+                base = '.'.join(parts)
+            else:
+                base = node.module
+            if not base:
+                continue
+            add(base)
+            for alias in node.names:
+                if alias.name != '*':
+                    imports.add('%s.%s' % (base, alias.name))
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Attribute):
+                name = func.attr
+            elif isinstance(func, ast.Name):
+                name = func.id
+            else:
+                continue
+            if (name in IMPORT_FUNCTIONS and node.args
+                    and isinstance(node.args[0], ast.Str)):
+                add(node.args[0].s)
+    imports.discard(modname)
+    return imports
+
+
+def find_modules(root):
+    """Return a dict mapping module names to file names under root."""
+    modules = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        reldir = os.path.relpath(dirpath, root)
+        if reldir == os.curdir:
+            prefix = ''
+        else:
+            if not os.path.isfile(os.path.join(dirpath, '__init__.py')):
+                dirnames[:] = []
+                continue
+            prefix = reldir.replace(os.sep, '.') + '.'
+        dirnames[:] = [name for name in dirnames
+                       if name.isidentifier() and name != 'site-packages']
+        for filename in filenames:
+            name, ext = os.path.splitext(filename)
+            if ext != '.py' or not name.isidentifier():
+                continue
+            if name == '__init__':
+                modname = prefix[:-1]
+                if not modname:
+                    continue
+            else:
+                modname = prefix + name
+            modules[modname] = os.path.join(dirpath, filename)
+    return modules
+
+
+class ImportGraph:
+    """Import graph of the modules found in a list of directories."""
+
+    def __init__(self, roots, cache_filename=None):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.cache_filename = cache_filename
+        self.modules = {}
+        for root in reversed(self.roots):
+            self.modules.update(find_modules(root))
+        self.filenames = {filename: modname
+                          for modname, filename in self.modules.items()}
+        self.imports = {}
+        self._build()
+
+    def _load_cache(self):
+        if not self.cache_filename:
+            return {}
+        try:
+            with open(self.cache_filename, encoding='utf-8') as fp:
+                cache = json.load(fp)
+        except (OSError, ValueError):
+            return {}
+        if (not isinstance(cache, dict)
+                or cache.get('version') != CACHE_VERSION):
+            return {}
+        return cache.get('files', {})
+
+    def _save_cache(self, files):
+        if not self.cache_filename:
+            return
+        tmp_filename = self.cache_filename + '.tmp'
+        try:
+            with open(tmp_filename, 'w', encoding='utf-8') as fp:
+                json.dump({'version': CACHE_VERSION, 'files': files}, fp)
+            os.replace(tmp_filename, self.cache_filename)
+        except OSError as exc:
+            print("Warning: failed to write the import graph cache %s: %s"
+                  % (self.cache_filename, exc), file=sys.stderr)
+
+    def _build(self):
+        cache = self._load_cache()
+        files = {}
+        modified = False
+        for modname, filename in self.modules.items():
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+            key = [st.st_mtime, st.st_size]
+            entry = cache.get(filename)
+            if entry is not None and entry[:2] == key:
+                imports = entry[2]
+            else:
+                modified = True
+                is_package = (os.path.basename(filename) == '__init__.py')
+                try:
+                    with open(filename, 'rb') as fp:
+                        source = fp.read()
+                    imports = sorted(scan_imports(source, modname,
+                                                  is_package))
+                except (SyntaxError, ValueError):
+                    # Files with bad syntax on purpose (badsyntax_*.py, ...)
+                    imports = []
+            files[filename] = key + [imports]
+            self.imports[modname] = imports
+        if modified or len(files) != len(cache):
+            self._save_cache(files)
+
+    def importers(self, modnames):
+        """Return modnames and all modules importing them, transitively."""
+        reverse = {}
+        for modname, imports in self.imports.items():
+            for name in imports:
+                reverse.setdefault(name, []).append(modname)
+            # load_tests() of a test package loads all its submodules
+            parent = modname.rpartition('.')[0]
+            if any(part.startswith('test_') for part in parent.split('.')):
+                reverse.setdefault(modname, []).append(parent)
+        seen = set(modnames)
+        todo = list(modnames)
+        while todo:
+            name = todo.pop()
+            for importer in reverse.get(name, ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    todo.append(importer)
+        return seen
+
+    def module_name(self, filename):
+        """Return the module name of a file, or None if it is unknown."""
+        return self.filenames.get(os.path.abspath(filename))
+
+
+def changed_since(revision, cwd):
+    """Return the absolute path of the files under cwd changed since a git
+    revision.
+
+    Untracked files which are not ignored count as changed: they are new
+    files not added yet.  Files outside cwd are left out: the repository
+    may contain more than the Python source tree.
+    """
+    output = subprocess.check_output(
+        ['git', 'diff', '--name-only', '--relative', revision, '--', '.'],
+        cwd=cwd, universal_newlines=True)
+    output += subprocess.check_output(
+        ['git', 'ls-files', '--others', '--exclude-standard', '--', '.'],
+        cwd=cwd, universal_newlines=True)
+    return [os.path.join(cwd, line) for line in output.splitlines()
+            if line]
+
+
+def is_ignored(filename, srcdir):
+    if filename.endswith(IGNORED_EXTS):
+        return True
+    relpath = os.path.relpath(os.path.abspath(filename), srcdir)
+    return relpath.split(os.sep, 1)[0] in IGNORED_DIRS
+
+
+def select_tests(tests, changed_files, graph, get_module, srcdir):
+    """Select the tests which import one of the changed files.
+
+    Return (selected, unknown) where unknown is the list of changed files
+    which are not Python modules of the graph.  If unknown is not empty,
+    the impact cannot be determined and all tests are selected.
+    """
+    changed = set()
+    unknown = []
+    for filename in changed_files:
+        if is_ignored(filename, srcdir):
+            continue
+        modname = graph.module_name(filename)
+        if modname is None:
+            unknown.append(filename)
+        else:
+            changed.add(modname)
+    if unknown:
+        return list(tests), unknown
+
+    impacted = graph.importers(changed)
+    return [test for test in tests if get_module(test) in impacted], []
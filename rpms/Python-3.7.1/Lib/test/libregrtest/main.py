@@ -1,10 +1,12 @@
 import datetime
 import faulthandler
+import json
 import locale
 import os
 import platform
 import random
 import re
+import subprocess
 import sys
 import sysconfig
 import tempfile
@@ -12,7 +14,7 @@ import time
 import unittest
 from test.libregrtest.cmdline import _parse_args
 from test.libregrtest.runtest import (
-    findtests, runtest, get_abs_module,
+    findtests, findtestdir, runtest, get_abs_module, split_test_packages,
     STDTESTS, NOTTESTS, PASSED, FAILED, ENV_CHANGED, SKIPPED, RESOURCE_DENIED,
     INTERRUPTED, CHILD_ERROR,
     PROGRESS_MIN_TIME, format_test_result)
@@ -103,6 +105,12 @@ class Regrtest:
         # used by --junit-xml
         self.testsuite_xml = None
 
+        # used by --durations: True if the slowest tests are run first
+        self.sort_by_duration = False
+
+        # used by --changed and --changed-since: text of the report
+        self.impact_report = None
+
     def accumulate_result(self, test, result):
         ok, test_time, xml_data = result
         if ok not in (CHILD_ERROR, INTERRUPTED):
@@ -247,11 +255,107 @@ class Regrtest:
                 print("Couldn't find starting test (%s), using all tests"
                       % self.ns.start, file=sys.stderr)
 
+        if self.ns.split_packages:
+            self.selected = split_test_packages(self.selected,
+                                                self.ns.split_packages,
+                                                self.ns.testdir)
+
+        if self.ns.changed or self.ns.changed_since:
+            self.select_impacted_tests()
+
         if self.ns.randomize:
             if self.ns.random_seed is None:
                 self.ns.random_seed = random.randrange(10000000)
             random.seed(self.ns.random_seed)
             random.shuffle(self.selected)
+        elif self.ns.durations and self.ns.use_mp:
+            # Longest processing time first: start the slowest tests first
+            # so that the -j processes finish at about the same time.
+            # Tests with an unknown duration may be slow: start them first.
+            durations = self.load_durations()
+            unknown = [test for test in self.selected
+                       if test not in durations]
+            known = [test for test in self.selected if test in durations]
+            known.sort(key=durations.__getitem__, reverse=True)
+            self.selected = unknown + known
+            self.sort_by_duration = True
+
+    def select_impacted_tests(self):
+        from test.libregrtest import impact
+
+        libdir = os.path.dirname(os.__file__)
+        srcdir = os.path.dirname(libdir)
+        roots = [libdir]
+        if self.ns.testdir:
+            roots.insert(0, findtestdir(self.ns.testdir))
+
+        changed = list(self.ns.changed or ())
+        if self.ns.changed_since:
+            try:
+                changed.extend(impact.changed_since(self.ns.changed_since,
+                                                    srcdir))
+            except (OSError, subprocess.CalledProcessError) as exc:
+                print("Failed to get the files changed since %s: %s"
+                      % (self.ns.changed_since, exc), file=sys.stderr)
+                sys.exit(2)
+
+        cache_filename = self.ns.import_cache
+        if not cache_filename:
+            cache_filename = os.path.join(TEMPDIR, 'regrtest_imports.json')
+        graph = impact.ImportGraph(roots, cache_filename)
+        tests = self.selected
+        self.selected, unknown = impact.select_tests(
+            tests, changed, graph,
+            lambda test: get_abs_module(self.ns, test), srcdir)
+
+        if unknown:
+            self.impact_report = (
+                "Run all %s: cannot determine the impact of %s"
+                % (count(len(tests), "test"), ', '.join(sorted(unknown))))
+            return
+
+        report = ("Run %s/%s importing %s"
+                  % (len(self.selected), count(len(tests), "test"),
+                     count(len(changed), "modified file")))
+        skipped = set(tests) - set(self.selected)
+        if skipped and self.ns.durations:
+            durations = self.load_durations()
+            known = [durations[test] for test in skipped if test in durations]
+            if known:
+                report += ("; estimated time saved: %s (%s/%s skipped tests "
+                           "with a known duration)"
+                           % (format_duration(sum(known)),
+                              len(known), len(skipped)))
+        self.impact_report = report
+
+    def load_durations(self):
+        try:
+            with open(self.ns.durations, encoding='utf-8') as fp:
+                durations = json.load(fp)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            print("Warning: failed to read test durations from %s: %s"
+                  % (self.ns.durations, exc), file=sys.stderr)
+            return {}
+        if not isinstance(durations, dict):
+            print("Warning: ignore invalid test durations file %s"
+                  % self.ns.durations, file=sys.stderr)
+            return {}
+        return durations
+
+    def save_durations(self):
+        durations = self.load_durations()
+        for test_time, test in self.test_times:
+            durations[test] = round(test_time, 3)
+        tmp_filename = self.ns.durations + '.tmp'
+        try:
+            with open(tmp_filename, 'w', encoding='utf-8') as fp:
+                json.dump(durations, fp, indent=0, sort_keys=True)
+            os.replace(tmp_filename, self.ns.durations)
+        except OSError as exc:
+            print("Warning: failed to write test durations to %s: %s"
+                  % (self.ns.durations, exc), file=sys.stderr)
 
     def list_tests(self):
         for name in self.selected:
@@ -486,6 +590,11 @@ class Regrtest:
 
         if self.ns.randomize:
             print("Using random seed", self.ns.random_seed)
+        if self.impact_report:
+            print(self.impact_report)
+        if self.sort_by_duration:
+            print("Run the slowest tests first using durations from",
+                  self.ns.durations)
 
         if self.ns.forever:
             self.tests = self._test_forever(list(self.selected))
@@ -510,6 +619,9 @@ class Regrtest:
             else:
                 os.unlink(self.next_single_filename)
 
+        if self.ns.durations and self.test_times:
+            self.save_durations()
+
         if self.tracer:
             r = self.tracer.results()
             r.write_results(show_missing=True, summary=True,
@@ -71,6 +71,39 @@ def findtests(testdir=None, stdtests=STDTESTS, nottests=NOTTESTS):
     return stdtests + sorted(tests)
 
 
+def split_test_packages(tests, packages, testdir=None):
+    """Replace each test package of packages by its test modules."""
+    testdir = findtestdir(testdir)
+    result = []
+    for test in tests:
+        if test in packages:
+            result.extend(findtestmodules(test, testdir))
+        else:
+            result.append(test)
+    return result
+
+
+def findtestmodules(package, testdir):
+    """Return the test modules and subpackages of a test package.
+
+    Use the same rules as unittest discovery (see load_package_tests()):
+    "test*.py" modules and all subpackages.  Return [package] if package
+    is not a package.
+    """
+    path = os.path.join(testdir, *package.split('.'))
+    if not os.path.isfile(os.path.join(path, '__init__.py')):
+        return [package]
+    modules = []
+    for name in sorted(os.listdir(path)):
+        mod, ext = os.path.splitext(name)
+        if ext == '.py':
+            if mod.startswith('test'):
+                modules.append(mod)
+        elif os.path.isfile(os.path.join(path, name, '__init__.py')):
+            modules.append(name)
+    return ['%s.%s' % (package, mod) for mod in modules] or [package]
+
+
 def get_abs_module(ns, test):
     if test.startswith('test.') or ns.testdir:
         return test
@@ -142,6 +142,31 @@ class BaseEventTests(test_utils.TestCase):
                                                    socket.SOCK_STREAM,
                                                    socket.IPPROTO_TCP))
 
+    def test_interleave_addrinfos(self):
+        self.maxDiff = None
+        SIX_A = (socket.AF_INET6, 0, 0, '', ('2001:db8::1', 1))
+        SIX_B = (socket.AF_INET6, 0, 0, '', ('2001:db8::2', 2))
+        SIX_C = (socket.AF_INET6, 0, 0, '', ('2001:db8::3', 3))
+        SIX_D = (socket.AF_INET6, 0, 0, '', ('2001:db8::4', 4))
+        FOUR_A = (socket.AF_INET, 0, 0, '', ('192.0.2.1', 5))
+        FOUR_B = (socket.AF_INET, 0, 0, '', ('192.0.2.2', 6))
+        FOUR_C = (socket.AF_INET, 0, 0, '', ('192.0.2.3', 7))
+        FOUR_D = (socket.AF_INET, 0, 0, '', ('192.0.2.4', 8))
+
+        addrinfos = [SIX_A, SIX_B, SIX_C, FOUR_A, FOUR_B, FOUR_C, FOUR_D,
+                     SIX_D]
+        expected = [SIX_A, FOUR_A, SIX_B, FOUR_B, SIX_C, FOUR_C, SIX_D,
+                    FOUR_D]
+        self.assertEqual(expected,
+                         base_events._interleave_addrinfos(addrinfos))
+
+        expected_fafc_2 = [SIX_A, SIX_B, FOUR_A, SIX_C, FOUR_B, SIX_D,
+                           FOUR_C, FOUR_D]
+        self.assertEqual(
+            expected_fafc_2,
+            base_events._interleave_addrinfos(
+                addrinfos, first_address_family_count=2))
+
 
 class BaseEventLoopTests(test_utils.TestCase):
 
@@ -1047,6 +1072,114 @@ class BaseEventLoopWithSelectorTests(test_utils.TestCase):
         r = self.loop.run_until_complete(self.loop.getnameinfo(('abc', 123)))
         self.assertEqual(r, 42)
 
+    @mock.patch('socket.getaddrinfo')
+    def test_getaddrinfo_cache(self, m_gai):
+        now = 100.0
+        self.loop.time = lambda: now
+        m_gai.return_value = [(2, 1, 6, '', ('192.0.2.1', 80))]
+        self.loop.set_getaddrinfo_cache(10)
+
+        def getaddrinfo(host):
+            return self.loop.run_until_complete(
+                self.loop.getaddrinfo(host, 80))
+
+        self.assertEqual(getaddrinfo('example.com'), m_gai.return_value)
+        self.assertEqual(getaddrinfo('example.com'), m_gai.return_value)
+        self.assertEqual(m_gai.call_count, 1)
+        # The cached list cannot be modified by callers
+        getaddrinfo('example.com').clear()
+        self.assertEqual(getaddrinfo('example.com'), m_gai.return_value)
+        self.assertEqual(m_gai.call_count, 1)
+
+        getaddrinfo('example.org')
+        self.assertEqual(m_gai.call_count, 2)
+
+        now += 10
+        getaddrinfo('example.com')
+        self.assertEqual(m_gai.call_count, 3)
+
+        self.loop.set_getaddrinfo_cache(None)
+        getaddrinfo('example.com')
+        getaddrinfo('example.com')
+        self.assertEqual(m_gai.call_count, 5)
+
+    @mock.patch('socket.getaddrinfo')
+    def test_getaddrinfo_cache_negative(self, m_gai):
+        now = 100.0
+        self.loop.time = lambda: now
+        m_gai.side_effect = socket.gaierror(socket.EAI_NONAME, 'unknown')
+
+        def getaddrinfo():
+            with self.assertRaises(socket.gaierror) as cm:
+                self.loop.run_until_complete(
+                    self.loop.getaddrinfo('example.com', 80))
+            self.assertEqual(cm.exception.errno, socket.EAI_NONAME)
+
+        # Failures are not cached by default
+        self.loop.set_getaddrinfo_cache(10)
+        getaddrinfo()
+        getaddrinfo()
+        self.assertEqual(m_gai.call_count, 2)
+
+        self.loop.set_getaddrinfo_cache(10, negative_ttl=1)
+        getaddrinfo()
+        getaddrinfo()
+        self.assertEqual(m_gai.call_count, 3)
+        now += 1
+        getaddrinfo()
+        self.assertEqual(m_gai.call_count, 4)
+
+        # Other errors are never cached
+        m_gai.side_effect = OSError
+        self.loop.set_getaddrinfo_cache(10, negative_ttl=10)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                self.loop.run_until_complete(
+                    self.loop.getaddrinfo('example.com', 80))
+        self.assertEqual(m_gai.call_count, 6)
+
+    @mock.patch('socket.getaddrinfo')
+    def test_getaddrinfo_cache_concurrent(self, m_gai):
+        event = threading.Event()
+        def getaddrinfo(*args):
+            event.wait(30)
+            return [(2, 1, 6, '', ('192.0.2.1', 80))]
+        m_gai.side_effect = getaddrinfo
+        self.loop.set_getaddrinfo_cache(10)
+
+        async def main():
+            lookups = [self.loop.create_task(
+                           self.loop.getaddrinfo('example.com', 80))
+                       for _ in range(3)]
+            await asyncio.sleep(0.01)
+            # Cancelling one caller does not cancel the shared lookup
+            lookups[0].cancel()
+            event.set()
+            return await asyncio.gather(*lookups, return_exceptions=True)
+
+        cancelled, *results = self.loop.run_until_complete(main())
+        self.assertIsInstance(cancelled, asyncio.CancelledError)
+        self.assertEqual(results, [[(2, 1, 6, '', ('192.0.2.1', 80))]] * 2)
+        self.assertEqual(m_gai.call_count, 1)
+
+    @mock.patch('socket.getaddrinfo')
+    def test_getaddrinfo_cache_maxsize(self, m_gai):
+        m_gai.return_value = [(2, 1, 6, '', ('192.0.2.1', 80))]
+        self.loop.set_getaddrinfo_cache(10, maxsize=2)
+        for host in ('a', 'b', 'a', 'c', 'a', 'b'):
+            self.loop.run_until_complete(self.loop.getaddrinfo(host, 80))
+        # 'b' was the least recently used when 'c' was added
+        self.assertEqual([args[0] for args, _ in m_gai.call_args_list],
+                         ['a', 'b', 'c', 'b'])
+
+    def test_set_getaddrinfo_cache_invalid(self):
+        with self.assertRaises(ValueError):
+            self.loop.set_getaddrinfo_cache(0)
+        with self.assertRaises(ValueError):
+            self.loop.set_getaddrinfo_cache(10, negative_ttl=-1)
+        with self.assertRaises(ValueError):
+            self.loop.set_getaddrinfo_cache(10, maxsize=0)
+
     @patch_socket
     def test_create_connection_multiple_errors(self, m_socket):
 
@@ -1219,6 +1352,118 @@ class BaseEventLoopWithSelectorTests(test_utils.TestCase):
         with self.assertRaises(OSError):
             self.loop.run_until_complete(coro)
 
+    def _setup_happy_eyeballs(self, infos, connect):
+        async def getaddrinfo(*args, **kw):
+            return infos
+
+        def getaddrinfo_task(*args, **kwds):
+            return asyncio.Task(getaddrinfo(*args, **kwds), loop=self.loop)
+
+        self.loop.getaddrinfo = getaddrinfo_task
+        self.loop.sock_connect = connect
+        self.loop._add_reader = mock.Mock()
+        self.loop._add_reader._is_coroutine = False
+        self.loop._add_writer = mock.Mock()
+        self.loop._add_writer._is_coroutine = False
+
+    @patch_socket
+    def test_create_connection_happy_eyeballs(self, m_socket):
+        attempts = []
+        cancelled = []
+
+        async def sock_connect(sock, address):
+            attempts.append(address)
+            if address[0] == '2001:db8::1':
+                # Never answers
+                try:
+                    await self.loop.create_future()
+                except asyncio.CancelledError:
+                    cancelled.append(address)
+                    raise
+
+        self._setup_happy_eyeballs(
+            [(socket.AF_INET6, 1, 6, '', ('2001:db8::1', 80, 0, 0)),
+             (socket.AF_INET, 1, 6, '', ('192.0.2.1', 80))],
+            sock_connect)
+
+        coro = self.loop.create_connection(
+            MyProto, 'example.com', 80, happy_eyeballs_delay=0.01)
+        t, p = self.loop.run_until_complete(coro)
+        try:
+            self.assertEqual(attempts, [('2001:db8::1', 80, 0, 0),
+                                        ('192.0.2.1', 80)])
+            self.assertEqual(cancelled, [('2001:db8::1', 80, 0, 0)])
+            self.assertIsInstance(p, MyProto)
+        finally:
+            t.close()
+            test_utils.run_briefly(self.loop)  # allow transport to close
+
+    @patch_socket
+    def test_create_connection_happy_eyeballs_failure(self, m_socket):
+        attempts = []
+
+        async def sock_connect(sock, address):
+            attempts.append((address, self.loop.time()))
+            if address[0] == '2001:db8::1':
+                raise ConnectionRefusedError(errno.ECONNREFUSED, 'refused')
+
+        self._setup_happy_eyeballs(
+            [(socket.AF_INET6, 1, 6, '', ('2001:db8::1', 80, 0, 0)),
+             (socket.AF_INET, 1, 6, '', ('192.0.2.1', 80))],
+            sock_connect)
+
+        # A failed attempt starts the next one without waiting for the delay
+        coro = self.loop.create_connection(
+            MyProto, 'example.com', 80, happy_eyeballs_delay=10.0)
+        t, p = self.loop.run_until_complete(coro)
+        try:
+            self.assertEqual([address for address, _ in attempts],
+                             [('2001:db8::1', 80, 0, 0), ('192.0.2.1', 80)])
+            self.assertLess(attempts[1][1] - attempts[0][1], 1.0)
+        finally:
+            t.close()
+            test_utils.run_briefly(self.loop)  # allow transport to close
+
+    @patch_socket
+    def test_create_connection_happy_eyeballs_all_errors(self, m_socket):
+        async def sock_connect(sock, address):
+            raise OSError(errno.ECONNREFUSED, 'refused {}'.format(address[0]))
+
+        self._setup_happy_eyeballs(
+            [(socket.AF_INET, 1, 6, '', ('192.0.2.1', 80)),
+             (socket.AF_INET, 1, 6, '', ('192.0.2.2', 80))],
+            sock_connect)
+
+        coro = self.loop.create_connection(
+            MyProto, 'example.com', 80, happy_eyeballs_delay=0.01)
+        with self.assertRaises(OSError) as cm:
+            self.loop.run_until_complete(coro)
+
+        self.assertTrue(str(cm.exception).startswith('Multiple exceptions: '))
+        self.assertIn('refused 192.0.2.1', str(cm.exception))
+        self.assertIn('refused 192.0.2.2', str(cm.exception))
+        self.assertTrue(m_socket.socket.return_value.close.called)
+
+    @patch_socket
+    def test_create_connection_interleave(self, m_socket):
+        attempts = []
+
+        async def sock_connect(sock, address):
+            attempts.append(address[0])
+            raise OSError(errno.ECONNREFUSED, 'refused')
+
+        self._setup_happy_eyeballs(
+            [(socket.AF_INET6, 1, 6, '', ('2001:db8::1', 80, 0, 0)),
+             (socket.AF_INET6, 1, 6, '', ('2001:db8::2', 80, 0, 0)),
+             (socket.AF_INET, 1, 6, '', ('192.0.2.1', 80))],
+            sock_connect)
+
+        coro = self.loop.create_connection(
+            MyProto, 'example.com', 80, interleave=1)
+        with self.assertRaises(OSError):
+            self.loop.run_until_complete(coro)
+        self.assertEqual(attempts, ['2001:db8::1', '192.0.2.1', '2001:db8::2'])
+
     @patch_socket
     def test_create_connection_multiple_errors_local_addr(self, m_socket):
 
@@ -3014,6 +3014,18 @@ class AbstractEventLoopTests(unittest.TestCase):
             NotImplementedError, loop.get_debug)
         self.assertRaises(
             NotImplementedError, loop.set_debug, f)
+        self.assertRaises(
+            NotImplementedError, loop.set_file_io_pool, f)
+        self.assertRaises(
+            NotImplementedError, loop.get_file_io_pool)
+        self.assertRaises(
+            NotImplementedError, loop.set_timer_wheel, f)
+        self.assertRaises(
+            NotImplementedError, loop.get_timer_wheel)
+        self.assertRaises(
+            NotImplementedError, loop.set_stats, f)
+        self.assertRaises(
+            NotImplementedError, loop.get_stats)
 
     def test_not_implemented_async(self):
 
@@ -0,0 +1,420 @@
+"""Tests for asyncio/files.py."""
+
+import io
+import socket
+import threading
+import unittest
+from unittest import mock
+
+import asyncio
+from asyncio import files
+from test import support
+from test.test_asyncio import utils as test_utils
+
+
+def tearDownModule():
+    asyncio.set_event_loop_policy(None)
+
+
+class CountingPool(asyncio.FileIOPool):
+
+    deliveries = 0
+
+    def _deliver(self):
+        self.deliveries += 1
+        super()._deliver()
+
+
+class CountingReader(io.BufferedReader):
+
+    reads = 0
+
+    def read(self, *args):
+        self.reads += 1
+        return super().read(*args)
+
+    def read1(self, *args):
+        self.reads += 1
+        return super().read1(*args)
+
+
+class FileIOPoolTests(test_utils.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+
+    def test_max_workers(self):
+        with self.assertRaises(ValueError):
+            asyncio.FileIOPool(0, loop=self.loop)
+        pool = asyncio.FileIOPool(loop=self.loop)
+        self.assertEqual(pool.max_workers, files._DEFAULT_MAX_WORKERS)
+        self.assertIn('max_workers=', repr(pool))
+
+    def test_run(self):
+        pool = asyncio.FileIOPool(2, loop=self.loop)
+        self.addCleanup(pool.shutdown)
+        result = self.loop.run_until_complete(pool.run(divmod, 7, 2))
+        self.assertEqual(result, (3, 1))
+        with self.assertRaises(ZeroDivisionError):
+            self.loop.run_until_complete(pool.run(divmod, 1, 0))
+
+    def test_bounded(self):
+        pool = asyncio.FileIOPool(3, loop=self.loop)
+        self.addCleanup(pool.shutdown)
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+        release = threading.Event()
+
+        def work(i):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            release.wait()
+            with lock:
+                running -= 1
+            return i
+
+        futs = [pool.run(work, i) for i in range(20)]
+        self.loop.call_later(0.1, release.set)
+        results = self.loop.run_until_complete(asyncio.gather(*futs))
+        self.assertEqual(results, list(range(20)))
+        self.assertLessEqual(max_running, 3)
+        self.assertLessEqual(len(pool._threads), 3)
+
+    def test_parallel(self):
+        pool = asyncio.FileIOPool(4, loop=self.loop)
+        self.addCleanup(pool.shutdown)
+        # Once a worker is idle, a burst of operations still starts enough
+        # workers to run them all at the same time.
+        self.loop.run_until_complete(pool.run(int))
+        self.assertEqual(len(pool._threads), 1)
+        barrier = threading.Barrier(4, timeout=10)
+        futs = [pool.run(barrier.wait) for i in range(4)]
+        results = self.loop.run_until_complete(asyncio.gather(*futs))
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        self.assertEqual(len(pool._threads), 4)
+
+    def test_batched_wakeups(self):
+        pool = CountingPool(1, loop=self.loop)
+        self.addCleanup(pool.shutdown)
+        release = threading.Event()
+        futs = [pool.run(release.wait)]
+        futs += [pool.run(int, i) for i in range(10)]
+        release.set()
+        # Let the worker complete all the operations before the loop
+        # wakes up.
+        while len(pool._completed) < 11:
+            release.wait(0.01)
+        self.loop.run_until_complete(asyncio.gather(*futs))
+        self.assertEqual(futs[-1].result(), 9)
+        self.assertEqual(pool.deliveries, 1)
+
+    def test_cancel_before_start(self):
+        pool = asyncio.FileIOPool(1, loop=self.loop)
+        self.addCleanup(pool.shutdown)
+        release = threading.Event()
+        calls = []
+        first = pool.run(release.wait)
+        second = pool.run(calls.append, 1)
+        second.cancel()
+        release.set()
+        self.loop.run_until_complete(first)
+        self.loop.run_until_complete(pool.run(calls.append, 2))
+        self.assertEqual(calls, [2])
+
+    def test_shutdown(self):
+        pool = asyncio.FileIOPool(2, loop=self.loop)
+        fut = pool.run(int, 5)
+        pool.shutdown()
+        self.assertEqual(pool._threads[0].is_alive(), False)
+        self.assertEqual(self.loop.run_until_complete(fut), 5)
+        with self.assertRaises(RuntimeError):
+            pool.run(int, 1)
+
+    def test_loop_pool(self):
+        pool = self.loop.get_file_io_pool()
+        self.assertIsInstance(pool, asyncio.FileIOPool)
+        self.assertIs(self.loop.get_file_io_pool(), pool)
+
+        other = asyncio.FileIOPool(1, loop=self.loop)
+        self.loop.set_file_io_pool(other)
+        self.assertIs(self.loop.get_file_io_pool(), other)
+        self.loop.set_file_io_pool(None)
+        self.assertIsNot(self.loop.get_file_io_pool(), other)
+        pool.shutdown()
+        other.shutdown()
+
+        with self.assertRaises(TypeError):
+            self.loop.set_file_io_pool(object())
+        other_loop = asyncio.new_event_loop()
+        self.addCleanup(other_loop.close)
+        with self.assertRaises(ValueError):
+            self.loop.set_file_io_pool(
+                asyncio.FileIOPool(1, loop=other_loop))
+
+    def test_close_loop(self):
+        pool = self.loop.get_file_io_pool()
+        self.loop.run_until_complete(pool.run(int, 1))
+        self.loop.close()
+        for thread in pool._threads:
+            thread.join()
+        with self.assertRaises(RuntimeError):
+            self.loop.get_file_io_pool()
+
+
+class AsyncFileTests(test_utils.TestCase):
+
+    DATA = b''.join(b'line %d\n' % i for i in range(20000))
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+        with open(support.TESTFN, 'wb') as f:
+            f.write(self.DATA)
+        self.addCleanup(support.unlink, support.TESTFN)
+
+    def run_loop(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def open(self, mode='rb', **kwargs):
+        f = self.run_loop(asyncio.open_file(support.TESTFN, mode,
+                                            loop=self.loop, **kwargs))
+        self.addCleanup(f.file.close)
+        return f
+
+    def test_open(self):
+        f = self.open()
+        self.assertIsInstance(f, asyncio.AsyncFile)
+        self.assertEqual(f.name, support.TESTFN)
+        self.assertEqual(f.mode, 'rb')
+        self.assertEqual(f.fileno(), f.file.fileno())
+        self.assertFalse(f.closed)
+        self.run_loop(f.close())
+        self.assertTrue(f.closed)
+
+    def test_open_error(self):
+        with self.assertRaises(FileNotFoundError):
+            self.run_loop(asyncio.open_file(support.TESTFN + '.missing',
+                                            loop=self.loop))
+
+    def test_context_manager(self):
+        async def main():
+            async with await asyncio.open_file(support.TESTFN, 'rb',
+                                               loop=self.loop) as f:
+                return f, await f.read()
+
+        f, data = self.run_loop(main())
+        self.assertEqual(data, self.DATA)
+        self.assertTrue(f.closed)
+
+    def open_counting(self):
+        file = CountingReader(io.FileIO(support.TESTFN))
+        self.addCleanup(file.close)
+        return asyncio.AsyncFile(file, loop=self.loop)
+
+    def check_small_reads(self, size):
+        f = self.open_counting()
+
+        async def main():
+            chunks = []
+            while True:
+                chunk = await f.read(size)
+                if not chunk:
+                    return b''.join(chunks)
+                self.assertLessEqual(len(chunk), size)
+                chunks.append(chunk)
+
+        self.assertEqual(self.run_loop(main()), self.DATA)
+        # Small reads are batched
+        self.assertLess(f.file.reads, len(self.DATA) // size // 100)
+
+    def test_read_small(self):
+        self.check_small_reads(1)
+        self.check_small_reads(100)
+
+    def test_read(self):
+        f = self.open()
+        self.assertEqual(self.run_loop(f.read(5)), self.DATA[:5])
+        size = files._READAHEAD_SIZE + 10
+        self.assertEqual(self.run_loop(f.read(size)), self.DATA[5:size + 5])
+        self.assertEqual(self.run_loop(f.read()), self.DATA[size + 5:])
+        self.assertEqual(self.run_loop(f.read()), b'')
+
+    def test_readinto(self):
+        f = self.open()
+        buf = bytearray(10)
+        self.assertEqual(self.run_loop(f.readinto(buf)), 10)
+        self.assertEqual(buf, self.DATA[:10])
+        big = bytearray(files._READAHEAD_SIZE * 2)
+        self.assertEqual(self.run_loop(f.readinto(big)), len(big))
+        self.assertEqual(big, self.DATA[10:len(big) + 10])
+        self.run_loop(f.seek(-3, io.SEEK_END))
+        self.assertEqual(self.run_loop(f.readinto(buf)), 3)
+        self.assertEqual(buf[:3], self.DATA[-3:])
+
+    def test_readline(self):
+        f = self.open()
+        self.assertEqual(self.run_loop(f.readline()), b'line 0\n')
+        self.assertEqual(self.run_loop(f.readline(3)), b'lin')
+        self.assertEqual(self.run_loop(f.readline(100)), b'e 1\n')
+        self.assertEqual(self.run_loop(f.readline(0)), b'')
+
+    def test_iterate(self):
+        f = self.open_counting()
+
+        async def main():
+            return [line async for line in f]
+
+        self.assertEqual(self.run_loop(main()),
+                         self.DATA.splitlines(keepends=True))
+        self.assertLess(f.file.reads, 10)
+
+    def test_readlines(self):
+        f = self.open()
+        lines = self.run_loop(f.readlines(20))
+        self.assertEqual(lines, [b'line 0\n', b'line 1\n', b'line 2\n'])
+        lines = self.run_loop(f.readlines())
+        self.assertEqual(lines, self.DATA.splitlines(keepends=True)[3:])
+
+    def test_seek_tell(self):
+        f = self.open()
+        self.run_loop(f.read(10))
+        self.assertEqual(self.run_loop(f.tell()), 10)
+        self.assertEqual(self.run_loop(f.seek(5, io.SEEK_CUR)), 15)
+        self.assertEqual(self.run_loop(f.read(5)), self.DATA[15:20])
+        self.assertEqual(self.run_loop(f.seek(100)), 100)
+        self.assertEqual(self.run_loop(f.read(3)), self.DATA[100:103])
+        self.assertEqual(self.run_loop(f.tell()), 103)
+
+    def test_text(self):
+        f = self.open('r', encoding='ascii')
+        self.assertFalse(f._readahead)
+        self.assertEqual(self.run_loop(f.readline()), 'line 0\n')
+        self.assertEqual(self.run_loop(f.read(4)), 'line')
+
+        async def main():
+            return [line async for line in f]
+
+        lines = self.run_loop(main())
+        self.assertEqual(lines[0], ' 1\n')
+        self.assertEqual(len(lines), 19999)
+
+    def test_write(self):
+        f = self.open('r+b')
+        self.assertFalse(f._readahead)
+        self.assertEqual(self.run_loop(f.read(5)), self.DATA[:5])
+        self.assertEqual(self.run_loop(f.write(b'12345')), 5)
+        self.run_loop(f.writelines([b'a', b'b']))
+        self.run_loop(f.flush())
+        self.assertEqual(self.run_loop(f.tell()), 12)
+        self.run_loop(f.truncate())
+        self.run_loop(f.close())
+        with open(support.TESTFN, 'rb') as fp:
+            self.assertEqual(fp.read(), self.DATA[:5] + b'12345ab')
+
+
+class AsyncFileSendfileTests(test_utils.TestCase):
+
+    DATA = b"12345abcde" * 64 * 1024  # 640 KiB
+
+    class MyProto(asyncio.Protocol):
+
+        def __init__(self, loop):
+            self.data = bytearray()
+            self.done = loop.create_future()
+            self.transport = None
+
+        def connection_made(self, transport):
+            self.transport = transport
+
+        def data_received(self, data):
+            self.data.extend(data)
+
+        def connection_lost(self, exc):
+            self.done.set_result(None)
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+        with open(support.TESTFN, 'wb') as f:
+            f.write(self.DATA)
+        self.addCleanup(support.unlink, support.TESTFN)
+
+    def run_loop(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def prepare(self):
+        srv_proto = self.MyProto(self.loop)
+        server = self.run_loop(self.loop.create_server(
+            lambda: srv_proto, support.HOST, 0))
+        self.addCleanup(self.run_loop, server.wait_closed())
+        self.addCleanup(server.close)
+        port = server.sockets[0].getsockname()[1]
+        _, cli_proto = self.run_loop(self.loop.create_connection(
+            lambda: self.MyProto(self.loop), support.HOST, port))
+        test_utils.run_until(self.loop, lambda: srv_proto.transport)
+        return srv_proto, cli_proto
+
+    def check_sendfile(self, offset, count, expected):
+        srv_proto, cli_proto = self.prepare()
+        f = self.run_loop(asyncio.open_file(support.TESTFN, 'rb',
+                                            loop=self.loop))
+        self.addCleanup(f.file.close)
+        self.run_loop(f.read(offset))
+        sent = self.run_loop(f.sendfile(cli_proto.transport, count))
+        self.assertEqual(sent, len(expected))
+        self.assertEqual(self.run_loop(f.tell()), offset + sent)
+        cli_proto.transport.close()
+        self.run_loop(srv_proto.done)
+        self.assertEqual(srv_proto.data, expected)
+
+    def test_sendfile(self):
+        self.check_sendfile(0, None, self.DATA)
+
+    def test_sendfile_offset_count(self):
+        self.check_sendfile(1000, 300000, self.DATA[1000:301000])
+
+    def test_sendfile_fallback(self):
+        with mock.patch.object(
+                self.loop, '_sendfile_native',
+                side_effect=asyncio.SendfileNotAvailableError):
+            self.check_sendfile(1000, None, self.DATA[1000:])
+
+    def test_sendfile_fallback_cancel(self):
+        srv_proto, cli_proto = self.prepare()
+        # Stop reading, so that the data piles up in the write buffer
+        srv_proto.transport.pause_reading()
+        sock = cli_proto.transport.get_extra_info('socket')
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        file = open(support.TESTFN, 'rb')
+        self.addCleanup(file.close)
+
+        async def main():
+            task = self.loop.create_task(self.loop.sendfile(
+                cli_proto.transport, file))
+            while not cli_proto.transport.get_write_buffer_size():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch.object(
+                self.loop, '_sendfile_native',
+                side_effect=asyncio.SendfileNotAvailableError):
+            self.run_loop(main())
+        self.assertLess(file.tell(), len(self.DATA))
+        srv_proto.transport.resume_reading()
+        cli_proto.transport.close()
+        self.run_loop(srv_proto.done)
+        # The file position is right after the data written
+        self.assertEqual(bytes(srv_proto.data), self.DATA[:file.tell()])
+
+
+if __name__ == '__main__':
+    unittest.main()
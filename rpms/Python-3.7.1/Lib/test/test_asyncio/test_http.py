@@ -0,0 +1,558 @@
+"""Tests for asyncio/http.py."""
+
+import http.client
+import io
+import unittest
+from unittest import mock
+
+import asyncio
+import asyncio.http
+from asyncio.http import ConnectionPool, Response
+from test.test_asyncio import utils as test_utils
+
+
+def tearDownModule():
+    asyncio.set_event_loop_policy(None)
+
+
+async def echo(request):
+    body = await request.read()
+    headers = {'X-Method': request.method, 'X-Path': request.path}
+    return Response(200, headers, body)
+
+
+class ParseHeadTests(unittest.TestCase):
+
+    def check(self, fields):
+        head = b'GET / HTTP/1.1\r\n' + fields + b'\r\n'
+        line, headers = asyncio.http._parse_head(head)
+        expected = http.client.parse_headers(io.BytesIO(fields + b'\r\n'))
+        self.assertEqual(line, 'GET / HTTP/1.1')
+        self.assertIsInstance(headers, http.client.HTTPMessage)
+        self.assertEqual(headers.items(), expected.items())
+        self.assertEqual(list(map(type, headers.defects)),
+                         list(map(type, expected.defects)))
+
+    def test_parse_head(self):
+        self.check(b'')
+        self.check(b'Host: example.com\r\nAccept:*/*\r\n'
+                   b'X-Empty:\r\nX-Spaces: \t a b  \r\n'
+                   b'X-Dup: 1\r\nx-dup: 2\r\n')
+        self.check(b'X-Latin: caf\xe9\r\n')
+        # Unusual heads are parsed by the email parser.
+        self.check(b'X-Folded: a\r\n b\r\n')
+        self.check(b'X-Bare: a\nX-Next: b\r\n')
+        self.check(b'X-CR: a\rb\r\n')
+        self.check(b'Bad Name: a\r\nHost: b\r\n')
+        self.check(b'X: a\r\n' * 98)
+
+    def test_too_many_headers(self):
+        with self.assertRaises(http.client.HTTPException):
+            asyncio.http._parse_head(b'GET / HTTP/1.1\r\n' +
+                                     b'X: a\r\n' * 100 + b'\r\n')
+
+
+class HTTPTestCase(test_utils.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+
+    def run_loop(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def start(self, handler=echo, **kwds):
+        server = self.run_loop(asyncio.http.start_server(
+            handler, '127.0.0.1', 0, loop=self.loop, **kwds))
+        self.addCleanup(self.run_loop, self.stop(server))
+        self.port = server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{self.port}'
+        return server
+
+    async def stop(self, server):
+        # Close the server and wait for its connections to be closed.
+        waiter = self.loop.create_task(server.wait_closed())
+        await asyncio.sleep(0, loop=self.loop)
+        server.close()
+        await asyncio.wait_for(waiter, 5, loop=self.loop)
+
+    def pool(self, **kwds):
+        pool = ConnectionPool(loop=self.loop, **kwds)
+        self.addCleanup(self.run_loop, pool.close())
+        return pool
+
+    async def exchange(self, data, *, port=None):
+        # Send raw data and return everything received until the server
+        # closes the connection.
+        reader, writer = await asyncio.open_connection(
+            '127.0.0.1', port or self.port, loop=self.loop)
+        writer.write(data)
+        try:
+            return await reader.read()
+        finally:
+            writer.close()
+
+
+class ServerTests(HTTPTestCase):
+
+    def test_request(self):
+        self.start()
+        pool = self.pool()
+
+        async def main():
+            response = await pool.request('POST', self.url + '/a?b=c',
+                                          body=b'data')
+            return response, await response.read()
+
+        response, body = self.run_loop(main())
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.reason, 'OK')
+        self.assertEqual(response.version, 'HTTP/1.1')
+        self.assertEqual(body, b'data')
+        self.assertEqual(response.headers['X-Method'], 'POST')
+        self.assertEqual(response.headers['X-Path'], '/a?b=c')
+        self.assertEqual(response.headers['Content-Length'], '4')
+        self.assertIn('Date', response.headers)
+
+    def test_keep_alive(self):
+        peers = set()
+
+        async def handler(request):
+            peers.add(request.get_extra_info('peername'))
+            return Response(body=b'ok')
+
+        self.start(handler)
+        pool = self.pool()
+
+        async def main():
+            for _ in range(5):
+                response = await pool.request('GET', self.url)
+                self.assertEqual(await response.read(), b'ok')
+
+        self.run_loop(main())
+        self.assertEqual(len(peers), 1)
+
+    def test_pipelining(self):
+        self.start()
+        data = self.run_loop(self.exchange(
+            b'POST /1 HTTP/1.1\r\nContent-Length: 3\r\n\r\none'
+            b'GET /2 HTTP/1.1\r\n\r\n'
+            b'POST /3 HTTP/1.1\r\nContent-Length: 5\r\n'
+            b'Connection: close\r\n\r\nthree'))
+        responses = data.split(b'HTTP/1.1 200 OK\r\n')
+        self.assertEqual(responses[0], b'')
+        self.assertEqual(len(responses), 4)
+        self.assertIn(b'X-Path: /1\r\n', responses[1])
+        self.assertTrue(responses[1].endswith(b'\r\n\r\none'))
+        self.assertIn(b'X-Path: /2\r\n', responses[2])
+        self.assertIn(b'Content-Length: 0\r\n', responses[2])
+        self.assertIn(b'X-Path: /3\r\n', responses[3])
+        self.assertIn(b'Connection: close\r\n', responses[3])
+        self.assertTrue(responses[3].endswith(b'\r\n\r\nthree'))
+
+    def test_http10(self):
+        self.start()
+        data = self.run_loop(self.exchange(b'GET / HTTP/1.0\r\n\r\n'))
+        self.assertTrue(data.startswith(b'HTTP/1.1 200 OK\r\n'))
+        self.assertIn(b'Connection: close\r\n', data)
+
+        data = self.run_loop(self.exchange(
+            b'GET /1 HTTP/1.0\r\nConnection: keep-alive\r\n\r\n'
+            b'GET /2 HTTP/1.0\r\n\r\n'))
+        first, second = data.split(b'HTTP/1.1 200 OK\r\n')[1:]
+        self.assertIn(b'Connection: keep-alive\r\n', first)
+        self.assertIn(b'Connection: close\r\n', second)
+
+    def test_chunked_request(self):
+        self.start()
+        data = self.run_loop(self.exchange(
+            b'POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n'
+            b'Connection: close\r\n\r\n'
+            b'3;ext=1\r\nabc\r\n10\r\n0123456789abcdef\r\n0\r\n'
+            b'Trailer: x\r\n\r\n'))
+        self.assertIn(b'Content-Length: 19\r\n', data)
+        self.assertTrue(data.endswith(b'\r\n\r\nabc0123456789abcdef'))
+
+    def test_chunked_request_iteration(self):
+        pieces = []
+
+        async def handler(request):
+            async for data in request:
+                pieces.append(data)
+            return Response()
+
+        self.start(handler)
+        self.run_loop(self.exchange(
+            b'POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n'
+            b'Connection: close\r\n\r\n'
+            b'3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n'))
+        self.assertEqual(b''.join(pieces), b'abcde')
+
+    def test_streamed_response(self):
+        async def body():
+            yield b'abc'
+            yield b''
+            yield b'defgh'
+
+        async def handler(request):
+            return Response(body=body())
+
+        self.start(handler)
+        data = self.run_loop(self.exchange(
+            b'GET / HTTP/1.1\r\nConnection: close\r\n\r\n'))
+        self.assertIn(b'Transfer-Encoding: chunked\r\n', data)
+        self.assertTrue(data.endswith(b'\r\n\r\n3\r\nabc\r\n5\r\ndefgh\r\n'
+                                      b'0\r\n\r\n'))
+
+        # HTTP/1.0 has no chunked transfer encoding.
+        data = self.run_loop(self.exchange(b'GET / HTTP/1.0\r\n\r\n'))
+        self.assertNotIn(b'Transfer-Encoding', data)
+        self.assertTrue(data.endswith(b'\r\n\r\nabcdefgh'))
+
+        pool = self.pool()
+
+        async def main():
+            response = await pool.request('GET', self.url)
+            return [data async for data in response]
+
+        self.assertEqual(b''.join(self.run_loop(main())), b'abcdefgh')
+
+    def test_head(self):
+        async def handler(request):
+            return Response(body=b'0123456789')
+
+        self.start(handler)
+        data = self.run_loop(self.exchange(
+            b'HEAD / HTTP/1.1\r\n\r\n'
+            b'GET / HTTP/1.1\r\nConnection: close\r\n\r\n'))
+        head, rest = data.split(b'\r\n\r\n', 1)
+        self.assertIn(b'\r\nContent-Length: 10', head)
+        self.assertTrue(rest.startswith(b'HTTP/1.1 200 OK\r\n'))
+        self.assertTrue(rest.endswith(b'\r\n\r\n0123456789'))
+
+        pool = self.pool()
+
+        async def main():
+            response = await pool.request('HEAD', self.url)
+            self.assertEqual(response.headers['Content-Length'], '10')
+            return await response.read()
+
+        self.assertEqual(self.run_loop(main()), b'')
+
+    def test_no_content(self):
+        async def handler(request):
+            return Response(204)
+
+        self.start(handler)
+        data = self.run_loop(self.exchange(
+            b'GET / HTTP/1.1\r\nConnection: close\r\n\r\n'))
+        self.assertTrue(data.startswith(b'HTTP/1.1 204 No Content\r\n'))
+        self.assertNotIn(b'Content-Length', data)
+
+    def check_error(self, request, status, **kwds):
+        self.start(**kwds)
+        data = self.run_loop(self.exchange(request))
+        self.assertTrue(data.startswith(b'HTTP/1.1 %d ' % status), data)
+        self.assertIn(b'Connection: close\r\n', data)
+
+    def test_bad_request_line(self):
+        self.check_error(b'GARBAGE\r\n\r\n', 400)
+
+    def test_bad_version(self):
+        self.check_error(b'GET / HTTX/1.1\r\n\r\n', 400)
+
+    def test_unsupported_version(self):
+        self.check_error(b'GET / HTTP/2.0\r\n\r\n', 505)
+
+    def test_bad_content_length(self):
+        self.check_error(b'POST / HTTP/1.1\r\nContent-Length: -1\r\n\r\n',
+                         400)
+
+    def test_conflicting_content_length(self):
+        self.check_error(b'POST / HTTP/1.1\r\nContent-Length: 1\r\n'
+                         b'Content-Length: 2\r\n\r\nab', 400)
+
+    def test_content_length_and_chunked(self):
+        self.check_error(b'POST / HTTP/1.1\r\nContent-Length: 1\r\n'
+                         b'Transfer-Encoding: chunked\r\n\r\n', 400)
+
+    def test_unsupported_transfer_encoding(self):
+        self.check_error(b'POST / HTTP/1.1\r\n'
+                         b'Transfer-Encoding: gzip\r\n\r\n', 400)
+
+    def test_head_too_large(self):
+        self.check_error(b'GET / HTTP/1.1\r\nX: ' + b'x' * 2000 + b'\r\n\r\n',
+                         431, limit=1024)
+
+    def test_handler_error(self):
+        async def handler(request):
+            raise ZeroDivisionError
+
+        handler_calls = []
+        self.loop.set_exception_handler(
+            lambda loop, context: handler_calls.append(context))
+        self.start(handler)
+        data = self.run_loop(self.exchange(b'GET / HTTP/1.1\r\n\r\n'))
+        self.assertTrue(data.startswith(b'HTTP/1.1 500 '))
+        self.assertEqual(len(handler_calls), 1)
+        self.assertIsInstance(handler_calls[0]['exception'],
+                              ZeroDivisionError)
+
+    def test_expect_continue(self):
+        self.start()
+
+        async def main():
+            reader, writer = await asyncio.open_connection(
+                '127.0.0.1', self.port, loop=self.loop)
+            writer.write(b'POST / HTTP/1.1\r\nContent-Length: 4\r\n'
+                         b'Expect: 100-continue\r\n\r\n')
+            interim = await reader.readuntil(b'\r\n\r\n')
+            writer.write(b'body')
+            head = await reader.readuntil(b'\r\n\r\n')
+            body = await reader.readexactly(4)
+            writer.close()
+            return interim, head, body
+
+        interim, head, body = self.run_loop(main())
+        self.assertEqual(interim, b'HTTP/1.1 100 Continue\r\n\r\n')
+        self.assertTrue(head.startswith(b'HTTP/1.1 200 OK\r\n'))
+        self.assertEqual(body, b'body')
+
+    def test_unread_body(self):
+        async def handler(request):
+            return Response(body=request.path.encode())
+
+        self.start(handler)
+        data = self.run_loop(self.exchange(
+            b'POST /1 HTTP/1.1\r\nContent-Length: 3\r\n\r\nabc'
+            b'POST /2 HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+            b'1\r\na\r\n0\r\n\r\n'
+            b'GET /3 HTTP/1.1\r\nConnection: close\r\n\r\n'))
+        self.assertEqual(data.count(b'HTTP/1.1 200 OK'), 3)
+        self.assertTrue(data.endswith(b'/3'))
+
+    def test_keepalive_timeout(self):
+        self.start(keepalive_timeout=0.01)
+
+        async def main():
+            reader, writer = await asyncio.open_connection(
+                '127.0.0.1', self.port, loop=self.loop)
+            writer.write(b'GET / HTTP/1.1\r\n\r\n')
+            data = await reader.read()
+            writer.close()
+            return data
+
+        data = self.run_loop(main())
+        self.assertTrue(data.startswith(b'HTTP/1.1 200 OK\r\n'))
+
+    def test_http_client(self):
+        self.start()
+
+        def client():
+            conn = http.client.HTTPConnection('127.0.0.1', self.port)
+            try:
+                results = []
+                for body in (b'one', b'two'):
+                    conn.request('PUT', '/x', body=body)
+                    response = conn.getresponse()
+                    results.append((response.status, response.read()))
+                return results
+            finally:
+                conn.close()
+
+        results = self.run_loop(self.loop.run_in_executor(None, client))
+        self.assertEqual(results, [(200, b'one'), (200, b'two')])
+
+
+class ClientTests(HTTPTestCase):
+
+    def test_invalid_url(self):
+        pool = self.pool()
+        with self.assertRaises(ValueError):
+            self.run_loop(pool.request('GET', 'ftp://example.com/'))
+        with self.assertRaises(ValueError):
+            self.run_loop(pool.request('GET', 'http:///path'))
+        with self.assertRaises(ValueError):
+            ConnectionPool(limit_per_host=0, loop=self.loop)
+
+    def test_invalid_header(self):
+        pool = self.pool()
+        with self.assertRaises(ValueError):
+            self.run_loop(pool.request('GET', 'http://127.0.0.1/',
+                                       headers={'X': 'a\r\nb: c'}))
+
+    def test_limit_per_host(self):
+        running = 0
+        max_running = 0
+        peers = set()
+
+        async def handler(request):
+            nonlocal running, max_running
+            peers.add(request.get_extra_info('peername'))
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return Response(body=request.path.encode())
+
+        self.start(handler)
+        pool = self.pool(limit_per_host=2)
+        self.assertEqual(pool.limit_per_host, 2)
+
+        async def get(i):
+            response = await pool.request('GET', f'{self.url}/{i}')
+            return await response.read()
+
+        results = self.run_loop(asyncio.gather(
+            *[get(i) for i in range(6)], loop=self.loop))
+        self.assertEqual(results, [b'/%d' % i for i in range(6)])
+        self.assertEqual(max_running, 2)
+        self.assertEqual(len(peers), 2)
+
+    def test_cancel_waiting(self):
+        self.start()
+        pool = self.pool(limit_per_host=1)
+
+        async def main():
+            first = await pool.request('POST', self.url, body=b'first')
+            waiting = self.loop.create_task(pool.request('GET', self.url))
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            await first.read()
+            response = await pool.request('GET', self.url, body=b'x')
+            return await response.read()
+
+        self.assertEqual(self.run_loop(main()), b'x')
+
+    def test_close_response(self):
+        async def handler(request):
+            return Response(body=b'x' * 100000)
+
+        self.start(handler)
+        pool = self.pool(limit_per_host=1)
+
+        async def main():
+            async with await pool.request('GET', self.url) as response:
+                self.assertEqual(len(await response.read(10)), 10)
+            self.assertEqual(len(pool._idle), 0)
+            self.assertEqual(len(pool._open), 0)
+            response = await pool.request('GET', self.url)
+            return await response.read()
+
+        self.assertEqual(len(self.run_loop(main())), 100000)
+
+    def test_streamed_request(self):
+        self.start()
+        pool = self.pool()
+
+        async def body():
+            yield b'abc'
+            yield b'def'
+
+        async def main():
+            response = await pool.request('POST', self.url, body=body())
+            return await response.read()
+
+        self.assertEqual(self.run_loop(main()), b'abcdef')
+
+    def check_closed_connection(self, method):
+        peers = []
+
+        async def handler(request):
+            peers.append(request.get_extra_info('peername'))
+            return Response(body=b'ok')
+
+        self.start(handler, keepalive_timeout=0.01)
+        pool = self.pool()
+
+        async def main():
+            response = await pool.request('GET', self.url)
+            await response.read()
+            # Let the server close the idle connection without the pool
+            # noticing it, as if the request was sent at the same time.
+            connection, = pool._idle['http', '127.0.0.1', self.port]
+            await asyncio.sleep(0.1)
+            with mock.patch.object(connection, 'is_usable',
+                                   return_value=True):
+                response = await pool.request(method, self.url)
+            return await response.read()
+
+        return self.run_loop(main()), peers
+
+    def test_retry_closed_connection(self):
+        body, peers = self.check_closed_connection('GET')
+        self.assertEqual(body, b'ok')
+        self.assertEqual(len(peers), 2)
+
+    def test_no_retry_not_idempotent(self):
+        # The server may have processed a POST before closing the
+        # connection: it is not sent again.
+        with self.assertRaises(ConnectionError):
+            self.check_closed_connection('POST')
+
+    def check_raw_response(self, data, method='GET'):
+        # Return the body of the response data received from a server.
+        async def serve(reader, writer):
+            await reader.readuntil(b'\r\n\r\n')
+            writer.write(data)
+            writer.close()
+
+        server = self.run_loop(asyncio.start_server(
+            serve, '127.0.0.1', 0, loop=self.loop))
+        self.addCleanup(self.run_loop, self.stop(server))
+        port = server.sockets[0].getsockname()[1]
+        pool = self.pool()
+
+        async def main():
+            response = await pool.request(method,
+                                          f'http://127.0.0.1:{port}/')
+            return response, await response.read()
+
+        return self.run_loop(main())
+
+    def test_read_until_eof(self):
+        response, body = self.check_raw_response(
+            b'HTTP/1.0 200 OK\r\nX: y\r\n\r\nall of it')
+        self.assertEqual(response.version, 'HTTP/1.0')
+        self.assertEqual(response.headers['X'], 'y')
+        self.assertEqual(body, b'all of it')
+
+    def test_interim_response(self):
+        response, body = self.check_raw_response(
+            b'HTTP/1.1 100 Continue\r\n\r\n'
+            b'HTTP/1.1 201 Created\r\nContent-Length: 2\r\n\r\nok')
+        self.assertEqual(response.status, 201)
+        self.assertEqual(response.reason, 'Created')
+        self.assertEqual(body, b'ok')
+
+    def test_no_reason(self):
+        response, body = self.check_raw_response(
+            b'HTTP/1.1 299\r\nContent-Length: 0\r\n\r\n')
+        self.assertEqual(response.status, 299)
+        self.assertEqual(response.reason, '')
+
+    def test_bad_status_line(self):
+        with self.assertRaises(http.client.BadStatusLine):
+            self.check_raw_response(b'HTTP/1.1 abc\r\n\r\n')
+
+    def test_remote_disconnected(self):
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.check_raw_response(b'')
+
+    def test_incomplete_body(self):
+        with self.assertRaises(http.client.IncompleteRead):
+            self.check_raw_response(
+                b'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nabc')
+
+    def test_bad_chunk(self):
+        with self.assertRaises(http.client.HTTPException):
+            self.check_raw_response(
+                b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+                b'xyz\r\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""Tests for asyncio/loopstats.py."""
+
+import gc
+import json
+import time
+import unittest
+
+import asyncio
+from test.test_asyncio import utils as test_utils
+
+
+def tearDownModule():
+    asyncio.set_event_loop_policy(None)
+
+
+class LoopStatsTests(test_utils.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+
+    def test_set_stats(self):
+        self.assertIsNone(self.loop.get_stats())
+        stats = asyncio.LoopStats()
+        self.loop.set_stats(stats)
+        self.assertIs(self.loop.get_stats(), stats)
+        self.loop.set_stats(None)
+        self.assertIsNone(self.loop.get_stats())
+        with self.assertRaises(TypeError):
+            self.loop.set_stats({})
+
+    def test_iterations(self):
+        stats = asyncio.LoopStats()
+        self.loop.set_stats(stats)
+        calls = []
+        for i in range(3):
+            self.loop.call_soon(calls.append, i)
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        self.assertEqual(calls, [0, 1, 2])
+
+        data = stats.as_dict()
+        self.assertEqual(data['iterations'], 1)
+        self.assertEqual(data['select_time']['count'], 1)
+        self.assertEqual(data['iteration_latency']['count'], 1)
+        self.assertEqual(data['callback_time']['count'], 4)
+        ready = data['ready_queue']
+        self.assertEqual(ready['max'], 4)
+        self.assertEqual([b['count'] for b in ready['buckets']
+                          if b['le'] == 4], [1])
+
+    def test_histogram_buckets(self):
+        stats = asyncio.LoopStats()
+        self.loop.set_stats(stats)
+        self.loop.call_soon(time.sleep, 0.012)
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+
+        callbacks = stats.as_dict()['callback_time']
+        self.assertGreaterEqual(callbacks['max'], 0.012)
+        self.assertGreaterEqual(callbacks['total'], 0.012)
+        buckets = callbacks['buckets']
+        self.assertIsNone(buckets[-1]['le'])
+        self.assertEqual(sum(b['count'] for b in buckets), 2)
+        slow = [b['count'] for b in buckets
+                if b['le'] is None or b['le'] > 0.01]
+        self.assertEqual(sum(slow), 1)
+
+    def test_task_stats(self):
+        async def spin(n):
+            for _ in range(n):
+                await asyncio.sleep(0)
+            t0 = time.thread_time()
+            while time.thread_time() - t0 < 0.01:
+                pass
+
+        stats = asyncio.LoopStats()
+        self.loop.set_stats(stats)
+        task = self.loop.create_task(spin(3))
+        self.assertIsNone(stats.get_task_stats(task))
+        self.loop.run_until_complete(task)
+
+        task_stats = stats.get_task_stats(task)
+        self.assertEqual(task_stats['steps'], 4)
+        self.assertGreaterEqual(task_stats['run_time'], 0.01)
+        self.assertGreaterEqual(task_stats['cpu_time'], 0.01)
+
+        data = stats.as_dict()
+        [task_data] = data['tasks']
+        self.assertEqual(task_data['id'], id(task))
+        self.assertTrue(task_data['done'])
+        self.assertEqual(task_data['coro'], spin.__qualname__)
+        self.assertEqual(task_data['steps'], 4)
+        self.assertEqual(data['coros'][spin.__qualname__]['steps'], 4)
+
+        # The statistics of the coroutine outlive the task
+        del task, task_data
+        gc.collect()
+        data = stats.as_dict()
+        self.assertEqual(data['tasks'], [])
+        self.assertEqual(data['coros'][spin.__qualname__]['steps'], 4)
+
+    def test_no_cpu_time(self):
+        stats = asyncio.LoopStats(cpu_time=False)
+        self.loop.set_stats(stats)
+        task = self.loop.create_task(asyncio.sleep(0))
+        self.loop.run_until_complete(task)
+        task_stats = stats.get_task_stats(task)
+        self.assertEqual(task_stats['steps'], 2)
+        self.assertEqual(task_stats['cpu_time'], 0.0)
+
+    def test_max_tasks(self):
+        async def run(delay):
+            await asyncio.sleep(0)
+            time.sleep(delay)
+
+        stats = asyncio.LoopStats()
+        self.loop.set_stats(stats)
+        tasks = [self.loop.create_task(run(delay))
+                 for delay in (0, 0.02, 0.01)]
+        self.loop.run_until_complete(asyncio.gather(*tasks))
+
+        data = stats.as_dict(max_tasks=2)
+        self.assertEqual([t['id'] for t in data['tasks']],
+                         [id(tasks[1]), id(tasks[2])])
+        self.assertEqual(len(stats.as_dict(max_tasks=None)['tasks']), 3)
+
+    def test_debug(self):
+        stats = asyncio.LoopStats()
+        self.loop.set_stats(stats)
+        self.loop.set_debug(True)
+        task = self.loop.create_task(asyncio.sleep(0))
+        self.loop.run_until_complete(task)
+        self.assertEqual(stats.get_task_stats(task)['steps'], 2)
+
+    def test_reset(self):
+        stats = asyncio.LoopStats()
+        self.loop.set_stats(stats)
+        task = self.loop.create_task(asyncio.sleep(0))
+        self.loop.run_until_complete(task)
+        stats.reset()
+        self.assertIsNone(stats.get_task_stats(task))
+        data = stats.as_dict()
+        self.assertEqual(data['iterations'], 0)
+        self.assertEqual(data['coros'], {})
+
+    def test_to_json(self):
+        stats = asyncio.LoopStats()
+        self.loop.set_stats(stats)
+        self.loop.run_until_complete(asyncio.sleep(0))
+        data = json.loads(stats.to_json(indent=2))
+        self.assertEqual(data, stats.as_dict())
+        self.assertIn('iterations=', repr(stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
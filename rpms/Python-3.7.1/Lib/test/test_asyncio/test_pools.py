@@ -0,0 +1,295 @@
+"""Tests for asyncio/pools.py."""
+
+import unittest
+
+import asyncio
+from test.test_asyncio import utils as test_utils
+
+
+def tearDownModule():
+    asyncio.set_event_loop_policy(None)
+
+
+class Tracker:
+    """Coroutine function recording how many calls run concurrently."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.running = 0
+        self.max_running = 0
+        self.started = []
+        self.cancelled = []
+
+    async def __call__(self, item):
+        self.started.append(item)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(item, 0))
+            if isinstance(item, Exception):
+                raise item
+            return item * 10
+        except asyncio.CancelledError:
+            self.cancelled.append(item)
+            raise
+        finally:
+            self.running -= 1
+
+
+class TaskPoolTests(test_utils.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+
+    def test_limit(self):
+        with self.assertRaises(ValueError):
+            asyncio.TaskPool(0, loop=self.loop)
+        pool = asyncio.TaskPool(3, loop=self.loop)
+        self.assertEqual(pool.limit, 3)
+        self.assertEqual(len(pool), 0)
+        self.assertIn('limit=3', repr(pool))
+
+    def test_spawn(self):
+        pool = asyncio.TaskPool(2, loop=self.loop)
+        tracker = Tracker({i: 0.01 for i in range(5)})
+
+        async def main():
+            spawned = []
+            for i in range(5):
+                spawned.append(await pool.spawn(tracker(i)))
+                self.assertLessEqual(len(pool), 2)
+            await pool.join()
+            return [task.result() for task in spawned]
+
+        results = self.loop.run_until_complete(main())
+        self.assertEqual(results, [0, 10, 20, 30, 40])
+        self.assertEqual(tracker.max_running, 2)
+        self.assertEqual(len(pool), 0)
+
+    def test_spawn_not_coroutine(self):
+        pool = asyncio.TaskPool(2, loop=self.loop)
+        with self.assertRaises(TypeError):
+            self.loop.run_until_complete(pool.spawn(lambda: None))
+
+    def test_spawn_cancelled(self):
+        pool = asyncio.TaskPool(1, loop=self.loop)
+        tracker = Tracker({0: 0.01})
+
+        async def main():
+            first = await pool.spawn(tracker(0))
+            coro = tracker(1)
+            waiting = self.loop.create_task(pool.spawn(coro))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            # The coroutine was closed without running
+            self.assertIsNone(coro.cr_frame)
+            await first
+            # The slot was not lost
+            second = await pool.spawn(tracker(2))
+            return await second
+
+        self.assertEqual(self.loop.run_until_complete(main()), 20)
+        self.assertEqual(tracker.started, [0, 2])
+        self.assertEqual(len(pool), 0)
+
+    def test_context_manager(self):
+        tracker = Tracker({0: 0.01, 1: 0.02})
+
+        async def main():
+            async with asyncio.TaskPool(2, loop=self.loop) as pool:
+                t0 = await pool.spawn(tracker(0))
+                t1 = await pool.spawn(tracker(1))
+            self.assertTrue(t0.done())
+            self.assertTrue(t1.done())
+
+        self.loop.run_until_complete(main())
+        self.assertEqual(tracker.cancelled, [])
+
+    def test_context_manager_error(self):
+        tracker = Tracker({0: 10})
+
+        async def main():
+            async with asyncio.TaskPool(2, loop=self.loop) as pool:
+                task = await pool.spawn(tracker(0))
+                await asyncio.sleep(0)
+                raise ZeroDivisionError
+            return task
+
+        with self.assertRaises(ZeroDivisionError):
+            self.loop.run_until_complete(main())
+        self.assertEqual(tracker.cancelled, [0])
+
+    def test_map(self):
+        pool = asyncio.TaskPool(3, loop=self.loop)
+        tracker = Tracker({0: 0.03, 1: 0.01, 2: 0.02})
+
+        async def main():
+            return [result async for result in pool.map(tracker, range(10))]
+
+        results = self.loop.run_until_complete(main())
+        self.assertEqual(results, [i * 10 for i in range(10)])
+        self.assertEqual(tracker.max_running, 3)
+        self.assertEqual(len(pool), 0)
+
+    def test_map_lazy(self):
+        pool = asyncio.TaskPool(3, loop=self.loop)
+        tracker = Tracker()
+        consumed = []
+
+        def items():
+            for i in range(1000):
+                consumed.append(i)
+                yield i
+
+        async def main():
+            results = []
+            async for result in pool.map(tracker, items()):
+                results.append(result)
+                # Completed results hold their slot until retrieved
+                self.assertLessEqual(len(consumed), len(results) + 3)
+                await asyncio.sleep(0)
+            return results
+
+        results = self.loop.run_until_complete(main())
+        self.assertEqual(len(results), 1000)
+
+    def test_map_async_iterable(self):
+        pool = asyncio.TaskPool(2, loop=self.loop)
+        tracker = Tracker()
+
+        async def items():
+            for i in range(5):
+                await asyncio.sleep(0)
+                yield i
+
+        async def main():
+            return [result async for result in pool.map(tracker, items())]
+
+        results = self.loop.run_until_complete(main())
+        self.assertEqual(results, [0, 10, 20, 30, 40])
+
+    def test_map_unordered(self):
+        pool = asyncio.TaskPool(3, loop=self.loop)
+        tracker = Tracker({0: 0.03, 1: 0.01, 2: 0.02})
+
+        async def main():
+            return [result async for result
+                    in pool.map_unordered(tracker, range(3))]
+
+        results = self.loop.run_until_complete(main())
+        self.assertEqual(results, [10, 20, 0])
+        self.assertEqual(len(pool), 0)
+
+    def test_map_unordered_lazy(self):
+        pool = asyncio.TaskPool(3, loop=self.loop)
+        tracker = Tracker()
+
+        async def main():
+            results = []
+            async for result in pool.map_unordered(tracker, range(100)):
+                results.append(result)
+                self.assertLessEqual(len(tracker.started), len(results) + 3)
+            return results
+
+        results = self.loop.run_until_complete(main())
+        self.assertEqual(sorted(results), [i * 10 for i in range(100)])
+        self.assertEqual(tracker.max_running, 3)
+
+    def check_error(self, method):
+        pool = asyncio.TaskPool(3, loop=self.loop)
+        error = ZeroDivisionError()
+        tracker = Tracker({1: 10, 2: 10})
+
+        async def main():
+            async for result in getattr(pool, method)(tracker,
+                                                      [error, 1, 2, 3]):
+                pass
+
+        with self.assertRaises(ZeroDivisionError):
+            self.loop.run_until_complete(main())
+        test_utils.run_briefly(self.loop)
+        self.assertEqual(sorted(tracker.cancelled), [1, 2])
+        self.assertNotIn(3, tracker.started)
+        self.assertEqual(len(pool), 0)
+
+    def test_map_error(self):
+        self.check_error('map')
+
+    def test_map_unordered_error(self):
+        self.check_error('map_unordered')
+
+    def check_break(self, method):
+        pool = asyncio.TaskPool(3, loop=self.loop)
+        tracker = Tracker({1: 10, 2: 10})
+
+        async def main():
+            results = getattr(pool, method)(tracker, range(10))
+            async for result in results:
+                break
+            await results.aclose()
+            await asyncio.sleep(0)
+
+        self.loop.run_until_complete(main())
+        test_utils.run_briefly(self.loop)
+        # The slot of the first result was not used again
+        self.assertEqual(tracker.started, [0, 1, 2])
+        self.assertEqual(sorted(tracker.cancelled), [1, 2])
+        self.assertEqual(len(pool), 0)
+
+    def test_map_break(self):
+        self.check_break('map')
+
+    def test_map_unordered_break(self):
+        self.check_break('map_unordered')
+
+    def check_cancel(self, method):
+        pool = asyncio.TaskPool(2, loop=self.loop)
+        tracker = Tracker({0: 10, 1: 10})
+
+        async def consume():
+            async for result in getattr(pool, method)(tracker, range(10)):
+                pass
+
+        async def main():
+            consumer = self.loop.create_task(consume())
+            await asyncio.sleep(0.01)
+            consumer.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await consumer
+            await asyncio.sleep(0)
+
+        self.loop.run_until_complete(main())
+        self.assertEqual(sorted(tracker.cancelled), [0, 1])
+        self.assertEqual(len(pool), 0)
+
+    def test_map_cancel(self):
+        self.check_cancel('map')
+
+    def test_map_unordered_cancel(self):
+        self.check_cancel('map_unordered')
+
+    def test_shared_limit(self):
+        pool = asyncio.TaskPool(2, loop=self.loop)
+        tracker = Tracker({'spawned': 0.02})
+
+        async def spawned(item):
+            await tracker(item)
+
+        async def main():
+            await pool.spawn(spawned('spawned'))
+            results = [result async for result
+                       in pool.map(tracker, range(5))]
+            await pool.join()
+            return results
+
+        results = self.loop.run_until_complete(main())
+        self.assertEqual(results, [0, 10, 20, 30, 40])
+        self.assertEqual(tracker.max_running, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
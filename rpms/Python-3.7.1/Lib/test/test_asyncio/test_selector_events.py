@@ -1,5 +1,6 @@
 """Tests for selector_events.py"""
 
+import collections
 import errno
 import selectors
 import socket
@@ -11,6 +12,7 @@ except ImportError:
     ssl = None
 
 import asyncio
+from asyncio import selector_events
 from asyncio.selector_events import BaseSelectorEventLoop
 from asyncio.selector_events import _SelectorTransport
 from asyncio.selector_events import _SelectorSocketTransport
@@ -1068,17 +1070,17 @@ class SelectorSocketTransportTests(test_utils.TestCase):
 
     def test_write_no_data(self):
         transport = self.socket_transport()
-        transport._buffer.extend(b'data')
+        transport._buffer.append(b'data')
         transport.write(b'')
         self.assertFalse(self.sock.send.called)
-        self.assertEqual(list_to_buffer([b'data']), transport._buffer)
+        self.assertEqual(collections.deque([b'data']), transport._buffer)
 
     def test_write_buffer(self):
         transport = self.socket_transport()
-        transport._buffer.extend(b'data1')
+        transport._buffer.append(b'data1')
         transport.write(b'data2')
         self.assertFalse(self.sock.send.called)
-        self.assertEqual(list_to_buffer([b'data1', b'data2']),
+        self.assertEqual(collections.deque([b'data1', b'data2']),
                          transport._buffer)
 
     def test_write_partial(self):
@@ -1089,7 +1091,7 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         transport.write(data)
 
         self.loop.assert_writer(7, transport._write_ready)
-        self.assertEqual(list_to_buffer([b'ta']), transport._buffer)
+        self.assertEqual(collections.deque([b'ta']), transport._buffer)
 
     def test_write_partial_bytearray(self):
         data = bytearray(b'data')
@@ -1099,7 +1101,7 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         transport.write(data)
 
         self.loop.assert_writer(7, transport._write_ready)
-        self.assertEqual(list_to_buffer([b'ta']), transport._buffer)
+        self.assertEqual(collections.deque([b'ta']), transport._buffer)
         self.assertEqual(data, bytearray(b'data'))  # Hasn't been mutated.
 
     def test_write_partial_memoryview(self):
@@ -1110,7 +1112,7 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         transport.write(data)
 
         self.loop.assert_writer(7, transport._write_ready)
-        self.assertEqual(list_to_buffer([b'ta']), transport._buffer)
+        self.assertEqual(collections.deque([b'ta']), transport._buffer)
 
     def test_write_partial_none(self):
         data = b'data'
@@ -1121,7 +1123,7 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         transport.write(data)
 
         self.loop.assert_writer(7, transport._write_ready)
-        self.assertEqual(list_to_buffer([b'data']), transport._buffer)
+        self.assertEqual(collections.deque([b'data']), transport._buffer)
 
     def test_write_tryagain(self):
         self.sock.send.side_effect = BlockingIOError
@@ -1131,7 +1133,7 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         transport.write(data)
 
         self.loop.assert_writer(7, transport._write_ready)
-        self.assertEqual(list_to_buffer([b'data']), transport._buffer)
+        self.assertEqual(collections.deque([b'data']), transport._buffer)
 
     @mock.patch('asyncio.selector_events.logger')
     def test_write_exception(self, m_log):
@@ -1172,7 +1174,7 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         self.sock.send.return_value = len(data)
 
         transport = self.socket_transport()
-        transport._buffer.extend(data)
+        transport._buffer.append(data)
         self.loop._add_writer(7, transport._write_ready)
         transport._write_ready()
         self.assertTrue(self.sock.send.called)
@@ -1184,7 +1186,7 @@ class SelectorSocketTransportTests(test_utils.TestCase):
 
         transport = self.socket_transport()
         transport._closing = True
-        transport._buffer.extend(data)
+        transport._buffer.append(data)
         self.loop._add_writer(7, transport._write_ready)
         transport._write_ready()
         self.assertTrue(self.sock.send.called)
@@ -1202,40 +1204,197 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         self.sock.send.return_value = 2
 
         transport = self.socket_transport()
-        transport._buffer.extend(data)
+        transport._buffer.append(data)
         self.loop._add_writer(7, transport._write_ready)
         transport._write_ready()
         self.loop.assert_writer(7, transport._write_ready)
-        self.assertEqual(list_to_buffer([b'ta']), transport._buffer)
+        self.assertEqual(collections.deque([b'ta']), transport._buffer)
 
     def test_write_ready_partial_none(self):
         data = b'data'
         self.sock.send.return_value = 0
 
         transport = self.socket_transport()
-        transport._buffer.extend(data)
+        transport._buffer.append(data)
         self.loop._add_writer(7, transport._write_ready)
         transport._write_ready()
         self.loop.assert_writer(7, transport._write_ready)
-        self.assertEqual(list_to_buffer([b'data']), transport._buffer)
+        self.assertEqual(collections.deque([b'data']), transport._buffer)
 
     def test_write_ready_tryagain(self):
         self.sock.send.side_effect = BlockingIOError
 
         transport = self.socket_transport()
-        transport._buffer = list_to_buffer([b'data1', b'data2'])
+        transport._buffer.append(b'data')
         self.loop._add_writer(7, transport._write_ready)
         transport._write_ready()
 
         self.loop.assert_writer(7, transport._write_ready)
-        self.assertEqual(list_to_buffer([b'data1data2']), transport._buffer)
+        self.assertEqual(collections.deque([b'data']), transport._buffer)
+
+    @unittest.skipUnless(selector_events._HAS_SENDMSG, 'no sendmsg')
+    def test_write_ready_sendmsg(self):
+        self.sock.send.side_effect = BlockingIOError
+        sent = []
+        def sendmsg(buffers):
+            buffers = list(buffers)
+            sent.append(buffers)
+            return min(7, sum(map(len, buffers)))
+        self.sock.sendmsg.side_effect = sendmsg
+
+        transport = self.socket_transport()
+        transport._coalesce_size = 1  # Queue bytes without copying them
+        transport.write(b'data1')
+        transport.write(b'data2')
+        transport.write(b'data3')
+        self.assertEqual(self.sock.send.call_count, 1)
+        self.assertEqual(transport.get_write_buffer_size(), 15)
+        transport._write_ready()
+
+        self.assertEqual(sent, [[b'data1', b'data2', b'data3']])
+        self.loop.assert_writer(7, transport._write_ready)
+        self.assertEqual(collections.deque([b'ta2', b'data3']),
+                         transport._buffer)
+        self.assertEqual(transport.get_write_buffer_size(), 8)
+
+        transport._write_ready()
+        self.assertEqual(sent[1], [b'ta2', b'data3'])
+        self.assertEqual(collections.deque([b'3']), transport._buffer)
+        self.assertEqual(transport.get_write_buffer_size(), 1)
+
+        self.sock.send.side_effect = None
+        self.sock.send.return_value = 1
+        transport._write_ready()
+        self.sock.send.assert_called_with(b'3')
+        self.assertFalse(self.loop.writers)
+        self.assertFalse(transport._buffer)
+        self.assertEqual(transport.get_write_buffer_size(), 0)
+
+    @unittest.skipUnless(selector_events._HAS_SENDMSG, 'no sendmsg')
+    def test_write_ready_sendmsg_iov_max(self):
+        sent = []
+        def sendmsg(buffers):
+            sent.append(len(list(buffers)))
+            raise BlockingIOError
+        self.sock.sendmsg.side_effect = sendmsg
+
+        transport = self.socket_transport()
+        transport._buffer.extend([b'x'] * (selector_events._SC_IOV_MAX + 1))
+        transport._write_ready()
+        self.assertEqual(sent, [selector_events._SC_IOV_MAX])
+
+    def test_write_copies_mutable(self):
+        self.sock.send.return_value = 0
+        data = bytearray(b'data')
+
+        transport = self.socket_transport()
+        transport.write(data)
+        data[:] = b'xxxx'
+        self.assertEqual(collections.deque([b'data']), transport._buffer)
+
+    def test_write_coalesce(self):
+        self.sock.send.return_value = 0
+
+        transport = self.socket_transport()
+        large = bytes(transport._coalesce_size)
+        transport.write(b'data1')
+        transport.write(b'data2')
+        transport.write(large)
+        transport.write(memoryview(large))
+        transport.write(b'data3')
+        transport.write(bytearray(large))
+        # Small and mutable data is copied together, large immutable data
+        # is queued as it is
+        self.assertEqual(len(transport._buffer), 4)
+        self.assertEqual(transport._buffer[0], b'data1data2')
+        self.assertIs(transport._buffer[1], large)
+        self.assertIs(transport._buffer[2].obj, large)
+        self.assertEqual(transport._buffer[3], b'data3' + large)
+        self.assertEqual(transport.get_write_buffer_size(),
+                         15 + 3 * len(large))
+
+    def test_cork(self):
+        self.sock.send.return_value = 10
+
+        transport = self.socket_transport()
+        transport.cork()
+        transport.write(b'data1')
+        transport.cork()
+        transport.writelines([b'data2', bytearray(b'data3')])
+        self.assertFalse(self.sock.send.called)
+        self.assertFalse(self.loop.writers)
+        self.assertEqual(transport.get_write_buffer_size(), 15)
+
+        transport.uncork()
+        self.assertFalse(self.sock.send.called)
+
+        # Everything written while corked goes out in a single call
+        transport.uncork()
+        self.sock.send.assert_called_once_with(bytearray(b'data1data2data3'))
+        self.loop.assert_writer(7, transport._write_ready)
+        self.assertEqual(collections.deque([b'data3']), transport._buffer)
+
+        # Extra calls are ignored
+        transport.uncork()
+        self.assertEqual(self.sock.send.call_count, 1)
+
+    @unittest.skipUnless(selector_events._HAS_SENDMSG, 'no sendmsg')
+    def test_writelines_large(self):
+        self.sock.sendmsg.side_effect = BlockingIOError
+        large = bytes(8192)
+
+        transport = self.socket_transport()
+        transport._coalesce_size = len(large)
+        transport.writelines([b'data', large])
+        self.assertEqual(self.sock.sendmsg.call_count, 1)
+        self.loop.assert_writer(7, transport._write_ready)
+        self.assertEqual(collections.deque([b'data', large]),
+                         transport._buffer)
+        self.assertIs(transport._buffer[1], large)
+        self.assertRaises(TypeError, transport.writelines, ['str', large])
+
+    def test_cork_close(self):
+        self.sock.send.return_value = 4
+
+        transport = self.socket_transport()
+        transport.cork()
+        transport.write(b'data')
+        transport.close()
+        self.sock.send.assert_called_with(b'data')
+        self.assertFalse(transport._buffer)
+        self.assertFalse(transport._corked)
+
+    def test_cork_write_eof(self):
+        self.sock.send.side_effect = BlockingIOError
+
+        transport = self.socket_transport()
+        transport.cork()
+        transport.write(b'data')
+        transport.write_eof()
+        self.loop.assert_writer(7, transport._write_ready)
+        self.assertFalse(self.sock.shutdown.called)
+
+        self.sock.send.side_effect = None
+        self.sock.send.return_value = 4
+        transport._write_ready()
+        self.sock.shutdown.assert_called_with(socket.SHUT_WR)
+        transport.close()
+
+    def test_writelines(self):
+        self.sock.send.return_value = 4
+
+        transport = self.socket_transport()
+        transport.writelines([b'data'])
+        self.sock.send.assert_called_with(b'data')
+        self.assertFalse(self.loop.writers)
+        self.assertFalse(transport._corked)
 
     def test_write_ready_exception(self):
         err = self.sock.send.side_effect = OSError()
 
         transport = self.socket_transport()
         transport._fatal_error = mock.Mock()
-        transport._buffer.extend(b'data')
+        transport._buffer.append(b'data')
         transport._write_ready()
         transport._fatal_error.assert_called_with(
                                    err,
@@ -1255,7 +1414,7 @@ class SelectorSocketTransportTests(test_utils.TestCase):
         self.sock.send.side_effect = BlockingIOError
         tr.write(b'data')
         tr.write_eof()
-        self.assertEqual(tr._buffer, list_to_buffer([b'data']))
+        self.assertEqual(tr._buffer, collections.deque([b'data']))
         self.assertTrue(tr._eof)
         self.assertFalse(self.sock.shutdown.called)
         self.sock.send.side_effect = lambda _: 4
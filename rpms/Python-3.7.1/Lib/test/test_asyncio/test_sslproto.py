@@ -148,6 +148,195 @@ class SslProtoHandshakeTests(test_utils.TestCase):
         # should not raise
         self.assertIsNone(transp.write(b'data'))
 
+    def test_buffer_updated(self):
+        ssl_proto = self.ssl_protocol()
+        self.connection_made(ssl_proto)
+        sslpipe = ssl_proto._sslpipe
+        sslpipe.wrapped = False
+        sslpipe.feed_ssldata.return_value = ([], [])
+
+        buf = ssl_proto.get_buffer(-1)
+        self.assertIs(self.ssl_protocol().get_buffer(-1), buf)
+        buf[:4] = b'data'
+        ssl_proto.buffer_updated(4)
+        data = sslpipe.feed_ssldata.call_args[0][0]
+        self.assertEqual(bytes(data), b'data')
+
+    def read_appdata(self, ssl_proto, chunks):
+        chunks = list(chunks)
+
+        def read_appdata(buf):
+            if not chunks:
+                return ([], None)
+            chunk = chunks.pop(0)
+            if buf is None:
+                return ([], chunk)
+            buf[:len(chunk)] = chunk
+            return ([], len(chunk))
+
+        sslpipe = ssl_proto._sslpipe
+        sslpipe.wrapped = True
+        sslpipe.feed_ssldata.return_value = ([], [])
+        sslpipe.read_appdata.side_effect = read_appdata
+
+    def test_data_received_buffered_protocol(self):
+
+        class Proto(asyncio.BufferedProtocol):
+            def __init__(self):
+                self.buf = bytearray(100)
+                self.data = b''
+
+            def get_buffer(self, sizehint):
+                return self.buf
+
+            def buffer_updated(self, nbytes):
+                self.data += self.buf[:nbytes]
+
+        proto = Proto()
+        ssl_proto = self.ssl_protocol(proto=proto)
+        self.connection_made(ssl_proto)
+        self.read_appdata(ssl_proto, [b'abc', b'def'])
+
+        ssl_proto.data_received(b'record')
+        self.assertEqual(proto.data, b'abcdef')
+        sslpipe = ssl_proto._sslpipe
+        sslpipe.feed_ssldata.assert_called_with(b'record', read_appdata=False)
+        self.assertIs(sslpipe.read_appdata.call_args[0][0], proto.buf)
+
+    def test_data_received_protocol(self):
+        proto = mock.Mock(spec=asyncio.Protocol)
+        ssl_proto = self.ssl_protocol(proto=proto)
+        self.connection_made(ssl_proto)
+        self.read_appdata(ssl_proto, [b'abc', b'def'])
+
+        ssl_proto.data_received(b'record')
+        self.assertEqual(proto.data_received.call_args_list,
+                         [mock.call(b'abc'), mock.call(b'def')])
+
+    def test_pause_reading(self):
+        proto = mock.Mock(spec=asyncio.Protocol)
+        ssl_proto = self.ssl_protocol(proto=proto)
+        transport = self.connection_made(ssl_proto)
+        self.read_appdata(ssl_proto, [b'abc', b'def'])
+        transp = ssl_proto._app_transport
+        proto.data_received.side_effect = lambda data: transp.pause_reading()
+
+        ssl_proto.data_received(b'record')
+        proto.data_received.assert_called_once_with(b'abc')
+        self.assertTrue(transport.pause_reading.called)
+        self.assertFalse(transp.is_reading())
+
+        proto.data_received.side_effect = None
+        transp.resume_reading()
+        self.assertTrue(transport.resume_reading.called)
+        # The remaining data is delivered by the event loop.
+        proto.data_received.assert_called_once_with(b'abc')
+        test_utils.run_briefly(self.loop)
+        proto.data_received.assert_called_with(b'def')
+
+    def test_cork(self):
+        ssl_proto = self.ssl_protocol()
+        transp = ssl_proto._app_transport
+        # No-ops before the connection is made
+        transp.cork()
+        transp.uncork()
+        transport = self.connection_made(ssl_proto)
+        transp.cork()
+        transport.cork.assert_called_once_with()
+        transp.uncork()
+        transport.uncork.assert_called_once_with()
+
+    def test_get_write_buffer_size(self):
+        ssl_proto = self.ssl_protocol()
+        transport = self.connection_made(ssl_proto)
+        transport.get_write_buffer_size.return_value = 10
+        sslpipe = ssl_proto._sslpipe
+        # The write is blocked until some data is received
+        sslpipe.feed_appdata.return_value = ([], 0)
+        sslpipe.need_ssldata = True
+
+        ssl_proto._app_transport.write(b'data')
+        self.assertEqual(ssl_proto._app_transport.get_write_buffer_size(), 14)
+
+
+@unittest.skipIf(ssl is None, 'No ssl module')
+class SslPipeTests(unittest.TestCase):
+
+    def connected_pipes(self):
+        client = sslproto._SSLPipe(test_utils.simple_client_sslcontext(),
+                                   False)
+        server = sslproto._SSLPipe(test_utils.simple_server_sslcontext(),
+                                   True)
+        to_server = client.do_handshake()
+        to_client = server.do_handshake()
+        while not (client.wrapped and server.wrapped):
+            ssldata, appdata = server.feed_ssldata(b''.join(to_server))
+            to_client += ssldata
+            to_server, appdata = client.feed_ssldata(b''.join(to_client))
+            to_client = []
+        return client, server
+
+    def send(self, sender, receiver, data):
+        ssldata, offset = sender.feed_appdata(data)
+        self.assertEqual(offset, len(data))
+        ssldata, appdata = receiver.feed_ssldata(b''.join(ssldata),
+                                                 read_appdata=False)
+        self.assertEqual(appdata, [])
+
+    def test_read_appdata(self):
+        client, server = self.connected_pipes()
+        data = bytes(range(256)) * 256
+        self.send(server, client, data)
+
+        buf = bytearray(len(data) + 1)
+        ssldata, nbytes = client.read_appdata(buf)
+        self.assertEqual(nbytes, len(data))
+        self.assertEqual(buf[:nbytes], data)
+
+        ssldata, nbytes = client.read_appdata(buf)
+        self.assertIsNone(nbytes)
+        self.assertTrue(client.need_ssldata)
+
+    def test_read_appdata_small_buffer(self):
+        client, server = self.connected_pipes()
+        self.send(server, client, b'abcdefg')
+
+        buf = memoryview(bytearray(3))
+        received = []
+        while True:
+            ssldata, nbytes = client.read_appdata(buf)
+            if nbytes is None:
+                break
+            received.append(bytes(buf[:nbytes]))
+        self.assertEqual(received, [b'abc', b'def', b'g'])
+
+    def test_read_appdata_bytes(self):
+        client, server = self.connected_pipes()
+        self.send(server, client, b'abc')
+        self.send(server, client, b'def')
+
+        self.assertEqual(client.read_appdata(), ([], b'abc'))
+        self.assertEqual(client.read_appdata(), ([], b'def'))
+        self.assertEqual(client.read_appdata(), ([], None))
+
+    def test_read_appdata_close_notify(self):
+        client, server = self.connected_pipes()
+        self.send(server, client, b'data')
+        ssldata = server.shutdown()
+        client.feed_ssldata(b''.join(ssldata), read_appdata=False)
+
+        buf = bytearray(100)
+        ssldata, nbytes = client.read_appdata(buf)
+        self.assertEqual(buf[:nbytes], b'data')
+        ssldata, nbytes = client.read_appdata(buf)
+        self.assertEqual(nbytes, 0)
+
+    def test_read_appdata_unwrapped(self):
+        client = sslproto._SSLPipe(test_utils.simple_client_sslcontext(),
+                                   False)
+        with self.assertRaisesRegex(RuntimeError, 'no security layer'):
+            client.read_appdata(bytearray(10))
+
 
 ##############################################################################
 # Start TLS Tests
@@ -16,6 +16,7 @@ except ImportError:
     ssl = None
 
 import asyncio
+from asyncio import protocols
 from test.test_asyncio import utils as test_utils
 
 
@@ -121,6 +122,36 @@ class StreamTests(test_utils.TestCase):
                                                     loop=self.loop)
             self._basetest_open_connection_error(conn_fut)
 
+    def test_readinto_connection(self):
+        data = bytes(range(256)) * 4096
+
+        async def handle_client(reader, writer):
+            writer.write(data)
+            await writer.drain()
+            writer.close()
+
+        async def client(addr):
+            reader, writer = await asyncio.open_connection(
+                *addr, loop=self.loop)
+            buf = bytearray(len(data) + 1)
+            view = memoryview(buf)
+            pos = 0
+            while True:
+                n = await reader.readinto(view[pos:])
+                if not n:
+                    break
+                pos += n
+            writer.close()
+            return buf[:pos]
+
+        server = self.loop.run_until_complete(asyncio.start_server(
+            handle_client, '127.0.0.1', 0, loop=self.loop))
+        addr = server.sockets[0].getsockname()
+        received = self.loop.run_until_complete(client(addr))
+        server.close()
+        self.loop.run_until_complete(server.wait_closed())
+        self.assertEqual(received, data)
+
     def test_feed_empty_data(self):
         stream = asyncio.StreamReader(loop=self.loop)
 
@@ -206,6 +237,147 @@ class StreamTests(test_utils.TestCase):
         self.assertRaises(
             ValueError, self.loop.run_until_complete, stream.read(2))
 
+    def test_buffered_protocol(self):
+        # Data received through get_buffer()/buffer_updated() is appended
+        # to the buffer like data passed to feed_data().
+        stream = asyncio.StreamReader(loop=self.loop)
+        protocol = asyncio.StreamReaderProtocol(stream, loop=self.loop)
+        self.assertIsInstance(protocol, asyncio.BufferedProtocol)
+
+        for chunk in (b'line1\nli', b'ne2\n'):
+            buf = protocol.get_buffer(-1)
+            self.assertGreaterEqual(len(buf), len(chunk))
+            buf[:len(chunk)] = chunk
+            protocol.buffer_updated(len(chunk))
+        self.assertEqual(b'line1\nline2\n', stream._buffer)
+        # The receive buffer is reused
+        self.assertIs(protocol.get_buffer(-1), buf)
+
+        data = self.loop.run_until_complete(stream.readline())
+        self.assertEqual(b'line1\n', data)
+
+    def test_buffered_protocol_pause(self):
+        stream = asyncio.StreamReader(limit=1, loop=self.loop)
+        transport = mock.Mock()
+        stream.set_transport(transport)
+        protocol = asyncio.StreamReaderProtocol(stream, loop=self.loop)
+
+        protocols._feed_data_to_buffered_proto(protocol, b'12')
+        self.assertFalse(transport.pause_reading.called)
+        protocols._feed_data_to_buffered_proto(protocol, b'3')
+        self.assertTrue(transport.pause_reading.called)
+
+    def test_buffered_protocol_feed_data_override(self):
+        chunks = []
+
+        class Reader(asyncio.StreamReader):
+            def feed_data(self, data):
+                chunks.append(data)
+                super().feed_data(data)
+
+        stream = Reader(loop=self.loop)
+        protocol = asyncio.StreamReaderProtocol(stream, loop=self.loop)
+        read_task = self.loop.create_task(stream.readinto(bytearray(10)))
+        test_utils.run_briefly(self.loop)
+
+        protocols._feed_data_to_buffered_proto(protocol, b'data')
+        self.assertEqual(chunks, [b'data'])
+        self.assertEqual(4, self.loop.run_until_complete(read_task))
+
+    def test_readinto(self):
+        stream = asyncio.StreamReader(loop=self.loop)
+        stream.feed_data(self.DATA)
+
+        buf = bytearray(8)
+        n = self.loop.run_until_complete(stream.readinto(buf))
+        self.assertEqual(8, n)
+        self.assertEqual(b'line1\nli', buf)
+        self.assertEqual(self.DATA[8:], stream._buffer)
+
+        # Short read of what is left in the buffer
+        buf = bytearray(100)
+        n = self.loop.run_until_complete(stream.readinto(memoryview(buf)))
+        self.assertEqual(len(self.DATA) - 8, n)
+        self.assertEqual(self.DATA[8:], buf[:n])
+        self.assertEqual(b'', stream._buffer)
+
+        self.assertEqual(
+            0, self.loop.run_until_complete(stream.readinto(bytearray())))
+
+        stream.feed_eof()
+        self.assertEqual(
+            0, self.loop.run_until_complete(stream.readinto(buf)))
+
+    def test_readinto_wait(self):
+        stream = asyncio.StreamReader(loop=self.loop)
+        buf = bytearray(4)
+        read_task = self.loop.create_task(stream.readinto(buf))
+
+        def cb():
+            stream.feed_data(b'chunk1')
+        self.loop.call_soon(cb)
+
+        self.assertEqual(4, self.loop.run_until_complete(read_task))
+        self.assertEqual(b'chun', buf)
+        self.assertEqual(b'k1', stream._buffer)
+
+    def test_readinto_direct(self):
+        # A pending readinto() receives data into the caller's buffer
+        stream = asyncio.StreamReader(loop=self.loop)
+        protocol = asyncio.StreamReaderProtocol(stream, loop=self.loop)
+        buf = bytearray(6)
+        read_task = self.loop.create_task(stream.readinto(buf))
+        test_utils.run_briefly(self.loop)
+
+        view = protocol.get_buffer(-1)
+        self.assertEqual(6, len(view))
+        view[:4] = b'data'
+        protocol.buffer_updated(4)
+        # Data received before readinto() resumes goes to the buffer
+        view = protocol.get_buffer(-1)
+        view[:4] = b'more'
+        protocol.buffer_updated(4)
+
+        self.assertEqual(4, self.loop.run_until_complete(read_task))
+        self.assertEqual(b'data\0\0', buf)
+        self.assertEqual(b'more', stream._buffer)
+
+    def test_readinto_direct_cancel(self):
+        # Data received into the buffer of a cancelled readinto() is kept
+        stream = asyncio.StreamReader(loop=self.loop)
+        protocol = asyncio.StreamReaderProtocol(stream, loop=self.loop)
+        read_task = self.loop.create_task(stream.readinto(bytearray(6)))
+        test_utils.run_briefly(self.loop)
+
+        view = protocol.get_buffer(-1)
+        view[:5] = b'hello'
+        protocol.buffer_updated(5)
+        view = protocol.get_buffer(-1)
+        view[:5] = b'world'
+        protocol.buffer_updated(5)
+        read_task.cancel()
+        self.assertRaises(asyncio.CancelledError,
+                          self.loop.run_until_complete, read_task)
+
+        stream.feed_eof()
+        self.assertEqual(b'helloworld',
+                         self.loop.run_until_complete(stream.read()))
+
+    def test_readinto_readonly(self):
+        stream = asyncio.StreamReader(loop=self.loop)
+        with self.assertRaises(TypeError):
+            self.loop.run_until_complete(stream.readinto(b'data'))
+
+    def test_readinto_exception(self):
+        stream = asyncio.StreamReader(loop=self.loop)
+        read_task = self.loop.create_task(stream.readinto(bytearray(4)))
+        test_utils.run_briefly(self.loop)
+
+        stream.set_exception(ValueError())
+        self.assertRaises(
+            ValueError, self.loop.run_until_complete, read_task)
+        self.assertIsNone(stream._readinto_view)
+
     def test_invalid_limit(self):
         with self.assertRaisesRegex(ValueError, 'imit'):
             asyncio.StreamReader(limit=0, loop=self.loop)
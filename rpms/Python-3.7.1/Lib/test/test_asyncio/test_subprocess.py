@@ -1,5 +1,6 @@
 import signal
 import sys
+import threading
 import unittest
 import warnings
 from unittest import mock
@@ -533,6 +534,40 @@ if sys.platform != 'win32':
 
         Watcher = unix_events.FastChildWatcher
 
+    class SubprocessThreadedWatcherTests(SubprocessWatcherMixin,
+                                         test_utils.TestCase):
+
+        Watcher = unix_events.ThreadedChildWatcher
+
+        def tearDown(self):
+            # The threads of the watcher may still be running the
+            # callbacks: join them before checking for dangling threads.
+            policy = asyncio.get_event_loop_policy()
+            policy.get_child_watcher()._join_threads()
+            super().tearDown()
+
+        def test_loop_in_thread(self):
+            # Unlike the other watchers, ThreadedChildWatcher works with
+            # event loops running outside of the main thread.
+            async def run():
+                proc = await asyncio.create_subprocess_exec(
+                    *PROGRAM_BLOCKED)
+                proc.kill()
+                return await proc.wait()
+
+            def thread_main():
+                loop = asyncio.new_event_loop()
+                try:
+                    results.append(loop.run_until_complete(run()))
+                finally:
+                    loop.close()
+
+            results = []
+            thread = threading.Thread(target=thread_main)
+            thread.start()
+            thread.join()
+            self.assertEqual(results, [-signal.SIGKILL])
+
 else:
     # Windows
     class SubprocessProactorTests(SubprocessMixin, test_utils.TestCase):
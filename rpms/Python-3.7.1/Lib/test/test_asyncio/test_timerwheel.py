@@ -0,0 +1,256 @@
+"""Tests for asyncio/timerwheel.py."""
+
+import math
+import random
+import unittest
+from unittest import mock
+
+import asyncio
+from asyncio import events
+from test.test_asyncio import utils as test_utils
+
+
+def tearDownModule():
+    asyncio.set_event_loop_policy(None)
+
+
+class TimerWheelTests(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = mock.Mock()
+        self.loop.get_debug.return_value = False
+        self.wheel = asyncio.TimerWheel(0.01)
+        self.wheel._start(1000.0)
+
+    def timer(self, when):
+        return events.TimerHandle(when, lambda: None, (), self.loop)
+
+    def run_until(self, end_time):
+        # Drive the wheel like the event loop does, with a virtual clock.
+        expired = []
+        now = 1000.0
+        while True:
+            deadline = self.wheel.next_deadline()
+            if deadline is None or deadline > end_time:
+                break
+            now = max(now, deadline)
+            for timer in self.wheel.expire(now):
+                self.assertLessEqual(timer._when, now)
+                expired.append((now, timer))
+        self.wheel.expire(end_time)
+        return expired
+
+    def test_resolution(self):
+        self.assertEqual(self.wheel.resolution, 0.01)
+        with self.assertRaises(ValueError):
+            asyncio.TimerWheel(0)
+        self.assertIn('timers=0', repr(self.wheel))
+
+    def test_push_remove(self):
+        timers = [self.timer(1000.0 + i) for i in range(5)]
+        for timer in timers:
+            self.wheel.push(timer)
+            self.assertTrue(timer._scheduled)
+        self.assertEqual(len(self.wheel), 5)
+
+        self.wheel.remove(timers[2])
+        self.assertFalse(timers[2]._scheduled)
+        self.assertIsNone(timers[2]._wheel_slot)
+        self.assertEqual(len(self.wheel), 4)
+
+        expired = [timer for now, timer in self.run_until(1010.0)]
+        self.assertEqual(expired, timers[:2] + timers[3:])
+        self.assertEqual(len(self.wheel), 0)
+        self.assertIsNone(self.wheel.next_deadline())
+
+    def test_equal_timers(self):
+        # TimerHandles with the same deadline compare equal
+        timers = [self.timer(1000.5) for i in range(3)]
+        for timer in timers:
+            self.wheel.push(timer)
+        self.wheel.remove(timers[1])
+        self.assertEqual(self.wheel.expire(1001.0), [timers[0], timers[2]])
+
+    def test_expire_current_tick(self):
+        early = self.timer(1000.012)
+        late = self.timer(1000.018)
+        self.wheel.push(late)
+        self.wheel.push(early)
+        self.assertEqual(self.wheel.next_deadline(), 1000.012)
+        self.assertEqual(self.wheel.expire(1000.011), [])
+        self.assertEqual(self.wheel.expire(1000.015), [early])
+        self.assertEqual(self.wheel.next_deadline(), 1000.018)
+        self.assertEqual(self.wheel.expire(1000.02), [late])
+
+    def test_expire_sorted(self):
+        whens = [1000.0 + random.random() for i in range(100)]
+        for when in whens:
+            self.wheel.push(self.timer(when))
+        expired = self.wheel.expire(1002.0)
+        self.assertEqual([timer._when for timer in expired], sorted(whens))
+
+    def test_past_timer(self):
+        timer = self.timer(10.0)
+        self.wheel.push(timer)
+        self.assertEqual(self.wheel.next_deadline(), 10.0)
+        self.assertEqual(self.wheel.expire(1000.0), [timer])
+
+    def test_cascade(self):
+        # Delays spanning all the levels of the wheel
+        delays = [0.005, 0.5, 1.0, 30.0, 100.0, 3600.0, 86400.0, 1e7]
+        timers = [self.timer(1000.0 + delay) for delay in delays]
+        for timer in reversed(timers):
+            self.wheel.push(timer)
+        expired = self.run_until(1000.0 + 2e7)
+        self.assertEqual([timer for now, timer in expired], timers)
+        for now, timer in expired:
+            self.assertEqual(now, timer._when)
+
+    def test_cascade_before_level0(self):
+        # A timer cascaded from level 1 is due before the first timer of
+        # level 0, whose slot comes after the cascade.
+        first = self.timer(1001.0)
+        self.wheel.push(first)
+        self.assertEqual(self.run_until(1000.5), [])
+        second = self.timer(1001.1)
+        self.wheel.push(second)
+        self.assertLess(self.wheel.next_deadline(), 1001.0 + 1e-9)
+        expired = self.run_until(1002.0)
+        self.assertEqual(expired, [(1001.0, first), (1001.1, second)])
+
+        # Same with many timers on both levels
+        timers = []
+        expired = []
+        for i in range(200):
+            delay = random.choice((random.uniform(0.0, 0.64),
+                                   random.uniform(0.64, 40.0)))
+            timer = self.timer(1002.0 + delay)
+            self.wheel.push(timer)
+            timers.append(timer)
+            if i % 20 == 0:
+                expired.extend(self.run_until(1002.0 + i * 0.005))
+        expired.extend(self.run_until(1100.0))
+        self.assertEqual(sorted(timer for now, timer in expired),
+                         sorted(timers))
+        for now, timer in expired:
+            self.assertEqual(now, timer._when)
+
+    def test_far_future(self):
+        timer = self.timer(math.inf)
+        self.wheel.push(timer)
+        deadline = self.wheel.next_deadline()
+        self.assertLess(deadline, math.inf)
+        self.assertEqual(self.wheel.expire(deadline), [])
+        self.assertEqual(len(self.wheel), 1)
+        self.wheel.remove(timer)
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_random(self):
+        timers = []
+        for i in range(1000):
+            timer = self.timer(1000.0 + random.expovariate(1.0) * 100)
+            self.wheel.push(timer)
+            timers.append(timer)
+        cancelled = set(random.sample(timers, 200))
+        for timer in cancelled:
+            self.wheel.remove(timer)
+        expired = [timer for now, timer in self.run_until(1e6)]
+        expected = sorted((timer for timer in timers
+                           if timer not in cancelled),
+                          key=lambda timer: timer._when)
+        self.assertEqual([t._when for t in expired],
+                         [t._when for t in expected])
+
+    def test_clear(self):
+        timers = [self.timer(1000.0 + 10 ** i) for i in range(6)]
+        for timer in timers:
+            self.wheel.push(timer)
+        cleared = self.wheel.clear()
+        self.assertEqual(sorted(cleared), timers)
+        self.assertEqual(len(self.wheel), 0)
+        self.assertIsNone(self.wheel.next_deadline())
+        for timer in timers:
+            self.assertFalse(timer._scheduled)
+
+    def test_start_in_use(self):
+        self.wheel.push(self.timer(1001.0))
+        with self.assertRaises(RuntimeError):
+            self.wheel._start(1000.0)
+
+
+class LoopTimerWheelTests(test_utils.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+
+    def test_set_timer_wheel(self):
+        self.assertIsNone(self.loop.get_timer_wheel())
+        wheel = asyncio.TimerWheel()
+        self.loop.set_timer_wheel(wheel)
+        self.assertIs(self.loop.get_timer_wheel(), wheel)
+        self.loop.set_timer_wheel(wheel)
+        self.assertIs(self.loop.get_timer_wheel(), wheel)
+        self.loop.set_timer_wheel(None)
+        self.assertIsNone(self.loop.get_timer_wheel())
+        with self.assertRaises(TypeError):
+            self.loop.set_timer_wheel(object())
+
+    def test_wheel_in_use(self):
+        wheel = asyncio.TimerWheel()
+        self.loop.set_timer_wheel(wheel)
+        self.loop.call_later(10, lambda: None)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        with self.assertRaises(RuntimeError):
+            loop.set_timer_wheel(wheel)
+
+    def test_call_later(self):
+        self.loop.set_timer_wheel(asyncio.TimerWheel())
+        calls = []
+        for delay in (0.03, 0.01, 0.02):
+            self.loop.call_later(delay, calls.append, delay)
+        cancelled = self.loop.call_later(0.015, calls.append, 'cancelled')
+        cancelled.cancel()
+        self.assertEqual(len(self.loop.get_timer_wheel()), 3)
+
+        start = self.loop.time()
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertGreaterEqual(self.loop.time() - start, 0.05)
+        self.assertEqual(calls, [0.01, 0.02, 0.03])
+        self.assertEqual(self.loop._scheduled, [])
+
+    def test_migrate(self):
+        calls = []
+        heap_timer = self.loop.call_later(0.01, calls.append, 'heap')
+        cancelled = self.loop.call_later(0.01, calls.append, 'cancelled')
+        cancelled.cancel()
+
+        wheel = asyncio.TimerWheel()
+        self.loop.set_timer_wheel(wheel)
+        self.assertEqual(self.loop._scheduled, [])
+        self.assertEqual(len(wheel), 1)
+        self.assertTrue(heap_timer._scheduled)
+        wheel_timer = self.loop.call_later(0.02, calls.append, 'wheel')
+
+        self.loop.set_timer_wheel(None)
+        self.assertEqual(len(wheel), 0)
+        self.assertEqual(sorted(self.loop._scheduled),
+                         [heap_timer, wheel_timer])
+        self.assertTrue(wheel_timer._scheduled)
+
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual(calls, ['heap', 'wheel'])
+
+    def test_close(self):
+        wheel = asyncio.TimerWheel()
+        self.loop.set_timer_wheel(wheel)
+        timer = self.loop.call_later(10, lambda: None)
+        self.loop.close()
+        self.assertEqual(len(wheel), 0)
+        self.assertFalse(timer._scheduled)
+
+
+if __name__ == '__main__':
+    unittest.main()
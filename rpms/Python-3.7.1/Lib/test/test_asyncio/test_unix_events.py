@@ -1792,6 +1792,93 @@ class FastChildWatcherTests (ChildWatcherTestsMixin, test_utils.TestCase):
         return asyncio.FastChildWatcher()
 
 
+class ThreadedChildWatcherTests(unittest.TestCase):
+
+    def setUp(self):
+        self.watcher = asyncio.ThreadedChildWatcher()
+        self.addCleanup(self.watcher.close)
+        # pid -> Event set when the process exits
+        self.running = {}
+        self.threads = []
+        threads = self.threads
+
+        class Thread(threading.Thread):
+            def start(self):
+                threads.append(self)
+                super().start()
+
+        for patcher in (mock.patch('os.waitpid', self.waitpid),
+                        mock.patch.object(unix_events.threading, 'Thread',
+                                          Thread)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def waitpid(self, pid, flags):
+        self.assertEqual(flags, 0)
+        if pid not in self.running:
+            raise ChildProcessError
+        self.running[pid].wait()
+        # Exit status 3
+        return pid, 3 << 8
+
+    def start(self, pid):
+        self.running[pid] = threading.Event()
+
+    def join(self, pid):
+        if pid in self.running:
+            self.running[pid].set()
+        for thread in self.threads:
+            thread.join()
+
+    def test_add_child_handler(self):
+        callback = mock.Mock()
+        self.start(42)
+        with self.watcher:
+            self.watcher.add_child_handler(42, callback, 'a', 'b')
+        self.assertFalse(callback.called)
+        self.join(42)
+        callback.assert_called_once_with(42, 3, 'a', 'b')
+        self.assertEqual(self.watcher._threads, {})
+        self.assertEqual(self.watcher._callbacks, {})
+
+    def test_replace_handler(self):
+        callback1 = mock.Mock()
+        callback2 = mock.Mock()
+        self.start(42)
+        self.watcher.add_child_handler(42, callback1)
+        self.watcher.add_child_handler(42, callback2)
+        self.assertEqual(len(self.watcher._threads), 1)
+        self.join(42)
+        self.assertFalse(callback1.called)
+        callback2.assert_called_once_with(42, 3)
+
+    def test_remove_child_handler(self):
+        callback = mock.Mock()
+        self.start(42)
+        self.watcher.add_child_handler(42, callback)
+        self.assertTrue(self.watcher.remove_child_handler(42))
+        self.assertFalse(self.watcher.remove_child_handler(42))
+        self.join(42)
+        self.assertFalse(callback.called)
+
+    def test_unknown_child(self):
+        callback = mock.Mock()
+        with mock.patch.object(log.logger, 'warning') as m_warning:
+            self.watcher.add_child_handler(43, callback)
+            self.join(43)
+        callback.assert_called_once_with(43, 255)
+        self.assertTrue(m_warning.called)
+
+    def test_callback_error(self):
+        callback = mock.Mock(side_effect=ZeroDivisionError)
+        self.start(42)
+        with mock.patch.object(log.logger, 'error') as m_error:
+            self.watcher.add_child_handler(42, callback)
+            self.join(42)
+        callback.assert_called_once_with(42, 3)
+        self.assertTrue(m_error.called)
+
+
 class PolicyTests(unittest.TestCase):
 
     def create_policy(self):
@@ -507,6 +507,9 @@ class TestCase(unittest.TestCase):
         executor = loop._default_executor
         if executor is not None:
             executor.shutdown(wait=True)
+        pool = loop._file_io_pool
+        if pool is not None:
+            pool.shutdown(wait=True)
         loop.close()
 
     def set_event_loop(self, loop, *, cleanup=True):
@@ -53,6 +53,10 @@ def sleep_and_raise(t):
     time.sleep(t)
     raise Exception('this is an exception')
 
+def sleep_and_return(t, result):
+    time.sleep(t)
+    return result
+
 def sleep_and_print(t, msg):
     time.sleep(t)
     print(msg)
@@ -93,6 +97,16 @@ def make_dummy_object(_):
     return MyObject()
 
 
+class PickleCounter(object):
+    # The unpickled object knows how many times its original was pickled
+    def __init__(self):
+        self.pickled = 0
+
+    def __getstate__(self):
+        self.pickled += 1
+        return self.__dict__
+
+
 class BaseTestCase(unittest.TestCase):
     def setUp(self):
         self._thread_key = test.support.threading_setup()
@@ -148,6 +162,10 @@ class ThreadPoolMixin(ExecutorMixin):
     executor_type = futures.ThreadPoolExecutor
 
 
+class WorkStealingThreadPoolMixin(ExecutorMixin):
+    executor_type = futures.WorkStealingThreadPoolExecutor
+
+
 class ProcessPoolForkMixin(ExecutorMixin):
     executor_type = futures.ProcessPoolExecutor
     ctx = "fork"
@@ -175,6 +193,7 @@ class ProcessPoolForkserverMixin(ExecutorMixin):
 
 def create_executor_tests(mixin, bases=(BaseTestCase,),
                           executor_mixins=(ThreadPoolMixin,
+                                           WorkStealingThreadPoolMixin,
                                            ProcessPoolForkMixin,
                                            ProcessPoolForkserverMixin,
                                            ProcessPoolSpawnMixin)):
@@ -688,6 +707,71 @@ class ExecutorTest:
 
         self.assertEqual([None, None], results)
 
+    def test_map_buffersize(self):
+        self.assertEqual(
+                list(self.executor.map(pow, range(10), range(10),
+                                       buffersize=3)),
+                list(map(pow, range(10), range(10))))
+        self.assertEqual(
+                list(self.executor.map(pow, range(10), range(10),
+                                       chunksize=3, buffersize=2)),
+                list(map(pow, range(10), range(10))))
+
+    def test_map_buffersize_lazy(self):
+        consumed = []
+        def gen():
+            for i in itertools.count():
+                consumed.append(i)
+                yield i
+        results = self.executor.map(abs, gen(), buffersize=2)
+        self.assertEqual(next(results), 0)
+        self.assertEqual(next(results), 1)
+        # Only buffersize items are submitted ahead of the consumer
+        self.assertEqual(consumed, [0, 1, 2, 3])
+        del results
+
+    def test_map_buffersize_invalid(self):
+        for buffersize in (0, -1):
+            with self.assertRaisesRegex(ValueError,
+                                        "buffersize must be None or >= 1"):
+                self.executor.map(str, range(4), buffersize=buffersize)
+            with self.assertRaisesRegex(ValueError,
+                                        "buffersize must be None or >= 1"):
+                self.executor.map_unordered(str, range(4),
+                                            buffersize=buffersize)
+
+    def test_map_unordered(self):
+        expected = sorted(map(pow, range(10), range(10)))
+        for kwargs in ({}, {'buffersize': 1}, {'buffersize': 3},
+                       {'chunksize': 4}, {'chunksize': 4, 'buffersize': 2}):
+            with self.subTest(**kwargs):
+                results = self.executor.map_unordered(pow, range(10),
+                                                      range(10), **kwargs)
+                self.assertEqual(sorted(results), expected)
+
+    def test_map_unordered_completion_order(self):
+        results = list(self.executor.map_unordered(
+            sleep_and_return, [0.5, 0], ['slow', 'fast']))
+        self.assertEqual(results, ['fast', 'slow'])
+
+    def test_map_unordered_exception(self):
+        i = self.executor.map_unordered(divmod, [1, 1], [0, 0])
+        self.assertRaises(ZeroDivisionError, i.__next__)
+
+    def test_map_unordered_timeout(self):
+        results = []
+        try:
+            for i in self.executor.map_unordered(time.sleep,
+                                                 [0, 0, 6],
+                                                 timeout=5):
+                results.append(i)
+        except futures.TimeoutError:
+            pass
+        else:
+            self.fail('expected TimeoutError')
+
+        self.assertEqual([None, None], results)
+
     def test_shutdown_race_issue12456(self):
         # Issue #12456: race condition at shutdown where trying to post a
         # sentinel in the call queue blocks (the queue is full while processes
@@ -744,6 +828,126 @@ class ThreadPoolExecutorTest(ThreadPoolMixin, ExecutorTest, BaseTestCase):
                          (os.cpu_count() or 1) * 5)
 
 
+class WorkStealingThreadPoolExecutorTest(WorkStealingThreadPoolMixin,
+                                        ExecutorTest, BaseTestCase):
+    def test_map_submits_without_iteration(self):
+        finished = []
+        def record_finished(n):
+            finished.append(n)
+
+        self.executor.map(record_finished, range(10))
+        self.executor.shutdown(wait=True)
+        self.assertCountEqual(finished, range(10))
+
+    def test_idle_timeout_invalid(self):
+        for timeout in (0, -1):
+            with self.assertRaisesRegex(ValueError,
+                                        "idle_timeout must be None or "
+                                        "greater than 0"):
+                self.executor_type(idle_timeout=timeout)
+
+    def test_fan_out(self):
+        executor = self.executor
+        def child(i):
+            time.sleep(0.01)
+            return i
+        def parent(n):
+            fs = [executor.submit(child, i) for i in range(n)]
+            return sum(f.result() for f in fs)
+
+        fs = [executor.submit(parent, 10) for _ in range(3)]
+        self.assertEqual([f.result() for f in fs], [45] * 3)
+        stats = executor.statistics()
+        self.assertGreater(stats['stolen'], 0)
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['active'], 0)
+        self.assertEqual(stats['submitted'], stats['completed'])
+        self.assertLessEqual(stats['threads'], self.worker_count)
+        latency = stats['latency']
+        self.assertEqual(latency[-1][0], float('inf'))
+        self.assertEqual(sum(count for bound, count in latency),
+                         stats['completed'])
+
+    def test_local_items_run_before_shared_items(self):
+        order = []
+        started = threading.Event()
+        shared_submitted = threading.Event()
+        with self.executor_type(max_workers=1) as executor:
+            def parent():
+                order.append('parent')
+                executor.submit(order.append, 'child')
+                started.set()
+                shared_submitted.wait()
+            executor.submit(parent)
+            # Submitted from outside the pool while the worker is busy
+            started.wait()
+            f = executor.submit(order.append, 'shared')
+            shared_submitted.set()
+            f.result()
+        self.assertEqual(order, ['parent', 'child', 'shared'])
+
+    def test_priorities(self):
+        order = []
+        with self.executor_type(max_workers=1) as executor:
+            event = threading.Event()
+            executor.submit(event.wait)
+            fs = [executor.submit_with_priority(priority, order.append,
+                                                priority)
+                  for priority in (5, 1, 3, -2, 1)]
+            event.set()
+            futures.wait(fs)
+        self.assertEqual(order, [-2, 1, 1, 3, 5])
+
+    def test_priorities_from_worker(self):
+        order = []
+        with self.executor_type(max_workers=1) as executor:
+            def parent():
+                return [executor.submit_with_priority(priority, order.append,
+                                                      priority)
+                        for priority in (0, 5, 1, 9, 1)]
+            fs = executor.submit(parent).result()
+            futures.wait(fs)
+        self.assertEqual(order, [0, 1, 1, 5, 9])
+
+        # Stolen calls are taken by priority too
+        order = []
+        with self.executor_type(max_workers=2) as executor:
+            release = threading.Event()
+            done = threading.Event()
+            def parent():
+                fs = [executor.submit_with_priority(priority, order.append,
+                                                    priority)
+                      for priority in (7, 3, 8, 2)]
+                # Block until the other worker has stolen all the calls
+                done.wait()
+                return fs
+            executor.submit(release.wait)
+            f = executor.submit(parent)
+            while executor.statistics()['queued'] < 4:
+                time.sleep(0.01)
+            release.set()
+            while len(order) < 4:
+                time.sleep(0.01)
+            done.set()
+            futures.wait(f.result())
+        self.assertEqual(order, [2, 3, 7, 8])
+
+    def test_idle_timeout(self):
+        with self.executor_type(max_workers=3, idle_timeout=0.1) as executor:
+            barrier = threading.Barrier(3)
+            fs = [executor.submit(barrier.wait) for _ in range(3)]
+            futures.wait(fs)
+            self.assertEqual(executor.statistics()['threads'], 3)
+            t1 = time.monotonic()
+            while executor.statistics()['threads']:
+                if time.monotonic() - t1 > 5:
+                    self.fail("idle threads not reaped after 5 s.")
+                time.sleep(0.05)
+            self.assertEqual(executor.statistics()['reaped'], 3)
+            # New threads are started on demand
+            self.assertEqual(executor.submit(mul, 6, 7).result(), 42)
+
+
 class ProcessPoolExecutorTest(ExecutorTest):
     def test_killed_child(self):
         # When a child process is abruptly terminated, the whole pool gets
@@ -808,6 +1012,113 @@ class ProcessPoolExecutorTest(ExecutorTest):
 
         self.assertTrue(obj.event.wait(timeout=1))
 
+    def test_shared_memory_results(self):
+        executor = self.executor_type(max_workers=2,
+                                      mp_context=self.get_context(),
+                                      shared_memory_threshold=1024)
+        try:
+            large = executor.submit(bytes, 1 << 20)
+            small = executor.submit(pow, 2, 8)
+            self.assertEqual(large.result(), bytes(1 << 20))
+            self.assertEqual(small.result(), 256)
+            self.assertEqual(
+                list(executor.map(bytes, [10, 5000, 2000], chunksize=2)),
+                [bytes(10), bytes(5000), bytes(2000)])
+            # Small results are only pickled once
+            self.assertEqual(executor.submit(PickleCounter).result().pickled,
+                             1)
+
+            # Pickling errors are raised by the future
+            future = executor.submit(threading.Lock)
+            self.assertRaises(TypeError, future.result)
+
+            # The files are freed once the results are received
+            directory = executor._shared_memory_dir
+            self.assertTrue(os.path.isdir(directory))
+            for name in os.listdir(directory):
+                self.assertTrue(name.startswith('free-'), name)
+
+            # and reused by the workers: each worker needs at most one file
+            # for sequential calls
+            nfiles = len(os.listdir(directory))
+            for i in range(10):
+                self.assertEqual(executor.submit(bytes, 5000).result(),
+                                 bytes(5000))
+            self.assertLessEqual(len(os.listdir(directory)), nfiles + 2)
+        finally:
+            executor.shutdown(wait=True)
+        self.assertFalse(os.path.exists(directory))
+
+    def test_restart_workers(self):
+        executor = self.executor_type(max_workers=2,
+                                      mp_context=self.get_context(),
+                                      restart_workers=True)
+        try:
+            self.assertEqual(executor.submit(pow, 2, 8).result(), 256)
+            fs = [executor.submit(_crash) for _ in range(3)]
+            fs.append(executor.submit(pow, 3, 2))
+            for future in fs[:3]:
+                self.assertRaises(BrokenProcessPool, future.result)
+            self.assertEqual(fs[3].result(), 9)
+            # The executor is still usable
+            self.assertFalse(executor._broken)
+            self.assertEqual(executor.submit(mul, 6, 7).result(), 42)
+            self.assertEqual(len(executor._processes), 2)
+        finally:
+            executor.shutdown(wait=True)
+
+    def test_max_worker_rss(self):
+        executor = self.executor_type(max_workers=2,
+                                      mp_context=self.get_context(),
+                                      max_worker_rss=1)
+        try:
+            # Every worker exceeds the limit and is replaced after a call
+            pids = [executor.submit(os.getpid).result() for _ in range(4)]
+            self.assertEqual(len(set(pids)), 4)
+            self.assertEqual(list(executor.map(abs, range(-5, 5))),
+                             [5, 4, 3, 2, 1, 0, 1, 2, 3, 4])
+        finally:
+            executor.shutdown(wait=True)
+        with self.assertRaisesRegex(ValueError, "max_worker_rss must be"):
+            self.executor_type(max_worker_rss=0)
+
+    def test_recycled_workers_files(self):
+        # The shared memory files of a replaced worker are removed
+        executor = self.executor_type(max_workers=2,
+                                      mp_context=self.get_context(),
+                                      shared_memory_threshold=1024,
+                                      max_worker_rss=1)
+        try:
+            for i in range(10):
+                self.assertEqual(executor.submit(bytes, 5000).result(),
+                                 bytes(5000))
+            directory = executor._shared_memory_dir
+            self.assertLessEqual(len(os.listdir(directory)), 2)
+        finally:
+            executor.shutdown(wait=True)
+
+    def test_forkserver_preload(self):
+        if self.ctx != 'forkserver':
+            with self.assertRaisesRegex(ValueError,
+                                        "forkserver_preload requires"):
+                self.executor_type(mp_context=self.get_context(),
+                                   forkserver_preload=['json'])
+            return
+        from multiprocessing import forkserver
+        self.addCleanup(forkserver.set_forkserver_preload,
+                        forkserver._forkserver._preload_modules)
+        with self.executor_type(max_workers=1,
+                                mp_context=self.get_context(),
+                                forkserver_preload=['json']) as executor:
+            self.assertEqual(executor.submit(pow, 2, 3).result(), 8)
+        self.assertEqual(forkserver._forkserver._preload_modules, ['json'])
+
+    def test_shared_memory_threshold_invalid(self):
+        for threshold in (0, -1):
+            with self.assertRaisesRegex(ValueError,
+                                        "shared_memory_threshold must be"):
+                self.executor_type(shared_memory_threshold=threshold)
+
 
 create_executor_tests(ProcessPoolExecutorTest,
                       executor_mixins=(ProcessPoolForkMixin,
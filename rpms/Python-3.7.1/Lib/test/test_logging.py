@@ -1697,6 +1697,127 @@ class SocketHandlerTest(BaseTest):
         time.sleep(self.sock_hdlr.retryTime - now + 0.001)
         self.root_logger.error('Nor this')
 
+class BatchingSocketHandlerTest(BaseTest):
+
+    """Test for BatchingSocketHandler objects."""
+
+    def setUp(self):
+        """Set up a TCP server to receive batches of records, and a
+        BatchingSocketHandler pointing to it."""
+        BaseTest.setUp(self)
+        self.server = self.sock_hdlr = None
+        self.batches = []
+        self.received = threading.Condition()
+        try:
+            self.server = server = TestTCPServer(('localhost', 0),
+                                                 self.handle_socket, 0.01)
+            server.start()
+        except OSError as e:
+            self.skipTest(e)
+        server.ready.wait()
+        self.sock_hdlr = logging.handlers.BatchingSocketHandler(
+            'localhost', server.port, capacity=3, flushInterval=60.0)
+        self.root_logger.removeHandler(self.root_logger.handlers[0])
+        self.root_logger.addHandler(self.sock_hdlr)
+
+    def tearDown(self):
+        """Shutdown the TCP server."""
+        try:
+            if self.sock_hdlr:
+                self.root_logger.removeHandler(self.sock_hdlr)
+                self.sock_hdlr.close()
+            if self.server:
+                self.server.stop(2.0)
+        finally:
+            BaseTest.tearDown(self)
+
+    def handle_socket(self, request):
+        for records in logging.handlers.receiveRecords(request.connection):
+            with self.received:
+                self.batches.append(records)
+                self.received.notify_all()
+
+    def wait_for(self, n):
+        with self.received:
+            self.assertTrue(self.received.wait_for(
+                lambda: sum(map(len, self.batches)) >= n, 5.0))
+
+    def test_output(self):
+        logger = logging.getLogger("tcp")
+        for i in range(7):
+            logger.error("spam %d", i)
+        self.wait_for(6)
+        self.sock_hdlr.flush()
+        self.wait_for(7)
+        self.assertTrue(all(len(batch) <= 3 for batch in self.batches))
+        records = [r for batch in self.batches for r in batch]
+        self.assertEqual([r.msg for r in records],
+                         ["spam %d" % i for i in range(7)])
+        self.assertEqual(records[0].name, "tcp")
+        self.assertEqual(records[0].levelno, logging.ERROR)
+        self.assertEqual(records[0].levelname, "ERROR")
+        self.assertEqual(records[0].funcName, "test_output")
+        self.assertIsNone(records[0].args)
+
+    def test_flush_interval(self):
+        self.sock_hdlr.flushInterval = 0.01
+        self.root_logger.error("alone")
+        self.wait_for(1)
+        self.assertEqual([[r.msg for r in batch] for batch in self.batches],
+                         [["alone"]])
+
+    def test_close_sends_buffer(self):
+        self.root_logger.error("last")
+        self.sock_hdlr.close()
+        self.wait_for(1)
+        self.assertEqual(self.batches[0][0].msg, "last")
+
+    def test_noserver(self):
+        # Emitting does not block while the server can't be reached, and
+        # records beyond maxBuffered are dropped.
+        port = self.server.port
+        self.server.stop(2.0)
+        self.server = None
+        self.root_logger.removeHandler(self.sock_hdlr)
+        self.sock_hdlr.close()
+        self.sock_hdlr = h = logging.handlers.BatchingSocketHandler(
+            'localhost', port, capacity=2, maxBuffered=5)
+        h.retryStart = 60.0
+        self.root_logger.addHandler(h)
+        for i in range(10):
+            self.root_logger.error("never sent %d", i)
+        h.close()
+        # The connection error holds a reference cycle to the sending
+        # thread's frames
+        support.gc_collect()
+        self.assertEqual(len(h.buffer), 5)
+        self.assertEqual(h.dropped, 5)
+        self.assertGreater(h.retryTime, time.time())
+
+    def test_encoding(self):
+        h = self.sock_hdlr
+        try:
+            raise RuntimeError('Deliberate mistake')
+        except RuntimeError:
+            exc_info = sys.exc_info()
+        r = logging.LogRecord('a.b', logging.WARNING, '/x/mod.py', 42,
+                              '\u00e9t\u00e9 %s %r', ('\u20ac', {1: 2}),
+                              exc_info, 'func', 'stack')
+        data = h.encodeRecord(r)
+        r2, = logging.handlers.decodeRecords(data)
+        for attr in ('name', 'levelno', 'levelname', 'pathname', 'filename',
+                     'module', 'lineno', 'funcName', 'created', 'msecs',
+                     'relativeCreated', 'thread', 'threadName', 'process',
+                     'processName', 'exc_text', 'stack_info'):
+            self.assertEqual(getattr(r2, attr), getattr(r, attr), attr)
+        self.assertEqual(r2.getMessage(), r.getMessage())
+        self.assertIn('Deliberate mistake', r2.exc_text)
+        r.thread = r.process = r.processName = None
+        r2, r3 = logging.handlers.decodeRecords(h.encodeRecord(r) * 2)
+        self.assertIsNone(r2.thread)
+        self.assertIsNone(r2.process)
+        self.assertIsNone(r3.processName)
+
 def _get_temp_domain_socket():
     fd, fn = tempfile.mkstemp(prefix='test_logging_', suffix='.sock')
     os.close(fd)
@@ -3361,6 +3482,101 @@ class QueueHandlerTest(BaseTest):
         listener.stop()
         self.assertEqual(self.stream.getvalue().strip().count('Traceback'), 1)
 
+    def test_queue_policies(self):
+        self.assertRaises(ValueError, logging.handlers.QueueHandler,
+                          self.queue, policy='spam')
+        self.que_logger.removeHandler(self.que_hdlr)
+
+        q = queue.Queue(2)
+        handler = logging.handlers.QueueHandler(q, policy='drop_newest')
+        self.que_logger.addHandler(handler)
+        for i in range(4):
+            self.que_logger.warning('%d', i)
+        self.assertEqual([q.get_nowait().msg for _ in range(2)], ['0', '1'])
+        self.assertEqual((handler.queued, handler.dropped), (2, 2))
+        self.que_logger.removeHandler(handler)
+
+        q = queue.Queue(2)
+        handler = logging.handlers.QueueHandler(q, policy='drop_oldest')
+        self.que_logger.addHandler(handler)
+        for i in range(4):
+            self.que_logger.warning('%d', i)
+        self.assertEqual([q.get_nowait().msg for _ in range(2)], ['2', '3'])
+        self.assertEqual((handler.queued, handler.dropped), (4, 2))
+        # The unfinished task count of the dropped records was released
+        for _ in range(2):
+            q.task_done()
+        q.join()
+        self.que_logger.removeHandler(handler)
+
+        q = queue.Queue(1)
+        handler = logging.handlers.QueueHandler(q, policy='block',
+                                                timeout=0.01)
+        self.que_logger.addHandler(handler)
+        self.que_logger.warning('0')
+        self.que_logger.warning('1')
+        self.assertEqual(q.get_nowait().msg, '0')
+        self.assertEqual((handler.queued, handler.dropped), (1, 1))
+        self.que_logger.removeHandler(handler)
+
+    def test_lazy(self):
+        self.que_logger.removeHandler(self.que_hdlr)
+        handler = logging.handlers.QueueHandler(self.queue, lazy=True)
+        handler.setFormatter(logging.Formatter('never used'))
+        self.que_logger.addHandler(handler)
+        self.que_logger.warning('%s %s', 'lazy', 'record')
+        record = self.queue.get_nowait()
+        self.assertEqual((record.msg, record.args), ('%s %s', ('lazy', 'record')))
+        self.assertFalse(hasattr(record, 'message'))
+        self.assertEqual(handler.queued, 1)
+
+    def test_queue_listener_batch(self):
+        self.assertRaises(ValueError, logging.handlers.QueueListener,
+                          self.queue, batch_size=0)
+
+        class CountingStream(io.StringIO):
+            writes = flushes = 0
+            def write(self, s):
+                self.writes += 1
+                return super().write(s)
+            def flush(self):
+                self.flushes += 1
+
+        stream = CountingStream()
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(logging.Formatter('%(message)s'))
+        stream_handler.addFilter(lambda record: record.msg != 'filtered')
+        test_handler = support.TestHandler(support.Matcher())
+        test_handler.setLevel(logging.ERROR)
+        for i in range(10):
+            self.que_logger.warning('m%d', i)
+        self.que_logger.warning('filtered')
+        self.que_logger.error('last')
+        listener = logging.handlers.QueueListener(
+            self.queue, stream_handler, test_handler,
+            respect_handler_level=True, batch_size=100)
+        listener.start()
+        listener.stop()
+        self.assertEqual(stream.getvalue(),
+                         ''.join('m%d\n' % i for i in range(10)) + 'last\n')
+        self.assertEqual((stream.writes, stream.flushes), (1, 1))
+        self.assertEqual(len(test_handler.buffer), 1)
+        self.assertTrue(test_handler.matches(levelno=logging.ERROR,
+                                             message='last'))
+        test_handler.close()
+
+    def test_emit_batch_subclass(self):
+        # A StreamHandler subclass overriding emit() still sees each record
+        emitted = []
+        class Handler(logging.StreamHandler):
+            def emit(self, record):
+                emitted.append(record.msg)
+        handler = Handler(io.StringIO())
+        records = [logging.makeLogRecord({'msg': str(i)}) for i in range(3)]
+        self.assertEqual(handler.handleBatch(records), 3)
+        self.assertEqual(emitted, ['0', '1', '2'])
+        self.assertEqual(handler.stream.getvalue(), '')
+
 if hasattr(logging.handlers, 'QueueListener'):
     import multiprocessing
     from unittest.mock import patch
@@ -4327,37 +4543,28 @@ class LoggerTest(BaseTest):
         logger1 = logging.getLogger("abc")
         logger2 = logging.getLogger("abc.def")
 
-        # Set root logger level and ensure cache is empty
+        # Set root logger level and ensure the threshold follows
         root.setLevel(logging.ERROR)
         self.assertEqual(logger2.getEffectiveLevel(), logging.ERROR)
-        self.assertEqual(logger2._cache, {})
-
-        # Ensure cache is populated and calls are consistent
+        self.assertEqual(logger2._threshold, logging.ERROR)
         self.assertTrue(logger2.isEnabledFor(logging.ERROR))
         self.assertFalse(logger2.isEnabledFor(logging.DEBUG))
-        self.assertEqual(logger2._cache, {logging.ERROR: True, logging.DEBUG: False})
-        self.assertEqual(root._cache, {})
-        self.assertTrue(logger2.isEnabledFor(logging.ERROR))
-
-        # Ensure root cache gets populated
-        self.assertEqual(root._cache, {})
         self.assertTrue(root.isEnabledFor(logging.ERROR))
-        self.assertEqual(root._cache, {logging.ERROR: True})
 
-        # Set parent logger level and ensure caches are emptied
+        # Set parent logger level and ensure thresholds are updated
         logger1.setLevel(logging.CRITICAL)
         self.assertEqual(logger2.getEffectiveLevel(), logging.CRITICAL)
-        self.assertEqual(logger2._cache, {})
+        self.assertEqual(logger2._threshold, logging.CRITICAL)
 
         # Ensure logger2 uses parent logger's effective level
         self.assertFalse(logger2.isEnabledFor(logging.ERROR))
 
-        # Set level to NOTSET and ensure caches are empty
+        # Set level to NOTSET and ensure thresholds are unchanged
         logger2.setLevel(logging.NOTSET)
         self.assertEqual(logger2.getEffectiveLevel(), logging.CRITICAL)
-        self.assertEqual(logger2._cache, {})
-        self.assertEqual(logger1._cache, {})
-        self.assertEqual(root._cache, {})
+        self.assertEqual(logger2._threshold, logging.CRITICAL)
+        self.assertEqual(logger1._threshold, logging.CRITICAL)
+        self.assertEqual(root._threshold, logging.ERROR)
 
         # Verify logger2 follows parent and not root
         self.assertFalse(logger2.isEnabledFor(logging.ERROR))
@@ -4366,17 +4573,55 @@ class LoggerTest(BaseTest):
         self.assertTrue(logger1.isEnabledFor(logging.CRITICAL))
         self.assertTrue(root.isEnabledFor(logging.ERROR))
 
-        # Disable logging in manager and ensure caches are clear
+        # A logger created later between existing ones picks up its
+        # parent's level, and so do loggers created after disable()
+        logger3 = logging.getLogger("abc.def.ghi")
+        self.assertFalse(logger3.isEnabledFor(logging.ERROR))
+        self.assertTrue(logger3.isEnabledFor(logging.CRITICAL))
+
+        # Disable logging in manager and ensure thresholds are raised
         logging.disable()
         self.assertEqual(logger2.getEffectiveLevel(), logging.CRITICAL)
-        self.assertEqual(logger2._cache, {})
-        self.assertEqual(logger1._cache, {})
-        self.assertEqual(root._cache, {})
+        self.assertEqual(logger2._threshold, logging.CRITICAL + 1)
+        self.assertEqual(logger1._threshold, logging.CRITICAL + 1)
+        self.assertEqual(root._threshold, logging.CRITICAL + 1)
 
         # Ensure no loggers are enabled
         self.assertFalse(logger1.isEnabledFor(logging.CRITICAL))
         self.assertFalse(logger2.isEnabledFor(logging.CRITICAL))
         self.assertFalse(root.isEnabledFor(logging.CRITICAL))
+        self.assertFalse(logging.getLogger("abc.xyz").isEnabledFor(
+            logging.CRITICAL))
+
+    def test_placeholder_replaced_with_level(self):
+        # A logger class which sets a level, replacing a placeholder,
+        # changes the threshold of the existing children.
+        class LevelledLogger(logging.Logger):
+            def __init__(self, name):
+                super().__init__(name, logging.ERROR)
+        child = logging.getLogger("pqr.stu")
+        self.assertTrue(child.isEnabledFor(logging.WARNING))
+        logging.setLoggerClass(LevelledLogger)
+        try:
+            parent = logging.getLogger("pqr")
+        finally:
+            logging.setLoggerClass(logging.Logger)
+        self.assertIs(child.parent, parent)
+        self.assertFalse(child.isEnabledFor(logging.WARNING))
+        self.assertTrue(child.isEnabledFor(logging.ERROR))
+
+    def test_get_logger_threads(self):
+        # Concurrent lookups of the same new logger all return it
+        results = []
+        def target():
+            for i in range(100):
+                results.append(logging.getLogger("threads.%d" % i))
+        threads = [threading.Thread(target=target) for _ in range(4)]
+        with support.start_threads(threads):
+            pass
+        for i in range(100):
+            loggers = {id(r) for r in results if r.name == "threads.%d" % i}
+            self.assertEqual(len(loggers), 1)
 
 
 class BaseFileTest(BaseTest):
@@ -4497,6 +4742,74 @@ class RotatingFileHandlerTest(BaseFileTest):
         self.assertFalse(os.path.exists(namer(self.fn + ".3")))
         rh.close()
 
+    def test_size_tracking(self):
+        line = 20 - len('\n') + len(os.linesep)
+        def emit(n):
+            for i in range(n):
+                rh.emit(logging.makeLogRecord({'msg': 'x' * 19}))
+        rh = logging.handlers.RotatingFileHandler(
+            self.fn, backupCount=1, maxBytes=5 * line)
+        rh.setFormatter(logging.Formatter('%(message)s'))
+        emit(4)
+        self.assertEqual(os.path.getsize(self.fn), 4 * line)
+        self.assertFalse(os.path.exists(self.fn + ".1"))
+        # The file is truncated by someone else: the handler notices when
+        # it is about to roll over, and does not.
+        with open(self.fn, 'w'):
+            pass
+        rh.stream.seek(0)
+        emit(2)
+        self.assertEqual(os.path.getsize(self.fn), 2 * line)
+        self.assertFalse(os.path.exists(self.fn + ".1"))
+        emit(3)
+        self.assertLogFile(self.fn + ".1")
+        self.assertEqual(os.path.getsize(self.fn + ".1"), 4 * line)
+        self.assertEqual(os.path.getsize(self.fn), line)
+        rh.close()
+
+    def test_format_once(self):
+        calls = []
+        class Formatter(logging.Formatter):
+            def format(self, record):
+                calls.append(record)
+                return super().format(record)
+        rh = logging.handlers.RotatingFileHandler(self.fn, maxBytes=1000)
+        rh.setFormatter(Formatter())
+        r = self.next_rec()
+        rh.emit(r)
+        self.assertEqual(calls, [r])
+        rh.close()
+
+    def check_compress(self, compress, module, suffix):
+        rh = logging.handlers.RotatingFileHandler(
+            self.fn, backupCount=2, maxBytes=1, compress=compress)
+        m1 = self.next_rec()
+        rh.emit(m1)
+        m2 = self.next_rec()
+        rh.emit(m2)
+        rh.emit(self.next_rec())
+        rh.close()
+        newline = os.linesep
+        for fn, m in ((self.fn + ".1" + suffix, m2),
+                      (self.fn + ".2" + suffix, m1)):
+            self.assertLogFile(fn)
+            with module.open(fn, "rb") as f:
+                self.assertEqual(f.read().decode("ascii"), m.msg + newline)
+        self.assertFalse(os.path.exists(self.fn + ".3" + suffix))
+        self.assertFalse(os.path.exists(self.fn + ".1" + suffix + ".tmp"))
+
+    def test_compress(self):
+        self.assertRaises(ValueError, logging.handlers.RotatingFileHandler,
+                          self.fn, compress='zip')
+        for compress, suffix in (('gzip', '.gz'), ('bz2', '.bz2'),
+                                 ('lzma', '.xz')):
+            with self.subTest(compress=compress):
+                try:
+                    module = __import__(compress)
+                except ImportError:
+                    continue
+                self.check_compress(compress, module, suffix)
+
 class TimedRotatingFileHandlerTest(BaseFileTest):
     # other test methods added below
     def test_rollover(self):
@@ -4708,6 +5021,7 @@ def test_main():
     tests = [
         BuiltinLevelsTest, BasicFilterTest, CustomLevelsAndFiltersTest,
         HandlerTest, MemoryHandlerTest, ConfigFileTest, SocketHandlerTest,
+        BatchingSocketHandlerTest,
         DatagramHandlerTest, MemoryTest, EncodingTest, WarningsTest,
         ConfigDictTest, ManagerTest, FormatterTest, BufferingFormatterTest,
         StreamHandlerTest, LogRecordFactoryTest, ChildLoggerTest,
@@ -7,6 +7,7 @@ Note: test_regrtest cannot be run twice in parallel.
 import contextlib
 import faulthandler
 import io
+import json
 import os.path
 import platform
 import re
@@ -19,7 +20,7 @@ import threading
 import unittest
 from test import libregrtest
 from test import support
-from test.libregrtest import utils
+from test.libregrtest import impact, utils
 
 
 Py_DEBUG = hasattr(sys, 'getobjects')
@@ -260,6 +261,35 @@ class ParseArgsTestCase(unittest.TestCase):
                 self.checkError([opt, '0', '-T'], "don't go together")
                 self.checkError([opt, '0', '-l'], "don't go together")
 
+    def test_durations(self):
+        ns = libregrtest._parse_args(['--durations', 'foo'])
+        self.assertEqual(ns.durations, os.path.join(support.SAVEDCWD, 'foo'))
+        self.checkError(['--durations'], 'expected one argument')
+
+    def test_changed(self):
+        ns = libregrtest._parse_args(['--changed', 'Lib/os.py',
+                                      '--changed', 'Lib/ast.py'])
+        self.assertEqual(ns.changed,
+                         [os.path.join(support.SAVEDCWD, 'Lib/os.py'),
+                          os.path.join(support.SAVEDCWD, 'Lib/ast.py')])
+        self.checkError(['--changed'], 'expected one argument')
+
+    def test_changed_since(self):
+        ns = libregrtest._parse_args(['--changed-since', 'HEAD~3'])
+        self.assertEqual(ns.changed_since, 'HEAD~3')
+        self.checkError(['--changed-since'], 'expected one argument')
+
+    def test_import_cache(self):
+        ns = libregrtest._parse_args(['--import-cache', 'foo'])
+        self.assertEqual(ns.import_cache,
+                         os.path.join(support.SAVEDCWD, 'foo'))
+
+    def test_split_package(self):
+        ns = libregrtest._parse_args(['--split-package', 'test_asyncio',
+                                      '--split-package', 'test_email'])
+        self.assertEqual(ns.split_packages, ['test_asyncio', 'test_email'])
+        self.checkError(['--split-package'], 'expected one argument')
+
     def test_coverage(self):
         for opt in '-T', '--coverage':
             with self.subTest(opt=opt):
@@ -864,6 +894,49 @@ class ArgsTestCase(BaseTestCase):
         self.assertEqual(output.rstrip().splitlines(),
                          tests)
 
+    def test_durations(self):
+        # test --durations
+        tests = [self.create_test() for index in range(3)]
+        filename = os.path.join(self.tmptestdir, 'durations.json')
+        with open(filename, 'w') as fp:
+            json.dump({tests[0]: 1.0, tests[1]: 30.0}, fp)
+
+        # with -j, the test without duration is first, then the slowest
+        output = self.run_tests('-j2', '--durations', filename,
+                                '--list-tests', *tests)
+        self.assertEqual(output.rstrip().splitlines(),
+                         [tests[2], tests[1], tests[0]])
+
+        # without -j, the order is unchanged
+        output = self.run_tests('--durations', filename,
+                                '--list-tests', *tests)
+        self.assertEqual(output.rstrip().splitlines(), tests)
+
+        # the durations of the run are written back
+        output = self.run_tests('-j2', '--durations', filename, *tests)
+        self.check_executed_tests(output, tests, randomize=True)
+        with open(filename) as fp:
+            durations = json.load(fp)
+        self.assertEqual(sorted(durations), sorted(tests))
+        self.assertLess(durations[tests[1]], 30.0)
+
+    def test_split_package(self):
+        # test --split-package
+        package = self.TESTNAME_PREFIX + 'package'
+        path = os.path.join(self.tmptestdir, package)
+        os.mkdir(path)
+        for name in ('__init__.py', 'test_b.py', 'test_a.py', 'helper.py'):
+            with open(os.path.join(path, name), 'x') as fp:
+                fp.write('import unittest\n')
+        tests = [package + '.test_a', package + '.test_b']
+
+        output = self.run_tests('--split-package', package,
+                                '--list-tests', package)
+        self.assertEqual(output.rstrip().splitlines(), tests)
+
+        output = self.run_tests('--split-package', package, package)
+        self.check_line(output, 'All 2 tests OK')
+
     def test_list_cases(self):
         # test --list-cases
         code = textwrap.dedent("""
@@ -981,6 +1054,136 @@ class ArgsTestCase(BaseTestCase):
                                   failed=testname, rerun=testname)
 
 
+class ImpactTestCase(unittest.TestCase):
+    """
+    Test the test selection of --changed, libregrtest.impact.
+    """
+
+    FILES = {
+        'pkg/__init__.py': 'from . import mod\n',
+        'pkg/mod.py': 'import os.path\n',
+        'other.py': 'x = 1\n',
+        'bad.py': 'def\n',
+        'test_a.py': 'import pkg\n',
+        'test_b.py': ('from test import support\n'
+                      'support.import_module("other")\n'),
+        'test_c.py': 'def f():\n    from pkg.mod import path\n',
+        'test_pkg/__init__.py': '',
+        'test_pkg/test_x.py': 'import other\n',
+    }
+    TESTS = ['test_a', 'test_b', 'test_c', 'test_pkg']
+
+    def setUp(self):
+        self.srcdir = tempfile.mkdtemp()
+        self.addCleanup(support.rmtree, self.srcdir)
+        self.root = os.path.join(self.srcdir, 'Lib')
+        for name, code in self.FILES.items():
+            path = os.path.join(self.root, *name.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as fp:
+                fp.write(code)
+        self.cache = os.path.join(self.srcdir, 'cache.json')
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def select(self, *changed):
+        graph = impact.ImportGraph([self.root], self.cache)
+        return impact.select_tests(self.TESTS, [self.path(name)
+                                                for name in changed],
+                                   graph, lambda test: test, self.srcdir)
+
+    def test_scan_imports(self):
+        self.assertEqual(impact.scan_imports('import a.b.c', 'x', False),
+                         {'a', 'a.b', 'a.b.c'})
+        self.assertEqual(impact.scan_imports('from . import b', 'p.x', False),
+                         {'p', 'p.b'})
+        self.assertEqual(impact.scan_imports('from .. import b', 'p.q', True),
+                         {'p', 'p.b'})
+        self.assertEqual(impact.scan_imports('from .m import *', 'p', True),
+                         {'p.m'})
+        self.assertEqual(
+            impact.scan_imports('importlib.import_module("a.b")', 'x', False),
+            {'a', 'a.b'})
+
+    def test_select(self):
+        self.assertEqual(self.select('pkg/mod.py'),
+                         (['test_a', 'test_c'], []))
+        self.assertEqual(self.select('pkg/__init__.py'),
+                         (['test_a', 'test_c'], []))
+        self.assertEqual(self.select('other.py'),
+                         (['test_b', 'test_pkg'], []))
+        self.assertEqual(self.select('test_pkg/test_x.py'),
+                         (['test_pkg'], []))
+        self.assertEqual(self.select('test_a.py'), (['test_a'], []))
+        self.assertEqual(self.select('bad.py'), ([], []))
+
+    def test_ignored_files(self):
+        doc = os.path.join(self.srcdir, 'Doc', 'library', 'os.rst')
+        graph = impact.ImportGraph([self.root], self.cache)
+        self.assertEqual(impact.select_tests(self.TESTS, [doc], graph,
+                                             lambda test: test, self.srcdir),
+                         ([], []))
+
+    def test_unknown_files(self):
+        cfile = os.path.join(self.srcdir, 'Modules', 'posixmodule.c')
+        graph = impact.ImportGraph([self.root], self.cache)
+        self.assertEqual(impact.select_tests(self.TESTS, [cfile], graph,
+                                             lambda test: test, self.srcdir),
+                         (self.TESTS, [cfile]))
+
+    def test_cache(self):
+        graph = impact.ImportGraph([self.root], self.cache)
+        self.assertTrue(os.path.exists(self.cache))
+        imports = graph.imports
+
+        # the cached imports are used for unchanged files
+        with open(self.cache) as fp:
+            data = json.load(fp)
+        data['files'][self.path('other.py')][2] = ['cached']
+        with open(self.cache, 'w') as fp:
+            json.dump(data, fp)
+        graph = impact.ImportGraph([self.root], self.cache)
+        self.assertEqual(graph.imports['other'], ['cached'])
+        self.assertEqual(graph.imports['test_a'], imports['test_a'])
+
+        # modified files are scanned again
+        with open(self.path('other.py'), 'w') as fp:
+            fp.write('import pkg\n')
+        graph = impact.ImportGraph([self.root], self.cache)
+        self.assertEqual(graph.imports['other'], ['pkg'])
+
+    def test_changed_since(self):
+        def git(*args):
+            subprocess.check_output(('git',) + args, cwd=self.srcdir,
+                                    stderr=subprocess.STDOUT)
+        try:
+            git('init', '-q')
+        except (OSError, subprocess.CalledProcessError):
+            self.skipTest('git is not available')
+        git('add', 'Lib')
+        git('-c', 'user.name=test', '-c', 'user.email=test@example.com',
+            'commit', '-q', '-m', 'initial')
+        with open(self.path('other.py'), 'a') as fp:
+            fp.write('y = 2\n')
+        with open(self.path('new.py'), 'w') as fp:
+            fp.write('import pkg\n')
+        with open(os.path.join(self.srcdir, '.gitignore'), 'w') as fp:
+            fp.write('*.json\n')
+        with open(self.path('data.json'), 'w') as fp:
+            fp.write('{}\n')
+        with open(os.path.join(self.srcdir, 'outside.py'), 'w') as fp:
+            fp.write('import pkg\n')
+
+        changed = impact.changed_since('HEAD', self.root)
+        # Untracked files are included, unless they are ignored, but not
+        # the files outside of the directory
+        self.assertEqual(sorted(os.path.realpath(name) for name in changed),
+                         sorted(os.path.realpath(name) for name in
+                                [self.path('new.py'),
+                                 self.path('other.py')]))
+
+
 class TestUtils(unittest.TestCase):
     def test_format_duration(self):
         self.assertEqual(utils.format_duration(0),
@@ -1641,6 +1641,28 @@ class POSIXProcessTestCase(BaseTestCase):
                             msg="restore_signals=True should've unblocked "
                             "SIGPIPE and friends.")
 
+    @unittest.skipIf(not os.path.exists('/proc/self/status'),
+                     "need /proc/self/status")
+    @unittest.skipUnless(hasattr(signal, 'pthread_sigmask'),
+                         "need signal.pthread_sigmask()")
+    def test_child_signal_mask(self):
+        # The signals blocked around vfork() must be unblocked in the child,
+        # and the signals blocked by the parent must stay blocked.
+        def sig_blk(output):
+            for line in output.splitlines():
+                if line.startswith(b'SigBlk'):
+                    return int(line.split()[1], 16)
+            self.skipTest("SigBlk not found in /proc/self/status.")
+
+        old_mask = signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGUSR1])
+        self.addCleanup(signal.pthread_sigmask, signal.SIG_SETMASK, old_mask)
+        for preexec_fn in (None, lambda: None):
+            with self.subTest(preexec_fn=preexec_fn):
+                output = subprocess.check_output(
+                        ['cat', '/proc/self/status'], preexec_fn=preexec_fn)
+                self.assertEqual(sig_blk(output),
+                                 1 << (signal.SIGUSR1 - 1))
+
     def test_start_new_session(self):
         # For code coverage of calling setsid().  We don't care if we get an
         # EPERM error from it depending on the test execution environment, that
@@ -20,6 +20,7 @@
 #ifdef HAVE_DIRENT_H
 #include <dirent.h>
 #endif
+#include <signal.h>
 
 #if defined(__ANDROID__) && __ANDROID_API__ < 21 && !defined(SYS_getdents64)
 # include <sys/linux-syscalls.h>
@@ -45,6 +46,14 @@
 
 #define POSIX_CALL(call)   do { if ((call) == -1) goto error; } while (0)
 
+/* vfork() does not copy the parent process, which makes it much cheaper
+ * than fork() for a parent with a large address space.  It is only usable
+ * where child_exec() does not allocate memory: see _close_open_fds_safe(). */
+#if defined(__linux__) && defined(HAVE_SYS_SYSCALL_H) && \
+    defined(HAVE_PTHREAD_SIGMASK) && !defined(HAVE_BROKEN_PTHREAD_SIGMASK)
+# define VFORK_USABLE 1
+#endif
+
 
 /* If gc was disabled, call gc.enable().  Return 0 on success. */
 static int
@@ -376,6 +385,41 @@ _close_open_fds_maybe_unsafe(long start_fd, PyObject* py_fds_to_keep)
 #endif  /* else NOT (defined(__linux__) && defined(HAVE_SYS_SYSCALL_H)) */
 
 
+#ifdef VFORK_USABLE
+/* Reset to SIG_DFL the handlers of the signals which child_sigmask does not
+ * block.  A child created by vfork() shares the memory of its parent: the
+ * signal handlers of the parent must not run in it. */
+static void
+reset_signal_handlers(const sigset_t *child_sigmask)
+{
+    struct sigaction sa_dfl;
+    int sig;
+
+    memset(&sa_dfl, 0, sizeof(sa_dfl));
+    sa_dfl.sa_handler = SIG_DFL;
+    for (sig = 1; sig < NSIG; sig++) {
+        struct sigaction sa;
+        void *handler;
+
+        /* Dispositions of SIGKILL and SIGSTOP can't be changed. */
+        if (sig == SIGKILL || sig == SIGSTOP)
+            continue;
+        /* The kernel resets the handlers of blocked signals on execve(). */
+        if (sigismember(child_sigmask, sig) == 1)
+            continue;
+        /* The C library may reserve some signals: skip errors. */
+        if (sigaction(sig, NULL, &sa) == -1)
+            continue;
+        handler = (sa.sa_flags & SA_SIGINFO) ? (void *)sa.sa_sigaction
+                                             : (void *)sa.sa_handler;
+        if (handler == (void *)SIG_IGN || handler == (void *)SIG_DFL)
+            continue;
+        (void)sigaction(sig, &sa_dfl, NULL);
+    }
+}
+#endif
+
+
 /*
  * This function is code executed in the child process immediately after fork
  * to set things up and call exec().
@@ -400,7 +444,8 @@ child_exec(char *const exec_array[],
            int call_setsid,
            PyObject *py_fds_to_keep,
            PyObject *preexec_fn,
-           PyObject *preexec_fn_args_tuple)
+           PyObject *preexec_fn_args_tuple,
+           const sigset_t *child_sigmask)
 {
     int i, saved_errno, reached_preexec = 0;
     PyObject *result;
@@ -408,6 +453,18 @@ child_exec(char *const exec_array[],
     /* Buffer large enough to hold a hex integer.  We can't malloc. */
     char hex_errno[sizeof(saved_errno)*2+1];
 
+#ifdef VFORK_USABLE
+    if (child_sigmask) {
+        /* Signals were blocked by the parent around vfork(). */
+        reset_signal_handlers(child_sigmask);
+        if ((saved_errno = pthread_sigmask(SIG_SETMASK, child_sigmask,
+                                           NULL))) {
+            errno = saved_errno;
+            goto error;
+        }
+    }
+#endif
+
     if (make_inheritable(py_fds_to_keep, errpipe_write) < 0)
         goto error;
 
@@ -546,6 +603,71 @@ error:
 }
 
 
+/* The child created by vfork() runs on the stack of the suspended parent,
+ * and vfork() returns twice: keep the function calling it small and out of
+ * line so that the child cannot clobber data the parent uses afterwards.
+ * child_sigmask is NULL to use fork(). */
+_Py_NO_INLINE static pid_t
+do_fork_exec(char *const exec_array[],
+             char *const argv[],
+             char *const envp[],
+             const char *cwd,
+             int p2cread, int p2cwrite,
+             int c2pread, int c2pwrite,
+             int errread, int errwrite,
+             int errpipe_read, int errpipe_write,
+             int close_fds, int restore_signals,
+             int call_setsid,
+             PyObject *py_fds_to_keep,
+             PyObject *preexec_fn,
+             PyObject *preexec_fn_args_tuple,
+             const sigset_t *child_sigmask)
+{
+    pid_t pid;
+
+#ifdef VFORK_USABLE
+    if (child_sigmask) {
+        pid = vfork();
+        if (pid == -1) {
+            /* vfork() may be forbidden, e.g. by a seccomp policy. */
+            pid = fork();
+        }
+    }
+    else
+#endif
+    {
+        pid = fork();
+    }
+    if (pid != 0) {
+        return pid;
+    }
+
+    /* Child process */
+    /*
+     * Code from here to _exit() must only use async-signal-safe functions,
+     * listed at `man 7 signal` or
+     * http://www.opengroup.org/onlinepubs/009695399/functions/xsh_chap02_04.html.
+     */
+
+    if (preexec_fn != Py_None) {
+        /* We'll be calling back into Python later so we need to do this.
+         * This call may not be async-signal-safe but neither is calling
+         * back into Python.  The user asked us to use hope as a strategy
+         * to avoid deadlock... */
+        PyOS_AfterFork_Child();
+    }
+
+    child_exec(exec_array, argv, envp, cwd,
+               p2cread, p2cwrite, c2pread, c2pwrite,
+               errread, errwrite, errpipe_read, errpipe_write,
+               close_fds, restore_signals, call_setsid,
+               py_fds_to_keep, preexec_fn, preexec_fn_args_tuple,
+               child_sigmask);
+    _exit(255);
+    return 0;  /* Dead code to avoid a potential compiler warning. */
+}
+
+
 static PyObject *
 subprocess_fork_exec(PyObject* self, PyObject *args)
 {
@@ -565,6 +687,10 @@ subprocess_fork_exec(PyObject* self, PyObject *args)
     Py_ssize_t arg_num;
     int need_after_fork = 0;
     int saved_errno = 0;
+    const sigset_t *old_sigmask = NULL;
+#ifdef VFORK_USABLE
+    sigset_t old_sigs;
+#endif
 
     if (!PyArg_ParseTuple(
             args, "OOpO!OOiiiiiiiiiiO:fork_exec",
@@ -676,37 +802,44 @@ subprocess_fork_exec(PyObject* self, PyObject *args)
         need_after_fork = 1;
     }
 
-    pid = fork();
-    if (pid == 0) {
-        /* Child process */
-        /*
-         * Code from here to _exit() must only use async-signal-safe functions,
-         * listed at `man 7 signal` or
-         * http://www.opengroup.org/onlinepubs/009695399/functions/xsh_chap02_04.html.
-         */
-
-        if (preexec_fn != Py_None) {
-            /* We'll be calling back into Python later so we need to do this.
-             * This call may not be async-signal-safe but neither is calling
-             * back into Python.  The user asked us to use hope as a strategy
-             * to avoid deadlock... */
-            PyOS_AfterFork_Child();
+#ifdef VFORK_USABLE
+    /* Use vfork() unless preexec_fn has to run Python code in the child.
+     * Block all the signals so that no signal handler runs in the child
+     * while it shares the memory of the parent; the child restores the
+     * signal mask once it has reset the handlers. */
+    if (preexec_fn == Py_None) {
+        sigset_t all_sigs;
+        sigfillset(&all_sigs);
+        if ((saved_errno = pthread_sigmask(SIG_BLOCK, &all_sigs, &old_sigs))) {
+            errno = saved_errno;
+            PyErr_SetFromErrno(PyExc_OSError);
+            Py_XDECREF(cwd_obj2);
+            goto cleanup;
         }
-
-        child_exec(exec_array, argv, envp, cwd,
-                   p2cread, p2cwrite, c2pread, c2pwrite,
-                   errread, errwrite, errpipe_read, errpipe_write,
-                   close_fds, restore_signals, call_setsid,
-                   py_fds_to_keep, preexec_fn, preexec_fn_args_tuple);
-        _exit(255);
-        return NULL;  /* Dead code to avoid a potential compiler warning. */
+        old_sigmask = &old_sigs;
     }
+#endif
+
+    pid = do_fork_exec(exec_array, argv, envp, cwd,
+                       p2cread, p2cwrite, c2pread, c2pwrite,
+                       errread, errwrite, errpipe_read, errpipe_write,
+                       close_fds, restore_signals, call_setsid,
+                       py_fds_to_keep, preexec_fn, preexec_fn_args_tuple,
+                       old_sigmask);
     /* Parent (original) process */
     if (pid == -1) {
         /* Capture errno for the exception. */
         saved_errno = errno;
     }
 
+#ifdef VFORK_USABLE
+    if (old_sigmask) {
+        /* The parent was suspended until the child called execve() or
+         * _exit(): it no longer shares memory with the child. */
+        (void)pthread_sigmask(SIG_SETMASK, old_sigmask, NULL);
+    }
+#endif
+
     Py_XDECREF(cwd_obj2);
 
     if (need_after_fork)
@@ -758,7 +891,8 @@ PyDoc_STRVAR(subprocess_fork_exec_doc,
 \n\
 Forks a child process, closes parent file descriptors as appropriate in the\n\
 child and dups the few that are needed before calling exec() in the child\n\
-process.\n\
+process.  On Linux, vfork() is used instead of fork() unless preexec_fn is\n\
+supplied.\n\
 \n\
 The preexec_fn, if supplied, will be called immediately before exec.\n\
 WARNING: preexec_fn is NOT SAFE if your application uses threads.\n\
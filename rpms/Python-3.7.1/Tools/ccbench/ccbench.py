@@ -14,9 +14,20 @@ import itertools
 import threading
 import subprocess
 import socket
+import json
 from optparse import OptionParser, SUPPRESS_HELP
 import platform
 
+try:
+    import multiprocessing
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+except ImportError:
+    multiprocessing = None
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
 # Compatibility
 try:
     xrange
@@ -37,6 +48,15 @@ LATENCY_DURATION = 2.0
 BANDWIDTH_PACKET_SIZE = 1024
 BANDWIDTH_DURATION = 2.0
 
+SCALING_DURATION = 2.0
+SCALING_TASKS_PER_WORKER = 10
+SCALING_IO_DELAY = 0.001
+
+TRANSPORT_DURATION = 2.0
+TRANSPORT_SIZES = [64 * 1024, 1024 * 1024, 16 * 1024 * 1024]
+# Results above this size go through shared memory when enabled
+TRANSPORT_THRESHOLD = 32 * 1024
+
 
 def task_pidigits():
     """Pi calculation (Python)"""
@@ -132,6 +152,17 @@ def task_hashing():
     return compute, (arg, )
 
 
+def task_noop():
+    """no-op (dispatch overhead)"""
+    def noop():
+        pass
+    return noop, ()
+
+def task_sleep():
+    """1 ms sleep (simulated I/O)"""
+    return time.sleep, (SCALING_IO_DELAY, )
+
+
 throughput_tasks = [task_pidigits, task_regex]
 for mod in 'bz2', 'hashlib':
     try:
@@ -151,6 +182,7 @@ else:
 
 latency_tasks = throughput_tasks
 bandwidth_tasks = [task_pidigits]
+scaling_tasks = [task_noop] + throughput_tasks + [task_sleep]
 
 
 class TimedLoop:
@@ -527,6 +559,217 @@ def run_bandwidth_tests(max_threads):
         print()
 
 
+# Per-process cache of (func, args) so that pool workers only build
+# each task once.
+_task_cache = {}
+
+def _call_task(name):
+    try:
+        func, args = _task_cache[name]
+    except KeyError:
+        func, args = _task_cache[name] = globals()[name]()
+    return func(*args)
+
+def _run_pool_round(pool_map, names):
+    for result in pool_map(_call_task, names):
+        pass
+
+def _run_asyncio_round(loop, func, args, names, nworkers, executor=None):
+    # Keep at most nworkers tasks in flight.  Scheduling uses plain loop
+    # callbacks so that this file stays importable without coroutine syntax.
+    done = loop.create_future()
+    state = {'todo': len(names), 'running': 0}
+    sleep = func is time.sleep
+
+    def finish(fut=None):
+        state['running'] -= 1
+        if not start_one() and not state['running']:
+            done.set_result(None)
+
+    def run_inline():
+        func(*args)
+        finish()
+
+    def start_one():
+        if not state['todo']:
+            return False
+        state['todo'] -= 1
+        state['running'] += 1
+        if executor is not None:
+            fut = loop.run_in_executor(executor, func, *args)
+            fut.add_done_callback(finish)
+        elif sleep:
+            loop.call_later(args[0], finish)
+        else:
+            loop.call_soon(run_inline)
+        return True
+
+    for i in range(nworkers):
+        start_one()
+    loop.run_until_complete(done)
+
+def _make_pool_runner(kind, nworkers):
+    """Return a (run_round, close) pair for the given executor kind."""
+    if kind == 'thread':
+        executor = ThreadPoolExecutor(nworkers)
+        return (lambda task, names: _run_pool_round(executor.map, names),
+                executor.shutdown)
+    if kind == 'process':
+        executor = ProcessPoolExecutor(nworkers)
+        return (lambda task, names: _run_pool_round(executor.map, names),
+                executor.shutdown)
+    if kind == 'mp-pool':
+        pool = multiprocessing.Pool(nworkers)
+        def close():
+            pool.close()
+            pool.join()
+        # chunksize=1 matches what the concurrent.futures executors do
+        return (lambda task, names: _run_pool_round(
+                    lambda f, it: pool.imap(f, it, 1), names),
+                close)
+    if kind in ('asyncio', 'asyncio-thread'):
+        loop = asyncio.new_event_loop()
+        executor = None
+        if kind == 'asyncio-thread':
+            executor = ThreadPoolExecutor(nworkers)
+        def run_round(task, names):
+            func, args = _task_cache.get(task.__name__) or task()
+            _task_cache[task.__name__] = func, args
+            _run_asyncio_round(loop, func, args, names, nworkers, executor)
+        def close():
+            if executor is not None:
+                executor.shutdown()
+            loop.close()
+        return run_round, close
+    raise ValueError("unknown executor kind: %r" % kind)
+
+def get_executor_kinds():
+    kinds = []
+    if multiprocessing is not None:
+        kinds.extend(['thread', 'process', 'mp-pool'])
+    if asyncio is not None:
+        kinds.extend(['asyncio', 'asyncio-thread'])
+    return kinds
+
+def run_scaling_test(task, kind, nworkers):
+    assert nworkers >= 1
+    names = [task.__name__] * (nworkers * SCALING_TASKS_PER_WORKER)
+    run_round, close = _make_pool_runner(kind, nworkers)
+    try:
+        # Warm up: spawns the workers and builds the task in each of them
+        run_round(task, names)
+        ntasks = 0
+        _time = time.time
+        start_time = _time()
+        while True:
+            run_round(task, names)
+            ntasks += len(names)
+            duration = _time() - start_time
+            if duration >= SCALING_DURATION:
+                return ntasks, duration
+    finally:
+        close()
+
+def run_scaling_tests(max_workers, kinds, json_results):
+    for task in scaling_tasks:
+        print(task.__doc__)
+        print()
+        print("%-16s" % "workers", end="")
+        for nworkers in range(1, max_workers + 1):
+            print("%18d" % nworkers, end="")
+        print()
+        for kind in kinds:
+            print("%-16s" % kind, end="")
+            sys.stdout.flush()
+            baseline_speed = None
+            for nworkers in range(1, max_workers + 1):
+                ntasks, duration = run_scaling_test(task, kind, nworkers)
+                speed = ntasks / duration
+                json_results.append({
+                    'task': task.__name__,
+                    'executor': kind,
+                    'workers': nworkers,
+                    'tasks': ntasks,
+                    'duration': duration,
+                    'tasks_per_sec': speed,
+                })
+                if baseline_speed is None:
+                    baseline_speed = speed
+                    cell = "%d/s" % speed
+                else:
+                    cell = "%d/s (%d %%)" % (speed,
+                                             speed / baseline_speed * 100)
+                print("%18s" % cell, end="")
+                sys.stdout.flush()
+            print()
+        print()
+
+
+def make_result(size):
+    return b"x" * size
+
+def _make_transport_executor(nworkers, shared):
+    if not shared:
+        return ProcessPoolExecutor(nworkers)
+    try:
+        return ProcessPoolExecutor(
+            nworkers, shared_memory_threshold=TRANSPORT_THRESHOLD)
+    except TypeError:
+        # Shared memory transport not available
+        return None
+
+def run_transport_test(size, nworkers, shared):
+    executor = _make_transport_executor(nworkers, shared)
+    if executor is None:
+        return None
+    sizes = [size] * (nworkers * 2)
+    try:
+        # Warm up: spawns the workers
+        for result in executor.map(make_result, sizes):
+            pass
+        nbytes = 0
+        _time = time.time
+        start_time = _time()
+        while True:
+            for result in executor.map(make_result, sizes):
+                nbytes += len(result)
+            del result
+            duration = _time() - start_time
+            if duration >= TRANSPORT_DURATION:
+                return nbytes, duration
+    finally:
+        executor.shutdown()
+
+def run_transport_tests(nworkers, json_results):
+    print("%-16s%18s%18s%18s" % ("result size", "pipe", "shared memory",
+                                 "speedup"))
+    for size in TRANSPORT_SIZES:
+        print("%-16s" % ("%d kB" % (size // 1024)), end="")
+        sys.stdout.flush()
+        speeds = {}
+        for transport, shared in (('pipe', False), ('shared', True)):
+            res = run_transport_test(size, nworkers, shared)
+            if res is None:
+                print("%18s" % "n/a", end="")
+                continue
+            nbytes, duration = res
+            speed = speeds[transport] = nbytes / duration / 1e6
+            json_results.append({
+                'size': size,
+                'transport': transport,
+                'workers': nworkers,
+                'bytes': nbytes,
+                'duration': duration,
+                'mb_per_sec': speed,
+            })
+            print("%18s" % ("%.1f MB/s" % speed), end="")
+            sys.stdout.flush()
+        if len(speeds) == 2:
+            print("%18s" % ("%.2fx" % (speeds['shared'] / speeds['pipe'])),
+                  end="")
+        print()
+    print()
+
 def main():
     usage = "usage: %prog [-h|--help] [options]"
     parser = OptionParser(usage=usage)
@@ -539,6 +782,22 @@ def main():
     parser.add_option("-b", "--bandwidth",
                       action="store_true", dest="bandwidth", default=False,
                       help="run I/O bandwidth tests")
+    parser.add_option("-s", "--scaling",
+                      action="store_true", dest="scaling", default=False,
+                      help="run executor scaling tests (not run by default)")
+    parser.add_option("-r", "--results",
+                      action="store_true", dest="results", default=False,
+                      help="run process pool result transport tests "
+                           "(not run by default)")
+    parser.add_option("-e", "--executors",
+                      action="store", dest="executors", default=None,
+                      help="comma-separated executor kinds for scaling tests "
+                           "(default: %s)" % ",".join(get_executor_kinds()))
+    parser.add_option("-J", "--json",
+                      action="store", dest="json", default=None,
+                      metavar="FILE",
+                      help="write scaling and result transport test "
+                           "results as JSON to FILE")
     parser.add_option("-i", "--interval",
                       action="store", type="int", dest="check_interval", default=None,
                       help="sys.setcheckinterval() value")
@@ -571,7 +830,17 @@ def main():
         bandwidth_client(**kwargs)
         return
 
-    if not options.throughput and not options.latency and not options.bandwidth:
+    if options.executors:
+        kinds = options.executors.split(",")
+        for kind in kinds:
+            if kind not in get_executor_kinds():
+                parser.error("unavailable executor kind: %r" % kind)
+    else:
+        kinds = get_executor_kinds()
+
+    if (not options.throughput and not options.latency
+        and not options.bandwidth and not options.scaling
+        and not options.results):
         options.throughput = options.latency = options.bandwidth = True
     if options.check_interval:
         sys.setcheckinterval(options.check_interval)
@@ -607,5 +876,34 @@ def main():
         print()
         run_bandwidth_tests(options.nthreads)
 
+    data = {}
+    if options.scaling:
+        print("--- Executor scaling (tasks/s, % of 1 worker) ---")
+        print()
+        data['scaling'] = []
+        run_scaling_tests(options.nthreads, kinds, data['scaling'])
+
+    if options.results:
+        if multiprocessing is None:
+            parser.error("result transport tests need multiprocessing")
+        print("--- Process pool result transport (%d workers) ---"
+              % options.nthreads)
+        print()
+        data['transport'] = []
+        run_transport_tests(options.nthreads, data['transport'])
+
+    if options.json and data:
+        data.update({
+            'implementation': platform.python_implementation(),
+            'version': platform.python_version(),
+            'build': platform.python_build()[0],
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'cpu_count': os.cpu_count(),
+        })
+        with open(options.json, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        print("Results written to %s" % options.json)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Requests per second of HTTP/1.1 servers over loopback.
+
+The asyncio.http server and http.server.ThreadingHTTPServer are run in a
+child process, and answer GET requests with a fixed body.  Clients keep
+their connections open and send a request once the previous response is
+received, or send several requests ahead of the responses (pipelining).
+"""
+
+import argparse
+import asyncio
+import http.server
+import multiprocessing
+import sys
+import time
+
+
+SERVERS = ['asyncio', 'threading']
+
+
+def serve_asyncio(body, ready):
+    import asyncio.http
+
+    async def handler(request):
+        return asyncio.http.Response(
+            headers={'Content-Type': 'text/plain'}, body=body)
+
+    async def main():
+        server = await asyncio.http.start_server(handler, '127.0.0.1', 0,
+                                                 backlog=1024)
+        ready.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def serve_threading(body, ready):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Like asyncio transports, do not delay the body sent after the
+        # headers.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(http.server.ThreadingHTTPServer):
+        request_queue_size = 1024
+
+    server = Server(('127.0.0.1', 0), Handler)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    if not head.startswith(b'HTTP/1.1 200 '):
+        raise RuntimeError(f'unexpected response: {head!r}')
+    start = head.lower().index(b'\r\ncontent-length:') + 17
+    length = int(head[start:head.index(b'\r\n', start)])
+    await reader.readexactly(length)
+
+
+async def client(port, requests, depth):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'
+    sent = received = 0
+    while received < requests:
+        # Keep up to depth requests in flight.
+        n = min(depth - (sent - received), requests - sent)
+        if n > 0:
+            writer.write(request * n)
+            sent += n
+        await read_response(reader)
+        received += 1
+    writer.close()
+
+
+async def run(port, connections, requests, depth):
+    per_connection = requests // connections
+    start = time.perf_counter()
+    await asyncio.gather(*[client(port, per_connection, depth)
+                           for _ in range(connections)])
+    elapsed = time.perf_counter() - start
+    return per_connection * connections / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-c', '--connections', type=int, default=16,
+                        help="number of client connections "
+                             "(default: %(default)s)")
+    parser.add_argument('-n', '--requests', type=int, default=20000,
+                        help="requests per run (default: %(default)s)")
+    parser.add_argument('-p', '--pipeline', type=int, default=16,
+                        help="requests in flight per connection in the "
+                             "pipelined runs (default: %(default)s)")
+    parser.add_argument('-b', '--body-size', type=int, default=100,
+                        help="size of the response body "
+                             "(default: %(default)s)")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="repetitions, the best is kept "
+                             "(default: %(default)s)")
+    parser.add_argument('servers', nargs='*',
+                        help="servers to run (default: all of %s)"
+                             % ", ".join(SERVERS))
+    options = parser.parse_args()
+    servers = options.servers or SERVERS
+    body = b'x' * options.body_size
+
+    print("Python %s" % sys.version.split()[0])
+    print("%d connections, %d requests, %d-byte responses"
+          % (options.connections, options.requests, options.body_size))
+    print("%-10s %14s %14s"
+          % ("server", "keep-alive", "pipelined x%d" % options.pipeline))
+    for name in servers:
+        target = globals()['serve_' + name]
+        ready = multiprocessing.Queue()
+        process = multiprocessing.Process(target=target, args=(body, ready),
+                                          daemon=True)
+        process.start()
+        try:
+            port = ready.get(timeout=30)
+            results = []
+            for depth in (1, options.pipeline):
+                results.append(max(
+                    asyncio.run(run(port, options.connections,
+                                    options.requests, depth))
+                    for _ in range(options.repeat)))
+        finally:
+            process.terminate()
+            process.join()
+        print("%-10s %10.0f r/s %10.0f r/s" % (name, *results))
+
+
+if __name__ == "__main__":
+    main()
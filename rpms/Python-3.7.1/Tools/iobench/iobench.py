@@ -1,18 +1,33 @@
 # -*- coding: utf-8 -*-
 # This file should be kept compatible with both Python 2.6 and Python >= 3.0.
 
+import contextlib
 import itertools
+import json
 import os
 import platform
+import random
 import re
+import shutil
 import sys
 import time
 from optparse import OptionParser
 
+try:
+    import mmap
+except ImportError:
+    mmap = None
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
 out = sys.stdout
 
 TEXT_ENCODING = 'utf8'
 NEWLINES = 'lf'
+BUFFERING = -1
+THREADS = 4
 
 # Compatibility
 try:
@@ -28,6 +43,30 @@ def text_open(fn, mode, encoding=None):
             mode += 'U' # 'U' mode is needed only in Python 2.x
         return open(fn, mode)
 
+def binary_open(fn, mode):
+    return open(fn, mode, BUFFERING)
+
+@contextlib.contextmanager
+def mmap_open(fn):
+    with open(fn, "rb") as f:
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield m
+    finally:
+        m.close()
+
+_random_offsets = {}
+
+def random_offsets(size, block):
+    """ size // block random block-aligned offsets, same for every run """
+    key = (size, block)
+    if key not in _random_offsets:
+        rng = random.Random(size)
+        nblocks = max(size // block, 1)
+        _random_offsets[key] = [rng.randrange(nblocks) * block
+                                for i in xrange(nblocks)]
+    return _random_offsets[key]
+
 def get_file_sizes():
     for s in ['20 KiB', '400 KiB', '10 MiB']:
         size, unit = s.split()
@@ -132,6 +171,14 @@ def read_seek_blockwise(f):
     while f.read(1000):
         f.seek(1000, 1)
 
+@with_open_mode("rb")
+@with_sizes("medium", "large")
+def read_random_chunks(f):
+    """ seek & read 4096 units at random """
+    for offset in random_offsets(os.fstat(f.fileno()).st_size, 4096):
+        f.seek(offset)
+        f.read(4096)
+
 
 @with_open_mode("w")
 @with_sizes("small")
@@ -224,11 +271,153 @@ def read_modify_blockwise(f, source):
         f.write(source[i+1000:i+2000])
 
 
+
+@with_open_mode("rb")
+@with_sizes("medium")
+def readinto_small_chunks(f, buf):
+    """ readinto 20 bytes at a time """
+    view = memoryview(buf)[:20]
+    f.seek(0)
+    while f.readinto(view):
+        pass
+
+@with_open_mode("rb")
+@with_sizes("medium")
+def readinto_big_chunks(f, buf):
+    """ readinto 4096 bytes at a time """
+    view = memoryview(buf)[:4096]
+    f.seek(0)
+    while f.readinto(view):
+        pass
+
+@with_open_mode("rb")
+@with_sizes("small", "medium", "large")
+def readinto_whole_file(f, buf):
+    """ readinto whole contents at once """
+    f.seek(0)
+    f.readinto(buf)
+
+@with_open_mode("rb")
+@with_sizes("medium", "large")
+def readinto_random_chunks(f, buf):
+    """ seek & readinto 4096 bytes at random """
+    view = memoryview(buf)[:4096]
+    for offset in random_offsets(len(buf), 4096):
+        f.seek(offset)
+        f.readinto(view)
+
+
+@with_open_mode("rb")
+@with_sizes("medium")
+def mmap_small_chunks(m):
+    """ mmap slice 20 bytes at a time """
+    for i in xrange(0, len(m), 20):
+        m[i:i+20]
+
+@with_open_mode("rb")
+@with_sizes("medium")
+def mmap_big_chunks(m):
+    """ mmap slice 4096 bytes at a time """
+    for i in xrange(0, len(m), 4096):
+        m[i:i+4096]
+
+@with_open_mode("rb")
+@with_sizes("small", "medium", "large")
+def mmap_whole_file(m):
+    """ mmap slice whole contents at once """
+    m[:]
+
+@with_open_mode("rb")
+@with_sizes("medium", "large")
+def mmap_random_chunks(m):
+    """ mmap slice 4096 bytes at random """
+    for offset in random_offsets(len(m), 4096):
+        m[offset:offset+4096]
+
+
+@with_open_mode("rb")
+@with_sizes("medium", "large")
+def copy_read_write(f, dest):
+    """ copy with read() & write() 64 KiB """
+    f.seek(0)
+    while True:
+        data = f.read(65536)
+        if not data:
+            break
+        dest.write(data)
+
+@with_open_mode("rb")
+@with_sizes("medium", "large")
+def copy_readinto_write(f, dest):
+    """ copy with readinto() & write() 64 KiB """
+    buf = bytearray(65536)
+    view = memoryview(buf)
+    f.seek(0)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+        dest.write(view[:n])
+
+@with_open_mode("rb")
+@with_sizes("medium", "large")
+def copy_copyfileobj(f, dest):
+    """ copy with shutil.copyfileobj() """
+    f.seek(0)
+    shutil.copyfileobj(f, dest)
+
+@with_open_mode("rb")
+@with_sizes("medium", "large")
+def copy_sendfile(f, dest):
+    """ copy with os.sendfile() """
+    infd = f.fileno()
+    outfd = dest.fileno()
+    size = os.fstat(infd).st_size
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(outfd, infd, offset, size - offset)
+        if not sent:
+            break
+        offset += sent
+
+
+@with_open_mode("rb")
+@with_sizes("large")
+def pread_blocks(f, pool):
+    """ pread 64 KiB blocks from thread pool """
+    fd = f.fileno()
+    size = os.fstat(fd).st_size
+    for data in pool.map(lambda offset: os.pread(fd, 65536, offset),
+                         xrange(0, size, 65536)):
+        pass
+
+@with_open_mode("rb")
+@with_sizes("large")
+def pread_random(f, pool):
+    """ pread 4096 bytes at random from pool """
+    fd = f.fileno()
+    offsets = random_offsets(os.fstat(fd).st_size, 4096)
+    for data in pool.map(lambda offset: os.pread(fd, 4096, offset),
+                         offsets):
+        pass
+
+@with_open_mode("wb+")
+@with_sizes("large")
+def pwrite_blocks(f, source, pool):
+    """ pwrite 64 KiB blocks from thread pool """
+    fd = f.fileno()
+    view = memoryview(source)
+    for n in pool.map(
+            lambda offset: os.pwrite(fd, view[offset:offset+65536], offset),
+            xrange(0, len(source), 65536)):
+        pass
+
+
 read_tests = [
     read_bytewise, read_small_chunks, read_lines, read_big_chunks,
     None, read_whole_file, None,
     seek_forward_bytewise, seek_forward_blockwise,
-    read_seek_bytewise, read_seek_blockwise,
+    read_seek_bytewise, read_seek_blockwise, read_random_chunks,
 ]
 
 write_tests = [
@@ -241,6 +430,31 @@ modify_tests = [
     modify_seek_forward_bytewise, modify_seek_forward_blockwise,
     read_modify_bytewise, read_modify_blockwise,
 ]
+readinto_tests = [
+    readinto_small_chunks, readinto_big_chunks, None,
+    readinto_whole_file, None,
+    readinto_random_chunks,
+]
+
+mmap_tests = [
+    mmap_small_chunks, mmap_big_chunks, None,
+    mmap_whole_file, None,
+    mmap_random_chunks,
+]
+
+copy_tests = [
+    copy_read_write, copy_readinto_write, copy_copyfileobj,
+]
+if hasattr(os, "sendfile"):
+    copy_tests.append(copy_sendfile)
+
+pread_tests = [
+    pread_blocks, pread_random,
+]
+
+pwrite_tests = [
+    pwrite_blocks,
+]
 
 def run_during(duration, func):
     _t = time.time
@@ -262,7 +476,14 @@ def warm_cache(filename):
         f.read()
 
 
-def run_all_tests(options):
+def run_all_tests(options, json_filename=None):
+    results = []
+    current = {}
+
+    def print_section(title):
+        current["section"] = title
+        print("\n** %s **\n" % title)
+
     def print_label(filename, func):
         name = re.split(r'[-.]', filename)[0]
         out.write(
@@ -271,9 +492,19 @@ def run_all_tests(options):
             ).ljust(52))
         out.flush()
 
-    def print_results(size, n, real, cpu):
-        bw = n * float(size) / 1024 ** 2 / real
-        bw = ("%4d MiB/s" if bw > 100 else "%.3g MiB/s") % bw
+    def print_results(name, size, test_func, n, real, cpu):
+        mibps = n * float(size) / 1024 ** 2 / real
+        results.append({
+            "section": current["section"],
+            "test": test_func.__name__,
+            "file": name,
+            "size": size,
+            "iterations": n,
+            "real": real,
+            "cpu": cpu,
+            "mib_per_s": mibps,
+        })
+        bw = ("%4d MiB/s" if mibps > 100 else "%.3g MiB/s") % mibps
         out.write(bw.rjust(12) + "\n")
         if cpu < 0.90 * real:
             out.write("   warning: test above used only %d%% CPU, "
@@ -286,7 +517,7 @@ def run_all_tests(options):
             warm_cache(name)
         with open_func(name) as f:
             n, real, cpu = run_during(1.5, lambda: test_func(f, *args))
-        print_results(size, n, real, cpu)
+        print_results(name, size, test_func, n, real, cpu)
 
     def run_test_family(tests, mode_filter, files, open_func, *make_args):
         for test_func in tests:
@@ -325,28 +556,33 @@ def run_all_tests(options):
     if "t" in options:
         print("Text unit = one character (%s-decoded)" % TEXT_ENCODING)
 
+    if "b" in options:
+        print("Binary buffering = %s" % (
+            "none" if BUFFERING == 0 else "default"))
+
     # Binary reads
     if "b" in options and "r" in options:
-        print("\n** Binary input **\n")
-        run_test_family(read_tests, "t", binary_files, lambda fn: open(fn, "rb"))
+        print_section("Binary input")
+        run_test_family(read_tests, "t", binary_files,
+            lambda fn: binary_open(fn, "rb"))
 
     # Text reads
     if "t" in options and "r" in options:
-        print("\n** Text input **\n")
+        print_section("Text input")
         run_test_family(read_tests, "b", text_files, lambda fn: text_open(fn, "r"))
 
     # Binary writes
     if "b" in options and "w" in options:
-        print("\n** Binary append **\n")
+        print_section("Binary append")
         def make_test_source(name, size):
             with open(name, "rb") as f:
                 return f.read()
         run_test_family(write_tests, "t", binary_files,
-            lambda fn: open(os.devnull, "wb"), make_test_source)
+            lambda fn: binary_open(os.devnull, "wb"), make_test_source)
 
     # Text writes
     if "t" in options and "w" in options:
-        print("\n** Text append **\n")
+        print_section("Text append")
         def make_test_source(name, size):
             with text_open(name, "r") as f:
                 return f.read()
@@ -355,22 +591,72 @@ def run_all_tests(options):
 
     # Binary overwrites
     if "b" in options and "w" in options:
-        print("\n** Binary overwrite **\n")
+        print_section("Binary overwrite")
         def make_test_source(name, size):
             with open(name, "rb") as f:
                 return f.read()
         run_test_family(modify_tests, "t", binary_files,
-            lambda fn: open(fn, "r+b"), make_test_source)
+            lambda fn: binary_open(fn, "r+b"), make_test_source)
 
     # Text overwrites
     if "t" in options and "w" in options:
-        print("\n** Text overwrite **\n")
+        print_section("Text overwrite")
         def make_test_source(name, size):
             with text_open(name, "r") as f:
                 return f.read()
         run_test_family(modify_tests, "b", text_files,
             lambda fn: text_open(fn, "r+"), make_test_source)
 
+    # Zero-copy and positional I/O (binary only)
+    if "b" in options and "z" in options:
+        print_section("Binary readinto")
+        run_test_family(readinto_tests, "t", binary_files,
+            lambda fn: binary_open(fn, "rb"),
+            lambda name, size: bytearray(size))
+
+        if mmap is not None:
+            print_section("Binary mmap")
+            run_test_family(mmap_tests, "t", binary_files, mmap_open)
+
+        print_section("Binary copy to %s" % os.devnull)
+        with binary_open(os.devnull, "wb") as dest:
+            run_test_family(copy_tests, "t", binary_files,
+                lambda fn: binary_open(fn, "rb"), lambda name, size: dest)
+
+        if ThreadPoolExecutor is not None and hasattr(os, "pread"):
+            pool = ThreadPoolExecutor(THREADS)
+            try:
+                print_section("Binary positional input (%d threads)"
+                              % THREADS)
+                run_test_family(pread_tests, "t", binary_files,
+                    lambda fn: binary_open(fn, "rb"), lambda name, size: pool)
+
+                print_section("Binary positional overwrite (%d threads)"
+                              % THREADS)
+                def make_test_source(name, size):
+                    with open(name, "rb") as f:
+                        return f.read()
+                run_test_family(pwrite_tests, "t", binary_files,
+                    lambda fn: binary_open(fn, "r+b"), make_test_source,
+                    lambda name, size: pool)
+            finally:
+                pool.shutdown()
+
+    if json_filename:
+        data = {
+            "python": sys.version,
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "text_encoding": TEXT_ENCODING,
+            "newlines": NEWLINES,
+            "buffering": BUFFERING,
+            "threads": THREADS,
+            "results": results,
+        }
+        with open(json_filename, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        print("\nResults written to %s" % json_filename)
+
 
 def prepare_files():
     print("Preparing files...")
@@ -415,7 +701,7 @@ def prepare_files():
             f.write(tail)
 
 def main():
-    global TEXT_ENCODING, NEWLINES
+    global TEXT_ENCODING, NEWLINES, BUFFERING, THREADS
 
     usage = "usage: %prog [-h|--help] [options]"
     parser = OptionParser(usage=usage)
@@ -431,6 +717,22 @@ def main():
     parser.add_option("-w", "--write",
                       action="store_true", dest="write", default=False,
                       help="run write & modify tests")
+    parser.add_option("-z", "--zero-copy",
+                      action="store_true", dest="zero_copy", default=False,
+                      help="run readinto, mmap, copy & pread/pwrite tests "
+                           "(binary only)")
+    parser.add_option("-U", "--unbuffered",
+                      action="store_true", dest="unbuffered", default=False,
+                      help="open binary files unbuffered (buffering=0)")
+    parser.add_option("-T", "--threads",
+                      action="store", type="int", dest="threads",
+                      default=THREADS,
+                      help="thread pool size for pread/pwrite tests "
+                           "(default: %d)" % THREADS)
+    parser.add_option("-J", "--json",
+                      action="store", dest="json", default=None,
+                      metavar="FILE",
+                      help="also write results as JSON to FILE")
     parser.add_option("-E", "--encoding",
                       action="store", dest="encoding", default=None,
                       help="encoding for text tests (default: %s)" % TEXT_ENCODING)
@@ -453,7 +755,9 @@ def main():
         test_options += "r"
     if options.write:
         test_options += "w"
-    elif not options.read:
+    if options.zero_copy:
+        test_options += "z"
+    if not test_options:
         test_options += "rw"
     if options.text:
         test_options += "t"
@@ -464,12 +768,17 @@ def main():
 
     if options.encoding:
         TEXT_ENCODING = options.encoding
+    if options.unbuffered:
+        BUFFERING = 0
+    if options.threads < 1:
+        parser.error("invalid 'threads' option: %r" % options.threads)
+    THREADS = options.threads
 
     if options.io_module:
         globals()['open'] = __import__(options.io_module, {}, {}, ['open']).open
 
     prepare_files()
-    run_all_tests(test_options)
+    run_all_tests(test_options, options.json)
 
 if __name__ == "__main__":
     main()
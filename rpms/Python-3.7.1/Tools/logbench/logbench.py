@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the logging module.
+
+Measures the cost of looking up an existing logger with getLogger(), and of
+logging calls at a disabled and at an enabled level, from a varying number
+of threads running at the same time.
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+
+
+def bench_getlogger(logger, n):
+    getLogger = logging.getLogger
+    name = logger.name
+    for _ in range(n):
+        getLogger(name)
+
+def bench_disabled(logger, n):
+    debug = logger.debug
+    for i in range(n):
+        debug("request %d", i)
+
+def bench_enabled(logger, n):
+    info = logger.info
+    for i in range(n):
+        info("request %d", i)
+
+def bench_request(logger, n):
+    # What a typical request handler does
+    getLogger = logging.getLogger
+    name = logger.name
+    for i in range(n):
+        log = getLogger(name)
+        log.debug("request %d", i)
+
+BENCHMARKS = [
+    ('getLogger', bench_getlogger),
+    ('disabled', bench_disabled),
+    ('enabled', bench_enabled),
+    ('request', bench_request),
+]
+
+
+def run(func, logger, nthreads, n):
+    """Run func in nthreads threads at once, and return the elapsed time."""
+    barrier = threading.Barrier(nthreads + 1)
+    def target():
+        barrier.wait()
+        func(logger, n)
+    threads = [threading.Thread(target=target) for _ in range(nthreads)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', '--number', type=int, default=200000,
+                        help="calls made by each thread (default: %(default)s)")
+    parser.add_argument('-t', '--threads', type=int, action='append',
+                        help="number of threads; may be repeated "
+                             "(default: 1, 2 and 4)")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="repetitions, the best is kept "
+                             "(default: %(default)s)")
+    parser.add_argument('benchmarks', nargs='*',
+                        help="benchmarks to run (default: all of %s)"
+                             % ", ".join(name for name, _ in BENCHMARKS))
+    options = parser.parse_args()
+    thread_counts = options.threads or [1, 2, 4]
+    selected = [(name, func) for name, func in BENCHMARKS
+                if not options.benchmarks or name in options.benchmarks]
+
+    logger = logging.getLogger('logbench.app.handler')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.NullHandler())
+
+    print("Python %s" % sys.version.split()[0])
+    print("%-10s %8s %12s %14s" % ("benchmark", "threads", "ns/call",
+                                   "calls/s"))
+    for name, func in selected:
+        for nthreads in thread_counts:
+            elapsed = min(run(func, logger, nthreads, options.number)
+                          for _ in range(options.repeat))
+            calls = nthreads * options.number
+            print("%-10s %8d %12.1f %14.0f" % (name, nthreads,
+                                               elapsed / calls * 1e9,
+                                               calls / elapsed))
+
+
+if __name__ == "__main__":
+    main()
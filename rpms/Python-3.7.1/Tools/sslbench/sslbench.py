@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for asyncio streams over loopback, with and without TLS.
+
+A server sends a fixed amount of data to a client, which reads it with
+StreamReader.read(), StreamReader.readinto() or a plain Protocol, and the
+throughput is reported in MB/s.  Run it with two builds of Python to compare
+their SSL transports.
+"""
+
+import argparse
+import asyncio
+import os
+import ssl
+import sys
+import time
+
+
+DEFAULT_CERT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, os.pardir, 'Lib', 'test',
+                            'keycert.pem')
+
+
+class CountingProtocol(asyncio.Protocol):
+
+    def __init__(self, done):
+        self.done = done
+        self.nbytes = 0
+
+    def data_received(self, data):
+        self.nbytes += len(data)
+
+    def eof_received(self):
+        if not self.done.done():
+            self.done.set_result(self.nbytes)
+
+    def connection_lost(self, exc):
+        if not self.done.done():
+            self.done.set_result(self.nbytes)
+
+
+async def read_stream(reader, chunk_size):
+    nbytes = 0
+    while True:
+        data = await reader.read(chunk_size)
+        if not data:
+            return nbytes
+        nbytes += len(data)
+
+
+async def readinto_stream(reader, chunk_size):
+    buf = bytearray(chunk_size)
+    nbytes = 0
+    while True:
+        n = await reader.readinto(buf)
+        if not n:
+            return nbytes
+        nbytes += n
+
+
+CLIENTS = ['read', 'readinto', 'protocol']
+
+
+async def run(client, size, chunk_size, server_ctx, client_ctx):
+    chunk = os.urandom(chunk_size)
+
+    async def handle(reader, writer):
+        for _ in range(size // chunk_size):
+            writer.write(chunk)
+            await writer.drain()
+        writer.close()
+
+    loop = asyncio.get_event_loop()
+    server = await asyncio.start_server(handle, '127.0.0.1', 0,
+                                        ssl=server_ctx)
+    host, port = server.sockets[0].getsockname()[:2]
+    server_hostname = 'localhost' if client_ctx is not None else None
+    start = time.perf_counter()
+    if client == 'protocol':
+        done = loop.create_future()
+        transport, _ = await loop.create_connection(
+            lambda: CountingProtocol(done), host, port,
+            ssl=client_ctx, server_hostname=server_hostname)
+        nbytes = await done
+        transport.close()
+    else:
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=client_ctx, server_hostname=server_hostname)
+        if client == 'readinto':
+            nbytes = await readinto_stream(reader, chunk_size)
+        else:
+            nbytes = await read_stream(reader, chunk_size)
+        writer.close()
+    elapsed = time.perf_counter() - start
+    server.close()
+    await server.wait_closed()
+    if nbytes != size // chunk_size * chunk_size:
+        raise RuntimeError(f'received {nbytes} bytes')
+    return nbytes / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-s', '--size', type=int, default=256,
+                        help="megabytes sent per run (default: %(default)s)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=65536,
+                        help="size of the writes and reads "
+                             "(default: %(default)s)")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="repetitions, the best is kept "
+                             "(default: %(default)s)")
+    parser.add_argument('--certfile', default=DEFAULT_CERT,
+                        help="certificate and private key of the server "
+                             "(default: Lib/test/keycert.pem)")
+    parser.add_argument('--no-plain', action='store_true',
+                        help="only run the TLS benchmarks")
+    parser.add_argument('clients', nargs='*',
+                        help="clients to run (default: all of %s)"
+                             % ", ".join(CLIENTS))
+    options = parser.parse_args()
+    clients = options.clients or CLIENTS
+    if not hasattr(asyncio.StreamReader, 'readinto') and 'readinto' in clients:
+        clients.remove('readinto')
+
+    server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_ctx.load_cert_chain(options.certfile)
+    client_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    client_ctx.check_hostname = False
+    client_ctx.verify_mode = ssl.CERT_NONE
+
+    modes = [('tls', server_ctx, client_ctx)]
+    if not options.no_plain:
+        modes.insert(0, ('plain', None, None))
+
+    print("Python %s, %s" % (sys.version.split()[0], ssl.OPENSSL_VERSION))
+    print("%-6s %-10s %10s" % ("mode", "client", "MB/s"))
+    size = options.size * 1024 * 1024
+    for mode, sctx, cctx in modes:
+        for client in clients:
+            best = max(
+                asyncio.run(run(client, size, options.chunk_size, sctx, cctx))
+                for _ in range(options.repeat))
+            print("%-6s %-10s %10.1f" % (mode, client, best))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,11 @@
 
 import timeit
 import itertools
+import json
+import math
 import operator
+import os
+import platform
 import re
 import sys
 import datetime
@@ -47,6 +51,24 @@ parser.add_option("-8", "--8-bit", dest="bytes_only",
 parser.add_option("-u", "--unicode", dest="unicode_only",
                   action="store_true",
                   help="only do Unicode string benchmarks")
+parser.add_option("-k", "--filter", dest="filter", metavar="REGEX",
+                  help="only run benchmarks whose name, group or comment "
+                       "matches REGEX")
+parser.add_option("-r", "--repeat", dest="repeat", type="int",
+                  default=REPEAT,
+                  help="number of timing samples per benchmark "
+                       "(default: %d)" % REPEAT)
+parser.add_option("-L", "--large-size", dest="large_size", metavar="SIZE",
+                  help="also run the large haystack benchmarks on SIZE "
+                       "bytes of log text (e.g. 4M, 4MB, 512K)")
+parser.add_option("-o", "--output", dest="output", metavar="FILE",
+                  help="save the results to FILE (JSON), keyed by "
+                       "interpreter build; other builds already in FILE "
+                       "are kept")
+parser.add_option("-c", "--compare", dest="compare", nargs=2,
+                  metavar="OLD NEW",
+                  help="compare two saved runs instead of running the "
+                       "benchmarks; each is FILE or FILE#BUILD")
 
 
 _RANGE_1000 = list(range(1000))
@@ -70,6 +92,10 @@ def bench(s, group, repeat_count):
 def uses_re(f):
     f.uses_re = True
 
+def uses_large(f):
+    f.uses_large = True
+    return f
+
 ####### 'in' comparisons
 
 @bench('"A" in "A"*1000', "early match, single character", 1000)
@@ -1390,26 +1416,297 @@ def upper_conversion_dense(STR):
         s_upper()
 
 
+#### Large haystacks (only run with --large-size)
+
+LARGE_SIZE = 0
+
+_log_line = ("2006-05-22 12:34:56,789 INFO [worker-%d] GET /index.html "
+             "200 %d bytes in %d ms\n")
+
+def _make_log_text(size):
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = _log_line % (i % 16, i * 7 % 100000, i % 997)
+        lines.append(line)
+        total += len(line)
+        i += 1
+    lines.append("2006-05-22 12:34:57,000 ERROR [worker-0] disk full\n")
+    return "".join(lines)
+
+_log_text_cache = {}
+def _get_log_text(STR):
+    key = (STR, LARGE_SIZE)
+    try:
+        return _log_text_cache[key]
+    except KeyError:
+        if STR is UNICODE:
+            s = unicode_from_str(_get_log_text(BYTES).decode("ascii")
+                                 if sys.version_info >= (3,)
+                                 else _make_log_text(LARGE_SIZE))
+        elif STR is BYTES:
+            s = bytes_from_str(_make_log_text(LARGE_SIZE))
+        else:
+            raise AssertionError
+        _log_text_cache[key] = s
+        return s
+
+_log_lines_cache = {}
+def _get_log_lines(STR):
+    key = (STR, LARGE_SIZE)
+    try:
+        return _log_lines_cache[key]
+    except KeyError:
+        lines = _log_lines_cache[key] = _get_log_text(STR).split(STR("\n"))
+        return lines
+
+@uses_large
+@bench('LOG.find("ERROR")', "large haystack: find", 10)
+def large_find_late_match(STR):
+    s = _get_log_text(STR)
+    s_find = s.find
+    t = STR("ERROR")
+    for x in _RANGE_10:
+        s_find(t)
+
+@uses_large
+@bench('LOG.find("CRITICAL")', "large haystack: find", 10)
+def large_find_no_match(STR):
+    s = _get_log_text(STR)
+    s_find = s.find
+    t = STR("CRITICAL")
+    for x in _RANGE_10:
+        s_find(t)
+
+@uses_large
+@bench('"CRITICAL" in LOG', "large haystack: find", 10)
+def large_in_no_match(STR):
+    s = _get_log_text(STR)
+    t = STR("CRITICAL")
+    for x in _RANGE_10:
+        t in s
+
+@uses_large
+@bench('LOG.count("\\n")', "large haystack: find", 10)
+def large_count_newlines(STR):
+    s = _get_log_text(STR)
+    s_count = s.count
+    nl = STR("\n")
+    for x in _RANGE_10:
+        s_count(nl)
+
+@uses_large
+@bench('LOG.split("\\n")', "large haystack: split", 10)
+def large_split_newlines(STR):
+    s = _get_log_text(STR)
+    s_split = s.split
+    nl = STR("\n")
+    for x in _RANGE_10:
+        s_split(nl)
+
+@uses_large
+@bench('LOG.splitlines()', "large haystack: split", 10)
+def large_splitlines(STR):
+    s = _get_log_text(STR)
+    s_splitlines = s.splitlines
+    for x in _RANGE_10:
+        s_splitlines()
+
+@uses_large
+@bench('LOG.split()', "large haystack: split", 10)
+def large_split_whitespace(STR):
+    s = _get_log_text(STR)
+    s_split = s.split
+    for x in _RANGE_10:
+        s_split()
+
+@uses_large
+@bench('LOG.replace("INFO", "WARN")', "large haystack: replace", 10)
+def large_replace_same_length(STR):
+    s = _get_log_text(STR)
+    s_replace = s.replace
+    a = STR("INFO")
+    b = STR("WARN")
+    for x in _RANGE_10:
+        s_replace(a, b)
+
+@uses_large
+@bench('LOG.replace(" ms", " milliseconds")', "large haystack: replace", 10)
+def large_replace_grow(STR):
+    s = _get_log_text(STR)
+    s_replace = s.replace
+    a = STR(" ms")
+    b = STR(" milliseconds")
+    for x in _RANGE_10:
+        s_replace(a, b)
+
+@uses_large
+@bench('LOG.replace("CRITICAL", "FATAL")', "large haystack: replace", 10)
+def large_replace_no_match(STR):
+    s = _get_log_text(STR)
+    s_replace = s.replace
+    a = STR("CRITICAL")
+    b = STR("FATAL")
+    for x in _RANGE_10:
+        s_replace(a, b)
+
+@uses_large
+@bench('"\\n".join(LOG.split("\\n"))', "large haystack: join", 10)
+def large_join_lines(STR):
+    lines = _get_log_lines(STR)
+    s_join = STR("\n").join
+    for x in _RANGE_10:
+        s_join(lines)
+
+
 # end of benchmarks
 
 #################
 
 class BenchTimer(timeit.Timer):
-    def best(self, repeat=1):
+    def samples(self, repeat=1):
         for i in range(1, 10):
             number = 10**i
             x = self.timeit(number)
             if x > 0.02:
                 break
-        times = [x]
-        for i in range(1, repeat):
-            times.append(self.timeit(number))
-        return min(times) / number
+        # The calibration run warms up caches, it is not a sample
+        times = [self.timeit(number) for i in range(repeat)]
+        return [t / number for t in times]
+
+    def best(self, repeat=1):
+        return min(self.samples(repeat))
+
+
+def parse_size(text):
+    """Parse a size like 4096, 512K, 4M or 4MB; raise ValueError if it is
+    invalid."""
+    text = text.strip().upper()
+    if text.endswith("B"):
+        text = text[:-1]
+    for suffix, factor in (("K", 1024), ("M", 1024 ** 2), ("G", 1024 ** 3)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+def build_key():
+    """Identify the interpreter build the results were produced with."""
+    return "%s %s (%s)" % (platform.python_implementation(),
+                           platform.python_version(),
+                           ", ".join(platform.python_build()))
+
+def save_results(filename, run):
+    data = {"version": VERSION, "builds": {}}
+    if os.path.exists(filename):
+        with open(filename) as f:
+            data = json.load(f)
+    data["builds"][run["build"]] = run
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+def load_run(spec):
+    filename, sep, key = spec.partition("#")
+    with open(filename) as f:
+        builds = json.load(f)["builds"]
+    if key:
+        if key not in builds:
+            raise SystemExit("No build %r in %s (have: %s)"
+                             % (key, filename, ", ".join(sorted(builds))))
+        return builds[key]
+    if len(builds) != 1:
+        raise SystemExit("%s has several builds, use %s#BUILD with one of: %s"
+                         % (filename, filename, ", ".join(sorted(builds))))
+    return list(builds.values())[0]
+
+# Two-sided 95% critical values of Student's t distribution
+_T_95 = [None, 12.71, 4.30, 3.18, 2.78, 2.57, 2.45, 2.36, 2.31, 2.26, 2.23,
+         2.20, 2.18, 2.16, 2.14, 2.13, 2.12, 2.11, 2.10, 2.09, 2.09,
+         2.08, 2.07, 2.07, 2.06, 2.06, 2.06, 2.05, 2.05, 2.05, 2.04]
+
+def _mean_var(samples):
+    n = len(samples)
+    mean = sum(samples) / n
+    return mean, sum((x - mean) ** 2 for x in samples) / (n - 1)
+
+def is_significant(old, new):
+    """Welch's t-test at 95%; None if there are too few samples."""
+    if len(old) < 2 or len(new) < 2:
+        return None
+    m1, v1 = _mean_var(old)
+    m2, v2 = _mean_var(new)
+    se1 = v1 / len(old)
+    se2 = v2 / len(new)
+    if se1 + se2 == 0.0:
+        return m1 != m2
+    t = abs(m1 - m2) / math.sqrt(se1 + se2)
+    df = (se1 + se2) ** 2 / (
+        (se1 ** 2 / (len(old) - 1) if se1 else 0.0) +
+        (se2 ** 2 / (len(new) - 1) if se2 else 0.0))
+    df = int(df)
+    crit = _T_95[df] if 1 <= df < len(_T_95) else 1.96
+    return t > crit
+
+def compare_runs(old_spec, new_spec, pattern):
+    old = load_run(old_spec)
+    new = load_run(new_spec)
+    p("old:", old["build"], old["date"])
+    p("new:", new["build"], new["date"])
+    p("old\tnew\t")
+    p("(in ms)\t(in ms)\tchange\tsig\tbenchmark")
+    names = sorted(set(old["benchmarks"]) & set(new["benchmarks"]),
+                   key=lambda k: (new["benchmarks"][k]["group"], k))
+    for title, group in itertools.groupby(
+            names, lambda k: new["benchmarks"][k]["group"]):
+        lines = []
+        for k in group:
+            o = old["benchmarks"][k]
+            n = new["benchmarks"][k]
+            if pattern and not (pattern.search(k) or pattern.search(title)
+                                or pattern.search(n["comment"])):
+                continue
+            for kind in ("bytes", "unicode"):
+                if not o.get(kind) or not n.get(kind):
+                    continue
+                old_time = min(o[kind])
+                new_time = min(n[kind])
+                change = 100. * (new_time - old_time) / old_time
+                sig = is_significant(o[kind], n[kind])
+                lines.append("%.2f\t%.2f\t%+.1f%%\t%s\t%s (%s)" % (
+                    1000 * old_time, 1000 * new_time, change,
+                    {None: "?", True: "*", False: ""}[sig],
+                    n["comment"], kind))
+        if lines:
+            p("="*10, title)
+            for line in lines:
+                p(line)
+    missing = sorted(set(old["benchmarks"]) ^ set(new["benchmarks"]))
+    if missing:
+        p("Not in both runs:", ", ".join(missing))
 
 def main():
+    global LARGE_SIZE
+
     (options, test_names) = parser.parse_args()
     if options.bytes_only and options.unicode_only:
         raise SystemExit("Only one of --8-bit and --unicode are allowed")
+    if options.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if options.large_size:
+        try:
+            LARGE_SIZE = parse_size(options.large_size)
+        except ValueError:
+            LARGE_SIZE = 0
+        if LARGE_SIZE <= 0:
+            parser.error("invalid --large-size: %r" % options.large_size)
+    pattern = None
+    if options.filter:
+        pattern = re.compile(options.filter)
+    if options.compare:
+        compare_runs(options.compare[0], options.compare[1], pattern)
+        return
+    if options.large_size:
+        p("large haystack: %d bytes" % LARGE_SIZE)
 
     bench_functions = []
     for (k,v) in globals().items():
@@ -1423,6 +1720,11 @@ def main():
                     continue
             if options.skip_re and hasattr(v, "uses_re"):
                 continue
+            if not LARGE_SIZE and hasattr(v, "uses_large"):
+                continue
+            if pattern and not (pattern.search(k) or pattern.search(v.group)
+                                or pattern.search(v.comment)):
+                continue
 
             bench_functions.append( (v.group, k, v) )
     bench_functions.sort()
@@ -1431,6 +1733,7 @@ def main():
     p("(in ms)\t(in ms)\t%\tcomment")
 
     bytes_total = uni_total = 0.0
+    results = {}
 
     for title, group in itertools.groupby(bench_functions,
                                       operator.itemgetter(0)):
@@ -1439,12 +1742,17 @@ def main():
         p("="*10, title)
         for (_, k, v) in group:
             if hasattr(v, "is_bench"):
+                result = results[k] = {"group": v.group,
+                                       "comment": v.comment,
+                                       "bytes": None, "unicode": None}
                 bytes_time = 0.0
                 bytes_time_s = " - "
                 if not options.unicode_only:
                     try:
-                        bytes_time = BenchTimer("__main__.%s(__main__.BYTES)" % (k,),
-                                                "import __main__").best(REPEAT)
+                        samples = BenchTimer("__main__.%s(__main__.BYTES)" % (k,),
+                                             "import __main__").samples(options.repeat)
+                        bytes_time = min(samples)
+                        result["bytes"] = samples
                         bytes_time_s = "%.2f" % (1000 * bytes_time)
                         bytes_total += bytes_time
                     except UnsupportedType:
@@ -1453,8 +1761,10 @@ def main():
                 uni_time_s = " - "
                 if not options.bytes_only:
                     try:
-                        uni_time = BenchTimer("__main__.%s(__main__.UNICODE)" % (k,),
-                                              "import __main__").best(REPEAT)
+                        samples = BenchTimer("__main__.%s(__main__.UNICODE)" % (k,),
+                                             "import __main__").samples(options.repeat)
+                        uni_time = min(samples)
+                        result["unicode"] = samples
                         uni_time_s = "%.2f" % (1000 * uni_time)
                         uni_total += uni_time
                     except UnsupportedType:
@@ -1478,5 +1788,15 @@ def main():
             1000*bytes_total, 1000*uni_total, 100.*ratio,
             "TOTAL"))
 
+    if options.output:
+        save_results(options.output, {
+            "build": build_key(),
+            "python": sys.version,
+            "date": str(datetime.datetime.now()),
+            "large_size": LARGE_SIZE,
+            "benchmarks": results,
+        })
+        p("Results saved to %s as %r" % (options.output, build_key()))
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the asyncio timers, scheduled with a heap or a TimerWheel.
+
+Like a server with one idle timeout per connection, the benchmark arms a
+timeout for each of many connections, then re-arms them all several times
+by cancelling each timeout and scheduling a new one.  Finally, timeouts
+spread over a short interval are left to expire while the loop runs.  The
+CPU time of each phase and the memory allocated are reported.
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+
+def noop():
+    pass
+
+
+def arm(loop, count, timeout):
+    call_later = loop.call_later
+    return [call_later(timeout * (1 + random.random()), noop)
+            for _ in range(count)]
+
+
+def rearm(loop, timers, timeout):
+    call_later = loop.call_later
+    for i, timer in enumerate(timers):
+        timer.cancel()
+        timers[i] = call_later(timeout * (1 + random.random()), noop)
+
+
+def expire(loop, count, spread):
+    call_later = loop.call_later
+    for _ in range(count):
+        call_later(random.random() * spread, noop)
+    loop.run_until_complete(asyncio.sleep(spread + 0.01))
+
+
+def new_loop(scheduler, options):
+    loop = asyncio.new_event_loop()
+    if scheduler == 'wheel':
+        loop.set_timer_wheel(asyncio.TimerWheel(options.resolution))
+    random.seed(0)
+    gc.collect()
+    return loop
+
+
+def run(scheduler, options):
+    loop = new_loop(scheduler, options)
+    try:
+        c0 = time.process_time()
+        timers = arm(loop, options.timers, options.timeout)
+        c1 = time.process_time()
+        for _ in range(options.rounds):
+            rearm(loop, timers, options.timeout)
+        c2 = time.process_time()
+        for timer in timers:
+            timer.cancel()
+        del timers
+        # Let the heap drop the cancelled timers
+        loop.run_until_complete(asyncio.sleep(0))
+        c3 = time.process_time()
+        expire(loop, options.expire, options.spread)
+        c4 = time.process_time()
+    finally:
+        loop.close()
+    return c1 - c0, c2 - c1, c4 - c3
+
+
+def measure_memory(scheduler, options):
+    # tracemalloc slows down allocations: measure memory in a separate run
+    loop = new_loop(scheduler, options)
+    try:
+        tracemalloc.start()
+        timers = arm(loop, options.timers, options.timeout)
+        armed = tracemalloc.get_traced_memory()[0]
+        for _ in range(options.rounds):
+            rearm(loop, timers, options.timeout)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        loop.close()
+    return armed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', '--timers', type=int, default=1000000,
+                        help="number of armed timeouts "
+                             "(default: %(default)s)")
+    parser.add_argument('-r', '--rounds', type=int, default=3,
+                        help="number of times each timeout is re-armed "
+                             "(default: %(default)s)")
+    parser.add_argument('-t', '--timeout', type=float, default=60.0,
+                        help="timeout in seconds, randomized up to twice "
+                             "as long (default: %(default)s)")
+    parser.add_argument('-e', '--expire', type=int, default=200000,
+                        help="number of timers left to expire "
+                             "(default: %(default)s)")
+    parser.add_argument('-s', '--spread', type=float, default=1.0,
+                        help="interval over which they expire, in seconds "
+                             "(default: %(default)s)")
+    parser.add_argument('--resolution', type=float, default=0.001,
+                        help="resolution of the timer wheel "
+                             "(default: %(default)s)")
+    parser.add_argument('schedulers', nargs='*',
+                        help="schedulers to run (default: heap wheel)")
+    options = parser.parse_args()
+    schedulers = options.schedulers or ['heap', 'wheel']
+
+    print("Python %s" % sys.version.split()[0])
+    print("%d timeouts, %d re-arm rounds, %d expiring timers"
+          % (options.timers, options.rounds, options.expire))
+    print("%-6s %10s %10s %10s %12s %12s"
+          % ("", "arm (s)", "rearm (s)", "expire (s)",
+             "armed (MB)", "peak (MB)"))
+    for scheduler in schedulers:
+        arm_time, rearm_time, expire_time = run(scheduler, options)
+        armed, peak = measure_memory(scheduler, options)
+        print("%-6s %10.2f %10.2f %10.2f %12.1f %12.1f"
+              % (scheduler, arm_time, rearm_time, expire_time,
+                 armed / 1e6, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()